@@ -0,0 +1,194 @@
+"""
+Dynamic micro-batching for model requests
+Collects concurrent requests for a short window and runs them as one batch
+"""
+
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import Future, TimeoutError as FuturesTimeout
+
+from app.metrics import Histogram, QUEUE_WAIT_BUCKETS_MS
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class _PendingRequest:
+    """A request waiting in the scheduler queue"""
+
+    __slots__ = ("kind", "payload", "group", "future", "enqueued_at")
+
+    def __init__(self, kind, payload, group):
+        self.kind = kind
+        self.payload = payload
+        self.group = group
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class BatchScheduler:
+    """
+    Batches concurrent requests in front of the model
+    
+    Requests are grouped by (kind, group) and each group is passed to the
+    handler registered for its kind as a list of payloads. Handlers must
+    return one result per payload, in order. All model work happens on the
+    scheduler thread, so request threads never call generate directly.
+    """
+
+    def __init__(self, handlers, window_ms=10, max_batch_size=8):
+        """
+        Initialize the scheduler
+        
+        Args:
+            handlers: dict mapping request kind to callable(list_of_payloads) -> list_of_results
+            window_ms: How long to wait for more requests after the first arrives
+            max_batch_size: Max requests collected per window
+        """
+        self.handlers = dict(handlers)
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_BUCKETS_MS)
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.requests = 0
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="batch-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, kind, payload, group=None):
+        """
+        Queue a request
+        
+        Args:
+            kind: Handler name (e.g. 'summarize')
+            payload: Handler-specific request data
+            group: Optional key; only requests with equal keys share a batch
+        
+        Returns:
+            Future: Resolves to the handler result for this payload
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown request kind: {kind}")
+        if self._stopped.is_set():
+            raise RuntimeError("Batch scheduler is stopped")
+        request = _PendingRequest(kind, payload, group)
+        self._queue.put(request)
+        return request.future
+
+    def run(self, kind, payload, group=None, timeout=None):
+        """
+        Queue a request and block until its result is ready
+        
+        Args:
+            kind, payload, group: See submit()
+            timeout: Max seconds to wait (None = no limit)
+        
+        Returns:
+            Handler result for this payload
+        
+        Raises:
+            TimeoutError: When no result arrives within timeout; a request
+                          still queued is then dropped from its batch
+        """
+        future = self.submit(kind, payload, group)
+        try:
+            return future.result(timeout=timeout)
+        except FuturesTimeout:
+            future.cancel()
+            raise TimeoutError(f"No '{kind}' result within {timeout}s (model busy)") from None
+
+    def stats(self):
+        """
+        Get scheduler statistics
+        
+        Returns:
+            dict: Request/batch counters and queue-wait / batch-size histograms
+        """
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "pending": self._queue.qsize(),
+            "window_ms": self.window * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+            "batch_size": self.batch_size.snapshot(),
+        }
+
+    def stop(self, timeout=None):
+        """Stop the scheduler thread; queued requests still in flight are failed"""
+        self._stopped.set()
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _collect(self):
+        """Block for the first request, then gather more until the window closes"""
+        first = self._queue.get()
+        if first is None:
+            return []
+        collected = [first]
+        deadline = time.perf_counter() + self.window
+        while len(collected) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._stopped.set()
+                break
+            collected.append(request)
+        return collected
+
+    def _loop(self):
+        """Scheduler thread main loop"""
+        while not self._stopped.is_set():
+            collected = self._collect()
+
+            groups = {}
+            for request in collected:
+                groups.setdefault((request.kind, request.group), []).append(request)
+
+            for (kind, _), batch in groups.items():
+                self._run_batch(kind, batch)
+
+        # Fail anything that arrived after stop()
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                request.future.set_exception(RuntimeError("Batch scheduler is stopped"))
+
+    def _run_batch(self, kind, batch):
+        """Run one group of requests through its handler and resolve their futures"""
+        # Requests whose caller gave up waiting are left out
+        batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        started = time.perf_counter()
+        for request in batch:
+            self.queue_wait_ms.observe((started - request.enqueued_at) * 1000.0)
+        self.batch_size.observe(len(batch))
+        self.requests += len(batch)
+        self.batches += 1
+
+        try:
+            results = self.handlers[kind]([request.payload for request in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Handler '{kind}' returned {len(results)} results for {len(batch)} requests")
+        except Exception as e:
+            logger.error(f"Error running '{kind}' batch of {len(batch)}: {e}")
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        for request, result in zip(batch, results):
+            request.future.set_result(result)
@@ -0,0 +1,489 @@
+"""
+Content-addressed result cache
+Bounded in-memory LRU in front of a persistent on-disk tier shared by processes,
+and a per-document chatbot answer cache with near-duplicate question matching
+"""
+
+import os
+import re
+import json
+import time
+import copy
+import hashlib
+import tempfile
+import threading
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Contractions expanded before questions are compared
+_CONTRACTIONS = (
+    (re.compile(r"\b(what|who|where|when|how|why|which|it|that|there|here)'s\b"), r"\1 is"),
+    (re.compile(r"\bcan't\b"), "can not"),
+    (re.compile(r"\bwon't\b"), "will not"),
+    (re.compile(r"n't\b"), " not"),
+    (re.compile(r"'re\b"), " are"),
+    (re.compile(r"'ll\b"), " will"),
+    (re.compile(r"'ve\b"), " have"),
+    (re.compile(r"'d\b"), " would"),
+)
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+# Words that change how a question is phrased, not what it asks. Every other
+# word, including question words, negations and tenses, is a key term that a
+# near-duplicate question must share
+_FILLER_WORDS = frozenset({
+    'a', 'an', 'the', 'is', 'are', 'am', 'be', 'please', 'kindly', 'can', 'could', 'would',
+    'you', 'me', 'us', 'i', 'we', 'tell', 'let', 'know', 'want', 'wonder', 'to', 'just',
+    'exactly', 'actually', 'so', 'well', 'hi', 'hello', 'hey',
+})
+
+
+def make_cache_key(*parts):
+    """
+    Build a stable cache key from JSON-serializable parts
+    
+    Args:
+        *parts: Values that together identify a result
+    
+    Returns:
+        str: SHA-256 hex digest
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache of JSON-serializable results
+    
+    The memory tier is a thread-safe LRU bounded by entry count. The disk
+    tier stores one JSON file per key under disk_dir (sharded by key
+    prefix) and is written atomically, so several worker processes can
+    share it and it survives restarts. Both tiers expire entries older
+    than max_age seconds; the disk tier is also trimmed to max_disk_bytes,
+    oldest files first.
+    """
+
+    # Run a disk eviction pass after this many writes
+    EVICT_EVERY = 64
+
+    def __init__(self, max_entries=512, disk_dir=None, max_disk_bytes=256 * 1024 * 1024,
+                 max_age=7 * 24 * 3600):
+        """
+        Initialize result cache
+        
+        Args:
+            max_entries: Max entries in the memory tier (0 disables it)
+            disk_dir: Directory for the disk tier (None disables it)
+            max_disk_bytes: Size cap for the disk tier
+            max_age: Entry lifetime in seconds (None for no expiry)
+        """
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_age = max_age
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def get(self, key):
+        """
+        Look up a result
+        
+        Args:
+            key: Cache key (see make_cache_key)
+        
+        Returns:
+            A copy of the cached value, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if self._expired(stored_at, now):
+                    del self._entries[key]
+                else:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return copy.deepcopy(value)
+
+        value, stored_at = self._read_disk(key, now)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, value, stored_at)
+        return copy.deepcopy(value)
+
+    def put(self, key, value):
+        """
+        Store a result in both tiers
+        
+        Args:
+            key: Cache key
+            value: JSON-serializable value
+        """
+        value = copy.deepcopy(value)
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            self._writes += 1
+            evict = self._writes % self.EVICT_EVERY == 0
+
+        self._write_disk(key, value)
+        if evict:
+            self.evict_disk()
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._entries.clear()
+        for path, _, _ in self._disk_files():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def evict_disk(self):
+        """
+        Remove expired disk entries and trim the tier to max_disk_bytes
+        
+        Returns:
+            int: Number of files removed
+        """
+        if not self.disk_dir:
+            return 0
+
+        now = time.time()
+        files = sorted(self._disk_files(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for path, size, mtime in files:
+            if not self._expired(mtime, now) and total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+                total -= size
+            except OSError:
+                pass
+
+        with self._lock:
+            self.evictions += removed
+        return removed
+
+    def stats(self):
+        """
+        Get cache statistics
+        
+        Returns:
+            dict: Hit/miss counters, hit rate and tier sizes
+        """
+        files = self._disk_files()
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_entries": len(self._entries),
+                "disk_entries": len(files),
+                "disk_bytes": sum(size for _, size, _ in files),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+    def _expired(self, stored_at, now):
+        """Check whether an entry stored at stored_at is past max_age"""
+        return self.max_age is not None and now - stored_at > self.max_age
+
+    def _remember(self, key, value, stored_at):
+        """Insert into the memory tier (lock held by caller)"""
+        if not self.max_entries:
+            return
+        self._entries[key] = (value, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_path(self, key):
+        """Path of the disk entry for a key"""
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key, now):
+        """Read a disk entry; returns (value, stored_at) or (None, None)"""
+        if not self.disk_dir:
+            return None, None
+        path = self._disk_path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+            if self._expired(stored_at, now):
+                os.remove(path)
+                return None, None
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f), stored_at
+        except (OSError, ValueError):
+            return None, None
+
+    def _write_disk(self, key, value):
+        """Atomically write a disk entry"""
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"Error writing result cache entry: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _disk_files(self):
+        """List (path, size, mtime) of every disk entry"""
+        if not self.disk_dir or not os.path.isdir(self.disk_dir):
+            return []
+        files = []
+        for shard in os.listdir(self.disk_dir):
+            shard_dir = os.path.join(self.disk_dir, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(shard_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((path, stat.st_size, stat.st_mtime))
+        return files
+
+
+def normalize_question(question):
+    """
+    Canonical form of a question for exact answer-cache matches
+
+    Lowercases, expands contractions and drops punctuation and repeated
+    whitespace, so "What's the deadline" and "what is the deadline?" match.
+
+    Returns:
+        str: Normalized question
+    """
+    text = question.lower().replace("\u2019", "'")
+    for pattern, replacement in _CONTRACTIONS:
+        text = pattern.sub(replacement, text)
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def question_terms(question):
+    """
+    Key terms of a question, in order, for near-duplicate answer-cache matches
+
+    Drops filler words ("can you tell me", articles, "is"/"are") and plural
+    endings from the normalized question, so "Can you tell me what the
+    payment deadlines are?" and "what is the payment deadline" share their
+    terms while "what is the payment budget" does not.
+
+    Returns:
+        tuple: Key terms
+    """
+    terms = []
+    for word in normalize_question(question).split():
+        if word in _FILLER_WORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+            word = word[:-1]
+        terms.append(word)
+    return tuple(terms)
+
+
+class _AnswerScope:
+    """Answers of one document: LRU entries plus a slot matrix of question embeddings"""
+
+    __slots__ = ("entries", "matrix", "slot_keys", "slot_terms", "free")
+
+    def __init__(self, max_entries):
+        self.entries = OrderedDict()  # (profile, normalized question) -> (slot, value)
+        self.matrix = None  # (max_entries x d) float32, allocated with the first embedding
+        self.slot_keys = [None] * max_entries  # entry key per slot that holds an embedding
+        self.slot_terms = [None] * max_entries  # question_terms() of each slot's question
+        self.free = list(range(max_entries - 1, -1, -1))
+
+
+class AnswerCache:
+    """
+    Chatbot answers per document scope
+
+    A scope is a fingerprint of the document, model and context settings,
+    so answers never outlive the document they were generated for. Scopes
+    are kept in LRU order up to max_documents, and each keeps up to
+    max_entries answers, also LRU. A lookup first tries the normalized
+    question, then the most similar earlier question of the same profile
+    with the same key terms (question_terms()) by cosine similarity of
+    question embeddings, accepted at or above threshold. The key terms
+    guard against embeddings that score questions about different things
+    close together; the embeddings rank rephrasings that pass the guard.
+    A scope's embeddings sit in one preallocated matrix, so the similarity
+    check is one matrix-vector product.
+    """
+
+    def __init__(self, max_documents=256, max_entries=128, threshold=None):
+        """
+        Initialize answer cache
+
+        Args:
+            max_documents: Max document scopes held
+            max_entries: Max answers per document
+            threshold: Min cosine similarity of a near-duplicate question
+                       with the same key terms (None = exact matches only)
+        """
+        self.max_documents = max_documents
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._scopes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, scope, profile, question, vector=None):
+        """
+        Look up an answer
+
+        Args:
+            scope: Document scope key
+            profile: Generation profile name
+            question: Question as asked
+            vector: L2-normalized question embedding for near-duplicate matching
+
+        Returns:
+            dict or None: A copy of the stored value plus "match" ("exact" or
+                          "similar") and "matched_question"
+        """
+        key = (profile, normalize_question(question))
+        with self._lock:
+            answers = self._scopes.get(scope)
+            if answers is None:
+                self.misses += 1
+                return None
+            self._scopes.move_to_end(scope)
+
+            entry = answers.entries.get(key)
+            match = "exact"
+            if entry is None and vector is not None and self.threshold is not None:
+                key = self._nearest(answers, profile, question_terms(question), vector)
+                entry = answers.entries.get(key) if key is not None else None
+                match = "similar"
+            if entry is None:
+                self.misses += 1
+                return None
+
+            answers.entries.move_to_end(key)
+            if match == "exact":
+                self.exact_hits += 1
+            else:
+                self.similar_hits += 1
+            return dict(copy.deepcopy(entry[1]), match=match, matched_question=key[1])
+
+    def put(self, scope, profile, question, value, vector=None):
+        """
+        Store an answer
+
+        Args:
+            scope: Document scope key
+            profile: Generation profile name
+            question: Question as asked
+            value: JSON-serializable answer data
+            vector: L2-normalized question embedding (enables near-duplicate hits)
+        """
+        key = (profile, normalize_question(question))
+        value = copy.deepcopy(value)
+        with self._lock:
+            answers = self._scopes.get(scope)
+            if answers is None:
+                answers = self._scopes[scope] = _AnswerScope(self.max_entries)
+                while len(self._scopes) > self.max_documents:
+                    _, dropped = self._scopes.popitem(last=False)
+                    self.evictions += len(dropped.entries)
+            self._scopes.move_to_end(scope)
+
+            if key in answers.entries:
+                slot = answers.entries.pop(key)[0]
+            else:
+                if not answers.free:
+                    _, (oldest_slot, _) = answers.entries.popitem(last=False)
+                    answers.slot_keys[oldest_slot] = None
+                    answers.free.append(oldest_slot)
+                    self.evictions += 1
+                slot = answers.free.pop()
+            answers.entries[key] = (slot, value)
+
+            if vector is not None:
+                if answers.matrix is None:
+                    answers.matrix = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+                answers.matrix[slot] = vector
+                answers.slot_keys[slot] = key
+                answers.slot_terms[slot] = question_terms(question)
+            else:
+                answers.slot_keys[slot] = None
+
+    def clear(self):
+        """Drop all answers"""
+        with self._lock:
+            self._scopes.clear()
+
+    def stats(self):
+        """
+        Get cache statistics
+
+        Returns:
+            dict: Document and entry counts, exact/similar hits, misses,
+                  hit rate and evictions
+        """
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            lookups = hits + self.misses
+            return {
+                "documents": len(self._scopes),
+                "entries": sum(len(answers.entries) for answers in self._scopes.values()),
+                "hits": hits,
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "threshold": self.threshold,
+            }
+
+    def _nearest(self, answers, profile, terms, vector):
+        """Key of the most similar stored question of a profile and terms at or above threshold (lock held)"""
+        if answers.matrix is None or not terms:
+            return None
+        candidates = [slot for slot, key in enumerate(answers.slot_keys)
+                      if key is not None and key[0] == profile and answers.slot_terms[slot] == terms]
+        if not candidates:
+            return None
+        scores = answers.matrix[candidates] @ np.asarray(vector, dtype=np.float32)
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        return answers.slot_keys[candidates[best]]
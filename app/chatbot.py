@@ -2,56 +2,165 @@
 Chatbot for contextual question answering based on summarized documents
 """
 
+import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import torch
+from transformers.modeling_outputs import BaseModelOutput
+from app.cache import AnswerCache, make_cache_key
+from app.generation import Deadline
+from app.metrics import REGISTRY, stage
+from app.retrieval import PassageIndex, embed_texts
 from app.summarizer import DocumentSummarizer
+from app.tokenization import content_hash
 from app.utils import TextProcessor, ContextBinder
 
 logger = logging.getLogger(__name__)
 
+QUESTIONS_ANSWERED = REGISTRY.counter("chatbot_questions_total", "Questions answered by the chatbot")
+CONTEXT_SOURCES = REGISTRY.counter("chatbot_context_total", "Questions answered by context source",
+                                   labelnames=("source",))
+
+# Threads finishing background document loads, shared by all chatbots
+_load_pool = None
+_load_pool_lock = threading.Lock()
+
+
+def _background_loads(workers):
+    """Get the shared background load pool, creating it on first use"""
+    global _load_pool
+    with _load_pool_lock:
+        if _load_pool is None:
+            _load_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chatbot-load")
+        return _load_pool
+
+
 class DocumentChatbot:
     """Chatbot that answers questions based on document context"""
 
-    def __init__(self, summarizer):
+    # Decoding settings for answers (num_beams and prompt_lookup come from the generation profile)
+    GENERATION_KWARGS = dict(
+        max_length=150,
+        min_length=5,
+        num_beams=4,
+        early_stopping=True,
+    )
+
+    def __init__(self, summarizer, split_context=None, retrieval=None, answer_cache=None):
         """
         Initialize chatbot with a summarizer
 
         Args:
             summarizer: DocumentSummarizer instance
+            split_context: Encode the summary context once per document and
+                           only the question per request, instead of the
+                           joint "question: ... context: ..." prompt. An
+                           approximation: answers can differ from the
+                           joint encoding (defaults to the
+                           CHATBOT_SPLIT_CONTEXT setting)
+            retrieval: Answer from the document passages closest to each
+                       question instead of the summary (defaults to the
+                       CHATBOT_RETRIEVAL setting; takes precedence over
+                       split_context)
+            answer_cache: AnswerCache shared with other chatbots (defaults
+                          to a private one when CHATBOT_ANSWER_CACHE_ENABLED)
         """
         self.summarizer = summarizer
         self.document_context = None
         self.summary = None
         self.keywords = []
+        if split_context is None:
+            split_context = summarizer._setting('CHATBOT_SPLIT_CONTEXT', False)
+        if retrieval is None:
+            retrieval = summarizer._setting('CHATBOT_RETRIEVAL', True)
+        self.split_context = split_context and not retrieval
+        self.retrieval = retrieval
+        self.question_tokens = summarizer._setting('CHATBOT_QUESTION_TOKENS', 64)
+        if answer_cache is None and summarizer._setting('CHATBOT_ANSWER_CACHE_ENABLED', True):
+            answer_cache = AnswerCache(
+                max_documents=summarizer._setting('CHATBOT_ANSWER_CACHE_DOCUMENTS', 256),
+                max_entries=summarizer._setting('CHATBOT_ANSWER_CACHE_ENTRIES', 128),
+                threshold=summarizer._setting('CHATBOT_ANSWER_CACHE_SIMILARITY', 0.9),
+            )
+        self.answer_cache = answer_cache
+        self._answer_scope = None
+        self._context_states = None
+        self._context_mask = None
+        self._index = None
+        self._load_id = 0
+        self._status = {"state": "empty"}
+        # Called without arguments when a load has finished (set by ChatSessionStore)
+        self.on_loaded = None
 
-    def load_document(self, document_text):
+    @property
+    def loading(self):
+        """True while a background load is still summarizing or indexing"""
+        return self._status["state"] == "loading"
+
+    @property
+    def revision(self):
+        """Changes whenever export_state() would: a new or restored document, a finished load, a clear"""
+        return self._load_id, self._status["state"]
+
+    def load_document(self, document_text, use_cache=True, profile=None, deadline_ms=None,
+                      background=False):
         """
         Load a document for context
 
+        Keywords and text statistics are computed at once. The passage index
+        (with retrieval) and the summary follow; with background=True they
+        are built on a background thread and this returns immediately.
+        Questions asked meanwhile use whatever is ready: retrieved passages,
+        then the summary, then the leading text of the document.
+
         Args:
             document_text: The document to analyze
+            use_cache: Reuse a cached summary of the same document
+            profile: Generation profile for the document summary
+            deadline_ms: Optional latency deadline for the summary
+            background: Return before summarizing and indexing (see load_status())
 
         Returns:
-            dict: Document analysis results
+            dict: Document analysis results ("status" is "loading" until
+                  the summary is ready)
         """
         try:
+            self._load_id += 1
+            load_id = self._load_id
+            self._set_answer_scope(document_text)
             self.document_context = document_text
-
-            # Generate summary
-            result = self.summarizer.summarize(document_text)
-            self.summary = result.get('summary', '')
+            self.summary = None
+            self._index = None
+            self._context_states = None
+            self._context_mask = None
+            self._status = {"state": "loading", "summary_ready": False, "index_ready": False,
+                            "started": time.perf_counter()}
 
             # Extract keywords
-            self.keywords = ContextBinder.extract_keywords(document_text, num_keywords=10)
+            with stage("keywords"):
+                self.keywords = ContextBinder.extract_keywords(document_text, num_keywords=10)
 
-            return {
-                "success": True,
-                "message": "Document loaded successfully",
+            stats = {
                 "word_count": TextProcessor.get_word_count(document_text),
                 "reading_time": TextProcessor.get_reading_time(document_text),
-                "summary": self.summary,
                 "keywords": self.keywords
             }
+            if background:
+                # Twice the inference slots by default: a long document's chunks then
+                # queue for slots alongside other loads instead of holding the only thread
+                workers = (self.summarizer._setting('CHATBOT_LOAD_WORKERS')
+                           or 2 * self.summarizer.executor.slots)
+                pool = _background_loads(workers)
+                pool.submit(self._finish_load, load_id, document_text, use_cache, profile, deadline_ms)
+                return dict(stats, success=True, status="loading", summary=None,
+                            message="Document loading; summary and index are built in the background")
+
+            self._finish_load(load_id, document_text, use_cache, profile, deadline_ms)
+            if self._status["state"] == "failed":
+                return {"success": False, "error": self._status["error"]}
+            return dict(stats, success=True, status="ready", summary=self.summary,
+                        message="Document loaded successfully")
 
         except Exception as e:
             logger.error(f"Error loading document: {e}")
@@ -60,62 +169,515 @@ class DocumentChatbot:
                 "error": str(e)
             }
 
-    def answer_question(self, question):
+    def _finish_load(self, load_id, document_text, use_cache, profile, deadline_ms):
+        """
+        Build the passage index and the summary of a loaded document
+
+        Results are published as they finish, unless another document was
+        loaded (or the context cleared) meanwhile.
+        """
+        try:
+            # The index comes first: it serves questions far sooner than the summary
+            if self.retrieval:
+                started = time.perf_counter()
+                index = self._build_index(document_text)
+                if load_id != self._load_id:
+                    return
+                self._index = index
+                self._status = dict(self._status, index_ready=True,
+                                    index_ms=round((time.perf_counter() - started) * 1000.0, 1))
+
+            # Generate summary
+            started = time.perf_counter()
+            result = self.summarizer.summarize(document_text, use_cache=use_cache,
+                                               profile=profile, deadline_ms=deadline_ms)
+            if load_id != self._load_id:
+                return
+            if result.get('error'):
+                raise RuntimeError(result['error'])
+            self.summary = result.get('summary', '')
+
+            # Encode the summary context once so questions only run their own part
+            if self.split_context:
+                self._encode_context()
+            self._status = dict(self._status, state="ready", summary_ready=True, finished=time.perf_counter(),
+                                summary_ms=round((time.perf_counter() - started) * 1000.0, 1))
+
+        except Exception as e:
+            logger.error(f"Error loading document: {e}")
+            if load_id == self._load_id:
+                self._status = dict(self._status, state="failed", error=str(e), finished=time.perf_counter())
+
+        if load_id == self._load_id and self.on_loaded is not None:
+            try:
+                self.on_loaded()
+            except Exception as e:
+                logger.error(f"Error in document load callback: {e}")
+
+    def load_status(self):
+        """
+        Get the progress of the current document load
+
+        Returns:
+            dict: "state" ("empty", "loading", "ready" or "failed"),
+                  "summary_ready", "index_ready", "elapsed_ms", step timings,
+                  and the summary once it is ready
+        """
+        status = dict(self._status)
+        started = status.pop("started", None)
+        finished = status.pop("finished", None) or time.perf_counter()
+        if started is not None:
+            status["elapsed_ms"] = round((finished - started) * 1000.0, 1)
+        if status.get("summary_ready"):
+            status["summary"] = self.summary
+            status["keywords"] = self.keywords
+        return status
+
+    def answer_question(self, question, profile=None, deadline_ms=None):
         """
         Answer a question based on loaded document context
 
         Args:
             question: User's question
+            profile: Generation profile name
+            deadline_ms: Optional latency deadline; the answer is cut short
+                         ("truncated") when it is reached
 
         Returns:
             dict: Answer and related information
         """
+        return self.answer_batch([question], profile, deadline_ms)[0]
+
+    def answer_questions(self, questions, profile=None, deadline_ms=None, batch_size=None):
+        """
+        Answer a list of questions in batched generate calls
+
+        Questions are sorted by length and answered batch_size at a time,
+        each batch in one padded generate call against the loaded
+        document's context.
+
+        Args:
+            questions: Questions about the loaded document
+            profile: Generation profile name
+            deadline_ms: Optional latency deadline for the whole list
+            batch_size: Questions per generate call (default CHATBOT_BATCH_SIZE)
+
+        Returns:
+            dict: "answers" (answer_question() dicts in input order, each
+                  with "latency_ms", the time until its batch was done),
+                  "batches", "total_ms" and "questions_per_second"
+        """
         if not self.document_context:
             return {
                 "success": False,
                 "error": "No document loaded. Please load a document first."
             }
 
-        try:
-            # Prepare input for QA model
-            input_text = f"question: {question} context: {self.summary}"
-
-            # Tokenize
-            inputs = self.summarizer.tokenizer.encode(input_text, return_tensors="pt", max_length=512, truncation=True)
-            inputs = inputs.to(self.summarizer.device)
-
-            # Generate answer
-            with torch.no_grad():
-                summary_ids = self.summarizer.model.generate(
-                    inputs,
-                    max_length=150,
-                    min_length=5,
-                    num_beams=4,
-                    early_stopping=True,
-                )
+        started = time.perf_counter()
+        batch_size = batch_size or self.summarizer._setting('CHATBOT_BATCH_SIZE', 16)
+        deadline = Deadline(deadline_ms) if deadline_ms else None
+        # Similar lengths in a batch keep padding low
+        order = sorted(range(len(questions)), key=lambda i: len(questions[i]))
+        answers = [None] * len(questions)
+        batches = 0
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            results = self.answer_batch([questions[i] for i in batch], profile, deadline=deadline)
+            latency_ms = round((time.perf_counter() - started) * 1000.0, 2)
+            for i, result in zip(batch, results):
+                answers[i] = dict(result, latency_ms=latency_ms)
+            batches += 1
+
+        total = time.perf_counter() - started
+        return {
+            "success": True,
+            "answers": answers,
+            "batches": batches,
+            "total_ms": round(total * 1000.0, 2),
+            "questions_per_second": round(len(questions) / total, 2) if total > 0 else 0.0,
+        }
 
-            # Decode answer
-            answer = self.summarizer.tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+    def answer_batch(self, questions, profile=None, deadline_ms=None, deadline=None):
+        """
+        Answer several questions in one padded generate call
 
-            # Check if question relates to document keywords
-            question_lower = question.lower()
-            related_keywords = [kw for kw in self.keywords
-                               if kw.lower() in question_lower]
+        Args:
+            questions: List of questions about the loaded document
+            profile: Generation profile name
+            deadline_ms: Optional latency deadline shared by the batch
+            deadline: Running Deadline to use instead of deadline_ms
 
-            return {
-                "success": True,
-                "question": question,
-                "answer": answer,
-                "related_keywords": related_keywords,
-                "confidence": len(related_keywords) / len(self.keywords) if self.keywords else 0
-            }
+        Returns:
+            list: answer_question()-style dicts in input order
+        """
+        if not self.document_context:
+            return [{
+                "success": False,
+                "error": "No document loaded. Please load a document first."
+            } for _ in questions]
+
+        try:
+            profile, kwargs = self._answer_kwargs(profile)
+            if deadline is None and deadline_ms:
+                deadline = Deadline(deadline_ms)
+
+            origin = self._answer_origin()
+            # Embedded once: for near-duplicate cache lookups and for retrieval
+            vectors = self._question_vectors(questions)
+            results = [self._cached_answer(question, profile, vectors, i, origin)
+                       for i, question in enumerate(questions)]
+            misses = [i for i, result in enumerate(results) if result is None]
+            if not misses:
+                return results
+
+            answered = self._generate_answers(
+                [questions[i] for i in misses], profile, kwargs, deadline,
+                vectors[misses] if vectors is not None else None,
+            )
+            for i, result in zip(misses, answered):
+                results[i] = result
+                self._store_answer(result, profile, vectors, i, origin)
+            return results
 
         except Exception as e:
             logger.error(f"Error answering question: {e}")
-            return {
+            return [{
                 "success": False,
                 "error": str(e)
-            }
+            } for _ in questions]
+
+    def _generate_answers(self, questions, profile, kwargs, deadline=None, vectors=None):
+        """
+        Generate answers for questions in one padded generate call
+
+        Returns:
+            list: answer_question()-style dicts in input order
+        """
+        if self._context_states is not None:
+            answers = self._generate_with_split_context(questions, kwargs, deadline)
+            QUESTIONS_ANSWERED.inc(len(questions))
+            CONTEXT_SOURCES.labels("summary").inc(len(questions))
+            return [self._build_answer(question, answer, profile, deadline, "summary")
+                    for question, answer in zip(questions, answers)]
+
+        # Prepare input for QA model
+        contexts, source = self._contexts(questions, vectors)
+        input_texts = [self._build_prompt(question, context)
+                       for question, context in zip(questions, contexts)]
+
+        # Tokenize (through the summarizer's shared token cache)
+        inputs = self.summarizer.pad_inputs([
+            self.summarizer.truncate_ids(ids, 512)
+            for ids in self.summarizer.encode_batch(input_texts)
+        ])
+
+        # Generate answers
+        answer_ids = self.summarizer.generate(inputs, deadline=deadline, **kwargs)
+
+        # Decode answers
+        with stage("detokenize"):
+            answers = self.summarizer.tokenizer.batch_decode(answer_ids, skip_special_tokens=True)
+        QUESTIONS_ANSWERED.inc(len(questions))
+        CONTEXT_SOURCES.labels(source).inc(len(questions))
+
+        return [self._build_answer(question, answer, profile, deadline, source)
+                for question, answer in zip(questions, answers)]
+
+    def answer_question_stream(self, question, do_sample=False, temperature=1.0, top_k=50, top_p=1.0,
+                               profile=None, deadline_ms=None):
+        """
+        Answer a question, yielding the answer while it is decoded
+
+        Args:
+            question: User's question
+            do_sample, temperature, top_k, top_p: See DocumentSummarizer.streaming_kwargs()
+            profile: Generation profile name
+            deadline_ms: Optional latency deadline
+
+        Yields:
+            dict: {"event": "token", "text": ...} pieces, then
+                  {"event": "done", **answer_question() result} or {"event": "error", "error": ...}
+        """
+        started = time.perf_counter()
+        if not self.document_context:
+            yield {"event": "error", "error": "No document loaded. Please load a document first."}
+            return
+
+        try:
+            profile, kwargs = self._answer_kwargs(profile)
+            deadline = Deadline(deadline_ms) if deadline_ms else None
+
+            # Sampled answers vary by design, so they neither use nor fill the cache
+            origin = self._answer_origin()
+            vectors = None
+            if not do_sample:
+                vectors = self._question_vectors([question])
+                cached = self._cached_answer(question, profile, vectors, 0, origin)
+                if cached is not None:
+                    yield {"event": "token", "text": cached["answer"]}
+                    yield {"event": "done", **cached}
+                    return
+
+            if self._context_states is not None:
+                inputs = self._split_context_inputs([question])
+                source = "summary"
+            else:
+                contexts, source = self._contexts([question], vectors)
+                ids = self.summarizer.encode(self._build_prompt(question, contexts[0]))
+                inputs = self.summarizer.pad_inputs([self.summarizer.truncate_ids(ids, 512)])
+            CONTEXT_SOURCES.labels(source).inc()
+
+            kwargs = self.summarizer.streaming_kwargs(kwargs, do_sample, temperature, top_k, top_p)
+            pieces = []
+            for piece in self.summarizer.generate_stream(inputs, started, deadline, **kwargs):
+                pieces.append(piece)
+                yield {"event": "token", "text": piece}
+
+            answer = self._build_answer(question, "".join(pieces).strip(), profile, deadline, source)
+            if not do_sample:
+                self._store_answer(answer, profile, vectors, 0, origin)
+            yield {"event": "done", **answer}
+
+        except Exception as e:
+            logger.error(f"Error answering question: {e}")
+            yield {"event": "error", "error": str(e)}
+
+    def _answer_kwargs(self, profile=None):
+        """
+        Answer decoding settings with the beam count of a generation profile
+
+        Returns:
+            tuple: (profile name, generate() settings)
+        """
+        profile, settings = self.summarizer.generation_profile(profile)
+        kwargs = dict(self.GENERATION_KWARGS, num_beams=settings["num_beams"],
+                      prompt_lookup=settings["prompt_lookup"])
+        if kwargs["num_beams"] == 1:
+            kwargs = self.summarizer._greedy_settings(kwargs)
+        return profile, kwargs
+
+    def _encode_context(self):
+        """Run the encoder over the document context and keep its states"""
+        ids = self.summarizer.encode(f"context: {self.summary}")
+        inputs = self.summarizer.pad_inputs([
+            self.summarizer.truncate_ids(ids, 512 - self.question_tokens)
+        ])
+        encoder_outputs = self.summarizer.run_encoder(inputs)
+        self._context_states = encoder_outputs.last_hidden_state
+        self._context_mask = inputs["attention_mask"]
+
+    def _generate_with_split_context(self, questions, generate_kwargs, deadline=None):
+        """
+        Answer questions against the separately encoded context
+
+        Only the question tokens go through the encoder; their states are
+        concatenated with the stored context states (fusion-in-decoder
+        style) and the decoder attends over both. The T5 encoder never
+        attends between question and context here, so this approximates
+        the joint prompt rather than reproducing it: bench_chatbot reports
+        how often the answers agree.
+
+        Returns:
+            list: Decoded answers
+        """
+        answer_ids = self.summarizer.generate(
+            self._split_context_inputs(questions),
+            deadline=deadline,
+            **generate_kwargs
+        )
+        with stage("detokenize"):
+            return self.summarizer.tokenizer.batch_decode(answer_ids, skip_special_tokens=True)
+
+    def _split_context_inputs(self, questions):
+        """
+        Encode questions and join their states with the stored context states
+
+        Returns:
+            dict: encoder_outputs / attention_mask for generate
+        """
+        inputs = self.summarizer.pad_inputs([
+            self.summarizer.truncate_ids(ids, self.question_tokens)
+            for ids in self.summarizer.encode_batch([f"question: {q}" for q in questions])
+        ])
+        question_states = self.summarizer.run_encoder(inputs).last_hidden_state
+
+        batch_size = len(questions)
+        hidden_states = torch.cat([
+            question_states,
+            self._context_states.expand(batch_size, -1, -1)
+        ], dim=1)
+        attention_mask = torch.cat([
+            inputs["attention_mask"],
+            self._context_mask.expand(batch_size, -1)
+        ], dim=1)
+
+        return {
+            "encoder_outputs": BaseModelOutput(last_hidden_state=hidden_states),
+            "attention_mask": attention_mask,
+        }
+
+    def _build_index(self, document_text):
+        """
+        Chunk a document and embed every passage for retrieval
+
+        Returns:
+            PassageIndex
+        """
+        return PassageIndex.build(
+            self.summarizer,
+            document_text,
+            passage_tokens=self.summarizer._setting('CHATBOT_PASSAGE_TOKENS', 96),
+            batch_size=self.summarizer._setting('CHATBOT_EMBEDDING_BATCH_SIZE', 32),
+            dtype=self.summarizer._setting('CHATBOT_EMBEDDING_DTYPE', 'float32'),
+        )
+
+    def _contexts(self, questions, vectors=None):
+        """
+        Context text for each question
+
+        With retrieval, the passages most similar to the question (top
+        CHATBOT_RETRIEVAL_TOP_K within CHATBOT_CONTEXT_TOKENS, in document
+        order); otherwise the summary. While a background load has neither
+        ready, the leading text of the document.
+
+        Args:
+            questions: Questions to find context for
+            vectors: Question embeddings when already computed
+
+        Returns:
+            tuple: (one context string per question, source: "passages",
+                    "summary" or "leading_text")
+        """
+        index, summary = self._index, self.summary
+        budget = self.summarizer._setting('CHATBOT_CONTEXT_TOKENS', 400)
+        if index is not None:
+            with stage("retrieve"):
+                picks = index.search(
+                    vectors if vectors is not None else embed_texts(self.summarizer, questions),
+                    top_k=self.summarizer._setting('CHATBOT_RETRIEVAL_TOP_K', 4),
+                    token_budget=budget,
+                )
+            return [" ".join(index.passages[i] for i in indices) for indices in picks], "passages"
+        if summary:
+            return [summary] * len(questions), "summary"
+        # About 4 words per 3 tokens; the prompt is truncated to the window anyway
+        leading = " ".join(self.document_context.split()[:budget * 3 // 4])
+        return [leading] * len(questions), "leading_text"
+
+    def _set_answer_scope(self, document_text):
+        """
+        Point the answer cache at a new document (None when none is loaded)
+
+        The scope covers everything an answer depends on besides the
+        question and profile: document, context settings and model weights.
+        The old scope's answers are left in place: other sessions on the
+        same document may still use them, and they can never be served for
+        another document. The cache's LRU drops them once unused.
+        """
+        self._answer_scope = None
+        if self.answer_cache is None or document_text is None:
+            return
+        settings = {
+            "retrieval": self.retrieval,
+            "split_context": self.split_context,
+            "passage_tokens": self.summarizer._setting('CHATBOT_PASSAGE_TOKENS', 96),
+            "top_k": self.summarizer._setting('CHATBOT_RETRIEVAL_TOP_K', 4),
+            "context_tokens": self.summarizer._setting('CHATBOT_CONTEXT_TOKENS', 400),
+            "embedding_dtype": self.summarizer._setting('CHATBOT_EMBEDDING_DTYPE', 'float32'),
+            "generation": self.GENERATION_KWARGS,
+        }
+        self._answer_scope = make_cache_key("answers", content_hash(document_text), settings,
+                                            self.summarizer.model_fingerprint())
+
+    def _question_vectors(self, questions):
+        """
+        Embed questions when retrieval or near-duplicate cache lookups need them
+
+        Returns:
+            np.ndarray or None
+        """
+        near_duplicates = self.answer_cache is not None and self.answer_cache.threshold is not None
+        if self._index is None and not near_duplicates:
+            return None
+        with stage("embed"):
+            return embed_texts(self.summarizer, questions)
+
+    def _answer_origin(self):
+        """
+        Identify the document a request is answered from
+
+        Taken when a request starts and checked again before its answers
+        are cached, so answers for a document replaced mid-generation are
+        never stored under the new document's scope.
+
+        Returns:
+            tuple: (answer scope, load id)
+        """
+        return self._answer_scope, self._load_id
+
+    def _cached_answer(self, question, profile, vectors, row, origin):
+        """
+        Look up an earlier answer to the same or a near-identical question
+
+        Args:
+            origin: _answer_origin() at the start of the request
+
+        Returns:
+            dict or None: answer_question()-style dict with "cached" set to
+                          the match kind ("exact" or "similar")
+        """
+        scope = origin[0]
+        if self.answer_cache is None or scope is None:
+            return None
+        hit = self.answer_cache.get(scope, profile, question,
+                                    vectors[row] if vectors is not None else None)
+        if hit is None:
+            return None
+        QUESTIONS_ANSWERED.inc()
+        CONTEXT_SOURCES.labels(hit["source"]).inc()
+        return dict(self._build_answer(question, hit["answer"], profile, source=hit["source"]),
+                    cached=hit["match"], matched_question=hit["matched_question"])
+
+    def _store_answer(self, result, profile, vectors, row, origin):
+        """
+        Cache a complete answer
+
+        Answers cut short by a deadline, given from the leading text while
+        a background load is running, or generated while another document
+        was loaded (origin no longer current) are not kept.
+
+        Args:
+            origin: _answer_origin() at the start of the request
+        """
+        if self.answer_cache is None or origin[0] is None or origin != self._answer_origin():
+            return
+        if not result.get("success") or result["truncated"] or result["context_source"] == "leading_text":
+            return
+        self.answer_cache.put(origin[0], profile, result["question"],
+                              {"answer": result["answer"], "source": result["context_source"]},
+                              vectors[row] if vectors is not None else None)
+
+    def _build_prompt(self, question, context=None):
+        """Build the QA model input for a question"""
+        return f"question: {question} context: {self.summary if context is None else context}"
+
+    def _build_answer(self, question, answer, profile=None, deadline=None, source=None):
+        """Build the answer_question() result dict"""
+        # Check if question relates to document keywords
+        question_lower = question.lower()
+        related_keywords = [kw for kw in self.keywords
+                           if kw.lower() in question_lower]
+
+        return {
+            "success": True,
+            "question": question,
+            "answer": answer,
+            "related_keywords": related_keywords,
+            "confidence": len(related_keywords) / len(self.keywords) if self.keywords else 0,
+            "profile": profile,
+            "truncated": bool(deadline and deadline.truncated),
+            "context_source": source
+        }
 
     def get_document_summary(self):
         """
@@ -132,15 +694,83 @@ class DocumentChatbot:
 
         return {
             "success": True,
+            "status": self._status["state"],
             "summary": self.summary,
             "keywords": self.keywords,
             "word_count": TextProcessor.get_word_count(self.document_context),
             "reading_time": TextProcessor.get_reading_time(self.document_context)
         }
 
+    def memory_bytes(self):
+        """
+        Approximate memory held by the loaded document
+
+        Returns:
+            int: Bytes of the document text, summary, keywords and cached
+                 context encoder states
+        """
+        size = sum(len(text) for text in (self.document_context, self.summary) if text)
+        size += sum(len(keyword) for keyword in self.keywords)
+        if self._index is not None:
+            size += self._index.memory_bytes()
+        for tensor in (self._context_states, self._context_mask):
+            if tensor is not None:
+                size += tensor.numel() * tensor.element_size()
+        return size
+
+    def export_state(self):
+        """
+        Get the loaded document as a JSON-serializable dict
+
+        Cached encoder states are left out: restore_state() rebuilds them
+        from the summary with one encoder pass. The passage index is kept,
+        so restoring never re-embeds the document.
+
+        Returns:
+            dict: Document text, summary, keywords and passage index (None
+                  when no document is loaded)
+        """
+        if not self.document_context:
+            return None
+        return {
+            "document": self.document_context,
+            "summary": self.summary,
+            "keywords": self.keywords,
+            "index": self._index.to_state() if self._index is not None else None,
+        }
+
+    def restore_state(self, state):
+        """
+        Load a document from export_state() output without summarizing it
+
+        Args:
+            state: Dict returned by export_state()
+        """
+        self._set_answer_scope(state["document"])
+        self.document_context = state["document"]
+        self.summary = state["summary"]
+        self.keywords = state["keywords"]
+        self._context_states = None
+        self._context_mask = None
+        self._index = None
+        if self.retrieval:
+            if state.get("index"):
+                self._index = PassageIndex.from_state(state["index"])
+            else:
+                self._index = self._build_index(self.document_context)
+        elif self.split_context:
+            self._encode_context()
+        self._status = {"state": "ready", "summary_ready": True, "index_ready": self._index is not None}
+
     def clear_context(self):
-        """Clear loaded document context"""
+        """Clear loaded document context (a background load still running is discarded)"""
+        self._load_id += 1
+        self._set_answer_scope(None)
+        self._status = {"state": "empty"}
         self.document_context = None
         self.summary = None
         self.keywords = []
+        self._context_states = None
+        self._context_mask = None
+        self._index = None
         return {"success": True, "message": "Context cleared"}
\ No newline at end of file
@@ -16,17 +16,115 @@ class Config:
     MODEL_NAME = "t5-base"  # Fallback model name
     MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'model.safetensors')
     TOKENIZER_PATH = os.path.join(os.path.dirname(__file__), '..')
+    MODEL_DIR = os.path.join(os.path.dirname(__file__), '..', 'model')  # Weights/tokenizer served by the web app
+    MODEL_LOCAL_FILES_ONLY = False  # Fallback model only from the local Hugging Face cache (never download)
+    
+    # Web app startup
+    MODEL_LOAD_BACKGROUND = True  # Bind at once and load the model in a thread (see /api/ready)
+    WARMUP_ENABLED = True  # Run generate at typical shapes before reporting ready
+    WARMUP_INPUT_LENGTHS = (64, 512)  # Input token lengths to warm up
+    WARMUP_NEW_TOKENS = 8  # Tokens generated per warmup call
     
     # Max input/output lengths
     MAX_INPUT_LENGTH = 512
     MAX_OUTPUT_LENGTH = 200
     MIN_OUTPUT_LENGTH = 30
     
-    # Summarization parameters
+    # Summarization parameters (used by generation profiles that leave them unset)
     NUM_BEAMS = 4
-    NO_REPEAT_NGRAM_SIZE = 3
-    LENGTH_PENALTY = 2.0
-    EARLY_STOPPING = True
+    NO_REPEAT_NGRAM_SIZE = 2
+    REPETITION_PENALTY = 1.3
+    LENGTH_PENALTY = 0.8  # < 1 allows longer output
+    EARLY_STOPPING = False
+    PROMPT_LOOKUP = False  # Greedy only: draft tokens from the input, verify them in one pass
+    PROMPT_LOOKUP_DRAFT_TOKENS = 10  # Max tokens drafted per decoder pass
+    PROMPT_LOOKUP_MAX_NGRAM = 3  # Longest generated suffix matched against the input
+    
+    # Named generation profiles, selectable per request ("profile")
+    GENERATION_PROFILES = {
+        "fast": {"num_beams": 1, "prompt_lookup": True},  # Greedy with prompt-lookup drafts
+        "balanced": {"num_beams": 2},
+        "quality": {},  # NUM_BEAMS / LENGTH_PENALTY / ... as configured above
+    }
+    DEFAULT_GENERATION_PROFILE = "quality"
+    
+    # Inference executor: every model call runs on one of INFERENCE_SLOTS slots
+    INFERENCE_SLOTS = 1  # Concurrent model calls (others queue)
+    INFERENCE_INTRA_OP_THREADS = 0  # torch threads per call (0 = CPU cores / slots)
+    INFERENCE_INTER_OP_THREADS = 0  # torch inter-op threads (0 = torch default)
+    INFERENCE_PIN_CORES = False  # Bind each slot to its own disjoint cores (Linux)
+    
+    # Multi-process serving (main.py): load the model once, fork workers that share it
+    SERVER_WORKERS = 1  # > 1 enables preload-and-fork serving (env SERVER_WORKERS overrides)
+    SERVER_GRACEFUL_TIMEOUT = 30  # Seconds a stopping worker may spend on in-flight requests
+    METRICS_MULTIPROCESS_DIR = None  # Worker metric snapshots merged by /api/metrics (None = a temp dir)
+    METRICS_SNAPSHOT_INTERVAL = 5.0  # Seconds between a worker's snapshots (max age of other workers' samples)
+    
+    # Token cache shared by summarizer and chatbot (keyed by content hash)
+    TOKEN_CACHE_SIZE = 256  # Max cached texts
+    TOKEN_CACHE_MAX_TOKENS = 2000000  # Max token IDs held in total
+    
+    # Summary result cache (memory LRU + on-disk tier shared by processes)
+    RESULT_CACHE_ENABLED = False  # Opt-in: writes summaries under RESULT_CACHE_DIR
+    RESULT_CACHE_MEMORY_ENTRIES = 512
+    RESULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'cache', 'results')  # None disables the disk tier
+    RESULT_CACHE_DISK_MAX_BYTES = 256 * 1024 * 1024
+    RESULT_CACHE_MAX_AGE = 7 * 24 * 3600  # Seconds
+    
+    # Batched summarization (summarize_batch)
+    SUMMARIZE_BATCH_MAX_TOKENS = 8192  # Max padded input tokens per generate call
+    SUMMARIZE_BATCH_MAX_SIZE = 16  # Max sequences per generate call
+    
+    # Long document (map-reduce) summarization
+    LONG_DOCUMENT_STRATEGY = "map_reduce"  # "map_reduce", "extractive" (key sentences only) or "truncate"
+    LONG_DOCUMENT_CHUNK_TOKENS = 480  # Token budget per chunk (leaves room for prefix/EOS)
+    LONG_DOCUMENT_CHUNK_OVERLAP = 32  # Tokens of trailing context repeated in the next chunk
+    LONG_DOCUMENT_FAN_IN = 4  # Max partial summaries merged per reduce step
+    LONG_DOCUMENT_PARTIAL_TOKENS = 150  # Max new tokens for intermediate summaries
+    LONG_DOCUMENT_BATCH_SIZE = 8  # Chunks per padded generate call
+    LONG_DOCUMENT_WORKERS = None  # Batches summarized at once (None = INFERENCE_SLOTS; capped at INFERENCE_SLOTS)
+    LONG_DOCUMENT_MAX_DEPTH = 6  # Safety cap on reduce levels
+    
+    # Extractive sentence ranking (key sentences, "extractive" pre-compression)
+    EXTRACTIVE_DIVERSITY = 0.3  # MMR redundancy weight (0 = plain centrality top-k)
+    EXTRACTIVE_POOL_SIZE = 256  # Top-ranked sentences considered for the input window
+    
+    # Request micro-batching in front of the model (web app)
+    BATCHING_ENABLED = True
+    BATCH_WINDOW_MS = 10  # How long to wait for concurrent requests
+    BATCH_MAX_SIZE = 8  # Max requests per batched generate call
+    BATCH_TIMEOUT_SECONDS = 120  # Max wait for a batched result before answering 503
+    
+    # Chatbot
+    CHATBOT_SPLIT_CONTEXT = False  # Encode the summary once and questions apart (approximate: answers can differ)
+    CHATBOT_QUESTION_TOKENS = 64  # Max question tokens when the context is encoded apart
+    CHATBOT_RETRIEVAL = True  # Answer from the passages closest to the question (overrides CHATBOT_SPLIT_CONTEXT)
+    CHATBOT_PASSAGE_TOKENS = 96  # Max tokens per embedded passage
+    CHATBOT_RETRIEVAL_TOP_K = 4  # Max passages per question
+    CHATBOT_CONTEXT_TOKENS = 400  # Token budget of the retrieved passages
+    CHATBOT_EMBEDDING_DTYPE = "float32"  # Passage embedding storage: "float32", "float16" or "int8"
+    CHATBOT_EMBEDDING_BATCH_SIZE = 32  # Passages per encoder call when embedding
+    CHATBOT_LOAD_BACKGROUND = True  # /api/chatbot/load returns before summarizing (poll /api/chatbot/status)
+    CHATBOT_LOAD_WORKERS = None  # Threads finishing background loads (None = 2 x INFERENCE_SLOTS)
+    CHATBOT_BATCH_SIZE = 16  # Questions per generate call in /api/chatbot/ask-batch
+    CHATBOT_MAX_BATCH_QUESTIONS = 100  # Max questions per /api/chatbot/ask-batch request
+    CHATBOT_ANSWER_CACHE_ENABLED = True  # Reuse answers to repeated questions about the same document
+    CHATBOT_ANSWER_CACHE_DOCUMENTS = 256  # Max documents with cached answers (LRU)
+    CHATBOT_ANSWER_CACHE_ENTRIES = 128  # Max cached answers per document (LRU)
+    CHATBOT_ANSWER_CACHE_SIMILARITY = 0.9  # Min question embedding cosine for a near-duplicate hit with the same key terms (None = exact only)
+    CHAT_SESSIONS_MAX_BYTES = 256 * 1024 * 1024  # Memory budget of the sessions held in memory
+    CHAT_SESSIONS_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'sessions')  # None drops evicted sessions (prefork workers then share a temp dir)
+    CHAT_SESSION_IDLE_SECONDS = 1800  # Evict sessions unused this long (None = only over budget)
+    CHAT_SESSION_MAX_AGE = 24 * 3600  # Seconds an evicted session stays on disk
+    
+    # Quantized CPU inference: None (float32) or "int8" (dynamic, Linear layers)
+    QUANTIZATION = None
+    QUANTIZED_MODEL_CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'cache', 'quantized')  # None disables
+    
+    # Inference backend: "torch" or "onnx" (ONNX Runtime CPU, see python -m app.onnx_backend export)
+    INFERENCE_BACKEND = "torch"
+    ONNX_MODEL_DIR = os.path.join(os.path.dirname(__file__), '..', 'model', 'onnx')
+    ONNX_INTRA_OP_THREADS = 0  # 0 = ONNX Runtime default
     
     # Device settings
     DEVICE = "cpu"  # Change to "cuda" if GPU is available
@@ -34,6 +132,23 @@ class Config:
     # History settings
     HISTORY_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'history.json')
     
+    # Asynchronous jobs (/api/jobs): durable SQLite queue drained by runner threads
+    JOBS_ENABLED = True
+    JOBS_DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'jobs.sqlite3')
+    JOB_WORKERS = 1  # Runner threads per process
+    JOB_RESULT_TTL = 24 * 3600  # Seconds finished jobs and their results are kept
+    JOB_LEASE_SECONDS = 60  # Running jobs without a heartbeat for this long are requeued
+    JOB_MAX_ATTEMPTS = 3  # Requeues before a job that keeps dying is marked failed
+    JOB_POLL_INTERVAL = 1.0  # Seconds idle runners wait between queue checks
+    
+    # On-demand profiling: X-Profile header / ?_profile= flag on /api/* routes
+    PROFILING_ENABLED = False  # Flags are ignored while off
+    PROFILING_TOKEN = os.getenv('PROFILING_TOKEN')  # When set, the flag value must equal it
+    PROFILING_SAMPLE_EVERY = 0  # Profile 1 in N /api/* requests automatically (0 = off)
+    PROFILING_TORCH_TRACE = True  # Record torch operators besides Python functions
+    PROFILING_TRACE_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'traces')
+    PROFILING_MAX_TRACES = 200  # Newest profiles kept in the trace directory
+    
     # Flask settings
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     
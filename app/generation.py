@@ -0,0 +1,206 @@
+"""
+Generation helpers
+A latency deadline shared by the generate calls of one request, an online
+cost model that picks beams and token budgets to fit it, and the logits
+processing used by the package's own decoding loops
+"""
+
+import time
+import threading
+from collections import deque
+import numpy as np
+
+
+class Deadline:
+    """Latency deadline for one request"""
+
+    def __init__(self, deadline_ms):
+        """
+        Start the clock
+
+        Args:
+            deadline_ms: Time budget in milliseconds from now
+        """
+        self.deadline_ms = deadline_ms
+        self.expires = time.perf_counter() + deadline_ms / 1000.0
+        self.truncated = False
+
+    def remaining(self):
+        """
+        Get the time left
+
+        Returns:
+            float: Seconds until the deadline (0.0 once it has passed)
+        """
+        return max(0.0, self.expires - time.perf_counter())
+
+
+class DecodeCostModel:
+    """
+    Online latency model for generate()
+
+    For each number of decoded rows (batch size x beams) it fits
+    seconds = overhead + per_token * new_tokens by least squares over a
+    window of recent calls. Row counts that were never measured are
+    extrapolated from the nearest measured one.
+    """
+
+    # Priors used before any call has been measured
+    DEFAULT_OVERHEAD = 0.05
+    DEFAULT_TOKEN_SECONDS = 0.02
+
+    def __init__(self, window=64):
+        """
+        Initialize cost model
+
+        Args:
+            window: Recent observations kept per row count
+        """
+        self.window = window
+        self._samples = {}  # rows -> deque of (new_tokens, seconds)
+        self._lock = threading.Lock()
+
+    def observe(self, rows, new_tokens, seconds):
+        """
+        Record one generate() call
+
+        Args:
+            rows: Decoded rows (batch size x beams)
+            new_tokens: Generated tokens per row
+            seconds: Wall time of the call
+        """
+        if new_tokens <= 0:
+            return
+        with self._lock:
+            self._samples.setdefault(rows, deque(maxlen=self.window)).append((new_tokens, seconds))
+
+    def coefficients(self, rows):
+        """
+        Get (overhead seconds, seconds per token) for a row count
+
+        Args:
+            rows: Decoded rows (batch size x beams)
+
+        Returns:
+            tuple: (overhead, per_token)
+        """
+        with self._lock:
+            samples = list(self._samples.get(rows, ()))
+            measured = sorted(self._samples)
+
+        if samples:
+            tokens = np.array([s[0] for s in samples], dtype=np.float64)
+            seconds = np.array([s[1] for s in samples], dtype=np.float64)
+            if len(np.unique(tokens)) > 1:
+                per_token, overhead = np.polyfit(tokens, seconds, 1)
+                if per_token > 0:
+                    return max(0.0, float(overhead)), float(per_token)
+            return 0.0, float(np.mean(seconds / tokens))
+
+        if not measured:
+            return self.DEFAULT_OVERHEAD, self.DEFAULT_TOKEN_SECONDS * rows ** 0.5
+
+        # Batched rows share most of the per-step cost on CPU, so scale sublinearly
+        nearest = min(measured, key=lambda r: abs(r - rows))
+        overhead, per_token = self.coefficients(nearest)
+        return overhead, per_token * (rows / nearest) ** 0.5
+
+    def estimate(self, rows, new_tokens):
+        """
+        Predict the wall time of a generate() call
+
+        Returns:
+            float: Seconds
+        """
+        overhead, per_token = self.coefficients(rows)
+        return overhead + per_token * new_tokens
+
+    def plan(self, seconds, batch_size, num_beams, max_new_tokens, safety=0.9):
+        """
+        Choose beams and a token budget that fit the time left
+
+        Keeps the full token budget with as many beams as fit (halving from
+        num_beams), and only shortens the output with greedy decoding when
+        even that does not fit.
+
+        Args:
+            seconds: Time left
+            batch_size: Sequences in the call
+            num_beams: Beams requested by the profile
+            max_new_tokens: Tokens requested
+            safety: Fraction of the time left to plan for
+
+        Returns:
+            tuple: (num_beams, max_new_tokens)
+        """
+        budget = seconds * safety
+        beams = max(1, num_beams)
+        while beams > 1:
+            if self.estimate(batch_size * beams, max_new_tokens) <= budget:
+                return beams, max_new_tokens
+            beams //= 2
+
+        overhead, per_token = self.coefficients(batch_size)
+        tokens = int((budget - overhead) / per_token) if per_token > 0 else max_new_tokens
+        return 1, max(1, min(max_new_tokens, tokens))
+
+    def snapshot(self):
+        """
+        Get a JSON-serializable view of the fitted coefficients
+
+        Returns:
+            dict: Per row count sample count, overhead (ms) and per-token cost (ms)
+        """
+        with self._lock:
+            counts = {rows: len(samples) for rows, samples in self._samples.items()}
+
+        snapshot = {}
+        for rows, count in sorted(counts.items()):
+            overhead, per_token = self.coefficients(rows)
+            snapshot[str(rows)] = {
+                "samples": count,
+                "overhead_ms": round(overhead * 1000.0, 3),
+                "per_token_ms": round(per_token * 1000.0, 3),
+            }
+        return snapshot
+
+
+def process_scores(scores, sequences, eos_token_id, min_length=0, no_repeat_ngram_size=0,
+                   repetition_penalty=1.0):
+    """
+    Apply min-length, repetition penalty and n-gram blocking in place
+
+    Matches transformers' logits processors of the same names, so custom
+    decoding loops produce the same tokens as model.generate().
+
+    Args:
+        scores: (rows, vocab) float array of logits or log-probabilities
+        sequences: (rows, length) int array of decoder tokens so far
+        eos_token_id: End-of-sequence token, blocked below min_length
+        min_length: Minimum decoder length (including the start token)
+        no_repeat_ngram_size: Block n-grams of this size from repeating (0 = off)
+        repetition_penalty: Penalty for tokens already generated (1.0 = off)
+
+    Returns:
+        np.ndarray: scores
+    """
+    cur_len = sequences.shape[1]
+
+    if repetition_penalty != 1.0:
+        for row, tokens in enumerate(sequences):
+            values = scores[row, tokens]
+            scores[row, tokens] = np.where(values < 0, values * repetition_penalty,
+                                           values / repetition_penalty)
+
+    if cur_len < min_length:
+        scores[:, eos_token_id] = -np.inf
+
+    n = no_repeat_ngram_size
+    if n and cur_len + 1 >= n:
+        for row, tokens in enumerate(sequences.tolist()):
+            prefix = tuple(tokens[cur_len - n + 1:])
+            banned = [tokens[i + n - 1] for i in range(cur_len - n + 1)
+                      if tuple(tokens[i:i + n - 1]) == prefix]
+            if banned:
+                scores[row, banned] = -np.inf
+    return scores
@@ -0,0 +1,185 @@
+"""
+Inference executor
+A fixed number of inference slots that run every model call, with torch
+thread counts sized per slot and optional CPU pinning
+"""
+
+import os
+import time
+import itertools
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import torch
+
+from app import profiling
+from app.metrics import Histogram, QUEUE_WAIT_BUCKETS_MS
+
+logger = logging.getLogger(__name__)
+
+
+def available_cores():
+    """
+    CPU cores this process may run on
+
+    Returns:
+        list: Core IDs
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def set_interop_threads(threads):
+    """
+    Set torch's inter-op thread count (possible once per process, before inter-op work)
+
+    Args:
+        threads: Thread count (0 = leave torch's default)
+    """
+    if not threads or torch.get_num_interop_threads() == threads:
+        return
+    try:
+        torch.set_num_interop_threads(threads)
+    except RuntimeError as e:
+        logger.warning(f"Could not set inter-op threads to {threads}: {e}")
+
+
+class InferenceExecutor:
+    """
+    Run model calls on a fixed set of inference slots
+
+    Each slot is one thread; at most `slots` model calls run at a time and
+    the rest wait in a FIFO queue, so concurrent requests cannot
+    oversubscribe the CPU. torch's intra-op thread count is process-wide,
+    so every slot uses intra_op_threads (default: cores / slots). With
+    pin_cores each slot thread is bound to its own disjoint set of cores;
+    the OpenMP workers it starts inherit that set. Calls made from a slot
+    thread run inline, so nested submissions cannot deadlock.
+    """
+
+    def __init__(self, slots=1, intra_op_threads=0, inter_op_threads=0, pin_cores=False, cores=None):
+        """
+        Initialize executor
+
+        Args:
+            slots: Concurrent model calls
+            intra_op_threads: torch threads per call (0 = cores / slots)
+            inter_op_threads: torch inter-op threads (0 = torch default)
+            pin_cores: Bind each slot thread to its own cores (Linux)
+            cores: Cores to use (default: this process's affinity set)
+        """
+        self.cores = sorted(cores) if cores else available_cores()
+        self.slots = max(1, slots)
+        self.intra_op_threads = intra_op_threads or max(1, len(self.cores) // self.slots)
+        self.pin_cores = pin_cores and hasattr(os, 'sched_setaffinity')
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_BUCKETS_MS)
+
+        torch.set_num_threads(self.intra_op_threads)
+        set_interop_threads(inter_op_threads)
+
+        self._local = threading.local()
+        self._slot_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._pool = ThreadPoolExecutor(max_workers=self.slots, thread_name_prefix="inference",
+                                        initializer=self._init_slot)
+
+    def slot_cores(self, slot):
+        """
+        Cores assigned to a slot when pinning
+
+        Slots get consecutive, disjoint blocks of intra_op_threads cores
+        while there are enough; beyond that blocks wrap around.
+
+        Returns:
+            list: Core IDs
+        """
+        start = (slot * self.intra_op_threads) % len(self.cores)
+        return [self.cores[(start + i) % len(self.cores)]
+                for i in range(min(self.intra_op_threads, len(self.cores)))]
+
+    def _init_slot(self):
+        """Slot thread initializer: thread count and optional pinning"""
+        slot = next(self._slot_ids) % self.slots
+        self._local.slot = slot
+        torch.set_num_threads(self.intra_op_threads)
+        if self.pin_cores:
+            try:
+                os.sched_setaffinity(0, self.slot_cores(slot))
+            except OSError as e:
+                logger.warning(f"Could not pin inference slot {slot}: {e}")
+
+    def in_slot(self):
+        """True when called from one of this executor's slot threads"""
+        return getattr(self._local, "slot", None) is not None
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queue a call for the next free slot
+
+        Args:
+            fn: Callable running model work
+            *args, **kwargs: Its arguments
+
+        Returns:
+            Future: Result of fn
+        """
+        queued_at = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+
+        def call():
+            self.queue_wait_ms.observe((time.perf_counter() - queued_at) * 1000.0)
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+
+        return self._pool.submit(call)
+
+    def run(self, fn, *args, **kwargs):
+        """
+        Run a call on a slot and wait for its result
+
+        Runs inline when already on a slot thread, or when the calling
+        thread is being profiled (so its profile includes the model call).
+
+        Returns:
+            Result of fn (its exception is re-raised)
+        """
+        if self.in_slot() or profiling.active():
+            return fn(*args, **kwargs)
+        return self.submit(fn, *args, **kwargs).result()
+
+    def stats(self):
+        """
+        Get slot configuration and load
+
+        Returns:
+            dict: Slots, threads, pinned cores, queued/running/completed calls
+                  and the queue-wait histogram (ms)
+        """
+        with self._lock:
+            queued, running, completed = self._queued, self._running, self._completed
+        return {
+            "slots": self.slots,
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": torch.get_num_interop_threads(),
+            "pinned_cores": [self.slot_cores(slot) for slot in range(self.slots)] if self.pin_cores else None,
+            "queued": queued,
+            "running": running,
+            "completed": completed,
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
+
+    def shutdown(self, wait=True):
+        """Stop the slot threads once queued calls have run"""
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,503 @@
+"""
+Asynchronous jobs
+A durable SQLite job queue under data/ and runner threads that drain it
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Job states; the last three are final
+JOB_STATES = ("queued", "running", "succeeded", "failed", "cancelled")
+FINISHED_STATES = ("succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    """Raised from a job's progress callback once cancellation was requested"""
+
+
+class JobStore:
+    """
+    Jobs persisted in a SQLite database
+
+    Every call opens its own connection, so the store is safe to share
+    between threads and forked worker processes; state changes that must
+    not race (claiming, cancelling) run in BEGIN IMMEDIATE transactions.
+    Running jobs are leased: their runner refreshes heartbeat_at, and jobs
+    whose heartbeat is older than lease_seconds, or whose owning process on
+    this host is gone (server restarted), go back to the queue. Finished
+    jobs expire after result_ttl.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            result TEXT,
+            error TEXT,
+            progress TEXT,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            owner TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            heartbeat_at REAL,
+            expires_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+    """
+
+    # Columns returned by get()/list() (result only on request)
+    FIELDS = ("id", "kind", "status", "progress", "error", "attempts", "created_at",
+              "started_at", "finished_at", "expires_at")
+
+    def __init__(self, path, result_ttl=24 * 3600, lease_seconds=60, max_attempts=3):
+        """
+        Initialize store
+
+        Args:
+            path: SQLite database file (created with its directory)
+            result_ttl: Seconds finished jobs are kept
+            lease_seconds: Seconds without heartbeat before a running job is requeued
+            max_attempts: Runs before a requeued job is marked failed instead
+        """
+        self.path = os.path.abspath(path)
+        self.result_ttl = result_ttl
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        """Open a connection in autocommit mode"""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Connection inside a write-locked transaction"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def _to_dict(self, row, include_result=False):
+        """Convert a row to the job dict returned by the API"""
+        job = {field: row[field] for field in self.FIELDS}
+        job["progress"] = json.loads(row["progress"]) if row["progress"] else None
+        job["cancel_requested"] = bool(row["cancel_requested"])
+        if include_result:
+            job["result"] = json.loads(row["result"]) if row["result"] else None
+        return job
+
+    def submit(self, kind, payload):
+        """
+        Queue a job
+
+        Args:
+            kind: Handler name
+            payload: JSON-serializable job arguments
+
+        Returns:
+            dict: The queued job
+        """
+        job_id = uuid.uuid4().hex
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, created_at) VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, kind, json.dumps(payload), time.time())
+            )
+        return self.get(job_id)
+
+    def get(self, job_id, include_result=False):
+        """
+        Look up a job
+
+        Args:
+            job_id: Job ID
+            include_result: Add the stored result
+
+        Returns:
+            dict: Job, or None when unknown or expired
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None or (row["expires_at"] is not None and row["expires_at"] < time.time()):
+            return None
+        return self._to_dict(row, include_result)
+
+    def list(self, status=None, limit=50):
+        """
+        List jobs, newest first
+
+        Args:
+            status: Only jobs in this state
+            limit: Max jobs returned
+
+        Returns:
+            list: Job dicts (without results)
+        """
+        query = "SELECT * FROM jobs WHERE (expires_at IS NULL OR expires_at >= ?)"
+        params = [time.time()]
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+        return [self._to_dict(row) for row in rows]
+
+    def counts(self):
+        """
+        Count jobs by state
+
+        Returns:
+            dict: State -> number of jobs
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        finally:
+            conn.close()
+        counts = dict.fromkeys(JOB_STATES, 0)
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def claim(self, kinds):
+        """
+        Take the oldest queued job of the given kinds
+
+        Args:
+            kinds: Handler names this runner can execute
+
+        Returns:
+            dict: Job with its payload, or None when the queue is empty
+        """
+        kinds = list(kinds)
+        placeholders = ", ".join("?" * len(kinds))
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                f"SELECT * FROM jobs WHERE status = 'queued' AND kind IN ({placeholders}) "
+                f"ORDER BY created_at LIMIT 1", kinds
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, started_at = ?, heartbeat_at = ?, "
+                "attempts = attempts + 1 WHERE id = ?", (_owner(), now, now, row["id"])
+            )
+        job = self._to_dict(row)
+        job.update(status="running", started_at=now, attempts=row["attempts"] + 1)
+        job["payload"] = json.loads(row["payload"])
+        return job
+
+    def heartbeat(self, job_ids):
+        """Refresh the lease of running jobs"""
+        if not job_ids:
+            return
+        conn = self._connect()
+        try:
+            conn.executemany("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'",
+                             [(time.time(), job_id) for job_id in job_ids])
+        finally:
+            conn.close()
+
+    def update_progress(self, job_id, progress):
+        """
+        Record a running job's progress
+
+        Args:
+            job_id: Job ID
+            progress: JSON-serializable progress report
+
+        Returns:
+            bool: True when cancellation of the job was requested
+        """
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE jobs SET progress = ?, heartbeat_at = ? WHERE id = ?",
+                         (json.dumps(progress), time.time(), job_id))
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return bool(row and row["cancel_requested"])
+
+    def cancel_requested(self, job_id):
+        """True when cancellation of the job was requested"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return bool(row and row["cancel_requested"])
+
+    def finish(self, job_id, status, result=None, error=None):
+        """
+        Store the outcome of a job and start its TTL
+
+        Args:
+            job_id: Job ID
+            status: "succeeded", "failed" or "cancelled"
+            result: JSON-serializable result
+            error: Error message
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, expires_at = ? "
+                "WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, now,
+                 now + self.result_ttl, job_id)
+            )
+        finally:
+            conn.close()
+
+    def cancel(self, job_id):
+        """
+        Cancel a job
+
+        Queued jobs are cancelled at once; running jobs are flagged and stop
+        at their next progress report. Finished jobs are left as they are.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            dict: The job after the request, or None when unknown or expired
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', cancel_requested = 1, finished_at = ?, "
+                "expires_at = ? WHERE id = ? AND status = 'queued'", (now, now + self.result_ttl, job_id)
+            )
+            conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'",
+                         (job_id,))
+        return self.get(job_id)
+
+    def recover(self):
+        """
+        Requeue abandoned running jobs and drop expired jobs
+
+        A running job is abandoned when its lease has expired or its owner
+        process on this host no longer exists. Jobs that have already used
+        max_attempts runs are marked failed rather than requeued, so a job
+        that kills its runner cannot loop; abandoned jobs with a pending
+        cancellation are marked cancelled.
+
+        Returns:
+            dict: Numbers of requeued, failed, cancelled and purged jobs
+        """
+        now = time.time()
+        stale = now - self.lease_seconds
+        with self._transaction() as conn:
+            # Jobs of dead local processes are abandoned now, not when the lease runs out
+            prefix = socket.gethostname() + ":"
+            rows = conn.execute("SELECT id, owner FROM jobs WHERE status = 'running' AND owner LIKE ?",
+                                (prefix + "%",)).fetchall()
+            dead = [(row["id"],) for row in rows if not _process_alive(row["owner"][len(prefix):])]
+            conn.executemany("UPDATE jobs SET heartbeat_at = 0 WHERE id = ?", dead)
+
+            failed = conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Job runner stopped too many times', "
+                "finished_at = ?, expires_at = ? WHERE status = 'running' AND heartbeat_at < ? "
+                "AND attempts >= ?", (now, now + self.result_ttl, stale, self.max_attempts)
+            ).rowcount
+            cancelled = conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ?, expires_at = ? "
+                "WHERE status = 'running' AND heartbeat_at < ? AND cancel_requested = 1",
+                (now, now + self.result_ttl, stale)
+            ).rowcount
+            requeued = conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, heartbeat_at = NULL "
+                "WHERE status = 'running' AND heartbeat_at < ?", (stale,)
+            ).rowcount
+            purged = conn.execute(
+                "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?", (now,)
+            ).rowcount
+        if requeued or failed or cancelled:
+            logger.warning(f"Recovered abandoned jobs: {requeued} requeued, {failed} failed, "
+                           f"{cancelled} cancelled")
+        return {"requeued": requeued, "failed": failed, "cancelled": cancelled, "purged": purged}
+
+
+class JobRunner:
+    """
+    Threads that claim jobs from a JobStore and run their handlers
+
+    A handler is called as handler(payload, progress) and returns a
+    JSON-serializable result; a result carrying an "error" key fails the
+    job. progress(report) stores the report and raises JobCancelled once
+    the job was cancelled, which ends the handler early. A heartbeat thread
+    keeps the leases of running jobs fresh and periodically recovers jobs
+    abandoned by runners that died.
+    """
+
+    # Seconds between recover() sweeps
+    RECOVER_INTERVAL = 30.0
+
+    def __init__(self, store, handlers, workers=1, poll_interval=1.0):
+        """
+        Initialize runner
+
+        Args:
+            store: JobStore
+            handlers: Dict of job kind -> handler
+            workers: Runner threads
+            poll_interval: Seconds idle runners wait between queue checks
+        """
+        self.store = store
+        self.handlers = handlers
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self._active = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Start the runner and heartbeat threads"""
+        if self._threads:
+            return
+        self._stop.clear()
+        self.store.recover()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"job-runner-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        logger.info(f"Job runner started with {self.workers} workers")
+
+    def stop(self, timeout=None):
+        """
+        Stop the threads once their current jobs finish
+
+        Jobs still running after the timeout keep their lease until it
+        expires and are then picked up again.
+
+        Args:
+            timeout: Max seconds to wait per thread
+        """
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        """Wake an idle runner (a job was submitted)"""
+        self._wake.set()
+
+    def running(self):
+        """IDs of the jobs currently running in this process"""
+        with self._lock:
+            return sorted(self._active)
+
+    def _loop(self):
+        """Claim and run jobs until stopped"""
+        while not self._stop.is_set():
+            try:
+                job = self.store.claim(self.handlers)
+            except sqlite3.Error as e:
+                logger.error(f"Could not claim job: {e}")
+                job = None
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self._run(job)
+
+    def _run(self, job):
+        """Run one claimed job and store its outcome"""
+        job_id = job["id"]
+        with self._lock:
+            self._active.add(job_id)
+
+        def progress(report):
+            if self.store.update_progress(job_id, report):
+                raise JobCancelled(f"Job {job_id} was cancelled")
+
+        logger.info(f"Running job {job_id} ({job['kind']}, attempt {job['attempts']})")
+        try:
+            result = self.handlers[job["kind"]](job["payload"], progress)
+            if self.store.cancel_requested(job_id):
+                self.store.finish(job_id, "cancelled")
+            elif isinstance(result, dict) and result.get("error"):
+                self.store.finish(job_id, "failed", result, result["error"])
+            else:
+                self.store.finish(job_id, "succeeded", result)
+        except JobCancelled:
+            self.store.finish(job_id, "cancelled")
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            self.store.finish(job_id, "failed", error=str(e))
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+
+    def _heartbeat_loop(self):
+        """Refresh leases of running jobs and recover abandoned ones"""
+        interval = max(1.0, self.store.lease_seconds / 3.0)
+        last_recover = time.monotonic()
+        while not self._stop.wait(interval):
+            try:
+                self.store.heartbeat(self.running())
+                if time.monotonic() - last_recover >= self.RECOVER_INTERVAL:
+                    self.store.recover()
+                    last_recover = time.monotonic()
+            except sqlite3.Error as e:
+                logger.error(f"Job heartbeat failed: {e}")
+
+
+
+def _owner():
+    """Owner tag of jobs claimed by this process"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _process_alive(pid):
+    """True when a process with this PID (string) exists"""
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (ValueError, PermissionError):
+        return True
+    return True
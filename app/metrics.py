@@ -0,0 +1,627 @@
+"""
+Lightweight in-process metrics
+Thread-safe histograms, counters and gauges, and a registry that renders
+them in the Prometheus text exposition format (merged across forked
+worker processes when shared)
+"""
+
+import os
+import json
+import time
+import bisect
+import tempfile
+import threading
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Buckets (seconds) for processing stages, from sub-millisecond text work to full generations
+STAGE_BUCKETS_SECONDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                         1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Buckets for generated tokens per second per generate call
+TOKENS_PER_SECOND_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Buckets for token counts per generate call
+TOKEN_COUNT_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+# Buckets (milliseconds) for time spent queued before a batch or an inference slot
+QUEUE_WAIT_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class Histogram:
+    """Fixed-bucket histogram with cumulative counts and percentile estimates"""
+
+    def __init__(self, buckets):
+        """
+        Initialize histogram
+        
+        Args:
+            buckets: Upper bounds of the buckets (an overflow bucket is implicit)
+        """
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """
+        Record one observation
+        
+        Args:
+            value: Observed value
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+            self._max = max(self._max, value)
+
+    def reset(self):
+        """Drop all observations"""
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self._sum = 0.0
+            self._count = 0
+            self._max = 0.0
+
+    def percentile(self, q):
+        """
+        Estimate a percentile as the upper bound of the bucket that contains it
+        
+        Args:
+            q: Percentile in [0, 100]
+        
+        Returns:
+            float: Estimated value (0.0 when empty)
+        """
+        with self._lock:
+            counts, total, largest = list(self._counts), self._count, self._max
+        if not total:
+            return 0.0
+        rank = q / 100.0 * total
+        seen = 0
+        for bound, count in zip(self.buckets + [largest], counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, largest)
+        return largest
+
+    def cumulative(self):
+        """
+        Get cumulative bucket counts in one consistent read
+        
+        Returns:
+            tuple: ([[upper bound, cumulative count], ..., ["+Inf", count]], count, sum, max)
+        """
+        with self._lock:
+            counts, total, value_sum, largest = list(self._counts), self._count, self._sum, self._max
+
+        running, buckets = 0, []
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            buckets.append([bound, running])
+        buckets.append(["+Inf", total])
+        return buckets, total, value_sum, largest
+
+    def snapshot(self):
+        """
+        Get a JSON-serializable view of the histogram
+        
+        Returns:
+            dict: Cumulative bucket counts, count, sum, mean, max and p50/p90/p99
+        """
+        buckets, total, value_sum, largest = self.cumulative()
+
+        return {
+            "buckets": buckets,
+            "count": total,
+            "sum": round(value_sum, 6),
+            "mean": round(value_sum / total, 6) if total else 0.0,
+            "max": round(largest, 6),
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
+
+
+class Counter:
+    """Monotonically increasing value"""
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        """Add a non-negative amount"""
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        """Current value"""
+        return self._value
+
+
+class Gauge:
+    """Value that can go up and down"""
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        """Replace the value"""
+        self._value = value
+
+    def inc(self, amount=1.0):
+        """Add an amount"""
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1.0):
+        """Subtract an amount"""
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self):
+        """Current value"""
+        return self._value
+
+
+class MetricFamily:
+    """
+    A named metric with optional labels
+    
+    Children (one Counter, Gauge or Histogram per label combination) are
+    created on first use. Without labels, inc/dec/set/observe/time act on
+    the single child directly.
+    """
+
+    def __init__(self, name, help_text, kind, labelnames=(), factory=None):
+        """
+        Initialize family
+        
+        Args:
+            name: Metric name
+            help_text: HELP line
+            kind: "counter", "gauge" or "histogram"
+            labelnames: Label names
+            factory: Zero-argument callable creating a child
+        """
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self.labels()  # Export 0 before the first update
+
+    def labels(self, *values):
+        """
+        Get the child for label values (in labelnames order)
+        
+        Returns:
+            Counter, Gauge or Histogram
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._factory())
+        return child
+
+    def inc(self, amount=1.0):
+        """Increment the unlabeled child"""
+        self.labels().inc(amount)
+
+    def dec(self, amount=1.0):
+        """Decrement the unlabeled child (gauges)"""
+        self.labels().dec(amount)
+
+    def set(self, value):
+        """Set the unlabeled child (gauges)"""
+        self.labels().set(value)
+
+    def observe(self, value):
+        """Record an observation on the unlabeled child (histograms)"""
+        self.labels().observe(value)
+
+    @contextmanager
+    def time(self, *values):
+        """Observe the seconds spent in the with-block (histograms)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.labels(*values).observe(time.perf_counter() - started)
+
+    def collect(self):
+        """
+        Current samples of the family
+        
+        Returns:
+            list: (label dict, child) pairs
+        """
+        with self._lock:
+            children = list(self._children.items())
+        return [(dict(zip(self.labelnames, values)), child) for values, child in children]
+
+
+class _Callback:
+    """Family whose samples are read from a callable at render time"""
+
+    def __init__(self, name, help_text, kind, collect, scale=1.0):
+        """See Registry.register()"""
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.collect = collect
+        self.scale = scale
+
+
+class Registry:
+    """
+    Collection of metric families rendered in the Prometheus text format
+    
+    Families either hold their own children (counter(), gauge(),
+    histogram()) or read values from other objects when scraped
+    (register()), so existing statistics are exported without extra work on
+    the request path.
+    """
+
+    def __init__(self, prefix=""):
+        """
+        Initialize registry
+        
+        Args:
+            prefix: Prepended to every metric name
+        """
+        self.prefix = prefix
+        self._families = {}
+        self._lock = threading.Lock()
+        self._shared = None  # (directory, worker label) after share()
+        self._sharing = None  # Stops the snapshot thread
+
+    def _add(self, family):
+        """Register a family, returning an existing one of the same name"""
+        with self._lock:
+            existing = self._families.get(family.name)
+            if existing is not None:
+                return existing
+            self._families[family.name] = family
+            return family
+
+    def counter(self, name, help_text, labelnames=()):
+        """Get or create a counter family"""
+        return self._add(MetricFamily(self.prefix + name, help_text, "counter", labelnames, Counter))
+
+    def gauge(self, name, help_text, labelnames=()):
+        """Get or create a gauge family"""
+        return self._add(MetricFamily(self.prefix + name, help_text, "gauge", labelnames, Gauge))
+
+    def histogram(self, name, help_text, buckets, labelnames=()):
+        """Get or create a histogram family"""
+        return self._add(MetricFamily(self.prefix + name, help_text, "histogram", labelnames,
+                                      lambda: Histogram(buckets)))
+
+    def register(self, name, help_text, kind, collect, scale=1.0):
+        """
+        Export values read when the registry is rendered
+        
+        Args:
+            name: Metric name (without prefix)
+            help_text: HELP line
+            kind: "counter", "gauge" or "histogram"
+            collect: Callable returning (label dict, value) pairs; values are
+                     numbers, or Histogram objects for kind="histogram"
+            scale: Factor applied to values and bucket bounds (e.g. 0.001
+                   to export a millisecond histogram in seconds)
+        """
+        with self._lock:
+            self._families[self.prefix + name] = _Callback(self.prefix + name, help_text, kind,
+                                                           collect, scale)
+
+    def collect(self):
+        """
+        Read every family into JSON-serializable samples
+        
+        Returns:
+            list: Per family a dict with name, help, kind and samples
+                  ([labels, value] pairs; histogram values are
+                  {"buckets", "sum", "count"} with scaled bounds), or an
+                  "error" instead of samples when reading it failed
+        """
+        with self._lock:
+            families = list(self._families.values())
+
+        collected = []
+        for family in families:
+            entry = {"name": family.name, "help": family.help, "kind": family.kind}
+            try:
+                samples = family.collect()
+            except Exception as e:
+                entry["error"] = str(e).splitlines()[0] if str(e) else repr(e)
+                collected.append(entry)
+                continue
+            scale = getattr(family, "scale", 1.0)
+            entry["samples"] = [[labels, _sample_value(family.kind, value, scale)] for labels, value in samples]
+            collected.append(entry)
+        return collected
+
+    def render(self):
+        """
+        Render every family in the Prometheus text exposition format
+        
+        After share(), the samples of every process sharing the directory
+        are merged (see merge_families()).
+        
+        Returns:
+            str: Exposition text
+        """
+        families = self.collect()
+        if self._shared is not None:
+            families = self._merge_shared(families)
+        return render_families(families)
+
+    def share(self, directory, worker, interval=5.0):
+        """
+        Merge this registry with the other processes writing to a directory
+        
+        For forked server workers (call in each worker after fork). The
+        registry writes its samples to <directory>/<pid>.json every
+        interval seconds, and whenever it renders. Rendering then reports
+        every process in the directory, so a scrape answered by any worker
+        covers all of them (other workers' samples are up to interval
+        seconds old).
+        
+        Args:
+            directory: Directory shared by the processes (see prepare_shared_dir())
+            worker: Label of this process in per-worker gauges
+            interval: Seconds between snapshots
+        """
+        os.makedirs(directory, exist_ok=True)
+        if self._sharing is not None:
+            self._sharing.set()
+        self._shared = (directory, str(worker))
+        stop = self._sharing = threading.Event()
+        self._write_snapshot(self.collect())
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    self._write_snapshot(self.collect())
+                except Exception as e:
+                    logger.warning(f"Error writing metrics snapshot: {e}")
+
+        threading.Thread(target=run, name="metrics-snapshot", daemon=True).start()
+
+    def _write_snapshot(self, families):
+        """Atomically replace this process's snapshot file"""
+        directory, worker = self._shared
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"pid": os.getpid(), "worker": worker, "families": families}, f)
+            os.replace(tmp_path, os.path.join(directory, f"{os.getpid()}.json"))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _merge_shared(self, families):
+        """Merge fresh local samples with the snapshots of the other processes"""
+        self._write_snapshot(families)
+        directory, worker = self._shared
+        snapshots = [(worker, True, families)]
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.json') or name == f"{os.getpid()}.json":
+                continue
+            try:
+                with open(os.path.join(directory, name), encoding='utf-8') as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping metrics snapshot {name}: {e}")
+                continue
+            snapshots.append((str(snapshot["worker"]), _pid_alive(snapshot["pid"]), snapshot["families"]))
+        return merge_families(snapshots)
+
+
+def prepare_shared_dir(directory=None):
+    """
+    Create (or empty) the directory for Registry.share()
+    
+    Call once in the master process before forking, so snapshots of a
+    previous server run are not counted.
+    
+    Args:
+        directory: Directory to use (None creates a temporary one)
+    
+    Returns:
+        str: The directory
+    """
+    if not directory:
+        return tempfile.mkdtemp(prefix='docsum-metrics-')
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(('.json', '.tmp')):
+            os.remove(os.path.join(directory, name))
+    return directory
+
+
+def merge_families(snapshots):
+    """
+    Combine the collected families of several processes
+    
+    Counters and histograms are summed per label set, including those of
+    processes that have exited, so totals never go back when a worker is
+    replaced. Gauges describe a live process: they are reported per
+    worker with a "worker" label, and dropped for exited processes.
+    
+    Args:
+        snapshots: (worker label, alive, Registry.collect() output) per process
+    
+    Returns:
+        list: Merged families, in the same format
+    """
+    merged = {}
+    for worker, alive, families in snapshots:
+        for family in families:
+            name = family["name"]
+            if "error" in family:
+                merged.setdefault(name, family)
+                continue
+            target = merged.get(name)
+            if target is None or "error" in target:
+                target = merged[name] = dict(family, samples={})
+
+            for labels, value in family["samples"]:
+                if family["kind"] == "gauge":
+                    if not alive:
+                        continue
+                    labels = dict(labels, worker=worker)
+                key = tuple(sorted(labels.items()))
+                current = target["samples"].get(key)
+                if current is not None:
+                    value = _add_values(current[1], value)
+                target["samples"][key] = [labels, value]
+
+    return [dict(family, samples=list(family["samples"].values())) if "samples" in family else family
+            for family in merged.values()]
+
+
+def render_families(families):
+    """
+    Render collected families in the Prometheus text exposition format
+    
+    Args:
+        families: Registry.collect() or merge_families() output
+    
+    Returns:
+        str: Exposition text
+    """
+    lines = []
+    for family in families:
+        name = family["name"]
+        if "error" in family:
+            lines.append(f"# {name} unavailable: {family['error']}")
+            continue
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['kind']}")
+        for labels, value in family["samples"]:
+            if family["kind"] == "histogram":
+                lines.extend(_histogram_lines(name, labels, value))
+            else:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _sample_value(kind, value, scale):
+    """Plain, scaled value of one sample (a dict for histograms)"""
+    if kind == "histogram":
+        buckets, count, value_sum, _ = value.cumulative()
+        return {
+            "buckets": [["+Inf" if bound == "+Inf" else _format_value(bound * scale), cumulative]
+                        for bound, cumulative in buckets],
+            "sum": value_sum * scale,
+            "count": count,
+        }
+    if not isinstance(value, (int, float)):
+        value = value.value
+    return value * scale
+
+
+def _add_values(a, b):
+    """Sum two sample values (histograms bucket by bucket)"""
+    if not isinstance(a, dict):
+        return a + b
+    buckets = dict(a["buckets"])
+    for le, cumulative in b["buckets"]:
+        buckets[le] = buckets.get(le, 0) + cumulative
+    return {"buckets": [[le, cumulative] for le, cumulative in buckets.items()],
+            "sum": a["sum"] + b["sum"], "count": a["count"] + b["count"]}
+
+
+def _pid_alive(pid):
+    """True when a process with this ID exists on this host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _histogram_lines(name, labels, histogram):
+    """Exposition lines of one histogram (a _sample_value() dict)"""
+    lines = []
+    for le, cumulative in histogram["buckets"]:
+        lines.append(f"{name}_bucket{_format_labels(dict(labels, le=le))} {cumulative}")
+    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram['sum'])}")
+    lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+    return lines
+
+
+def _format_labels(labels):
+    """Render a label dict as {name="value",...}"""
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value):
+    """Render a sample value (integers without a decimal point)"""
+    if value is None:
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# Process-wide registry and the families shared by the instrumented modules
+REGISTRY = Registry(prefix="docsum_")
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "stage_duration_seconds",
+    "Time spent per processing stage (clean, tokenize, encode, decode, detokenize, keywords, "
+    "history_read, history_write, ...)",
+    STAGE_BUCKETS_SECONDS, labelnames=("stage",)
+)
+INPUT_TOKENS = REGISTRY.counter("input_tokens_total", "Input tokens passed to the model")
+OUTPUT_TOKENS = REGISTRY.counter("output_tokens_total", "Tokens generated by the model")
+GENERATE_INPUT_TOKENS = REGISTRY.histogram(
+    "generate_input_tokens", "Input tokens per generate call", TOKEN_COUNT_BUCKETS
+)
+TOKENS_PER_SECOND = REGISTRY.histogram(
+    "generate_tokens_per_second", "Generated tokens per second of each generate call",
+    TOKENS_PER_SECOND_BUCKETS
+)
+
+
+def stage(name):
+    """
+    Time a processing stage
+    
+    Usage:
+        with stage("tokenize"):
+            ...
+    
+    Args:
+        name: Stage label
+    
+    Returns:
+        Context manager observing the stage duration in seconds
+    """
+    return STAGE_SECONDS.time(name)
@@ -0,0 +1,600 @@
+"""
+ONNX Runtime inference backend
+Exports the T5 model as separate encoder / decoder / decoder-with-past graphs
+and runs greedy or beam search on the ONNX Runtime CPU provider
+"""
+
+import os
+import sys
+import time
+import hashlib
+import argparse
+import logging
+import numpy as np
+import torch
+from transformers import AutoConfig, AutoModelForSeq2SeqLM
+from transformers.modeling_outputs import BaseModelOutput
+
+from app.generation import process_scores
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+logger = logging.getLogger(__name__)
+
+ENCODER_FILE = "encoder_model.onnx"
+DECODER_FILE = "decoder_model.onnx"
+DECODER_WITH_PAST_FILE = "decoder_with_past_model.onnx"
+ONNX_FILES = (ENCODER_FILE, DECODER_FILE, DECODER_WITH_PAST_FILE)
+
+
+class _EncoderWrapper(torch.nn.Module):
+    """Encoder graph: input_ids, attention_mask -> last_hidden_state"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.encoder = model.get_encoder()
+
+    def forward(self, input_ids, attention_mask):
+        return self.encoder(input_ids=input_ids, attention_mask=attention_mask,
+                            return_dict=True).last_hidden_state
+
+
+class _DecoderWrapper(torch.nn.Module):
+    """
+    Decoder graph returning logits and flattened key/value states
+
+    Without past it returns self- and cross-attention presents for every
+    layer; with past it takes both and returns only the self-attention
+    presents, since cross-attention states never change during decoding.
+    """
+
+    def __init__(self, model, with_past):
+        super().__init__()
+        self.model = model
+        self.with_past = with_past
+        self.num_layers = model.config.num_decoder_layers
+
+    def forward(self, decoder_input_ids, encoder_hidden_states, encoder_attention_mask, *past):
+        past_key_values = None
+        if self.with_past:
+            past_key_values = tuple(tuple(past[4 * i:4 * i + 4]) for i in range(self.num_layers))
+
+        outputs = self.model(
+            encoder_outputs=(encoder_hidden_states,),
+            attention_mask=encoder_attention_mask,
+            decoder_input_ids=decoder_input_ids,
+            past_key_values=past_key_values,
+            use_cache=True,
+            return_dict=True,
+        )
+
+        presents = []
+        for layer in outputs.past_key_values:
+            presents.extend(layer[:2] if self.with_past else layer)
+        return (outputs.logits, *presents)
+
+
+def _past_names(prefix, num_layers, include_cross=True):
+    """Input/output names for flattened key/value states"""
+    names = []
+    for i in range(num_layers):
+        names += [f"{prefix}.{i}.decoder.key", f"{prefix}.{i}.decoder.value"]
+        if include_cross:
+            names += [f"{prefix}.{i}.encoder.key", f"{prefix}.{i}.encoder.value"]
+    return names
+
+
+def export_onnx(model_dir, output_dir, opset=14):
+    """
+    Export a seq2seq model to ONNX as three graphs
+
+    Args:
+        model_dir: Directory (or hub name) of the PyTorch model
+        output_dir: Where to write the .onnx files and config.json
+        opset: ONNX opset version
+
+    Returns:
+        str: output_dir
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_dir)
+    model.eval()
+    config = model.config
+    num_layers = config.num_decoder_layers
+
+    batch, enc_len, past_len = 2, 5, 3
+    input_ids = torch.ones((batch, enc_len), dtype=torch.long)
+    attention_mask = torch.ones((batch, enc_len), dtype=torch.long)
+    decoder_input_ids = torch.full((batch, 1), config.decoder_start_token_id, dtype=torch.long)
+
+    with torch.no_grad():
+        encoder = _EncoderWrapper(model)
+        hidden = encoder(input_ids, attention_mask)
+
+        logger.info("Exporting encoder...")
+        torch.onnx.export(
+            encoder, (input_ids, attention_mask), os.path.join(output_dir, ENCODER_FILE),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "encoder_sequence"},
+                "attention_mask": {0: "batch", 1: "encoder_sequence"},
+                "last_hidden_state": {0: "batch", 1: "encoder_sequence"},
+            },
+            opset_version=opset,
+            dynamo=False,
+        )
+
+        decoder_axes = {
+            "decoder_input_ids": {0: "batch", 1: "decoder_sequence"},
+            "encoder_hidden_states": {0: "batch", 1: "encoder_sequence"},
+            "encoder_attention_mask": {0: "batch", 1: "encoder_sequence"},
+            "logits": {0: "batch", 1: "decoder_sequence"},
+        }
+
+        logger.info("Exporting decoder...")
+        present_names = _past_names("present", num_layers)
+        axes = dict(decoder_axes)
+        for name in present_names:
+            axes[name] = {0: "batch", 2: "encoder_sequence" if ".encoder." in name else "decoder_sequence"}
+        torch.onnx.export(
+            _DecoderWrapper(model, with_past=False),
+            (decoder_input_ids, hidden, attention_mask),
+            os.path.join(output_dir, DECODER_FILE),
+            input_names=["decoder_input_ids", "encoder_hidden_states", "encoder_attention_mask"],
+            output_names=["logits"] + present_names,
+            dynamic_axes=axes,
+            opset_version=opset,
+            dynamo=False,
+        )
+
+        logger.info("Exporting decoder with past...")
+        decoder = _DecoderWrapper(model, with_past=False)
+        past = decoder(torch.ones((batch, past_len), dtype=torch.long), hidden, attention_mask)[1:]
+        past_names = _past_names("past_key_values", num_layers)
+        axes = dict(decoder_axes)
+        for name in past_names:
+            axes[name] = {0: "batch", 2: "encoder_sequence" if ".encoder." in name else "past_sequence"}
+        for name in _past_names("present", num_layers, include_cross=False):
+            axes[name] = {0: "batch", 2: "past_sequence_plus_one"}
+        torch.onnx.export(
+            _DecoderWrapper(model, with_past=True),
+            (decoder_input_ids, hidden, attention_mask, *past),
+            os.path.join(output_dir, DECODER_WITH_PAST_FILE),
+            input_names=["decoder_input_ids", "encoder_hidden_states", "encoder_attention_mask"] + past_names,
+            output_names=["logits"] + _past_names("present", num_layers, include_cross=False),
+            dynamic_axes=axes,
+            opset_version=opset,
+            dynamo=False,
+        )
+
+    config.save_pretrained(output_dir)
+    logger.info(f"ONNX model written to {output_dir}")
+    return output_dir
+
+
+class OnnxSeq2SeqModel:
+    """
+    Seq2seq model running on ONNX Runtime
+
+    Mirrors the parts of the transformers model API the summarizer uses
+    (config, eval, to, get_encoder, generate) so it can stand in for the
+    PyTorch model. generate() supports greedy and beam search with the
+    min_length, no_repeat_ngram_size, repetition_penalty, length_penalty
+    and early_stopping settings used in this package.
+    """
+
+    def __init__(self, onnx_dir, intra_op_threads=0):
+        """
+        Load the three ONNX graphs
+
+        Args:
+            onnx_dir: Directory written by export_onnx()
+            intra_op_threads: ONNX Runtime intra-op threads (0 = library default)
+        """
+        if ort is None:
+            raise ImportError("onnxruntime is required for the ONNX backend (pip install onnxruntime)")
+
+        self.onnx_dir = onnx_dir
+        self.config = AutoConfig.from_pretrained(onnx_dir)
+        self.num_layers = self.config.num_decoder_layers
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        providers = ["CPUExecutionProvider"]
+
+        self.encoder = ort.InferenceSession(os.path.join(onnx_dir, ENCODER_FILE), options, providers=providers)
+        self.decoder = ort.InferenceSession(os.path.join(onnx_dir, DECODER_FILE), options, providers=providers)
+        self.decoder_with_past = ort.InferenceSession(
+            os.path.join(onnx_dir, DECODER_WITH_PAST_FILE), options, providers=providers
+        )
+        self._past_names = _past_names("past_key_values", self.num_layers)
+
+    def eval(self):
+        """No-op, kept for torch.nn.Module compatibility"""
+        return self
+
+    def to(self, device):
+        """ONNX sessions run on the CPU provider only"""
+        if str(device) != "cpu":
+            raise ValueError("The ONNX backend only supports the CPU")
+        return self
+
+    def fingerprint(self):
+        """
+        Identify the exported graphs for cache keys
+
+        Returns:
+            str: Hex digest of the config and graph file sizes/mtimes
+        """
+        digest = hashlib.sha256(self.config.to_json_string().encode('utf-8'))
+        for name in ONNX_FILES:
+            stat = os.stat(os.path.join(self.onnx_dir, name))
+            digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def get_encoder(self):
+        """
+        Get a callable that runs the encoder graph
+
+        Returns:
+            callable: (input_ids, attention_mask) -> BaseModelOutput
+        """
+        def encode(input_ids, attention_mask, **kwargs):
+            hidden = self._encode(_to_numpy(input_ids), _to_numpy(attention_mask))
+            return BaseModelOutput(last_hidden_state=torch.from_numpy(hidden))
+        return encode
+
+    def generate(self, input_ids=None, attention_mask=None, encoder_outputs=None,
+                 max_new_tokens=None, max_length=None, min_length=0, num_beams=1,
+                 no_repeat_ngram_size=0, repetition_penalty=1.0, length_penalty=1.0,
+                 early_stopping=False, do_sample=False, temperature=1.0, top_k=50, top_p=1.0,
+                 streamer=None, max_time=None, **kwargs):
+        """
+        Generate output token IDs
+
+        Args follow transformers' generate(); max_length counts the decoder
+        start token, max_new_tokens does not. Sampling (do_sample with
+        temperature / top_k / top_p) and streamers require num_beams=1.
+        max_time stops decoding after that many seconds, keeping what has
+        been generated (beam search returns its best hypotheses so far).
+
+        Returns:
+            torch.Tensor: Generated IDs (starting with the decoder start token)
+        """
+        if kwargs:
+            raise ValueError(f"Unsupported generate arguments for the ONNX backend: {sorted(kwargs)}")
+
+        mask = _to_numpy(attention_mask)
+        if encoder_outputs is not None:
+            hidden = _to_numpy(encoder_outputs.last_hidden_state).astype(np.float32)
+        else:
+            hidden = self._encode(_to_numpy(input_ids), mask)
+        if mask is None:
+            mask = np.ones(hidden.shape[:2], dtype=np.int64)
+
+        if max_new_tokens:
+            max_length = max_new_tokens + 1
+        max_length = max_length or 20
+
+        settings = dict(
+            stop_at=time.perf_counter() + max_time if max_time else None,
+            max_length=max_length,
+            min_length=min_length or 0,
+            no_repeat_ngram_size=no_repeat_ngram_size or 0,
+            repetition_penalty=repetition_penalty or 1.0,
+        )
+        if (num_beams or 1) > 1:
+            if do_sample or streamer is not None:
+                raise ValueError("Sampling and streaming require num_beams=1 on the ONNX backend")
+            sequences = self._beam_search(hidden, mask, num_beams, length_penalty, early_stopping, **settings)
+        else:
+            sampling = dict(temperature=temperature, top_k=top_k, top_p=top_p) if do_sample else None
+            sequences = self._greedy_search(hidden, mask, sampling=sampling, streamer=streamer, **settings)
+        return torch.from_numpy(sequences)
+
+    def _encode(self, input_ids, attention_mask):
+        """Run the encoder graph"""
+        if attention_mask is None:
+            attention_mask = np.ones_like(input_ids)
+        return self.encoder.run(None, {
+            "input_ids": input_ids.astype(np.int64),
+            "attention_mask": attention_mask.astype(np.int64),
+        })[0]
+
+    def _first_step(self, decoder_input_ids, hidden, mask):
+        """Run the no-past decoder; returns logits, self and cross presents"""
+        outputs = self.decoder.run(None, {
+            "decoder_input_ids": decoder_input_ids,
+            "encoder_hidden_states": hidden,
+            "encoder_attention_mask": mask,
+        })
+        logits, presents = outputs[0], outputs[1:]
+        self_past = [p for i, p in enumerate(presents) if i % 4 < 2]
+        cross_past = [p for i, p in enumerate(presents) if i % 4 >= 2]
+        return logits, self_past, cross_past
+
+    def _next_step(self, decoder_input_ids, hidden, mask, self_past, cross_past):
+        """Run the decoder-with-past for one token; returns logits and self presents"""
+        feed = {
+            "decoder_input_ids": decoder_input_ids,
+            "encoder_hidden_states": hidden,
+            "encoder_attention_mask": mask,
+        }
+        for i in range(self.num_layers):
+            feed[self._past_names[4 * i]] = self_past[2 * i]
+            feed[self._past_names[4 * i + 1]] = self_past[2 * i + 1]
+            feed[self._past_names[4 * i + 2]] = cross_past[2 * i]
+            feed[self._past_names[4 * i + 3]] = cross_past[2 * i + 1]
+        outputs = self.decoder_with_past.run(None, feed)
+        return outputs[0], outputs[1:]
+
+    @staticmethod
+    def _sample(scores, temperature, top_k, top_p):
+        """Pick one token per row with temperature, top-k and nucleus filtering"""
+        scores = scores / max(temperature, 1e-5)
+        if top_k and top_k < scores.shape[-1]:
+            kth = np.partition(scores, -top_k, axis=-1)[:, -top_k][:, None]
+            scores = np.where(scores < kth, -np.inf, scores)
+
+        probs = np.exp(scores - scores.max(axis=-1, keepdims=True))
+        probs /= probs.sum(axis=-1, keepdims=True)
+        if top_p < 1.0:
+            order = np.argsort(-probs, axis=-1)
+            sorted_probs = np.take_along_axis(probs, order, axis=-1)
+            # Keep the smallest prefix whose mass reaches top_p (at least one token)
+            drop = np.cumsum(sorted_probs, axis=-1) - sorted_probs >= top_p
+            np.put_along_axis(probs, order, np.where(drop, 0.0, sorted_probs), axis=-1)
+            probs /= probs.sum(axis=-1, keepdims=True)
+
+        cumulative = probs.cumsum(axis=-1)
+        draws = np.random.random((probs.shape[0], 1))
+        return np.minimum((cumulative < draws).sum(axis=-1), probs.shape[-1] - 1)
+
+    def _greedy_search(self, hidden, mask, stop_at, max_length, min_length, no_repeat_ngram_size,
+                       repetition_penalty, sampling=None, streamer=None):
+        """Greedy (or sampled) decoding with the key/value cache"""
+        config = self.config
+        batch = hidden.shape[0]
+        sequences = np.full((batch, 1), config.decoder_start_token_id, dtype=np.int64)
+        finished = np.zeros(batch, dtype=bool)
+        if streamer is not None:
+            streamer.put(torch.from_numpy(sequences))
+
+        logits, self_past, cross_past = self._first_step(sequences, hidden, mask)
+        while True:
+            scores = process_scores(logits[:, -1, :].copy(), sequences, config.eos_token_id,
+                                    min_length, no_repeat_ngram_size, repetition_penalty)
+            if sampling:
+                next_tokens = self._sample(scores, **sampling)
+            else:
+                next_tokens = scores.argmax(axis=-1)
+            next_tokens = np.where(finished, config.pad_token_id, next_tokens)
+            sequences = np.concatenate([sequences, next_tokens[:, None]], axis=1)
+            if streamer is not None:
+                streamer.put(torch.from_numpy(next_tokens))
+            finished |= next_tokens == config.eos_token_id
+            if (finished.all() or sequences.shape[1] >= max_length
+                    or (stop_at and time.perf_counter() >= stop_at)):
+                if streamer is not None:
+                    streamer.end()
+                return sequences
+            logits, self_past = self._next_step(next_tokens[:, None], hidden, mask, self_past, cross_past)
+
+    def _beam_search(self, hidden, mask, num_beams, length_penalty, early_stopping, stop_at,
+                     max_length, min_length, no_repeat_ngram_size, repetition_penalty):
+        """Beam search with the key/value cache (follows transformers' BeamSearchScorer)"""
+        config = self.config
+        eos, pad = config.eos_token_id, config.pad_token_id
+        batch = hidden.shape[0]
+        hidden = np.repeat(hidden, num_beams, axis=0)
+        mask = np.repeat(mask, num_beams, axis=0)
+
+        sequences = np.full((batch * num_beams, 1), config.decoder_start_token_id, dtype=np.int64)
+        beam_scores = np.zeros((batch, num_beams), dtype=np.float32)
+        beam_scores[:, 1:] = -1e9
+        beam_scores = beam_scores.reshape(-1)
+        hypotheses = [[] for _ in range(batch)]
+        done = [False] * batch
+
+        def add_hypothesis(b, tokens, score):
+            hyps = hypotheses[b]
+            hyps.append((score / (len(tokens) ** length_penalty), tokens))
+            if len(hyps) > num_beams:
+                hyps.remove(min(hyps, key=lambda h: h[0]))
+
+        logits, self_past, cross_past = self._first_step(sequences, hidden, mask)
+        while True:
+            cur_len = sequences.shape[1]
+            step = logits[:, -1, :].astype(np.float32)
+            step = step - step.max(axis=-1, keepdims=True)
+            log_probs = step - np.log(np.exp(step).sum(axis=-1, keepdims=True))
+            log_probs = process_scores(log_probs, sequences, eos, min_length,
+                                       no_repeat_ngram_size, repetition_penalty)
+            scores = (log_probs + beam_scores[:, None]).reshape(batch, -1)
+            vocab = log_probs.shape[-1]
+
+            top = np.argsort(-scores, axis=1)[:, :2 * num_beams]
+            next_scores = np.zeros((batch, num_beams), dtype=np.float32)
+            next_tokens = np.full((batch, num_beams), pad, dtype=np.int64)
+            next_indices = np.zeros((batch, num_beams), dtype=np.int64)
+
+            for b in range(batch):
+                if done[b]:
+                    next_indices[b] = b * num_beams
+                    continue
+                filled = 0
+                for rank, index in enumerate(top[b]):
+                    score = scores[b, index]
+                    beam, token = divmod(int(index), vocab)
+                    row = b * num_beams + beam
+                    if token == eos:
+                        if rank < num_beams:
+                            add_hypothesis(b, sequences[row].tolist(), float(score))
+                    else:
+                        next_scores[b, filled] = score
+                        next_tokens[b, filled] = token
+                        next_indices[b, filled] = row
+                        filled += 1
+                    if filled == num_beams:
+                        break
+
+                if len(hypotheses[b]) >= num_beams:
+                    if early_stopping:
+                        done[b] = True
+                    else:
+                        best_possible = scores[b, top[b, 0]] / (cur_len ** length_penalty)
+                        done[b] = min(h[0] for h in hypotheses[b]) >= best_possible
+
+            beam_scores = next_scores.reshape(-1)
+            rows = next_indices.reshape(-1)
+            sequences = np.concatenate([sequences[rows], next_tokens.reshape(-1, 1)], axis=1)
+            self_past = [p[rows] for p in self_past]
+
+            if (all(done) or sequences.shape[1] >= max_length
+                    or (stop_at and time.perf_counter() >= stop_at)):
+                break
+            logits, self_past = self._next_step(next_tokens.reshape(-1, 1), hidden, mask,
+                                                self_past, cross_past)
+
+        for b in range(batch):
+            if done[b]:
+                continue
+            for beam in range(num_beams):
+                row = b * num_beams + beam
+                add_hypothesis(b, sequences[row].tolist(), float(beam_scores[row]))
+
+        best = [max(hyps, key=lambda h: h[0])[1] for hyps in hypotheses]
+        width = min(max(len(tokens) for tokens in best) + 1, max_length)
+        output = np.full((batch, width), pad, dtype=np.int64)
+        for b, tokens in enumerate(best):
+            output[b, :len(tokens)] = tokens
+            if len(tokens) < max_length:
+                output[b, len(tokens)] = eos
+        return output
+
+
+def _to_numpy(tensor):
+    """Convert a torch tensor (or None) to a NumPy array"""
+    if tensor is None:
+        return None
+    if isinstance(tensor, torch.Tensor):
+        return tensor.detach().cpu().numpy()
+    return np.asarray(tensor)
+
+
+def check_parity(model_dir, onnx_dir, texts, num_beams_options=(1, 4), max_new_tokens=40):
+    """
+    Compare ONNX Runtime outputs with the PyTorch model
+
+    Args:
+        model_dir: PyTorch model (and tokenizer) directory
+        onnx_dir: Directory written by export_onnx()
+        texts: Sample inputs
+        num_beams_options: Beam counts to compare
+        max_new_tokens: Output length per sample
+
+    Returns:
+        dict: Encoder max abs difference, exact-match rate per beam count and timings
+    """
+    from app.tokenization import load_tokenizer
+
+    tokenizer = load_tokenizer(model_dir)
+    torch_model = AutoModelForSeq2SeqLM.from_pretrained(model_dir)
+    torch_model.eval()
+    onnx_model = OnnxSeq2SeqModel(onnx_dir)
+
+    inputs = tokenizer(["summarize: " + t for t in texts], return_tensors="pt", padding=True,
+                       truncation=True, max_length=512)
+    with torch.no_grad():
+        reference = torch_model.get_encoder()(**inputs).last_hidden_state
+    encoded = onnx_model.get_encoder()(**inputs).last_hidden_state
+    valid = inputs["attention_mask"].bool()
+
+    report = {
+        "samples": len(texts),
+        "encoder_max_abs_diff": float((reference - encoded)[valid].abs().max()),
+        "generation": {},
+    }
+    for num_beams in num_beams_options:
+        kwargs = dict(max_new_tokens=max_new_tokens, num_beams=num_beams, no_repeat_ngram_size=2,
+                      repetition_penalty=1.3, length_penalty=0.8, early_stopping=False)
+        matches, torch_seconds, onnx_seconds = 0, 0.0, 0.0
+        for i in range(len(texts)):
+            single = {k: v[i:i + 1, :int(inputs["attention_mask"][i].sum())] for k, v in inputs.items()}
+            start = time.perf_counter()
+            with torch.no_grad():
+                expected = torch_model.generate(**single, **kwargs)
+            torch_seconds += time.perf_counter() - start
+            start = time.perf_counter()
+            actual = onnx_model.generate(**single, **kwargs)
+            onnx_seconds += time.perf_counter() - start
+            matches += tokenizer.decode(expected[0], skip_special_tokens=True) == \
+                tokenizer.decode(actual[0], skip_special_tokens=True)
+        report["generation"][f"beams_{num_beams}"] = {
+            "exact_match_rate": round(matches / len(texts), 3),
+            "torch_seconds": round(torch_seconds, 3),
+            "onnx_seconds": round(onnx_seconds, 3),
+        }
+    return report
+
+
+def main():
+    """Command line entry point: export graphs or check parity"""
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    default_model_dir = os.path.join(project_root, 'model')
+
+    parser = argparse.ArgumentParser(description='ONNX Runtime backend tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export', help='Export the model to ONNX')
+    export_parser.add_argument('--model-dir', default=default_model_dir, help='PyTorch model directory')
+    export_parser.add_argument('--output-dir', default=os.path.join(default_model_dir, 'onnx'),
+                               help='Output directory for the ONNX graphs')
+    export_parser.add_argument('--opset', type=int, default=14, help='ONNX opset version')
+
+    parity_parser = commands.add_parser('parity', help='Compare ONNX and PyTorch outputs')
+    parity_parser.add_argument('--model-dir', default=default_model_dir, help='PyTorch model directory')
+    parity_parser.add_argument('--onnx-dir', default=os.path.join(default_model_dir, 'onnx'),
+                               help='Directory with the exported graphs')
+    parity_parser.add_argument('-f', '--file', type=str, help='Text file with one sample per line')
+    parity_parser.add_argument('--min-match', type=float, default=0.9,
+                               help='Minimum exact-match rate for each beam setting')
+    parity_parser.add_argument('--max-encoder-diff', type=float, default=1e-3,
+                               help='Maximum encoder output difference')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        print(export_onnx(args.model_dir, args.output_dir, args.opset))
+        return
+
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = [
+            "The board approved the annual budget after a long review of revenue and costs.",
+            "Payment is due within thirty days of delivery, and late payments incur a fee.",
+            "The project deadline moved to March because the vendor delayed the data system.",
+            "Customers reported faster service after the team changed the support policy.",
+        ]
+
+    report = check_parity(args.model_dir, args.onnx_dir, texts)
+    print(f"Encoder max abs diff: {report['encoder_max_abs_diff']:.2e}")
+    ok = report['encoder_max_abs_diff'] <= args.max_encoder_diff
+    for name, row in report['generation'].items():
+        print(f"{name}: exact match {row['exact_match_rate']:.0%}, "
+              f"torch {row['torch_seconds']}s, onnx {row['onnx_seconds']}s")
+        ok = ok and row['exact_match_rate'] >= args.min_match
+    print("PARITY OK" if ok else "PARITY FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
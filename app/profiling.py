@@ -0,0 +1,232 @@
+"""
+On-demand profiling
+Captures a Python (cProfile) profile and a torch operator trace for one
+request or CLI run and writes them to a trace directory
+"""
+
+import io
+import os
+import re
+import time
+import pstats
+import cProfile
+import itertools
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+# Profile IDs are used in file names
+_UNSAFE_ID_CHARS = re.compile(r'[^A-Za-z0-9_-]')
+
+
+def active():
+    """
+    True while the calling thread is being profiled
+
+    Model calls check this to run on the profiled thread itself instead of
+    an inference slot thread, so one profile holds the whole request.
+    """
+    return getattr(_local, "profile", None) is not None
+
+
+def safe_id(value, max_length=64):
+    """Reduce a client-supplied ID to characters safe in a file name"""
+    return _UNSAFE_ID_CHARS.sub('_', value)[:max_length].strip('_') or None
+
+
+class Profile:
+    """
+    Python and torch operator profile of one unit of work
+
+    Writes three files named after the profile ID:
+    <id>.pstats (cProfile data, for pstats / snakeviz), <id>.txt (top
+    functions and torch operators) and <id>.trace.json (torch operator
+    timeline for chrome://tracing or Perfetto).
+    """
+
+    def __init__(self, profile_id, trace_dir, torch_trace=True, top=40):
+        """
+        Initialize profile
+
+        Args:
+            profile_id: Name of the trace files
+            trace_dir: Directory the files are written to
+            torch_trace: Also record torch operators
+            top: Rows in the text report tables
+        """
+        self.profile_id = profile_id
+        self.trace_dir = trace_dir
+        self.torch_trace = torch_trace
+        self.top = top
+        self._python = cProfile.Profile()
+        self._torch = None
+        self._started = None
+        self.seconds = None
+
+    def start(self):
+        """Start profiling the calling thread"""
+        if self.torch_trace:
+            from torch.profiler import profile, ProfilerActivity
+            self._torch = profile(activities=[ProfilerActivity.CPU], record_shapes=True)
+            self._torch.__enter__()
+        _local.profile = self
+        self._started = time.perf_counter()
+        self._python.enable()
+
+    def stop(self):
+        """Stop profiling (same thread as start())"""
+        self._python.disable()
+        self.seconds = time.perf_counter() - self._started
+        _local.profile = None
+        if self._torch is not None:
+            self._torch.__exit__(None, None, None)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def write(self, meta=None):
+        """
+        Write the trace files
+
+        Args:
+            meta: Optional dict listed at the top of the text report
+
+        Returns:
+            list: Paths written
+        """
+        os.makedirs(self.trace_dir, exist_ok=True)
+        base = os.path.join(self.trace_dir, self.profile_id)
+        paths = [base + ".pstats", base + ".txt"]
+        self._python.dump_stats(paths[0])
+
+        report = io.StringIO()
+        report.write(f"profile: {self.profile_id}\n")
+        report.write(f"seconds: {self.seconds:.4f}\n")
+        for key, value in (meta or {}).items():
+            report.write(f"{key}: {value}\n")
+        report.write("\n== Python functions by cumulative time ==\n")
+        stats = pstats.Stats(self._python, stream=report)
+        stats.sort_stats("cumulative").print_stats(self.top)
+
+        if self._torch is not None:
+            events = self._torch.key_averages()
+            if len(events):
+                report.write("\n== torch operators by self CPU time ==\n")
+                report.write(events.table(sort_by="self_cpu_time_total", row_limit=self.top))
+                report.write("\n")
+                paths.append(base + ".trace.json")
+                self._torch.export_chrome_trace(paths[-1])
+
+        with open(paths[1], 'w', encoding='utf-8') as f:
+            f.write(report.getvalue())
+        return paths
+
+
+class RequestProfiler:
+    """
+    Decide which requests to profile and run one profile at a time
+
+    A request is profiled when it asks for it (with the token when one is
+    configured) or when it is the Nth request under 1-in-N sampling. Only
+    one profile runs at a time: torch's profiler is process-wide, and it
+    keeps a flood of flagged requests from slowing the server down.
+    Requests arriving while a profile runs are served unprofiled. Only the
+    newest max_traces profiles are kept.
+    """
+
+    def __init__(self, trace_dir, token=None, sample_every=0, torch_trace=True, max_traces=200):
+        """
+        Initialize profiler
+
+        Args:
+            trace_dir: Directory for trace files
+            token: Secret a profiling request must send (None = any flag value)
+            sample_every: Profile 1 in N requests automatically (0 = off)
+            torch_trace: Record torch operators too
+            max_traces: Profiles kept in trace_dir
+        """
+        self.trace_dir = trace_dir
+        self.token = token
+        self.sample_every = sample_every
+        self.torch_trace = torch_trace
+        self.max_traces = max_traces
+        self._requests = itertools.count(1)
+        self._busy = threading.Lock()
+
+    def wanted(self, flag):
+        """
+        Check whether a request should be profiled
+
+        Args:
+            flag: Value of the request's profiling flag (None when absent)
+
+        Returns:
+            str or None: "requested" or "sampled", None otherwise
+        """
+        if flag:
+            if self.token is None or flag == self.token:
+                return "requested"
+            logger.warning("Ignoring profiling request with a wrong token")
+        if self.sample_every and next(self._requests) % self.sample_every == 0:
+            return "sampled"
+        return None
+
+    def begin(self, request_id):
+        """
+        Start profiling the calling thread
+
+        Args:
+            request_id: Request ID included in the trace file names
+
+        Returns:
+            Profile or None: None while another profile is running
+        """
+        if not self._busy.acquire(blocking=False):
+            return None
+        try:
+            profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{request_id}"
+            profile = Profile(profile_id, self.trace_dir, self.torch_trace)
+            profile.start()
+            return profile
+        except Exception:
+            self._busy.release()
+            raise
+
+    def end(self, profile, meta=None):
+        """
+        Stop a profile, write its files and prune old ones
+
+        Returns:
+            list: Paths written
+        """
+        try:
+            profile.stop()
+            paths = profile.write(meta)
+            self._prune()
+            logger.info(f"Profile {profile.profile_id} written to {self.trace_dir}")
+            return paths
+        finally:
+            self._busy.release()
+
+    def _prune(self):
+        """Delete the oldest profiles beyond max_traces"""
+        try:
+            names = os.listdir(self.trace_dir)
+        except OSError:
+            return
+        profiles = sorted({name.split('.', 1)[0] for name in names})
+        for profile_id in profiles[:max(0, len(profiles) - self.max_traces)]:
+            for name in names:
+                if name.split('.', 1)[0] == profile_id:
+                    try:
+                        os.remove(os.path.join(self.trace_dir, name))
+                    except OSError:
+                        pass
@@ -0,0 +1,185 @@
+"""
+Prompt-lookup assisted decoding
+Drafts continuations by matching the decoder's recent n-grams against the
+input token IDs and verifies all drafted tokens in one decoder pass
+"""
+
+import time
+import threading
+import numpy as np
+import torch
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.generation import process_scores
+
+
+def find_draft(source_ids, generated, num_tokens, max_ngram=3, min_ngram=1):
+    """
+    Propose a continuation copied from the source
+
+    Looks for the longest suffix of the generated tokens (max_ngram down to
+    min_ngram tokens) that occurs in the source and returns the tokens that
+    follow its first occurrence.
+
+    Args:
+        source_ids: 1-D int array of input token IDs
+        generated: List of generated tokens (without the decoder start token)
+        num_tokens: Max draft length
+        max_ngram: Longest suffix to match
+        min_ngram: Shortest suffix to match
+
+    Returns:
+        list: Draft tokens (empty when nothing matches)
+    """
+    if num_tokens <= 0:
+        return []
+    for n in range(min(max_ngram, len(generated)), min_ngram - 1, -1):
+        if n >= len(source_ids):
+            continue
+        windows = sliding_window_view(source_ids[:-1], n)
+        matches = np.flatnonzero((windows == generated[-n:]).all(axis=1))
+        if len(matches):
+            start = matches[0] + n
+            return source_ids[start:start + num_tokens].tolist()
+    return []
+
+
+class PromptLookupDecoder:
+    """
+    Greedy decoding with prompt-lookup drafts
+
+    Each step feeds the last accepted token plus a drafted continuation to
+    the decoder and keeps the drafted tokens for as long as they match the
+    greedy choice, so the output is identical to greedy model.generate()
+    with the same logits processors. The key/value cache is cropped back to
+    the accepted tokens after each step. Single sequences only.
+    """
+
+    def __init__(self, model, num_draft_tokens=10, max_ngram=3):
+        """
+        Initialize decoder
+
+        Args:
+            model: transformers seq2seq model (PyTorch)
+            num_draft_tokens: Max tokens drafted per step
+            max_ngram: Longest generated suffix matched against the input
+        """
+        self.model = model
+        self.num_draft_tokens = num_draft_tokens
+        self.max_ngram = max_ngram
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Zero the acceptance counters"""
+        with self._lock:
+            self._stats = {"calls": 0, "forward_passes": 0, "drafted": 0, "accepted": 0,
+                           "new_tokens": 0, "seconds": 0.0}
+
+    def stats(self):
+        """
+        Get acceptance counters
+
+        Returns:
+            dict: Calls, decoder passes, drafted/accepted tokens, acceptance rate,
+                  tokens per pass and tokens/sec
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["acceptance_rate"] = round(stats["accepted"] / stats["drafted"], 4) if stats["drafted"] else 0.0
+        stats["tokens_per_pass"] = (round(stats["new_tokens"] / stats["forward_passes"], 3)
+                                    if stats["forward_passes"] else 0.0)
+        stats["tokens_per_second"] = round(stats["new_tokens"] / stats["seconds"], 2) if stats["seconds"] else 0.0
+        stats["seconds"] = round(stats["seconds"], 4)
+        return stats
+
+    @torch.no_grad()
+    def generate(self, input_ids, attention_mask, max_new_tokens=None, max_length=None, min_length=0,
+                 no_repeat_ngram_size=0, repetition_penalty=1.0, max_time=None, streamer=None,
+                 **kwargs):
+        """
+        Generate one sequence
+
+        Args follow transformers' generate() for greedy decoding.
+
+        Returns:
+            torch.Tensor: (1, length) generated IDs starting with the decoder start token
+        """
+        started = time.perf_counter()
+        config = self.model.config
+        budget = max_new_tokens or (max_length or 20) - 1
+        source = input_ids[0, attention_mask[0].bool()].cpu().numpy()
+
+        encoder_outputs = self.model.get_encoder()(input_ids=input_ids, attention_mask=attention_mask)
+        sequence = [config.decoder_start_token_id]
+        past, cached = None, 0
+        passes = drafted = accepted = 0
+        if streamer is not None:
+            streamer.put(torch.tensor(sequence))
+
+        while len(sequence) - 1 < budget:
+            draft = find_draft(source, sequence[1:], min(self.num_draft_tokens, budget - len(sequence)),
+                               self.max_ngram)
+            step_ids = torch.tensor([sequence[cached:] + draft], device=input_ids.device)
+            outputs = self.model(
+                encoder_outputs=encoder_outputs,
+                attention_mask=attention_mask,
+                decoder_input_ids=step_ids,
+                past_key_values=past,
+                use_cache=True,
+                return_dict=True,
+            )
+            passes += 1
+            drafted += len(draft)
+
+            # Logits for the position after the cached prefix and after each draft token
+            logits = outputs.logits[0, -(len(draft) + 1):].float().cpu().numpy()
+            new_tokens = []
+            for j in range(len(draft) + 1):
+                scores = process_scores(logits[j:j + 1].copy(), np.array([sequence + new_tokens]),
+                                        config.eos_token_id, min_length, no_repeat_ngram_size,
+                                        repetition_penalty)
+                token = int(scores[0].argmax())
+                new_tokens.append(token)
+                matched = j < len(draft) and token == draft[j]
+                accepted += matched
+                if (not matched or token == config.eos_token_id
+                        or len(sequence) - 1 + len(new_tokens) >= budget):
+                    break
+
+            sequence += new_tokens
+            if streamer is not None:
+                streamer.put(torch.tensor(new_tokens))
+
+            # Keep cached keys/values only for tokens that were accepted
+            cached = len(sequence) - 1
+            past = self._crop(outputs.past_key_values, cached)
+
+            if new_tokens[-1] == config.eos_token_id:
+                break
+            if max_time and time.perf_counter() - started >= max_time:
+                break
+
+        if streamer is not None:
+            streamer.end()
+
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["forward_passes"] += passes
+            self._stats["drafted"] += drafted
+            self._stats["accepted"] += accepted
+            self._stats["new_tokens"] += len(sequence) - 1
+            self._stats["seconds"] += time.perf_counter() - started
+
+        return torch.tensor([sequence], device=input_ids.device)
+
+    @staticmethod
+    def _crop(past_key_values, length):
+        """Crop the decoder self-attention cache to the first `length` positions"""
+        if hasattr(past_key_values, "crop"):
+            past_key_values.crop(length)
+            return past_key_values
+        return tuple(
+            (layer[0][:, :, :length], layer[1][:, :, :length]) + tuple(layer[2:])
+            for layer in past_key_values
+        )
@@ -0,0 +1,103 @@
+"""
+Int8 dynamic quantization for CPU inference
+Quantizes Linear layers and caches the quantized model on disk
+"""
+
+import os
+import hashlib
+import logging
+import torch
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ("int8",)
+
+# Files whose contents determine the quantized weights
+WEIGHT_FILES = ("config.json", "model.safetensors", "pytorch_model.bin")
+
+
+def quantize_dynamic_int8(model):
+    """
+    Apply int8 dynamic quantization to every Linear layer
+    
+    Weights are stored as int8; activations are quantized on the fly, so
+    no calibration data is needed.
+    
+    Args:
+        model: float32 model on the CPU
+    
+    Returns:
+        torch.nn.Module: Quantized model
+    """
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def quantized_cache_path(cache_dir, source, mode="int8"):
+    """
+    Path of the cached quantized model for a weight source
+    
+    The key covers the source path, the size and mtime of its weight files
+    and the torch version, so a new checkpoint or torch upgrade gets a
+    fresh cache entry.
+    
+    Args:
+        cache_dir: Cache directory (None disables caching)
+        source: Model directory or hub model name
+        mode: Quantization mode
+    
+    Returns:
+        str: Cache file path, or None when caching is disabled
+    """
+    if not cache_dir:
+        return None
+
+    digest = hashlib.sha256()
+    digest.update(f"{mode}:{torch.__version__}:{os.path.abspath(source) if os.path.isdir(source) else source}".encode('utf-8'))
+    if os.path.isdir(source):
+        for name in WEIGHT_FILES:
+            path = os.path.join(source, name)
+            if os.path.exists(path):
+                stat = os.stat(path)
+                digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+    return os.path.join(cache_dir, f"{mode}-{digest.hexdigest()[:16]}.pt")
+
+
+def load_quantized(cache_path):
+    """
+    Load a cached quantized model
+    
+    Args:
+        cache_path: Path from quantized_cache_path()
+    
+    Returns:
+        torch.nn.Module: Quantized model, or None when missing or unreadable
+    """
+    if not cache_path or not os.path.exists(cache_path):
+        return None
+    try:
+        model = torch.load(cache_path, map_location="cpu", weights_only=False)
+        logger.info(f"Loaded quantized model from {cache_path}")
+        return model
+    except Exception as e:
+        logger.warning(f"Could not load quantized model cache {cache_path}: {e}")
+        return None
+
+
+def save_quantized(model, cache_path):
+    """
+    Save a quantized model so later starts can skip quantization
+    
+    Args:
+        model: Quantized model
+        cache_path: Path from quantized_cache_path()
+    """
+    if not cache_path:
+        return
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        torch.save(model, tmp_path)
+        os.replace(tmp_path, cache_path)
+        logger.info(f"Saved quantized model to {cache_path}")
+    except Exception as e:
+        logger.warning(f"Could not save quantized model cache {cache_path}: {e}")
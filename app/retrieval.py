@@ -0,0 +1,229 @@
+"""
+Dense passage retrieval
+Embeds document chunks with mean-pooled encoder states and picks the chunks
+closest to a question by cosine similarity
+"""
+
+import base64
+import numpy as np
+import torch
+
+from app.metrics import stage
+
+# Storage types of the embedding matrix
+EMBEDDING_DTYPES = ("float32", "float16", "int8")
+
+# Rows of a float16/int8 matrix widened to float32 at a time when scoring
+SCORE_BLOCK_ROWS = 1024
+
+
+def embed_ids(summarizer, id_lists, batch_size=32, max_tokens=512):
+    """
+    Embed token ID lists with mean-pooled encoder states
+
+    Inputs are sorted by length before batching so each padded batch holds
+    similar lengths.
+
+    Args:
+        summarizer: DocumentSummarizer whose encoder is used
+        id_lists: Token IDs per text
+        batch_size: Texts per encoder call
+        max_tokens: Token cap per text
+
+    Returns:
+        np.ndarray: float32 matrix (len(id_lists) x d_model) with L2-normalized rows
+    """
+    id_lists = [summarizer.truncate_ids(ids, max_tokens) for ids in id_lists]
+    order = sorted(range(len(id_lists)), key=lambda i: len(id_lists[i]))
+    vectors = [None] * len(id_lists)
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        inputs = summarizer.pad_inputs([id_lists[i] for i in batch])
+        states = summarizer.run_encoder(inputs).last_hidden_state
+        mask = inputs["attention_mask"].unsqueeze(-1).to(states.dtype)
+        pooled = (states * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+        pooled = torch.nn.functional.normalize(pooled.float(), dim=-1).cpu().numpy()
+        for row, i in enumerate(batch):
+            vectors[i] = pooled[row]
+    return np.ascontiguousarray(np.stack(vectors), dtype=np.float32)
+
+
+def embed_texts(summarizer, texts, batch_size=32):
+    """
+    Embed short texts (e.g. questions), tokenized through the token cache
+
+    Returns:
+        np.ndarray: See embed_ids()
+    """
+    return embed_ids(summarizer, summarizer.encode_batch(texts), batch_size)
+
+
+class PassageIndex:
+    """
+    Chunked document with one embedding per chunk
+
+    Embeddings live in one contiguous (passages x d_model) matrix stored as
+    float32, float16 or int8. int8 rows are quantized symmetrically with a
+    per-row scale. A search is one matrix-vector product per question, an
+    argpartition for the top k and a greedy pass under the token budget, so
+    it stays in the millisecond range for thousands of passages.
+    """
+
+    def __init__(self, passages, lengths, embeddings, scales=None):
+        """
+        Initialize index
+
+        Args:
+            passages: Passage texts in document order
+            lengths: Token count per passage
+            embeddings: Embedding matrix (float32, float16 or int8)
+            scales: Per-row scales of an int8 matrix
+        """
+        self.passages = passages
+        self.lengths = np.asarray(lengths, dtype=np.int32)
+        self.embeddings = np.ascontiguousarray(embeddings)
+        self.scales = scales
+
+    @classmethod
+    def build(cls, summarizer, text, passage_tokens=96, batch_size=32, dtype="float32"):
+        """
+        Chunk a document and embed every chunk
+
+        Args:
+            summarizer: DocumentSummarizer
+            text: Document text
+            passage_tokens: Max tokens per passage
+            batch_size: Passages per encoder call
+            dtype: "float32", "float16" or "int8" storage
+
+        Returns:
+            PassageIndex
+        """
+        if dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"Unknown embedding dtype '{dtype}' (expected one of {EMBEDDING_DTYPES})")
+        passages = summarizer.chunk_text(text, passage_tokens) or [text]
+        # Tokenized directly: thousands of one-off passages would flush the token cache
+        with stage("tokenize"):
+            id_lists = summarizer.tokenizer(passages)["input_ids"]
+        lengths = [len(ids) - 1 for ids in id_lists]
+        with stage("embed"):
+            vectors = embed_ids(summarizer, id_lists, batch_size)
+        return cls.from_vectors(passages, lengths, vectors, dtype)
+
+    @classmethod
+    def from_vectors(cls, passages, lengths, vectors, dtype="float32"):
+        """
+        Create an index from float32 embeddings, converting them to dtype
+
+        Args:
+            passages: Passage texts
+            lengths: Token count per passage
+            vectors: float32 matrix with L2-normalized rows
+            dtype: "float32", "float16" or "int8" storage
+
+        Returns:
+            PassageIndex
+        """
+        if dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"Unknown embedding dtype '{dtype}' (expected one of {EMBEDDING_DTYPES})")
+        scales = None
+        if dtype == "float16":
+            vectors = vectors.astype(np.float16)
+        elif dtype == "int8":
+            scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12).astype(np.float32) / 127.0
+            vectors = np.round(vectors / scales[:, None]).astype(np.int8)
+        return cls(passages, lengths, vectors, scales)
+
+    def __len__(self):
+        return len(self.passages)
+
+    def memory_bytes(self):
+        """Bytes held by the embeddings, scales and passage texts"""
+        size = self.embeddings.nbytes + self.lengths.nbytes + sum(len(p) for p in self.passages)
+        return size + (self.scales.nbytes if self.scales is not None else 0)
+
+    def scores(self, queries):
+        """
+        Cosine similarity of queries to every passage
+
+        Args:
+            queries: float32 matrix (questions x d_model) with L2-normalized rows
+
+        Returns:
+            np.ndarray: (questions x passages) similarities
+        """
+        if self.embeddings.dtype == np.float32:
+            return queries @ self.embeddings.T
+        # BLAS has no float16/int8 kernels: widen the matrix a cache-sized
+        # block at a time (torch converts several times faster than NumPy)
+        matrix = torch.from_numpy(self.embeddings)
+        queries = torch.from_numpy(np.ascontiguousarray(queries, dtype=np.float32))
+        scores = torch.empty((len(queries), len(matrix)))
+        for start in range(0, len(matrix), SCORE_BLOCK_ROWS):
+            block = matrix[start:start + SCORE_BLOCK_ROWS]
+            scores[:, start:start + len(block)] = queries @ block.float().T
+        scores = scores.numpy()
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def search(self, queries, top_k=4, token_budget=400):
+        """
+        Pick passages for each query
+
+        The top_k most similar passages are taken in score order while they
+        fit token_budget (the best one always), then returned in document
+        order.
+
+        Args:
+            queries: float32 matrix (questions x d_model) with L2-normalized rows
+            top_k: Max passages per query
+            token_budget: Max total tokens of the passages per query
+
+        Returns:
+            list: Passage index lists, one per query
+        """
+        scores = self.scores(queries)
+        k = min(top_k, len(self.passages))
+        picks = []
+        for row in scores:
+            candidates = np.argpartition(-row, k - 1)[:k] if k < len(row) else np.arange(len(row))
+            chosen, used = [], 0
+            for index in candidates[np.argsort(-row[candidates])]:
+                length = int(self.lengths[index])
+                if not chosen or used + length <= token_budget:
+                    chosen.append(int(index))
+                    used += length
+            picks.append(sorted(chosen))
+        return picks
+
+    def to_state(self):
+        """
+        Get the index as a JSON-serializable dict
+
+        Returns:
+            dict: Passages, lengths and the base64-encoded matrix and scales
+        """
+        return {
+            "passages": self.passages,
+            "lengths": self.lengths.tolist(),
+            "dtype": str(self.embeddings.dtype),
+            "shape": list(self.embeddings.shape),
+            "embeddings": base64.b64encode(self.embeddings.tobytes()).decode('ascii'),
+            "scales": (base64.b64encode(self.scales.tobytes()).decode('ascii')
+                       if self.scales is not None else None),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Rebuild an index from to_state() output
+
+        Returns:
+            PassageIndex
+        """
+        embeddings = np.frombuffer(bytearray(base64.b64decode(state["embeddings"])), dtype=state["dtype"])
+        scales = None
+        if state.get("scales"):
+            scales = np.frombuffer(bytearray(base64.b64decode(state["scales"])), dtype=np.float32)
+        return cls(state["passages"], state["lengths"], embeddings.reshape(state["shape"]), scales)
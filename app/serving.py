@@ -0,0 +1,361 @@
+"""
+Preload-and-fork serving
+Loads the application once in a master process, then forks worker processes
+that share its memory copy-on-write and accept on one listening socket
+"""
+
+import os
+import gc
+import time
+import signal
+import socket
+import threading
+import logging
+from werkzeug.serving import make_server
+
+logger = logging.getLogger(__name__)
+
+# smaps_rollup fields reported per process (kB in /proc, bytes in reports)
+MEMORY_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared_clean",
+    "Shared_Dirty": "shared_dirty",
+    "Private_Clean": "private_clean",
+    "Private_Dirty": "private_dirty",
+}
+
+# Master PID, set in forked workers
+_master_pid = None
+
+
+def process_memory(pid="self"):
+    """
+    Read the memory footprint of a process
+
+    PSS (proportional set size) splits every shared page between the
+    processes mapping it, so summing PSS over master and workers gives the
+    real total while summing RSS counts shared weights once per process.
+
+    Args:
+        pid: Process ID (default: this process)
+
+    Returns:
+        dict: rss/pss/shared/private byte counts (None when /proc is unavailable)
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    memory = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].rstrip(':') in MEMORY_FIELDS:
+            memory[MEMORY_FIELDS[parts[0].rstrip(':')]] = int(parts[1]) * 1024
+    memory["shared"] = memory.get("shared_clean", 0) + memory.get("shared_dirty", 0)
+    memory["private"] = memory.get("private_clean", 0) + memory.get("private_dirty", 0)
+    return memory
+
+
+def child_pids(pid):
+    """
+    List the child processes of a process
+
+    Returns:
+        list: Child PIDs
+    """
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        pass
+
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Field 4 is the parent PID; the command name may contain spaces
+                if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                    children.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return children
+
+
+def memory_report():
+    """
+    Memory of the serving processes
+
+    In a forked worker this covers the master and all its workers;
+    otherwise only the current process.
+
+    Returns:
+        dict: mode, per-process memory and totals (bytes)
+    """
+    if _master_pid is None:
+        processes = {"self": os.getpid()}
+    else:
+        processes = {"master": _master_pid}
+        for index, pid in enumerate(sorted(child_pids(_master_pid))):
+            processes[f"worker-{index}"] = pid
+
+    report = {"mode": "prefork" if _master_pid else "single", "pid": os.getpid(), "processes": {}}
+    totals = {"rss": 0, "pss": 0, "private": 0}
+    for name, pid in processes.items():
+        memory = process_memory(pid)
+        if memory is None:
+            continue
+        report["processes"][name] = dict(memory, pid=pid)
+        for key in totals:
+            totals[key] += memory.get(key, 0)
+    report["total"] = totals
+    return report
+
+
+class _InFlight:
+    """WSGI middleware counting requests whose responses are not finished"""
+
+    def __init__(self, app):
+        self.app = app
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.count += 1
+        try:
+            response = self.app(environ, start_response)
+        except BaseException:
+            self._done()
+            raise
+        return _ClosingIterator(response, self._done)
+
+    def _done(self):
+        with self._lock:
+            self.count -= 1
+
+
+class _ClosingIterator:
+    """Response iterable that calls a callback once the server closes it"""
+
+    def __init__(self, response, callback):
+        self._response = response
+        self._callback = callback
+
+    def __iter__(self):
+        return iter(self._response)
+
+    def close(self):
+        try:
+            if hasattr(self._response, "close"):
+                self._response.close()
+        finally:
+            self._callback()
+
+
+class PreforkServer:
+    """
+    Master process supervising forked HTTP workers
+
+    The application (and its model) is loaded before run() is called; the
+    master then freezes the garbage collector's view of the loaded objects
+    (gc.freeze) so workers do not dirty those pages, opens one listening
+    socket and forks the workers, which inherit weights and socket.
+    Crashed workers are replaced. SIGHUP restarts the workers one at a
+    time (each finishes its in-flight requests first); SIGTERM/SIGINT stop
+    all of them and exit.
+    """
+
+    # Minimum seconds between respawns of crashing workers
+    RESPAWN_DELAY = 1.0
+
+    def __init__(self, app, host, port, workers=2, pre_fork=None, post_fork=None,
+                 graceful_timeout=30, backlog=128):
+        """
+        Initialize server
+
+        Args:
+            app: WSGI application, fully loaded
+            host: Bind address
+            port: Bind port
+            workers: Number of worker processes
+            pre_fork: Callable run once in the master before the first fork
+            post_fork: Callable(worker index) run in each worker after fork
+            graceful_timeout: Seconds a stopping worker may spend on in-flight requests
+            backlog: Listen backlog of the shared socket
+        """
+        self.app = app
+        self.host = host
+        self.port = port
+        self.num_workers = max(1, workers)
+        self.pre_fork = pre_fork
+        self.post_fork = post_fork
+        self.graceful_timeout = graceful_timeout
+        self.backlog = backlog
+        self.workers = {}  # pid -> worker index
+        self._socket = None
+        self._stopping = False
+        self._reload = False
+        self._last_spawn = 0.0
+
+    def run(self):
+        """Open the socket, fork the workers and supervise them until stopped"""
+        self._socket = self._listen()
+        if self.pre_fork:
+            self.pre_fork()
+
+        # Move everything loaded so far out of the collector's reach so
+        # collections in the workers do not write to the shared pages
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+
+        logger.info(f"Master {os.getpid()} serving on http://{self.host}:{self.port} "
+                    f"with {self.num_workers} workers")
+        for index in range(self.num_workers):
+            self._spawn(index)
+
+        while not self._stopping:
+            self._reap()
+            if self._reload:
+                self._reload = False
+                self._restart_workers()
+            for index in self._missing_indexes():
+                if time.monotonic() - self._last_spawn < self.RESPAWN_DELAY:
+                    break
+                self._spawn(index)
+            time.sleep(0.2)
+
+        self._shutdown()
+
+    def _listen(self):
+        """Open the listening socket shared by all workers"""
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(self.backlog)
+        sock.set_inheritable(True)
+        self.port = sock.getsockname()[1]
+        return sock
+
+    def _handle_stop(self, signum, frame):
+        self._stopping = True
+
+    def _handle_reload(self, signum, frame):
+        self._reload = True
+
+    def _missing_indexes(self):
+        """Worker slots without a running process"""
+        running = set(self.workers.values())
+        return [index for index in range(self.num_workers) if index not in running]
+
+    def _spawn(self, index):
+        """Fork one worker"""
+        self._last_spawn = time.monotonic()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self._worker_main(index)
+            except BaseException as e:
+                logger.error(f"Worker {os.getpid()} failed: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+        self.workers[pid] = index
+        logger.info(f"Started worker {index} (pid {pid})")
+        return pid
+
+    def _reap(self):
+        """Collect exited workers"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            index = self.workers.pop(pid, None)
+            if index is not None and not self._stopping:
+                logger.warning(f"Worker {index} (pid {pid}) exited with status {status}")
+
+    def _restart_workers(self):
+        """Replace the workers one at a time, keeping the others serving"""
+        logger.info("Restarting workers...")
+        for pid, index in list(self.workers.items()):
+            self._stop_worker(pid)
+            self._spawn(index)
+
+    def _stop_worker(self, pid, timeout=None):
+        """Ask a worker to stop and wait for it (killed after the timeout)"""
+        timeout = self.graceful_timeout if timeout is None else timeout
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        deadline = time.monotonic() + timeout + 1.0
+        while time.monotonic() < deadline:
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done = pid
+            if done:
+                self.workers.pop(pid, None)
+                return
+            time.sleep(0.05)
+        logger.warning(f"Worker pid {pid} did not stop in time; killing it")
+        try:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+        self.workers.pop(pid, None)
+
+    def _shutdown(self):
+        """Stop all workers and close the socket"""
+        logger.info("Stopping workers...")
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in list(self.workers):
+            self._stop_worker(pid)
+        self._socket.close()
+
+    def _worker_main(self, index):
+        """Serve requests on the inherited socket until SIGTERM"""
+        global _master_pid
+        _master_pid = os.getppid()
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+        if self.post_fork:
+            self.post_fork(index)
+
+        app = _InFlight(self.app)
+        server = make_server(self.host, self.port, app, threaded=True, fd=self._socket.fileno())
+        thread = threading.Thread(target=server.serve_forever, name="http-server", daemon=True)
+        thread.start()
+
+        while not stop.wait(1.0):
+            if os.getppid() != _master_pid:  # Master is gone
+                break
+
+        # Stop accepting, then let in-flight requests finish
+        server.shutdown()
+        deadline = time.monotonic() + self.graceful_timeout
+        while app.count > 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+
@@ -0,0 +1,449 @@
+"""
+Session-keyed chatbot store
+Keeps one DocumentChatbot per chat session in memory up to a byte budget and
+spills idle sessions to compact files on disk
+"""
+
+import os
+import re
+import gzip
+import json
+import time
+import tempfile
+import threading
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from app.metrics import REGISTRY, STAGE_BUCKETS_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Session IDs are used in file names
+_SESSION_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+SPILL_SECONDS = REGISTRY.histogram("chat_session_spill_seconds", "Time to evict a session to disk",
+                                   STAGE_BUCKETS_SECONDS)
+REHYDRATE_SECONDS = REGISTRY.histogram("chat_session_rehydrate_seconds",
+                                       "Time to load an evicted session back into memory",
+                                       STAGE_BUCKETS_SECONDS)
+EVICTIONS = REGISTRY.counter("chat_session_evictions_total", "Sessions evicted from memory",
+                             labelnames=("reason",))
+
+
+def check_session_id(session_id):
+    """
+    Validate a client-supplied session ID
+
+    Raises:
+        ValueError: When the ID is not 1-64 letters, digits, '-' or '_'
+    """
+    if not isinstance(session_id, str) or not _SESSION_ID.match(session_id):
+        raise ValueError("session_id must be 1-64 letters, digits, '-' or '_'")
+    return session_id
+
+
+class _Session:
+    """A chatbot held in memory, with its size and usage bookkeeping"""
+
+    __slots__ = ("bot", "size", "last_used", "users", "revision", "version")
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.size = 0
+        self.last_used = time.monotonic()
+        self.users = 0
+        # Chatbot revision last written to disk and the file version it produced (shared stores)
+        self.revision = bot.revision
+        self.version = None
+
+
+class ChatSessionStore:
+    """
+    Chatbots keyed by session ID
+
+    Each session owns a DocumentChatbot (document, summary, keywords and
+    context encoder states); all of them share one summarizer. Sessions
+    are kept in LRU order. When the memory tier grows past max_bytes, or
+    a session has been idle for idle_seconds, the least recently used
+    sessions that no request is using are written to spill_dir as gzipped
+    JSON and dropped from memory. The next request for an evicted session
+    reads it back without summarizing the document again; only context
+    encoder states are rebuilt. Spilled sessions older than max_age are
+    deleted.
+
+    After share(), processes using the same spill_dir (forked server
+    workers) see each other's sessions: see share().
+    """
+
+    # Run a disk expiry pass after this many spills
+    EXPIRE_EVERY = 64
+
+    # Seconds between scans for idle sessions while memory is under budget
+    IDLE_SCAN_INTERVAL = 5.0
+
+    def __init__(self, factory, max_bytes=256 * 1024 * 1024, spill_dir=None, idle_seconds=None,
+                 max_age=24 * 3600):
+        """
+        Initialize session store
+
+        Args:
+            factory: Zero-argument callable returning a new DocumentChatbot
+            max_bytes: Memory budget for the sessions held in memory
+            spill_dir: Directory for evicted sessions (None drops them instead)
+            idle_seconds: Also evict sessions unused for this long (None = only by size)
+            max_age: Lifetime of spilled sessions in seconds (None for no expiry)
+        """
+        self.factory = factory
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.idle_seconds = idle_seconds
+        self.max_age = max_age
+        self.shared = False
+        self.memory_bytes = 0
+        self.rehydrations = 0
+        self._sessions = OrderedDict()
+        self._spills = 0
+        self._last_idle_scan = time.monotonic()
+        self._lock = threading.Lock()
+        self._loading = threading.Lock()
+
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+
+    def share(self):
+        """
+        Keep sessions consistent across processes sharing spill_dir
+
+        Every change to a session (a finished load, a new document or a
+        clear) is written through to its file. A request for a session
+        held in memory reloads it when another process has replaced the
+        file since, and drops it when the file was removed. Files are
+        kept when sessions are rehydrated, and evicting only drops the
+        in-memory copy. Without a spill_dir a temporary one is created,
+        so call this before forking.
+        """
+        if not self.spill_dir:
+            self.spill_dir = tempfile.mkdtemp(prefix='chat-sessions-')
+        self.shared = True
+
+    @contextmanager
+    def session(self, session_id, create=False):
+        """
+        Use the chatbot of a session
+
+        The session is pinned (never evicted) while the block runs, and
+        while its chatbot is loading a document in the background. Its
+        size is measured again when the block exits and when a background
+        load finishes, so documents loaded inside it count towards
+        max_bytes.
+
+        Args:
+            session_id: Session ID
+            create: Start an empty session when none exists
+
+        Yields:
+            DocumentChatbot, or None when the session does not exist and
+            create is False
+        """
+        entry = self._acquire(session_id, create)
+        if entry is None:
+            yield None
+            return
+        try:
+            yield entry.bot
+        finally:
+            self._release(session_id, entry)
+
+    def remove(self, session_id):
+        """
+        Drop a session from memory and disk
+
+        Returns:
+            bool: True if the session existed
+        """
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry is not None:
+                self.memory_bytes -= entry.size
+        removed = entry is not None
+        if removed:
+            # Discards a running background load
+            entry.bot.clear_context()
+        path = self._spill_path(session_id)
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+                removed = True
+            except OSError:
+                pass
+        return removed
+
+    def stats(self):
+        """
+        Get store statistics
+
+        Returns:
+            dict: Session counts and bytes per tier, memory budget and
+                  rehydrations
+        """
+        files = self._spill_files()
+        with self._lock:
+            return {
+                "memory_sessions": len(self._sessions),
+                "disk_sessions": len(files),
+                "memory_bytes": self.memory_bytes,
+                "max_bytes": self.max_bytes,
+                "disk_bytes": sum(size for _, size, _ in files),
+                "rehydrations": self.rehydrations,
+            }
+
+    def evict(self):
+        """
+        Evict idle sessions and trim memory to max_bytes, least recently used first
+
+        Returns:
+            int: Number of sessions evicted
+        """
+        now = time.monotonic()
+        idle_scan = self.idle_seconds is not None and now - self._last_idle_scan >= self.IDLE_SCAN_INTERVAL
+        if self.memory_bytes <= self.max_bytes and not idle_scan:
+            return 0
+
+        # Held while spilling, so a request for a session being evicted
+        # waits for its file instead of finding neither copy
+        with self._loading:
+            victims = []
+            with self._lock:
+                if idle_scan:
+                    self._last_idle_scan = now
+                size = self.memory_bytes
+                for session_id, entry in self._sessions.items():
+                    # Sessions in use or still loading in the background stay
+                    if entry.users or entry.bot.loading:
+                        continue
+                    if size > self.max_bytes:
+                        reason = "memory"
+                    elif idle_scan and now - entry.last_used > self.idle_seconds:
+                        reason = "idle"
+                    else:
+                        continue
+                    victims.append((session_id, entry, reason))
+                    size -= entry.size
+
+                for session_id, entry, _ in victims:
+                    del self._sessions[session_id]
+                    self.memory_bytes -= entry.size
+
+            for session_id, entry, reason in victims:
+                # Shared sessions are on disk already, maybe newer from another process
+                if not self.shared:
+                    self._spill(session_id, entry.bot)
+                EVICTIONS.labels(reason).inc()
+        return len(victims)
+
+    def _acquire(self, session_id, create):
+        """Find, rehydrate or create a session and pin it"""
+        entry = self._pin(session_id)
+        if entry is not None:
+            return entry
+
+        # One session is brought in at a time, so concurrent requests for
+        # an evicted session wait for the first one instead of missing it
+        with self._loading:
+            entry = self._pin(session_id)
+            if entry is not None:
+                return entry
+
+            # Read the version first: a file replaced meanwhile is then reloaded next time
+            version = self._file_version(session_id) if self.shared else None
+            bot = self._rehydrate(session_id)
+            if bot is None:
+                if not create:
+                    return None
+                bot, version = self.factory(), None
+
+            entry = _Session(bot)
+            entry.version = version
+            entry.size = bot.memory_bytes()
+            entry.users = 1
+            # Background loads finish after the request released the session
+            bot.on_loaded = lambda: self._resize(session_id, entry)
+            with self._lock:
+                self._sessions[session_id] = entry
+                self.memory_bytes += entry.size
+            return entry
+
+    def _pin(self, session_id):
+        """Pin a session held in memory; None when it is not, or its copy is stale"""
+        disk = self._file_version(session_id) if self.shared else None
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if self.shared and disk != entry.version and not entry.users and not entry.bot.loading:
+                # Another process changed or removed the session
+                del self._sessions[session_id]
+                self.memory_bytes -= entry.size
+                return None
+            self._sessions.move_to_end(session_id)
+            entry.users += 1
+            return entry
+
+    def _release(self, session_id, entry):
+        """Unpin a session, update its size and evict if over budget"""
+        with self._lock:
+            entry.users -= 1
+            entry.last_used = time.monotonic()
+        self._resize(session_id, entry)
+
+    def _resize(self, session_id, entry):
+        """Measure a session again once its document has loaded and evict if over budget"""
+        if self.shared:
+            self._write_through(session_id, entry)
+        size = entry.bot.memory_bytes()
+        with self._lock:
+            if self._sessions.get(session_id) is entry:
+                self.memory_bytes += size - entry.size
+                entry.size = size
+        self.evict()
+
+    def _spill_path(self, session_id):
+        """Path of the spill file of a session"""
+        if not self.spill_dir:
+            return None
+        return os.path.join(self.spill_dir, f"{session_id}.json.gz")
+
+    def _spill(self, session_id, bot):
+        """Write an evicted session to disk (sessions without a document are dropped)"""
+        state = bot.export_state()
+        if state is None or not self.spill_dir:
+            return
+
+        started = time.perf_counter()
+        if self._write_state(session_id, state) is not None:
+            SPILL_SECONDS.observe(time.perf_counter() - started)
+
+    def _write_through(self, session_id, entry):
+        """Write a changed session to its file so other processes see the change"""
+        bot = entry.bot
+        if bot.loading or bot.revision == entry.revision:
+            return
+        entry.revision = bot.revision
+        state = bot.export_state()
+        if state is not None:
+            entry.version = self._write_state(session_id, state)
+            return
+        entry.version = None
+        try:
+            os.remove(self._spill_path(session_id))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Error removing chat session {session_id}: {e}")
+
+    def _write_state(self, session_id, state):
+        """
+        Atomically write a session's state to its file
+
+        Returns:
+            tuple: Version of the written file (None when writing failed)
+        """
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.spill_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as raw:
+                with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=1) as f:
+                    f.write(json.dumps(state).encode('utf-8'))
+                raw.flush()
+                # Renaming keeps inode and mtime, so this is the version others will see
+                version = self._version(os.fstat(raw.fileno()))
+            os.replace(tmp_path, self._spill_path(session_id))
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"Error writing chat session {session_id}: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+        self._spills += 1
+        if self._spills % self.EXPIRE_EVERY == 0:
+            self.expire_disk()
+        return version
+
+    @staticmethod
+    def _version(stat):
+        """Identify one write of a file (a replaced file has a new inode or mtime)"""
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _file_version(self, session_id):
+        """Version of a session's file (None when there is none)"""
+        try:
+            return self._version(os.stat(self._spill_path(session_id)))
+        except OSError:
+            return None
+
+    def _rehydrate(self, session_id):
+        """Load a spilled session into a new chatbot; None when there is none"""
+        path = self._spill_path(session_id)
+        if path is None:
+            return None
+
+        started = time.perf_counter()
+        try:
+            if self.max_age is not None and time.time() - os.path.getmtime(path) > self.max_age:
+                os.remove(path)
+                return None
+            with gzip.open(path, 'rb') as f:
+                state = json.loads(f.read())
+            # The session lives in memory again; the file would only go stale
+            # (unless other processes share it)
+            if not self.shared:
+                os.remove(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading chat session {session_id}: {e}")
+            return None
+
+        bot = self.factory()
+        bot.restore_state(state)
+        REHYDRATE_SECONDS.observe(time.perf_counter() - started)
+        with self._lock:
+            self.rehydrations += 1
+        return bot
+
+    def expire_disk(self):
+        """
+        Delete spilled sessions older than max_age
+
+        Returns:
+            int: Number of files removed
+        """
+        if self.max_age is None:
+            return 0
+        now = time.time()
+        removed = 0
+        for path, _, mtime in self._spill_files():
+            if now - mtime > self.max_age:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def _spill_files(self):
+        """List (path, size, mtime) of every spill file"""
+        if not self.spill_dir or not os.path.isdir(self.spill_dir):
+            return []
+        files = []
+        for name in os.listdir(self.spill_dir):
+            if not name.endswith('.json.gz'):
+                continue
+            path = os.path.join(self.spill_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((path, stat.st_size, stat.st_mtime))
+        return files
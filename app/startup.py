@@ -0,0 +1,126 @@
+"""
+Background model loading
+Loads the model stack off the request path and tracks load phase and timings
+"""
+
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ModelLoader:
+    """
+    Run a model load function in a background thread
+
+    The load function receives the loader and calls enter() as it moves
+    through its phases ("importing", "loading", "warming_up", ...); the
+    time spent in each phase is recorded. The loader ends in "ready" when
+    the function returns, or "failed" when it raises.
+    """
+
+    def __init__(self, load):
+        """
+        Initialize loader
+
+        Args:
+            load: Callable taking the loader, run once by start()
+        """
+        self.load = load
+        self.phase = "pending"
+        self.error = None
+        self.timings_ms = {}
+        self._started = None
+        self._phase_started = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, background=True):
+        """
+        Run the load function
+
+        Args:
+            background: Return at once and load in a daemon thread
+
+        Returns:
+            ModelLoader: self
+        """
+        self._started = self._phase_started = time.perf_counter()
+        if not background:
+            self._run()
+            return self
+        self._thread = threading.Thread(target=self._run, name="model-loader", daemon=True)
+        self._thread.start()
+        return self
+
+    def enter(self, phase):
+        """
+        Move to a new phase, recording the time spent in the previous one
+
+        Args:
+            phase: Phase name
+        """
+        now = time.perf_counter()
+        with self._lock:
+            if self._phase_started is not None and self.phase != "pending":
+                self.timings_ms[self.phase] = round((now - self._phase_started) * 1000.0, 1)
+            self.phase = phase
+            self._phase_started = now
+        logger.info(f"Model loader: {phase}")
+
+    def _run(self):
+        """Run the load function and record the outcome"""
+        try:
+            self.load(self)
+            self.enter("ready")
+        except Exception as e:
+            logger.error(f"Model loading failed: {e}")
+            self.error = str(e)
+            self.enter("failed")
+        finally:
+            with self._lock:
+                self.timings_ms["total"] = round((time.perf_counter() - self._started) * 1000.0, 1)
+            self._done.set()
+
+    @property
+    def ready(self):
+        """True once the load function has completed"""
+        return self.phase == "ready"
+
+    @property
+    def failed(self):
+        """True when the load function raised"""
+        return self.phase == "failed"
+
+    def wait(self, timeout=None):
+        """
+        Block until loading has finished
+
+        Args:
+            timeout: Max seconds to wait (None = no limit)
+
+        Returns:
+            bool: True when the model is ready
+        """
+        self._done.wait(timeout)
+        return self.ready
+
+    def status(self):
+        """
+        Get load phase and timings
+
+        Returns:
+            dict: Phase, ready flag, error, per-phase timings (ms) and elapsed time (ms)
+        """
+        with self._lock:
+            status = {
+                "phase": self.phase,
+                "ready": self.phase == "ready",
+                "error": self.error,
+                "timings_ms": dict(self.timings_ms),
+            }
+        if self._started is not None and not self._done.is_set():
+            status["elapsed_ms"] = round((time.perf_counter() - self._started) * 1000.0, 1)
+        return status
@@ -4,15 +4,48 @@ Handles text summarization and contextual binding
 """
 
 import os
+import time
+import threading
+import importlib.util
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import torch
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+from transformers import AutoModelForSeq2SeqLM, TextIteratorStreamer
 import logging
 
+from app.cache import ResultCache, make_cache_key
+from app.config import Config
+from app.generation import Deadline, DecodeCostModel
+from app.inference import InferenceExecutor
+from app.metrics import (Histogram, STAGE_SECONDS, INPUT_TOKENS, OUTPUT_TOKENS, GENERATE_INPUT_TOKENS,
+                         TOKENS_PER_SECOND, stage)
+from app.onnx_backend import OnnxSeq2SeqModel
+from app.prompt_lookup import PromptLookupDecoder
+from app.quantization import (QUANTIZATION_MODES, quantize_dynamic_int8, quantized_cache_path,
+                              load_quantized, save_quantized)
+from app.tokenization import TokenCache, content_hash, load_tokenizer
+from app.utils import TextProcessor, SentenceRanker
+
 logger = logging.getLogger(__name__)
 
+SUMMARY_PREFIX = "summarize: "
+
+# Time-to-first-token histogram buckets for streamed generation
+TTFT_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
 class DocumentSummarizer:
     """Summarizes documents using a fine-tuned T5 model"""
     
+    # generate() setting -> Config attribute used when a profile leaves it out
+    PROFILE_SETTINGS = {
+        "num_beams": "NUM_BEAMS",
+        "no_repeat_ngram_size": "NO_REPEAT_NGRAM_SIZE",
+        "repetition_penalty": "REPETITION_PENALTY",
+        "length_penalty": "LENGTH_PENALTY",
+        "early_stopping": "EARLY_STOPPING",
+        "prompt_lookup": "PROMPT_LOOKUP",
+    }
+    
     def __init__(self, model_path, tokenizer_path, device="cpu", config=None):
         """
         Initialize the summarizer with model and tokenizer
@@ -27,16 +60,15 @@ class DocumentSummarizer:
         self.config = config
         self.model = None
         self.tokenizer = None
+        self._init_runtime()
         
         try:
             logger.info(f"Loading model from {model_path}...")
-            self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_path)
-            self.model = AutoModelForSeq2SeqLM.from_pretrained(
+            self.tokenizer = load_tokenizer(tokenizer_path)
+            self.model = self._load_model(
                 tokenizer_path,
                 device_map=device if device != "cpu" else None
             )
-            self.model.to(device)
-            self.model.eval()
             logger.info("Model loaded successfully!")
         except Exception as e:
             logger.warning(f"Could not load custom model: {e}. Loading T5-base...")
@@ -44,90 +76,1210 @@ class DocumentSummarizer:
     
     def _load_default_model(self):
         """Load default T5-base model as fallback"""
+        # With MODEL_LOCAL_FILES_ONLY only a locally cached t5-base is used (no download)
+        local_files_only = bool(self._setting('MODEL_LOCAL_FILES_ONLY', False))
         try:
-            self.tokenizer = AutoTokenizer.from_pretrained("t5-base")
-            self.model = AutoModelForSeq2SeqLM.from_pretrained("t5-base")
-            self.model.to(self.device)
-            self.model.eval()
+            self.tokenizer = load_tokenizer("t5-base", local_files_only=local_files_only)
+            self.model = self._load_model("t5-base", local_files_only=local_files_only)
             logger.info("Default T5-base model loaded successfully!")
         except Exception as e:
             logger.error(f"Failed to load default model: {e}")
             raise
     
-    def summarize(self, text, max_length=None, min_length=None, num_beams=None):
+    def _load_model(self, source, **kwargs):
+        """
+        Load seq2seq weights and prepare them for inference
+        
+        With QUANTIZATION = "int8" (CPU only) the Linear layers are
+        dynamically quantized; the quantized model is cached under
+        QUANTIZED_MODEL_CACHE_DIR so later starts load it directly.
+        With INFERENCE_BACKEND = "onnx" the graphs exported to
+        ONNX_MODEL_DIR are run on ONNX Runtime instead, falling back to
+        PyTorch if they cannot be loaded.
+        
+        Args:
+            source: Model directory or hub model name
+            **kwargs: Extra from_pretrained arguments
+        
+        Returns:
+            torch.nn.Module or OnnxSeq2SeqModel: Model ready for inference
+        """
+        if self._setting('INFERENCE_BACKEND', 'torch') == "onnx":
+            try:
+                model = OnnxSeq2SeqModel(
+                    self._setting('ONNX_MODEL_DIR'),
+                    intra_op_threads=self._setting('ONNX_INTRA_OP_THREADS', 0),
+                )
+                return model.to(self.device)
+            except Exception as e:
+                logger.warning(f"Could not load ONNX model: {e}. Using the PyTorch backend...")
+
+        mode = self._setting('QUANTIZATION')
+        if mode and self.device != "cpu":
+            logger.warning(f"Quantization '{mode}' is CPU only; loading float weights on {self.device}")
+            mode = None
+        if mode and mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode: {mode}")
+
+        if mode == "int8":
+            cache_path = quantized_cache_path(self._setting('QUANTIZED_MODEL_CACHE_DIR'), source, mode)
+            model = load_quantized(cache_path)
+            if model is None:
+                model = AutoModelForSeq2SeqLM.from_pretrained(source, **kwargs)
+                model.eval()
+                logger.info("Applying int8 dynamic quantization...")
+                model = quantize_dynamic_int8(model)
+                save_quantized(model, cache_path)
+        else:
+            # Load straight from the memory-mapped safetensors file instead of
+            # materializing randomly initialized weights first (needs accelerate)
+            if importlib.util.find_spec("accelerate") is not None:
+                kwargs.setdefault("low_cpu_mem_usage", True)
+            model = AutoModelForSeq2SeqLM.from_pretrained(source, **kwargs)
+            model.to(self.device)
+
+        model.eval()
+        return model
+    
+    def _init_runtime(self):
+        """Set up caches and runtime state shared by all model loaders"""
+        self.token_cache = TokenCache(
+            max_entries=self._setting('TOKEN_CACHE_SIZE', 256),
+            max_tokens=self._setting('TOKEN_CACHE_MAX_TOKENS', 2000000),
+        )
+        self._prefix_len = None
+        self._fingerprint = None
+        self.ttft_ms = Histogram(TTFT_BUCKETS_MS)
+        self._encoder_clock = threading.local()
+        self._timed_encoder = None
+        self.cost_model = DecodeCostModel()
+        self._prompt_lookup = None
+        self.executor = None
+        self.reset_executor()
+        self.result_cache = None
+        if self._setting('RESULT_CACHE_ENABLED', False):
+            self.result_cache = ResultCache(
+                max_entries=self._setting('RESULT_CACHE_MEMORY_ENTRIES', 512),
+                disk_dir=self._setting('RESULT_CACHE_DIR'),
+                max_disk_bytes=self._setting('RESULT_CACHE_DISK_MAX_BYTES', 256 * 1024 * 1024),
+                max_age=self._setting('RESULT_CACHE_MAX_AGE'),
+            )
+    
+    def reset_executor(self, slots=None, intra_op_threads=None, inter_op_threads=None, pin_cores=None,
+                       cores=None):
+        """
+        Replace the inference executor that runs all model calls
+        
+        Settings default to the INFERENCE_* configuration. Call again after
+        fork (slot threads do not survive it) or to try other slot/thread
+        combinations.
+        
+        Args:
+            slots: Concurrent model calls
+            intra_op_threads: torch threads per call (0 = cores / slots)
+            inter_op_threads: torch inter-op threads (0 = torch default)
+            pin_cores: Bind each slot to its own cores
+            cores: Cores available to the executor (default: process affinity)
+        
+        Returns:
+            InferenceExecutor: The new executor
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        self.executor = InferenceExecutor(
+            slots=slots or self._setting('INFERENCE_SLOTS', 1),
+            intra_op_threads=intra_op_threads if intra_op_threads is not None
+            else self._setting('INFERENCE_INTRA_OP_THREADS', 0),
+            inter_op_threads=inter_op_threads if inter_op_threads is not None
+            else self._setting('INFERENCE_INTER_OP_THREADS', 0),
+            pin_cores=pin_cores if pin_cores is not None else self._setting('INFERENCE_PIN_CORES', False),
+            cores=cores,
+        )
+        return self.executor
+    
+    def _setting(self, name, default=None):
+        """
+        Read a setting from the config object, falling back to Config defaults
+        
+        Args:
+            name: Setting name (e.g. 'LONG_DOCUMENT_FAN_IN')
+            default: Value used when the setting is not defined anywhere
+        
+        Returns:
+            The configured value
+        """
+        fallback = getattr(Config, name, default)
+        if self.config is None:
+            return fallback
+        if isinstance(self.config, dict):
+            return self.config.get(name, fallback)
+        return getattr(self.config, name, fallback)
+    
+    @staticmethod
+    def _output_lengths(input_len, max_length=None, min_length=None):
+        """
+        Pick (max_new_tokens, min_length) for an input of the given token length
+        
+        max_length caps the ladder value and min_length overrides the
+        derived minimum (both optional, as passed to summarize()).
+        """
+        # Auto length selection (optimized)
+        if input_len < 80:
+            out_len = 60
+        elif input_len < 150:
+            out_len = 120
+        elif input_len < 250:
+            out_len = 180
+        elif input_len < 350:
+            out_len = 250
+        else:
+            out_len = 350  # Cap to avoid GPU overload
+
+        # Minimum length (very important)
+        min_len = max(30, out_len // 3)
+
+        if max_length:
+            out_len = min(out_len, max_length)
+            min_len = min(min_len, max(1, out_len // 3))
+        if min_length is not None:
+            min_len = min(min_length, out_len)
+        return out_len, min_len
+    
+    def generation_profile(self, name=None):
+        """
+        Resolve a named generation profile
+        
+        Args:
+            name: Profile name (defaults to DEFAULT_GENERATION_PROFILE)
+        
+        Returns:
+            tuple: (profile name, dict of generate() settings)
+        
+        Raises:
+            ValueError: If no such profile is configured
+        """
+        name = name or self._setting('DEFAULT_GENERATION_PROFILE', 'quality')
+        profiles = self._setting('GENERATION_PROFILES', {})
+        if name not in profiles:
+            raise ValueError(f"Unknown generation profile '{name}' (available: {', '.join(profiles)})")
+
+        settings = {}
+        for key, setting in self.PROFILE_SETTINGS.items():
+            value = profiles[name].get(key)
+            settings[key] = value if value is not None else self._setting(setting)
+        return name, settings
+    
+    def _generation_kwargs(self, out_len, min_len, num_beams=None, profile=None):
+        """Decoding settings shared by all summarization paths"""
+        _, kwargs = self.generation_profile(profile)
+        if num_beams:
+            kwargs["num_beams"] = num_beams
+        kwargs.update(max_new_tokens=out_len, min_length=min_len)
+        if kwargs["num_beams"] == 1:
+            return self._greedy_settings(kwargs)
+        return kwargs
+    
+    @staticmethod
+    def _greedy_settings(generate_kwargs):
+        """Copy of generate() settings with num_beams=1 and beam-only options removed"""
+        kwargs = {k: v for k, v in generate_kwargs.items()
+                  if k not in ("length_penalty", "early_stopping")}
+        kwargs["num_beams"] = 1
+        return kwargs
+    
+    def summarize(self, text, max_length=None, min_length=None, num_beams=None, use_cache=True,
+                  profile=None, deadline_ms=None, progress=None):
         """
         Smart summarizer:
         - auto-adjusts summary length based on input size
         - prevents premature stopping
         - avoids repetition
         - ensures output is complete
+        - reuses cached results for repeated inputs (use_cache=False bypasses)
+        - decodes with a named generation profile ("fast", "balanced", "quality")
+        - with deadline_ms, fits beams and length to the deadline and stops
+          when it is reached ("truncated" in the result)
+        - reports {"stage", "done", "total"} updates to an optional progress
+          callable (per batch of chunks for long documents)
         """
         if not text or not text.strip():
             return {"summary": "", "error": "Empty input text"}
 
+        try:
+            profile, _ = self.generation_profile(profile)
+        except ValueError as e:
+            return {"summary": "", "error": str(e)}
+
+        key = self._result_key(text, None, max_length, min_length, num_beams, profile) if use_cache else None
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        deadline = Deadline(deadline_ms) if deadline_ms else None
+        result = self._summarize(text, max_length, min_length, num_beams, profile, deadline, progress)
+        if not result.get("truncated"):
+            self._cache_put(key, result)
+        return result
+    
+    def _summarize(self, text, max_length=None, min_length=None, num_beams=None, profile=None,
+                   deadline=None, progress=None):
+        """Run summarize() without the result cache"""
         try:
             # ----------------------------------------
-            # 1. Measure input length
+            # 1. Tokenize once and measure input length
             # ----------------------------------------
-            input_len = len(self.tokenizer.encode(text))
-
-            # Auto length selection (optimized)
-            if input_len < 80:
-                out_len = 60
-            elif input_len < 150:
-                out_len = 120
-            elif input_len < 250:
-                out_len = 180
-            elif input_len < 350:
-                out_len = 250
-            else:
-                out_len = 350  # Cap to avoid GPU overload
+            ids = self.encode(SUMMARY_PREFIX + text)
+            input_len = len(ids) - self._prefix_length()
+
+            # Inputs beyond one model window go through map-reduce (or are
+            # pre-compressed to their key sentences) instead of being
+            # silently truncated
+            strategy = self._setting('LONG_DOCUMENT_STRATEGY')
+            if input_len > self._setting('MAX_INPUT_LENGTH', 512):
+                if strategy == "map_reduce":
+                    return self.summarize_long(text, num_beams=num_beams, max_length=max_length,
+                                               min_length=min_length, profile=profile, deadline=deadline,
+                                               progress=progress)
+                if strategy == "extractive":
+                    ids, input_len = self._extractive_ids(text)
 
-            # Minimum length (very important)
-            min_len = max(30, out_len // 3)
+            out_len, min_len = self._output_lengths(input_len, max_length, min_length)
 
             # ----------------------------------------
-            # 2. Tokenize Input
+            # 2. Truncate the same IDs to the model window
             # ----------------------------------------
-            inputs = self.tokenizer(
-                "summarize: " + text,
-                return_tensors="pt",
-                truncation=True,
-                max_length=512   # T5-base limit
-            ).to(self.device)
+            ids = self.truncate_ids(ids, 512)   # T5-base limit
 
             # ----------------------------------------
-            # 3. Generate Summary with Safe Settings
+            # 3. Generate and decode with safe settings
             # ----------------------------------------
-            with torch.no_grad():
-                summary_ids = self.model.generate(
-                    **inputs,
-                    max_new_tokens=out_len,
-                    min_length=min_len,
-                    num_beams=num_beams or 4,                 # 4 beams is more stable than 6
-                    no_repeat_ngram_size=2,      # safer, less cutting
-                    repetition_penalty=1.3,      # balanced; avoids early cutoff
-                    length_penalty=0.8,          # allows longer output
-                    early_stopping=False,
+            if progress:
+                progress({"stage": "generate", "done": 0, "total": 1})
+            summary = self._generate_from_ids([ids], out_len, min_len, num_beams, profile, deadline)[0]
+            if progress:
+                progress({"stage": "generate", "done": 1, "total": 1})
+
+            return self._build_result(text, summary, profile, deadline)
+
+        except Exception as e:
+            logger.error(f"Error during summarization: {e}")
+            return {"summary": "", "error": str(e)}
+    
+    def encode(self, text):
+        """
+        Tokenize text once, reusing cached token IDs for repeated content
+        
+        Args:
+            text: Text to tokenize (with any task prefix already applied)
+        
+        Returns:
+            tuple: Token IDs including the EOS token, untruncated
+        """
+        key = content_hash(text)
+        ids = self.token_cache.get(key)
+        if ids is None:
+            with stage("tokenize"):
+                ids = tuple(self.tokenizer(text)["input_ids"])
+            self.token_cache.put(key, ids)
+        return ids
+    
+    def encode_batch(self, texts):
+        """
+        Tokenize many texts, encoding cache misses in one batched call
+        
+        The batched call runs in the Rust tokenizer, which spreads the work
+        across cores (unless TOKENIZERS_PARALLELISM=false).
+        
+        Args:
+            texts: Texts to tokenize
+        
+        Returns:
+            list: Token ID tuples per text, in input order
+        """
+        keys = [content_hash(text) for text in texts]
+        encoded = [self.token_cache.get(key) for key in keys]
+        misses = [i for i, ids in enumerate(encoded) if ids is None]
+        if misses:
+            with stage("tokenize"):
+                fresh = self.tokenizer([texts[i] for i in misses])["input_ids"]
+            for i, ids in zip(misses, fresh):
+                encoded[i] = tuple(ids)
+                self.token_cache.put(keys[i], encoded[i])
+        return encoded
+    
+    def truncate_ids(self, ids, max_length):
+        """
+        Truncate token IDs to max_length, keeping the trailing EOS token
+        
+        Returns:
+            list: Truncated token IDs
+        """
+        if len(ids) <= max_length:
+            return list(ids)
+        return list(ids[:max_length - 1]) + [self.tokenizer.eos_token_id]
+    
+    def pad_inputs(self, id_lists):
+        """
+        Right-pad token ID lists into model inputs on the model device
+        
+        Returns:
+            dict: input_ids and attention_mask tensors
+        """
+        max_len = max(len(ids) for ids in id_lists)
+        input_ids = torch.full((len(id_lists), max_len), self.tokenizer.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(id_lists), max_len), dtype=torch.long)
+        for row, ids in enumerate(id_lists):
+            input_ids[row, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+            attention_mask[row, :len(ids)] = 1
+        return {
+            "input_ids": input_ids.to(self.device),
+            "attention_mask": attention_mask.to(self.device),
+        }
+    
+    def warmup(self, input_lengths=None, new_tokens=None):
+        """
+        Run generate() once at typical input shapes
+        
+        The first calls pay one-time costs (allocator growth, kernel and
+        graph setup); warming up moves them off the first requests. One call
+        runs per input length and distinct beam count of the configured
+        generation profiles. The decode cost model is reset afterwards so
+        those first-call timings do not skew deadline planning.
+        
+        Args:
+            input_lengths: Input token lengths (default WARMUP_INPUT_LENGTHS)
+            new_tokens: Tokens generated per call (default WARMUP_NEW_TOKENS)
+        
+        Returns:
+            dict: "<input length>x<beams>" -> milliseconds
+        """
+        input_lengths = input_lengths or self._setting('WARMUP_INPUT_LENGTHS', (64, 512))
+        new_tokens = new_tokens or self._setting('WARMUP_NEW_TOKENS', 8)
+        beam_counts = sorted({self.generation_profile(name)[1]["num_beams"]
+                              for name in self._setting('GENERATION_PROFILES', {})} or {1})
+
+        filler = list(self.encode(SUMMARY_PREFIX + "warmup")[:-1])
+        timings = {}
+        for length in input_lengths:
+            length = min(length, self._setting('MAX_INPUT_LENGTH', 512))
+            ids = (filler * (length // len(filler) + 1))[:length - 1] + [self.tokenizer.eos_token_id]
+            inputs = self.pad_inputs([ids])
+            for beams in beam_counts:
+                started = time.perf_counter()
+                self.generate(inputs, **self._generation_kwargs(new_tokens, new_tokens + 1, beams))
+                timings[f"{length}x{beams}"] = round((time.perf_counter() - started) * 1000.0, 1)
+
+        self.cost_model = DecodeCostModel()
+        logger.info(f"Warmup finished: {timings}")
+        return timings
+    
+    def _prefix_length(self):
+        """Token count of the summarization prefix"""
+        if self._prefix_len is None:
+            self._prefix_len = self._count_tokens(SUMMARY_PREFIX)
+        return self._prefix_len
+    
+    def run_encoder(self, inputs):
+        """
+        Run only the encoder without gradients
+        
+        Args:
+            inputs: input_ids / attention_mask on the model device
+        
+        Returns:
+            BaseModelOutput: Encoder outputs (last_hidden_state)
+        """
+        def encode():
+            with stage("encode"), torch.no_grad():
+                return self.model.get_encoder()(**inputs)
+
+        return self.executor.run(encode)
+    
+    def generate(self, inputs, deadline=None, **generate_kwargs):
+        """
+        Run model.generate without gradients
+        
+        Every model call in the package goes through here and runs on an
+        inference executor slot (see reset_executor). Calls are timed
+        for the decode cost model; with a deadline, beams and token budget
+        are fitted to the time left and decoding stops when it runs out
+        (deadline.truncated is set when that cut the output short).
+        With prompt_lookup=True, single-sequence greedy calls on the
+        PyTorch backend use prompt-lookup drafting (same output, fewer
+        decoder passes); other calls ignore it.
+        
+        Args:
+            inputs: Model inputs on the model device (input_ids / attention_mask,
+                    or precomputed encoder_outputs / attention_mask)
+            deadline: Optional Deadline shared by the request
+            **generate_kwargs: Arguments forwarded to model.generate
+        
+        Returns:
+            torch.Tensor: Generated token IDs
+        """
+        return self.executor.run(self._generate, inputs, deadline, generate_kwargs)
+    
+    def _generate(self, inputs, deadline, generate_kwargs):
+        """Run generate() on the current (slot) thread"""
+        prompt_lookup = generate_kwargs.pop("prompt_lookup", False)
+        budget_cut = False
+        if deadline is not None:
+            generate_kwargs, budget_cut = self._fit_deadline(inputs, generate_kwargs, deadline)
+
+        self._watch_encoder()
+        self._encoder_clock.seconds = 0.0
+        started = time.perf_counter()
+        with torch.no_grad():
+            if prompt_lookup and self._can_prompt_lookup(inputs, generate_kwargs):
+                output = self.prompt_lookup_decoder().generate(**inputs, **generate_kwargs)
+            else:
+                output = self.model.generate(**inputs, **generate_kwargs)
+        elapsed = time.perf_counter() - started
+
+        new_tokens = output.shape[1] - 1
+        rows = self._batch_size(inputs) * generate_kwargs.get("num_beams", 1)
+        self.cost_model.observe(rows, new_tokens, elapsed)
+        self._record_generate(inputs, output, elapsed)
+
+        if deadline is not None and (
+                elapsed >= generate_kwargs["max_time"]
+                or (budget_cut and new_tokens >= self._token_budget(generate_kwargs))):
+            deadline.truncated = True
+        return output
+    
+    def _watch_encoder(self):
+        """Time encoder forward passes per thread with hooks on the loaded encoder"""
+        if not isinstance(self.model, torch.nn.Module) or self._timed_encoder is self.model.get_encoder():
+            return
+        encoder = self.model.get_encoder()
+        clock = self._encoder_clock
+
+        def before(module, args):
+            clock.started = time.perf_counter()
+
+        def after(module, args, output):
+            clock.seconds = getattr(clock, "seconds", 0.0) + time.perf_counter() - clock.started
+
+        encoder.register_forward_pre_hook(before)
+        encoder.register_forward_hook(after)
+        self._timed_encoder = encoder
+    
+    def _record_generate(self, inputs, output, elapsed):
+        """
+        Export stage timings and token counts of one generate call
+        
+        The encoder share comes from the encoder hooks (zero when encoder
+        states were precomputed); the rest of the call is decoding.
+        """
+        encoder_seconds = min(getattr(self._encoder_clock, "seconds", 0.0), elapsed)
+        decode_seconds = elapsed - encoder_seconds
+        if encoder_seconds:
+            STAGE_SECONDS.labels("encode").observe(encoder_seconds)
+        STAGE_SECONDS.labels("decode").observe(decode_seconds)
+
+        if "input_ids" in inputs:
+            input_tokens = int(inputs["attention_mask"].sum())
+            INPUT_TOKENS.inc(input_tokens)
+            GENERATE_INPUT_TOKENS.observe(input_tokens)
+        output_tokens = int((output[:, 1:] != self.tokenizer.pad_token_id).sum())
+        OUTPUT_TOKENS.inc(output_tokens)
+        if decode_seconds > 0:
+            TOKENS_PER_SECOND.observe(output_tokens / decode_seconds)
+    
+    def model_memory_bytes(self):
+        """
+        Memory held by the model's parameters and buffers
+        
+        Returns:
+            int: Bytes (None for non-PyTorch backends)
+        """
+        if not isinstance(self.model, torch.nn.Module):
+            return None
+        tensors = list(self.model.parameters()) + list(self.model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    
+    def _can_prompt_lookup(self, inputs, generate_kwargs):
+        """Whether a generate call can use prompt-lookup decoding"""
+        return (isinstance(self.model, torch.nn.Module)
+                and "input_ids" in inputs
+                and self._batch_size(inputs) == 1
+                and generate_kwargs.get("num_beams", 1) == 1
+                and not generate_kwargs.get("do_sample"))
+    
+    def prompt_lookup_decoder(self):
+        """
+        Get the prompt-lookup decoder for the loaded model (created on first use)
+        
+        Returns:
+            PromptLookupDecoder: Decoder with acceptance statistics
+        """
+        if self._prompt_lookup is None or self._prompt_lookup.model is not self.model:
+            self._prompt_lookup = PromptLookupDecoder(
+                self.model,
+                num_draft_tokens=self._setting('PROMPT_LOOKUP_DRAFT_TOKENS', 10),
+                max_ngram=self._setting('PROMPT_LOOKUP_MAX_NGRAM', 3),
+            )
+        return self._prompt_lookup
+    
+    def prompt_lookup_stats(self):
+        """
+        Get prompt-lookup acceptance statistics
+        
+        Returns:
+            dict or None: PromptLookupDecoder.stats(), None before first use
+        """
+        return self._prompt_lookup.stats() if self._prompt_lookup else None
+    
+    def _fit_deadline(self, inputs, generate_kwargs, deadline):
+        """
+        Fit generate() settings to the time left before a deadline
+        
+        Returns:
+            tuple: (settings with the planned beams / token budget and
+                    max_time, whether the token budget was reduced)
+        """
+        remaining = deadline.remaining()
+        requested = self._token_budget(generate_kwargs)
+        num_beams, tokens = self.cost_model.plan(
+            remaining, self._batch_size(inputs), generate_kwargs.get("num_beams", 1), requested
+        )
+
+        kwargs = dict(generate_kwargs, num_beams=num_beams, max_time=max(remaining, 0.001))
+        if num_beams == 1:
+            kwargs = self._greedy_settings(kwargs)
+        if "max_new_tokens" in kwargs:
+            kwargs["max_new_tokens"] = tokens
+        else:
+            kwargs["max_length"] = tokens + 1
+        if "min_length" in kwargs:
+            kwargs["min_length"] = min(kwargs["min_length"], tokens)
+        return kwargs, tokens < requested
+    
+    @staticmethod
+    def _token_budget(generate_kwargs):
+        """New-token budget of generate() settings (max_length counts the start token)"""
+        if generate_kwargs.get("max_new_tokens"):
+            return generate_kwargs["max_new_tokens"]
+        return generate_kwargs.get("max_length", 20) - 1
+    
+    @staticmethod
+    def _batch_size(inputs):
+        """Number of sequences in model inputs"""
+        return inputs["attention_mask"].shape[0]
+    
+    def generate_stream(self, inputs, started=None, deadline=None, **generate_kwargs):
+        """
+        Run generate on an inference slot and yield text as it is decoded
+        
+        Only greedy and sampling decoding can stream (num_beams=1). The
+        delay from `started` to the first non-empty piece is recorded in
+        the ttft_ms histogram.
+        
+        Args:
+            inputs: Model inputs for a single sequence (see generate)
+            started: time.perf_counter() value when the request arrived (default: now)
+            deadline: Optional Deadline (see generate)
+            **generate_kwargs: Arguments forwarded to model.generate
+        
+        Yields:
+            str: Decoded text pieces (whole words where possible)
+        """
+        started = started or time.perf_counter()
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        errors = []
+
+        def run():
+            try:
+                self._generate(inputs, deadline, dict(generate_kwargs, streamer=streamer))
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        future = self.executor.submit(run)
+
+        first = True
+        for piece in streamer:
+            if not piece:
+                continue
+            if first:
+                self.ttft_ms.observe((time.perf_counter() - started) * 1000.0)
+                first = False
+            yield piece
+
+        future.result()
+        if errors:
+            raise errors[0]
+    
+    @classmethod
+    def streaming_kwargs(cls, generate_kwargs, do_sample=False, temperature=1.0, top_k=50, top_p=1.0):
+        """
+        Adapt generation settings for streaming (greedy or sampling)
+        
+        Args:
+            generate_kwargs: Beam search settings to start from
+            do_sample: Sample instead of greedy decoding
+            temperature: Sampling temperature
+            top_k: Keep only the k most likely tokens when sampling
+            top_p: Nucleus sampling probability mass
+        
+        Returns:
+            dict: Settings with num_beams=1 and beam-only options removed
+        """
+        kwargs = cls._greedy_settings(generate_kwargs)
+        if do_sample:
+            kwargs.update(do_sample=True, temperature=temperature, top_k=top_k, top_p=top_p)
+        return kwargs
+    
+    def summarize_stream(self, text, do_sample=False, temperature=1.0, top_k=50, top_p=1.0,
+                         profile=None, deadline_ms=None):
+        """
+        Summarize text, yielding the summary while it is decoded
+        
+        Documents beyond one model window are summarized with
+        summarize_long() and sent as a single piece.
+        
+        Args:
+            text: Input text to summarize
+            do_sample, temperature, top_k, top_p: See streaming_kwargs()
+            profile: Generation profile for the non-beam settings
+            deadline_ms: Optional latency deadline (see summarize())
+        
+        Yields:
+            dict: {"event": "token", "text": ...} pieces, then
+                  {"event": "done", **summarize() result} or {"event": "error", "error": ...}
+        """
+        started = time.perf_counter()
+        if not text or not text.strip():
+            yield {"event": "error", "error": "Empty input text"}
+            return
+
+        try:
+            profile, _ = self.generation_profile(profile)
+            deadline = Deadline(deadline_ms) if deadline_ms else None
+            ids = self.encode(SUMMARY_PREFIX + text)
+            input_len = len(ids) - self._prefix_length()
+
+            strategy = self._setting('LONG_DOCUMENT_STRATEGY')
+            if input_len > self._setting('MAX_INPUT_LENGTH', 512) and strategy == "map_reduce":
+                result = self.summarize_long(text, num_beams=1, profile=profile, deadline=deadline)
+                if result.get("error"):
+                    yield {"event": "error", "error": result["error"]}
+                    return
+                self.ttft_ms.observe((time.perf_counter() - started) * 1000.0)
+                yield {"event": "token", "text": result["summary"]}
+                yield {"event": "done", **result}
+                return
+            if input_len > self._setting('MAX_INPUT_LENGTH', 512) and strategy == "extractive":
+                ids, input_len = self._extractive_ids(text)
+
+            out_len, min_len = self._output_lengths(input_len)
+            inputs = self.pad_inputs([self.truncate_ids(ids, 512)])
+            kwargs = self.streaming_kwargs(self._generation_kwargs(out_len, min_len, profile=profile),
+                                           do_sample, temperature, top_k, top_p)
+
+            pieces = []
+            for piece in self.generate_stream(inputs, started, deadline, **kwargs):
+                pieces.append(piece)
+                yield {"event": "token", "text": piece}
+
+            summary = "".join(pieces).strip()
+            yield {"event": "done", **self._build_result(text, summary, profile, deadline)}
+
+        except Exception as e:
+            logger.error(f"Error during streamed summarization: {e}")
+            yield {"event": "error", "error": str(e)}
+    
+    def fits_window(self, text, context=None):
+        """
+        Check whether an input is summarized in one generate call
+        
+        Longer inputs go through map-reduce, many generate calls in a row.
+        The text is tokenized through the token cache, so summarizing it
+        afterwards reuses the IDs.
+        
+        Args:
+            text: Input text
+            context: Optional context (see summarize_with_context)
+        
+        Returns:
+            bool: True when the input fits in one MAX_INPUT_LENGTH window
+        """
+        ids = self.encode(SUMMARY_PREFIX + self._combine_context(text, context))
+        return len(ids) - self._prefix_length() <= self._setting('MAX_INPUT_LENGTH', 512)
+    
+    def summarize_batch(self, texts, contexts=None, max_batch_tokens=None, max_batch_size=None,
+                        num_beams=None, use_cache=True, profile=None):
+        """
+        Summarize many documents with batched generate calls
+        
+        Texts are tokenized once, sorted by token length and packed into
+        buckets that share an output-length tier, so each padded batch
+        wastes little compute on padding. Inputs longer than one window are
+        handed to summarize() (map-reduce) individually.
+        
+        Args:
+            texts: List of input texts
+            contexts: Optional list of contexts (one per text, may be None);
+                      when given each result also carries its "context"
+            max_batch_tokens: Max padded input tokens per generate call
+            max_batch_size: Max sequences per generate call
+            num_beams: Beam count (defaults to the profile's)
+            use_cache: Serve repeated inputs from the result cache
+            profile: Generation profile name
+        
+        Returns:
+            list: One summarize()-style dict per input, in input order
+        """
+        try:
+            profile, _ = self.generation_profile(profile)
+        except ValueError as e:
+            return [{"summary": "", "error": str(e)} for _ in texts]
+
+        max_batch_tokens = max_batch_tokens or self._setting('SUMMARIZE_BATCH_MAX_TOKENS', 8192)
+        max_batch_size = max_batch_size or self._setting('SUMMARIZE_BATCH_MAX_SIZE', 16)
+        window = self._setting('MAX_INPUT_LENGTH', 512)
+
+        if use_cache and self.result_cache:
+            context_list = contexts if contexts is not None else [None] * len(texts)
+            keys = [self._result_key(t, c, None, None, num_beams, profile) if t and t.strip() else None
+                    for t, c in zip(texts, context_list)]
+            results = [self._cache_get(key) for key in keys]
+            missing = [i for i, result in enumerate(results) if result is None]
+            if missing:
+                fresh = self.summarize_batch(
+                    [texts[i] for i in missing],
+                    contexts=[contexts[i] for i in missing] if contexts is not None else None,
+                    max_batch_tokens=max_batch_tokens,
+                    max_batch_size=max_batch_size,
+                    num_beams=num_beams,
+                    use_cache=False,
+                    profile=profile,
                 )
+                for i, result in zip(missing, fresh):
+                    self._cache_put(keys[i], result)
+                    results[i] = result
+            return results
 
-            # ----------------------------------------
-            # 4. Decode Output
-            # ----------------------------------------
-            summary = self.tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+        if contexts is not None:
+            results = self.summarize_batch(
+                [self._combine_context(t, c) for t, c in zip(texts, contexts)],
+                max_batch_tokens=max_batch_tokens,
+                max_batch_size=max_batch_size,
+                num_beams=num_beams,
+                use_cache=False,
+                profile=profile,
+            )
+            return [{"context": c, **r} for c, r in zip(contexts, results)]
+
+        results = [None] * len(texts)
+        pending = []
+        for i, text in enumerate(texts):
+            if not text or not text.strip():
+                results[i] = {"summary": "", "error": "Empty input text"}
+            else:
+                pending.append(i)
+
+        if not pending:
+            return results
+
+        try:
+            encoded = self.encode_batch([SUMMARY_PREFIX + texts[i] for i in pending])
+        except Exception as e:
+            logger.error(f"Error tokenizing batch: {e}")
+            for i in pending:
+                results[i] = {"summary": "", "error": str(e)}
+            return results
+
+        # The output ladder is keyed on the unprefixed length, as in summarize()
+        prefix_len = self._prefix_length()
+        items = []
+        for i, ids in zip(pending, encoded):
+            if len(ids) - prefix_len > window:
+                results[i] = self.summarize(texts[i], num_beams=num_beams, use_cache=False,
+                                            profile=profile)
+            else:
+                items.append((i, ids))
+
+        for batch in self._bucket_by_length(items, max_batch_tokens, max_batch_size, prefix_len):
+            try:
+                input_len = max(len(ids) for _, ids in batch) - prefix_len
+                out_len, min_len = self._output_lengths(input_len)
+                summaries = self._generate_from_ids(
+                    [self.truncate_ids(ids, 512) for _, ids in batch], out_len, min_len, num_beams,
+                    profile
+                )
+                for (i, _), summary in zip(batch, summaries):
+                    results[i] = self._build_result(texts[i], summary, profile)
+            except Exception as e:
+                logger.error(f"Error during batch summarization: {e}")
+                for i, _ in batch:
+                    results[i] = {"summary": "", "error": str(e)}
 
-            return {
-                "summary": summary,
-                "original_length": len(text.split()),
-                "summary_length": len(summary.split()),
-                "compression_ratio": round(len(summary.split()) / (len(text.split()) + 1e-6), 2)
+        return results
+    
+    def _bucket_by_length(self, items, max_batch_tokens, max_batch_size, prefix_len=0):
+        """
+        Group (index, token_ids) pairs into padding-friendly batches
+        
+        Items are sorted by length; a batch is closed when the padded size
+        (rows x longest row) would exceed max_batch_tokens, when it reaches
+        max_batch_size, or when the output-length tier changes.
+        """
+        batches = []
+        current, tier = [], None
+        for item in sorted(items, key=lambda item: len(item[1])):
+            length = len(item[1])
+            item_tier = self._output_lengths(length - prefix_len)
+            if current and (
+                    item_tier != tier
+                    or len(current) >= max_batch_size
+                    or (len(current) + 1) * length > max_batch_tokens):
+                batches.append(current)
+                current = []
+            current.append(item)
+            tier = item_tier
+        if current:
+            batches.append(current)
+        return batches
+    
+    def summarize_long(self, text, chunk_tokens=None, overlap_tokens=None, fan_in=None,
+                       batch_size=None, num_workers=None, num_beams=None, max_length=None,
+                       min_length=None, profile=None, deadline=None, progress=None):
+        """
+        Summarize a document longer than one model window (map-reduce)
+        
+        The text is split on paragraph/sentence boundaries into token-budgeted
+        chunks, the chunks are summarized in padded batches (map), and the
+        partial summaries are merged and re-summarized until they fit a
+        single window (reduce).
+        
+        Args:
+            text: Input text of any length
+            chunk_tokens: Token budget per chunk
+            overlap_tokens: Tokens of trailing context carried into the next chunk
+            fan_in: Max partial summaries merged per reduce step
+            batch_size: Chunks per padded generate call
+            num_workers: Map/reduce batches run at once (default
+                         LONG_DOCUMENT_WORKERS, else one per inference
+                         slot; capped at the slot count)
+            num_beams: Beam count (defaults to the profile's)
+            max_length: Cap on the final summary tokens
+            min_length: Minimum final summary length
+            profile: Generation profile name
+            deadline: Optional Deadline shared by every generate call
+            progress: Optional callable receiving {"stage", "level", "done",
+                      "total", "chunks"} after every finished batch
+        
+        Returns:
+            dict: Same keys as summarize() plus a "long_document" report
+                  with chunk count, depth and per-level timings
+        """
+        if not text or not text.strip():
+            return {"summary": "", "error": "Empty input text"}
+
+        try:
+            profile, _ = self.generation_profile(profile)
+        except ValueError as e:
+            return {"summary": "", "error": str(e)}
+
+        chunk_tokens = chunk_tokens or self._setting('LONG_DOCUMENT_CHUNK_TOKENS', 480)
+        if overlap_tokens is None:
+            overlap_tokens = self._setting('LONG_DOCUMENT_CHUNK_OVERLAP', 32)
+        fan_in = max(2, fan_in or self._setting('LONG_DOCUMENT_FAN_IN', 4))
+        batch_size = batch_size or self._setting('LONG_DOCUMENT_BATCH_SIZE', 8)
+        # Every batch's generate call needs an inference slot, so more workers than
+        # slots would only queue; parallel batches come from INFERENCE_SLOTS
+        num_workers = min(num_workers or self._setting('LONG_DOCUMENT_WORKERS') or self.executor.slots,
+                          self.executor.slots)
+        partial_tokens = self._setting('LONG_DOCUMENT_PARTIAL_TOKENS', 150)
+        max_depth = self._setting('LONG_DOCUMENT_MAX_DEPTH', 6)
+
+        try:
+            started = time.perf_counter()
+            levels = []
+
+            def run_level(stage, inputs, max_new_tokens, min_new_tokens=None):
+                level_start = time.perf_counter()
+                on_batch = None
+                if progress:
+                    report = {"stage": stage, "level": len(levels), "done": 0,
+                              "total": len(inputs), "chunks": len(chunks)}
+                    progress(dict(report))
+                    lock = threading.Lock()
+
+                    def on_batch(count):
+                        with lock:
+                            report["done"] += count
+                            update = dict(report)
+                        progress(update)
+
+                outputs = self._summarize_chunks(
+                    inputs, batch_size, num_workers, num_beams, max_new_tokens, min_new_tokens,
+                    profile, deadline, on_batch
+                )
+                levels.append({
+                    "level": len(levels),
+                    "stage": stage,
+                    "inputs": len(inputs),
+                    "seconds": round(time.perf_counter() - level_start, 3),
+                })
+                return outputs
+
+            # Map: summarize every chunk
+            chunks = self.chunk_text(text, chunk_tokens, overlap_tokens)
+            partials = run_level("map", chunks, partial_tokens)
+
+            # Reduce: merge partial summaries until they fit one window
+            while (len(partials) > 1
+                   and self._count_tokens(" ".join(partials)) > chunk_tokens
+                   and len(levels) < max_depth):
+                groups = self._group_partials(partials, chunk_tokens, fan_in)
+                partials = run_level("reduce", groups, partial_tokens)
+
+            # Final pass over the merged partial summaries
+            if len(chunks) > 1:
+                summary = run_level("final", [" ".join(partials)], max_length, min_length)[0]
+            else:
+                summary = partials[0]
+
+            result = self._build_result(text, summary, profile, deadline)
+            result["long_document"] = {
+                "chunks": len(chunks),
+                "depth": len(levels),
+                "levels": levels,
+                "chunk_tokens": chunk_tokens,
+                "overlap_tokens": overlap_tokens,
+                "fan_in": fan_in,
+                "workers": num_workers,
+                "total_seconds": round(time.perf_counter() - started, 3),
             }
+            return result
 
         except Exception as e:
-            logger.error(f"Error during summarization: {e}")
+            logger.error(f"Error during long document summarization: {e}")
             return {"summary": "", "error": str(e)}
     
-    def summarize_with_context(self, text, context=None, max_length=None):
+    def chunk_text(self, text, chunk_tokens, overlap_tokens=0):
+        """
+        Split text into token-budgeted chunks on paragraph/sentence boundaries
+        
+        Args:
+            text: Input text
+            chunk_tokens: Max tokens per chunk
+            overlap_tokens: Trailing tokens of a chunk repeated at the start of the next
+        
+        Returns:
+            list: Chunk strings
+        """
+        units = []  # (sentence, token_count, ends_paragraph)
+        for paragraph in TextProcessor.split_paragraphs(text):
+            sentences = TextProcessor.split_sentences(paragraph)
+            lengths = self._count_tokens_batch(sentences)
+            for i, (sentence, length) in enumerate(zip(sentences, lengths)):
+                ends_paragraph = i == len(sentences) - 1
+                if length <= chunk_tokens:
+                    units.append((sentence, length, ends_paragraph))
+                    continue
+                # A single oversized sentence is hard-split on token windows
+                ids = self.tokenizer(sentence, add_special_tokens=False)["input_ids"]
+                for start in range(0, len(ids), chunk_tokens):
+                    piece = self.tokenizer.decode(ids[start:start + chunk_tokens])
+                    units.append((piece, len(ids[start:start + chunk_tokens]), False))
+                units[-1] = (units[-1][0], units[-1][1], ends_paragraph)
+
+        chunks = []
+        current, current_len = [], 0
+        for sentence, length, ends_paragraph in units:
+            if current and current_len + length > chunk_tokens:
+                chunks.append(" ".join(s for s, _ in current))
+                # Carry trailing sentences forward as overlap
+                carried, carried_len = [], 0
+                for s, n in reversed(current):
+                    if carried_len + n > overlap_tokens or carried_len + n + length > chunk_tokens:
+                        break
+                    carried.insert(0, (s, n))
+                    carried_len += n
+                current, current_len = carried, carried_len
+            current.append((sentence, length))
+            current_len += length
+            # Prefer closing chunks at paragraph ends once they are mostly full
+            if ends_paragraph and current_len >= 0.75 * chunk_tokens:
+                chunks.append(" ".join(s for s, _ in current))
+                current, current_len = [], 0
+
+        if current:
+            chunks.append(" ".join(s for s, _ in current))
+        return chunks
+    
+    def _count_tokens(self, text):
+        """Count tokens in text without special tokens"""
+        return len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+    
+    def _count_tokens_batch(self, texts):
+        """Count tokens for a list of texts in one tokenizer call"""
+        if not texts:
+            return []
+        encoded = self.tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+    
+    def _group_partials(self, partials, chunk_tokens, fan_in):
+        """Pack consecutive partial summaries into groups that fit one window"""
+        groups = []
+        current, current_len = [], 0
+        for partial, length in zip(partials, self._count_tokens_batch(partials)):
+            if current and (len(current) >= fan_in or current_len + length > chunk_tokens):
+                groups.append(" ".join(current))
+                current, current_len = [], 0
+            current.append(partial)
+            current_len += length
+        if current:
+            groups.append(" ".join(current))
+        return groups
+    
+    def _summarize_chunks(self, texts, batch_size, num_workers=1, num_beams=None,
+                          max_new_tokens=None, min_length=None, profile=None, deadline=None,
+                          on_batch=None):
+        """
+        Summarize a list of window-sized texts in padded batches
+        
+        Batches are dispatched to a thread pool when num_workers > 1; torch
+        releases the GIL inside generate so batches run concurrently, one
+        per free inference slot.
+        on_batch, when given, is called with the size of every finished batch.
+        
+        Returns:
+            list: Summaries in input order
+        """
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+
+        def run(batch):
+            summaries = self._generate_summaries(batch, num_beams, max_new_tokens, min_length,
+                                                 profile, deadline)
+            if on_batch:
+                on_batch(len(batch))
+            return summaries
+
+        if num_workers > 1 and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=num_workers) as pool:
+                results = list(pool.map(run, batches))
+        else:
+            results = [run(batch) for batch in batches]
+
+        return [summary for batch in results for summary in batch]
+    
+    def _generate_summaries(self, texts, num_beams=None, max_new_tokens=None, min_length=None,
+                            profile=None, deadline=None):
+        """
+        Run one padded generate call over a batch of texts
+        
+        Args:
+            texts: Texts that fit a single window
+            num_beams: Beam count
+            max_new_tokens: Optional cap on the output length ladder
+            min_length: Optional minimum output length
+            profile: Generation profile name
+            deadline: Optional Deadline
+        
+        Returns:
+            list: Decoded summaries
+        """
+        encoded = [self.truncate_ids(ids, 512)
+                   for ids in self.encode_batch([SUMMARY_PREFIX + t for t in texts])]
+
+        input_len = max(len(ids) for ids in encoded)
+        out_len, min_len = self._output_lengths(input_len, max_new_tokens, min_length)
+
+        return self._generate_from_ids(encoded, out_len, min_len, num_beams, profile, deadline)
+    
+    def _generate_from_ids(self, id_lists, out_len, min_len, num_beams=None, profile=None,
+                           deadline=None):
+        """
+        Pad pre-tokenized inputs to the batch maximum and run one generate call
+        
+        Returns:
+            list: Decoded outputs in input order
+        """
+        inputs = self.pad_inputs(id_lists)
+
+        summary_ids = self.generate(
+            inputs,
+            deadline=deadline,
+            **self._generation_kwargs(out_len, min_len, num_beams, profile)
+        )
+
+        with stage("detokenize"):
+            return self.tokenizer.batch_decode(summary_ids, skip_special_tokens=True)
+    
+    @staticmethod
+    def _build_result(text, summary, profile=None, deadline=None):
+        """Build the standard summarize() result dict"""
+        return {
+            "summary": summary,
+            "original_length": len(text.split()),
+            "summary_length": len(summary.split()),
+            "compression_ratio": round(len(summary.split()) / (len(text.split()) + 1e-6), 2),
+            "profile": profile,
+            "truncated": bool(deadline and deadline.truncated),
+        }
+    
+    def model_fingerprint(self):
+        """
+        Identify the loaded weights for cache keys
+        
+        Combines the model config with a sample of the first and last
+        parameter tensors, so a different checkpoint gets different keys
+        without hashing the full ~900 MB of weights.
+        
+        Returns:
+            str: Hex digest
+        """
+        if self._fingerprint is None and isinstance(self.model, OnnxSeq2SeqModel):
+            self._fingerprint = self.model.fingerprint()
+        if self._fingerprint is None:
+            digest = hashlib.sha256()
+            digest.update(self.model.config.to_json_string().encode('utf-8'))
+            parameters = list(self.model.parameters())
+            for tensor in (parameters[:1] + parameters[-1:]):
+                sample = tensor.detach().flatten()[:256].to("cpu", torch.float32)
+                digest.update(sample.numpy().tobytes())
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+    
+    def _result_key(self, text, context, max_length, min_length, num_beams, profile=None):
+        """Result cache key for a request (None when the cache is disabled)"""
+        if not self.result_cache:
+            return None
+        params = {
+            "max_length": max_length,
+            "min_length": min_length,
+            "num_beams": num_beams,
+            "profile": profile,
+            "long_document_strategy": self._setting('LONG_DOCUMENT_STRATEGY'),
+            "quantization": self._setting('QUANTIZATION'),
+            "backend": "onnx" if isinstance(self.model, OnnxSeq2SeqModel) else "torch",
+        }
+        return make_cache_key("summary", text, context, params, self.model_fingerprint())
+    
+    def _cache_get(self, key):
+        """Look up a cached result"""
+        if key is None:
+            return None
+        return self.result_cache.get(key)
+    
+    def _cache_put(self, key, result):
+        """Store a successful result"""
+        if key is not None and not result.get("error"):
+            self.result_cache.put(key, result)
+    
+    @staticmethod
+    def _combine_context(text, context):
+        """Prepend context to text for contextual summarization"""
+        if context:
+            return f"Context: {context}\n\nDocument: {text}"
+        return text
+    
+    def summarize_with_context(self, text, context=None, max_length=None, use_cache=True,
+                               profile=None, deadline_ms=None, progress=None):
         """
         Summarize text with optional context binding
         
@@ -135,6 +1287,10 @@ class DocumentSummarizer:
             text: Main text to summarize
             context: Additional context to consider
             max_length: Maximum summary length
+            use_cache: Serve repeated requests from the result cache
+            profile: Generation profile name
+            deadline_ms: Optional latency deadline (see summarize())
+            progress: Optional progress callable (see summarize())
         
         Returns:
             dict: Contains summary and context information
@@ -142,15 +1298,23 @@ class DocumentSummarizer:
         result = {"context": context}
         
         try:
-            if context:
-                # Prepend context to text for contextual summarization
-                combined_text = f"Context: {context}\n\nDocument: {text}"
-            else:
-                combined_text = text
+            profile, _ = self.generation_profile(profile)
+            key = None
+            if use_cache and text and text.strip():
+                key = self._result_key(text, context, max_length, None, None, profile)
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+            
+            combined_text = self._combine_context(text, context)
             
-            summary_result = self.summarize(combined_text, max_length=max_length)
+            summary_result = self.summarize(combined_text, max_length=max_length, use_cache=False,
+                                            profile=profile, deadline_ms=deadline_ms,
+                                            progress=progress)
             result.update(summary_result)
             
+            if not result.get("truncated"):
+                self._cache_put(key, result)
             return result
         
         except Exception as e:
@@ -160,23 +1324,63 @@ class DocumentSummarizer:
     
     def extract_key_sentences(self, text, num_sentences=3):
         """
-        Extract key sentences from text using summarization
+        Extract key sentences from text by centrality ranking (no model call)
         
         Args:
             text: Input text
             num_sentences: Number of key sentences to extract
         
         Returns:
-            list: Key sentences
+            list: Key sentences in document order
         """
         try:
-            # Use extractive approach: get summary and split into sentences
-            result = self.summarize(text, max_length=150)
-            summary = result.get("summary", "")
-            
-            sentences = [s.strip() for s in summary.split('.') if s.strip()]
-            return sentences[:num_sentences]
+            return SentenceRanker.key_sentences(text, num_sentences,
+                                                self._setting('EXTRACTIVE_DIVERSITY', 0.3))
         
         except Exception as e:
             logger.error(f"Error extracting key sentences: {e}")
             return []
+    
+    def extract_context(self, text, max_tokens):
+        """
+        Pre-compress text to its most central sentences
+        
+        Sentences are taken in ranking order (central and non-redundant
+        first) while they fit the token budget and are returned in document
+        order.
+        
+        Args:
+            text: Input text
+            max_tokens: Token budget for the selected sentences
+        
+        Returns:
+            str: Selected sentences
+        """
+        sentences = TextProcessor.split_sentences(text)
+        ranker = SentenceRanker(sentences)
+        pool_size = self._setting('EXTRACTIVE_POOL_SIZE', 256)
+        ranked = ranker.select(pool_size, self._setting('EXTRACTIVE_DIVERSITY', 0.3), pool_size)
+
+        chosen, used = [], 0
+        for start in range(0, len(ranked), 32):
+            batch = ranked[start:start + 32]
+            for index, length in zip(batch, self._count_tokens_batch([sentences[i] for i in batch])):
+                if used + length <= max_tokens:
+                    chosen.append(index)
+                    used += length
+            if max_tokens - used < 8:
+                break
+        return " ".join(sentences[i] for i in sorted(chosen))
+    
+    def _extractive_ids(self, text):
+        """
+        Token IDs of the window-sized extractive pre-compression of text
+        
+        Returns:
+            tuple: (ids, input length without prefix)
+        """
+        budget = self._setting('MAX_INPUT_LENGTH', 512) - self._prefix_length() - 1
+        with stage("extract"):
+            context = self.extract_context(text, budget)
+        ids = self.encode(SUMMARY_PREFIX + context)
+        return ids, len(ids) - self._prefix_length()
@@ -0,0 +1,195 @@
+"""
+Tokenizer loading and token caching
+Loads the precompiled fast tokenizer artifact and caches token IDs by content hash
+"""
+
+import os
+import sys
+import hashlib
+import argparse
+import threading
+import logging
+from collections import OrderedDict
+
+from transformers import AutoTokenizer
+
+logger = logging.getLogger(__name__)
+
+FAST_TOKENIZER_FILE = "tokenizer.json"
+SENTENCEPIECE_FILE = "spiece.model"
+
+
+def build_fast_tokenizer(model_dir, output_path=None):
+    """
+    Convert the SentencePiece tokenizer in model_dir to a fast tokenizer artifact
+    
+    Args:
+        model_dir: Directory containing spiece.model and tokenizer_config.json
+        output_path: Where to write tokenizer.json (default: model_dir/tokenizer.json)
+    
+    Returns:
+        str: Path of the written artifact
+    """
+    output_path = output_path or os.path.join(model_dir, FAST_TOKENIZER_FILE)
+    logger.info(f"Converting {os.path.join(model_dir, SENTENCEPIECE_FILE)} to a fast tokenizer...")
+    tokenizer = AutoTokenizer.from_pretrained(model_dir, use_fast=True)
+    tokenizer.backend_tokenizer.save(output_path)
+    logger.info(f"Fast tokenizer artifact written to {output_path}")
+    return output_path
+
+
+def load_tokenizer(path, build_artifact=False, **kwargs):
+    """
+    Load a tokenizer, preferring the precompiled fast tokenizer artifact
+    
+    The T5 tokenizer_config sets add_prefix_space, which makes transformers
+    rebuild the fast tokenizer from spiece.model on every load. When a
+    tokenizer.json artifact sits next to spiece.model it is loaded directly
+    instead. Loading never writes to the model directory by default (it
+    may be read-only or shared); build the artifact once with
+    `python -m app.tokenization <model_dir>` (setup.sh does).
+    
+    Args:
+        path: Local tokenizer directory or hub model name
+        build_artifact: Write tokenizer.json when it is missing
+        **kwargs: Extra from_pretrained arguments (e.g. local_files_only)
+    
+    Returns:
+        PreTrainedTokenizerBase: Loaded tokenizer
+    """
+    artifact = os.path.join(path, FAST_TOKENIZER_FILE)
+    has_spiece = os.path.exists(os.path.join(path, SENTENCEPIECE_FILE))
+
+    if not os.path.exists(artifact) and has_spiece:
+        if build_artifact:
+            try:
+                build_fast_tokenizer(path)
+            except Exception as e:
+                logger.warning(f"Could not build fast tokenizer artifact: {e}")
+        else:
+            logger.info(f"No {FAST_TOKENIZER_FILE} in {path}; converting {SENTENCEPIECE_FILE} "
+                        f"(build it once with: python -m app.tokenization {path})")
+
+    if os.path.exists(artifact):
+        try:
+            return AutoTokenizer.from_pretrained(path, add_prefix_space=None, **kwargs)
+        except Exception as e:
+            logger.warning(f"Could not load fast tokenizer artifact {artifact}: {e}")
+
+    return AutoTokenizer.from_pretrained(path, **kwargs)
+
+
+def content_hash(text):
+    """
+    Hash text content for cache keys
+    
+    Args:
+        text: Input text
+    
+    Returns:
+        str: Hex digest
+    """
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class TokenCache:
+    """Thread-safe LRU cache of token IDs keyed by content hash"""
+
+    def __init__(self, max_entries=256, max_tokens=2000000):
+        """
+        Initialize token cache
+        
+        Args:
+            max_entries: Maximum number of cached texts
+            max_tokens: Maximum total token IDs held across all entries
+        """
+        self.max_entries = max_entries
+        self.max_tokens = max_tokens
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._total_tokens = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Look up token IDs
+        
+        Args:
+            key: Content hash
+        
+        Returns:
+            tuple: Token IDs, or None on a miss
+        """
+        with self._lock:
+            ids = self._entries.get(key)
+            if ids is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return ids
+
+    def put(self, key, ids):
+        """
+        Store token IDs, evicting least recently used entries as needed
+        
+        Args:
+            key: Content hash
+            ids: Token IDs
+        """
+        if not self.max_entries or len(ids) > self.max_tokens:
+            return
+        ids = tuple(ids)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_tokens -= len(previous)
+            self._entries[key] = ids
+            self._total_tokens += len(ids)
+            while (len(self._entries) > self.max_entries
+                   or self._total_tokens > self.max_tokens):
+                _, evicted = self._entries.popitem(last=False)
+                self._total_tokens -= len(evicted)
+
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self._entries.clear()
+            self._total_tokens = 0
+
+    def stats(self):
+        """
+        Get cache statistics
+        
+        Returns:
+            dict: Entry/token counts and hit/miss counters
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "tokens": self._total_tokens,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def main():
+    """Build the fast tokenizer artifact from the command line"""
+    parser = argparse.ArgumentParser(description='Build the fast tokenizer artifact')
+    parser.add_argument('model_dir', nargs='?',
+                        default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model'),
+                        help='Directory containing spiece.model (default: model/)')
+    parser.add_argument('-o', '--output', type=str, help='Output path for tokenizer.json')
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.model_dir, SENTENCEPIECE_FILE)):
+        print(f"Error: {SENTENCEPIECE_FILE} not found in '{args.model_dir}'")
+        sys.exit(1)
+
+    print(build_fast_tokenizer(args.model_dir, args.output))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
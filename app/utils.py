@@ -5,11 +5,44 @@ Utility functions for text processing and data management
 import json
 import os
 import re
+import string
+import tempfile
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 import logging
+import numpy as np
+
+from app.metrics import stage
+
+try:
+    import fcntl
+except ImportError:  # Windows: history writes are only serialized within a process
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 
+STOPWORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
+    'i', 'you', 'he', 'she', 'it', 'we', 'they', 'that', 'this', 'what',
+    'which', 'who', 'when', 'where', 'why', 'how'
+})
+
+# Words that end in a period without ending the sentence
+ABBREVIATIONS = frozenset({
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'mt', 'gen', 'col', 'capt', 'lt', 'sgt',
+    'rev', 'hon', 'e.g', 'i.e', 'etc', 'vs', 'cf', 'al', 'approx', 'ca', 'fig', 'figs', 'eq',
+    'vol', 'ch', 'sec', 'pp', 'inc', 'ltd', 'co', 'corp', 'dept', 'est', 'jan', 'feb', 'mar',
+    'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec', 'u.s', 'u.k', 'a.m', 'p.m'
+})
+
+# Candidate sentence ends: terminal punctuation, closing quotes/brackets, whitespace
+SENTENCE_END = re.compile(r'([.!?]+["\'\)\]]*)\s+')
+
+# Punctuation -> space, for term extraction
+_PUNCTUATION = str.maketrans(string.punctuation, ' ' * len(string.punctuation))
+
 class TextProcessor:
     """Handle text preprocessing and cleaning"""
     
@@ -49,10 +82,25 @@ class TextProcessor:
         Returns:
             list: List of sentences
         """
-        # Simple sentence splitter using regex
-        sentences = re.split(r'(?<=[.!?])\s+', text)
+        # Split after terminal punctuation, then rejoin splits that follow an
+        # abbreviation or initial or that run on in lowercase
+        parts = SENTENCE_END.split(text)
+        bodies, ends = parts[0::2], parts[1::2]
+        pieces = [body + end for body, end in zip(bodies, ends)]
+        pieces.append(bodies[-1])
+        
+        is_abbreviation = TextProcessor._is_abbreviation
+        starts = [0] + [i + 1 for i, (body, end, following) in enumerate(zip(bodies, ends, bodies[1:]))
+                        if not (following[:1].islower() or (end == '.' and is_abbreviation(body)))]
+        sentences = [" ".join(pieces[a:b]) for a, b in zip(starts, starts[1:] + [len(pieces)])]
         return [s.strip() for s in sentences if s.strip()]
     
+    @staticmethod
+    def _is_abbreviation(text):
+        """Check whether text ends with an abbreviation or an initial (before its period)"""
+        word = text[text.rfind(' ') + 1:].lstrip('(["\'').lower()
+        return word in ABBREVIATIONS or (len(word) == 1 and word.isalpha())
+    
     @staticmethod
     def split_paragraphs(text):
         """
@@ -114,12 +162,7 @@ class ContextBinder:
         words = text.lower().split()
         
         # Remove common stopwords
-        stopwords = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 
-                    'of', 'with', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
-                    'i', 'you', 'he', 'she', 'it', 'we', 'they', 'that', 'this', 'what',
-                    'which', 'who', 'when', 'where', 'why', 'how'}
-        
-        words = [w for w in words if w.isalpha() and w not in stopwords and len(w) > 3]
+        words = [w for w in words if w.isalpha() and w not in STOPWORDS and len(w) > 3]
         
         # Simple frequency count
         word_freq = {}
@@ -157,6 +200,172 @@ class ContextBinder:
         }
 
 
+class SentenceRanker:
+    """
+    Extractive sentence ranking
+    
+    Builds a sparse (CSR) sentence x term TF-IDF matrix S with L2-normalized
+    rows and scores sentences by LexRank-style centrality over the cosine
+    similarity graph S @ S.T. The graph is never materialized: each power
+    iteration computes S @ (S.T @ x) with two sparse products, so the cost
+    is linear in the number of terms in the text. Top-k selection uses
+    maximal marginal relevance to skip sentences that repeat ones already
+    picked.
+    """
+    
+    def __init__(self, sentences, damping=0.85, max_iterations=50, tolerance=1e-4):
+        """
+        Build the term-sentence matrix
+        
+        Args:
+            sentences: List of sentences
+            damping: PageRank damping factor
+            max_iterations: Cap on power iterations
+            tolerance: L1 change at which the iteration stops
+        """
+        self.sentences = sentences
+        self.damping = damping
+        self.max_iterations = max_iterations
+        self.tolerance = tolerance
+        self._scores = None
+        self._build_matrix()
+    
+    def _build_matrix(self):
+        """Tokenize sentences and fill the CSR arrays (indptr, indices, data)"""
+        n = len(self.sentences)
+        sentences = self.sentences
+        if any('\x00' in s for s in sentences):
+            sentences = [s.replace('\x00', ' ') for s in sentences]
+        
+        # Tokenize everything in one pass with a separator token between sentences
+        words = " \x00 ".join(sentences).lower().translate(_PUNCTUATION).split()
+        vocab = {w: i for i, w in enumerate(dict.fromkeys(words))}
+        term_ids = np.fromiter(map(vocab.__getitem__, words), dtype=np.int64, count=len(words))
+        separator = vocab.get('\x00', -1)
+        rows = np.cumsum(term_ids == separator)
+        
+        stop = np.zeros(len(vocab) + 1, dtype=bool)
+        stop[[i for w, i in vocab.items() if w in STOPWORDS or len(w) < 2]] = True
+        keep = ~stop[term_ids]
+        vocab_size = max(len(vocab), 1)
+        # Sorted (row, term) keys give CSR order and term counts in one pass
+        keys, counts = np.unique(rows[keep] * vocab_size + term_ids[keep], return_counts=True)
+        rows, terms = keys // vocab_size, keys % vocab_size
+        
+        df = np.bincount(terms, minlength=len(vocab))
+        idf = np.log((1.0 + n) / (1.0 + df)) + 1.0
+        data = (1.0 + np.log(counts)) * idf[terms]
+        norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=n))
+        data /= norms[rows]
+        
+        self.num_terms = len(vocab)
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=n))))
+        self.indices = terms
+        self.data = data
+        self._rows = rows
+        self._nonempty = norms > 0
+    
+    def _similarity_product(self, x):
+        """Compute (S @ S.T - I) @ x, the similarity graph without self-loops"""
+        terms = np.bincount(self.indices, weights=self.data * x[self._rows], minlength=self.num_terms)
+        y = np.bincount(self._rows, weights=self.data * terms[self.indices], minlength=len(self.sentences))
+        return y - x * self._nonempty
+    
+    def scores(self):
+        """
+        Get centrality scores
+        
+        Returns:
+            np.ndarray: One score per sentence (sums to 1)
+        """
+        if self._scores is not None:
+            return self._scores
+        n = len(self.sentences)
+        if n == 0:
+            self._scores = np.zeros(0)
+            return self._scores
+        
+        degree = self._similarity_product(np.ones(n))
+        connected = degree > 1e-12
+        inverse_degree = np.where(connected, 1.0 / np.where(connected, degree, 1.0), 0.0)
+        
+        rank = np.full(n, 1.0 / n)
+        for _ in range(self.max_iterations):
+            # Rank of isolated sentences is spread uniformly (dangling nodes)
+            spread = self.damping * rank[~connected].sum() / n
+            updated = (1.0 - self.damping) / n + spread + self.damping * self._similarity_product(rank * inverse_degree)
+            delta = np.abs(updated - rank).sum()
+            rank = updated
+            if delta < self.tolerance:
+                break
+        self._scores = rank / rank.sum()
+        return self._scores
+    
+    def select(self, k, diversity=0.3, pool_size=None):
+        """
+        Pick central, non-redundant sentences
+        
+        Maximal marginal relevance over the highest-scoring candidates:
+        each step takes the sentence maximizing
+        (1 - diversity) * relevance - diversity * max similarity to the picks.
+        
+        Args:
+            k: Sentences to pick
+            diversity: Redundancy weight in [0, 1] (0 = plain top-k)
+            pool_size: Candidates considered (default max(4k, 64))
+        
+        Returns:
+            list: Sentence indices in selection order
+        """
+        scores = self.scores()
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        pool_size = min(len(scores), pool_size or max(4 * k, 64))
+        pool = np.argpartition(-scores, pool_size - 1)[:pool_size]
+        pool = pool[np.argsort(-scores[pool], kind='stable')]
+        if diversity <= 0:
+            return pool[:k].tolist()
+        
+        # Dense rows of the candidates over their own terms
+        starts, ends = self.indptr[pool], self.indptr[pool + 1]
+        spans = [np.arange(a, b) for a, b in zip(starts, ends)]
+        positions = np.concatenate(spans) if spans else np.zeros(0, dtype=np.int64)
+        local_terms, columns = np.unique(self.indices[positions], return_inverse=True)
+        dense = np.zeros((pool_size, len(local_terms)))
+        dense[np.repeat(np.arange(pool_size), ends - starts), columns] = self.data[positions]
+        similarity = dense @ dense.T
+        
+        relevance = scores[pool] / scores[pool[0]]
+        redundancy = np.zeros(pool_size)
+        available = np.ones(pool_size, dtype=bool)
+        picked = []
+        for _ in range(k):
+            mmr = np.where(available, (1.0 - diversity) * relevance - diversity * redundancy, -np.inf)
+            best = int(np.argmax(mmr))
+            picked.append(best)
+            available[best] = False
+            redundancy = np.maximum(redundancy, similarity[best])
+        return pool[picked].tolist()
+    
+    @classmethod
+    def key_sentences(cls, text, num_sentences=3, diversity=0.3):
+        """
+        Extract the most central sentences of a text
+        
+        Args:
+            text: Input text
+            num_sentences: Number of sentences
+            diversity: Redundancy weight (see select())
+        
+        Returns:
+            list: Sentences in document order
+        """
+        sentences = TextProcessor.split_sentences(text)
+        picked = cls(sentences).select(num_sentences, diversity)
+        return [sentences[i] for i in sorted(picked)]
+
+
 class HistoryManager:
     """Manage summarization history"""
     
@@ -168,9 +377,35 @@ class HistoryManager:
             history_file: Path to history JSON file
         """
         self.history_file = history_file
+        self._thread_lock = threading.Lock()
         os.makedirs(os.path.dirname(history_file), exist_ok=True)
         self._ensure_file_exists()
     
+    @contextmanager
+    def _locked(self):
+        """Serialize read-modify-write cycles across threads and worker processes"""
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.history_file + '.lock', 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _write(self, history):
+        """Atomically replace the history file"""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.history_file), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(history, f, indent=2)
+            os.replace(tmp_path, self.history_file)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    
     def _ensure_file_exists(self):
         """Ensure history file exists"""
         # If file does not exist, create and initialize with empty list
@@ -203,8 +438,6 @@ class HistoryManager:
             bool: Success status
         """
         try:
-            history = self.get_history()
-            
             entry = {
                 "timestamp": datetime.now().isoformat(),
                 "original_text": original_text[:500],  # Store first 500 chars
@@ -214,14 +447,15 @@ class HistoryManager:
                 "text_length": len(original_text.split())
             }
             
-            history.append(entry)
-            
-            # Keep only last 100 entries
-            if len(history) > 100:
-                history = history[-100:]
-            
-            with open(self.history_file, 'w') as f:
-                json.dump(history, f, indent=2)
+            with self._locked(), stage("history_write"):
+                history = self.get_history()
+                history.append(entry)
+                
+                # Keep only last 100 entries
+                if len(history) > 100:
+                    history = history[-100:]
+                
+                self._write(history)
             
             return True
         
@@ -240,7 +474,7 @@ class HistoryManager:
             list: History entries
         """
         try:
-            with open(self.history_file, 'r') as f:
+            with stage("history_read"), open(self.history_file, 'r') as f:
                 content = f.read()
                 if not content.strip():
                     # Empty file -> return empty history
@@ -269,8 +503,8 @@ class HistoryManager:
     def clear_history(self):
         """Clear all history"""
         try:
-            with open(self.history_file, 'w') as f:
-                json.dump([], f)
+            with self._locked():
+                self._write([])
             return True
         except Exception as e:
             logger.error(f"Error clearing history: {e}")
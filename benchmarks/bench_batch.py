@@ -0,0 +1,56 @@
+"""
+Benchmark: summarize_batch() throughput against batch size on CPU
+
+Usage:
+  python -m benchmarks.bench_batch --tiny
+  python -m benchmarks.bench_batch --docs 64 --batch-sizes 1,4,8,16
+"""
+
+import argparse
+import time
+
+from benchmarks.common import synthetic_corpus, load_summarizer
+
+
+def main():
+    """Run the batch size sweep and print docs/sec"""
+    parser = argparse.ArgumentParser(description='summarize_batch() throughput benchmark')
+    parser.add_argument('--docs', type=int, default=32, help='Number of documents')
+    parser.add_argument('--batch-sizes', type=str, default='1,2,4,8,16',
+                        help='Comma separated max batch sizes to try')
+    parser.add_argument('--max-batch-tokens', type=int, default=16384,
+                        help='Padded token budget per generate call')
+    parser.add_argument('--model-dir', type=str, help='Model directory (default: model/)')
+    parser.add_argument('--tiny', action='store_true', help='Use a tiny random T5')
+    args = parser.parse_args()
+
+    # Without the result cache the batched sweeps would replay the sequential pass
+    summarizer = load_summarizer(args.model_dir, tiny=args.tiny, config={"RESULT_CACHE_ENABLED": False})
+    texts = synthetic_corpus(args.docs)
+
+    # Warm up kernels so the first configuration is not penalised
+    summarizer.summarize_batch(texts[:2])
+
+    print(f"{'mode':<12}{'batch':>8}{'seconds':>12}{'docs/sec':>12}")
+
+    start = time.perf_counter()
+    for text in texts:
+        summarizer.summarize(text)
+    elapsed = time.perf_counter() - start
+    print(f"{'sequential':<12}{'-':>8}{elapsed:>12.2f}{len(texts) / elapsed:>12.2f}")
+
+    for batch_size in [int(b) for b in args.batch_sizes.split(',')]:
+        start = time.perf_counter()
+        results = summarizer.summarize_batch(
+            texts, max_batch_tokens=args.max_batch_tokens, max_batch_size=batch_size
+        )
+        elapsed = time.perf_counter() - start
+        errors = sum(1 for r in results if r.get('error'))
+        line = f"{'batched':<12}{batch_size:>8}{elapsed:>12.2f}{len(texts) / elapsed:>12.2f}"
+        if errors:
+            line += f"  ({errors} errors)"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark: per-question chatbot latency for summary, split-context and retrieval modes,
+how often split-context answers agree with the jointly encoded prompt, and checklist
+throughput of answer_questions() against sequential answer_question() calls
+
+Usage:
+  python -m benchmarks.bench_chatbot --tiny
+  python -m benchmarks.bench_chatbot --questions 20 --doc-words 400
+  python -m benchmarks.bench_chatbot --checklist 50 --batch-size 16
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.common import synthetic_document, load_summarizer
+
+QUESTIONS = [
+    "What is the payment term?",
+    "Who are the parties?",
+    "When is the deadline?",
+    "What is the notice period?",
+    "What does the liability clause say?",
+    "What was the annual revenue growth?",
+    "Which risks were reported?",
+    "What decision did the board make?",
+]
+
+
+def time_questions(chatbot, questions):
+    """Ask questions one at a time and return per-question latencies in ms"""
+    latencies = []
+    for question in questions:
+        start = time.perf_counter()
+        chatbot.answer_question(question)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return latencies
+
+
+def answer_agreement(answers, reference):
+    """
+    Share of questions answered exactly as in a reference mode
+
+    Args:
+        answers: Answers of the mode under test
+        reference: Answers of the reference mode to the same questions
+
+    Returns:
+        float: Fraction in [0, 1]
+    """
+    same = sum(1 for answer, expected in zip(answers, reference) if answer.strip() == expected.strip())
+    return same / len(reference) if reference else 1.0
+
+
+def compare_checklist(chatbot, questions, batch_size):
+    """
+    Answer a checklist sequentially and batched
+
+    Returns:
+        tuple: (sequential seconds, batched seconds)
+    """
+    start = time.perf_counter()
+    for question in questions:
+        chatbot.answer_question(question)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    chatbot.answer_questions(questions, batch_size=batch_size)
+    return sequential, time.perf_counter() - start
+
+
+def main():
+    """Compare per-question latency for the chatbot modes"""
+    from app.chatbot import DocumentChatbot
+
+    parser = argparse.ArgumentParser(description='Chatbot per-question latency benchmark')
+    parser.add_argument('--questions', type=int, default=16, help='Questions to ask per mode')
+    parser.add_argument('--doc-words', type=int, default=400, help='Document length in words')
+    parser.add_argument('--checklist', type=int, default=32, help='Checklist questions for the throughput run')
+    parser.add_argument('--batch-size', type=int, default=16, help='Questions per batched generate call')
+    parser.add_argument('--model-dir', type=str, help='Model directory (default: model/)')
+    parser.add_argument('--tiny', action='store_true', help='Use a tiny random T5')
+    args = parser.parse_args()
+
+    summarizer = load_summarizer(args.model_dir, tiny=args.tiny)
+    document = synthetic_document(args.doc_words, seed=7)
+    questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(args.questions)]
+
+    print(f"{'mode':<16}{'load ms':>10}{'mean ms':>10}{'p50 ms':>10}{'max ms':>10}")
+    modes = (("full encode", False, False), ("split context", True, False), ("retrieval", False, True))
+    answers = {}
+    for label, split_context, retrieval in modes:
+        chatbot = DocumentChatbot(summarizer, split_context=split_context, retrieval=retrieval)
+        start = time.perf_counter()
+        chatbot.load_document(document)
+        load_ms = (time.perf_counter() - start) * 1000.0
+
+        chatbot.answer_question(questions[0])  # warm up
+        latencies = time_questions(chatbot, questions)
+        print(f"{label:<16}{load_ms:>10.1f}{statistics.mean(latencies):>10.1f}"
+              f"{statistics.median(latencies):>10.1f}{max(latencies):>10.1f}")
+        answers[label] = [chatbot.answer_question(question)["answer"] for question in QUESTIONS]
+
+    # Split context encodes question and summary apart, so its answers are not guaranteed
+    # to match the joint "question: ... context: ..." prompt of the full encode mode
+    agreement = answer_agreement(answers["split context"], answers["full encode"])
+    print(f"\nSplit context answers equal to full encode: {agreement:.0%} of {len(QUESTIONS)} questions")
+
+    # Distinct questions, so no per-text cache makes the batched pass look faster
+    checklist = [f"{QUESTIONS[i % len(QUESTIONS)][:-1]} in section {i + 1}?" for i in range(args.checklist)]
+    chatbot = DocumentChatbot(summarizer)
+    chatbot.load_document(document)
+    sequential, batched = compare_checklist(chatbot, checklist, args.batch_size)
+    print(f"\nChecklist of {len(checklist)} questions (batch size {args.batch_size}):")
+    print(f"{'path':<16}{'total s':>10}{'q/s':>10}")
+    print(f"{'sequential':<16}{sequential:>10.2f}{len(checklist) / sequential:>10.2f}")
+    print(f"{'batched':<16}{batched:>10.2f}{len(checklist) / batched:>10.2f}")
+    print(f"Speedup: {sequential / batched:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: inference slots x torch threads sweep
+
+Sends concurrent summarize() calls from several client threads through the
+inference executor for every slot/thread combination and reports docs/sec,
+latency percentiles and queue wait.
+
+Usage:
+  python -m benchmarks.bench_executor --tiny
+  python -m benchmarks.bench_executor --slots 1 2 4 8 --threads 1 2 4 8 --clients 16
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import synthetic_corpus, load_summarizer
+from app.inference import available_cores
+
+
+def run_clients(summarizer, documents, clients):
+    """Summarize documents from concurrent client threads; returns (seconds, latencies ms)"""
+    def timed(document):
+        start = time.perf_counter()
+        summarizer.summarize(document, use_cache=False)
+        return (time.perf_counter() - start) * 1000.0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = list(pool.map(timed, documents))
+    return time.perf_counter() - start, latencies
+
+
+def main():
+    """Sweep slot and thread counts"""
+    parser = argparse.ArgumentParser(description='Inference executor sweep')
+    parser.add_argument('--slots', type=int, nargs='+', default=[1, 2, 4], help='Slot counts')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4], help='torch threads per slot')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent client threads')
+    parser.add_argument('--docs', type=int, default=24, help='Documents per combination')
+    parser.add_argument('--pin', action='store_true', help='Pin slots to disjoint cores')
+    parser.add_argument('--oversubscribe', action='store_true',
+                        help='Also run combinations with slots x threads > cores')
+    parser.add_argument('--model-dir', type=str, help='Model directory (default: model/)')
+    parser.add_argument('--tiny', action='store_true', help='Use a tiny random T5')
+    args = parser.parse_args()
+
+    summarizer = load_summarizer(args.model_dir, tiny=args.tiny, config={"RESULT_CACHE_ENABLED": False})
+    documents = synthetic_corpus(args.docs, seed=3)
+    cores = len(available_cores())
+    print(f"{cores} cores, {args.clients} clients, {len(documents)} documents\n")
+
+    print(f"{'slots':>6}{'threads':>9}{'docs/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'wait p50':>10}")
+    for slots in args.slots:
+        for threads in args.threads:
+            if slots * threads > cores and not args.oversubscribe:
+                continue
+            executor = summarizer.reset_executor(slots=slots, intra_op_threads=threads, pin_cores=args.pin)
+            run_clients(summarizer, documents[:slots], slots)  # warm up every slot
+            executor.queue_wait_ms.reset()
+
+            seconds, latencies = run_clients(summarizer, documents, args.clients)
+            latencies.sort()
+            p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+            print(f"{slots:>6}{threads:>9}{len(documents) / seconds:>9.2f}"
+                  f"{statistics.median(latencies):>10.0f}{p95:>10.0f}"
+                  f"{executor.queue_wait_ms.percentile(50):>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Benchmark: extractive sentence ranking
+
+Times sentence splitting, matrix construction, centrality scoring and MMR
+selection on synthetic documents of growing size. No model is loaded.
+
+Usage:
+  python -m benchmarks.bench_extractive
+  python -m benchmarks.bench_extractive --sentences 1000 10000 100000
+"""
+
+import argparse
+import time
+
+from benchmarks.common import synthetic_document
+from app.utils import TextProcessor, SentenceRanker
+
+
+def main():
+    """Time each ranking stage per document size"""
+    parser = argparse.ArgumentParser(description='Extractive ranking benchmark')
+    parser.add_argument('--sentences', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Approximate sentence counts to test')
+    parser.add_argument('--top', type=int, default=10, help='Sentences to select')
+    args = parser.parse_args()
+
+    print(f"{'sentences':>10}{'split s':>10}{'matrix s':>10}{'rank s':>10}{'select s':>10}{'total s':>10}")
+    for count in args.sentences:
+        text = synthetic_document(count * 16, seed=count)
+
+        start = time.perf_counter()
+        sentences = TextProcessor.split_sentences(text)
+        split = time.perf_counter()
+        ranker = SentenceRanker(sentences)
+        built = time.perf_counter()
+        ranker.scores()
+        ranked = time.perf_counter()
+        ranker.select(args.top)
+        selected = time.perf_counter()
+
+        print(f"{len(sentences):>10}{split - start:>10.3f}{built - split:>10.3f}"
+              f"{ranked - built:>10.3f}{selected - ranked:>10.3f}{selected - start:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
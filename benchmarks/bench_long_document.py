@@ -0,0 +1,63 @@
+"""
+Benchmark: map-reduce wall-clock time against inference slots
+
+Summarizes one long document with summarize_long() for every slot count.
+Map and reduce batches run one per inference slot, so this is the knob
+that parallelizes a long document; each slot gets cores / slots torch
+threads. Speedup is relative to the first slot count.
+
+Usage:
+  python -m benchmarks.bench_long_document --tiny
+  python -m benchmarks.bench_long_document --slots 1 2 4 --doc-words 4000 --batch-size 2
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.common import synthetic_document, load_summarizer
+from app.inference import available_cores
+
+
+def time_long_document(summarizer, document, batch_size, repeats):
+    """Summarize a document repeatedly; returns (median seconds, long_document report)"""
+    timings, report = [], None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = summarizer.summarize_long(document, batch_size=batch_size)
+        timings.append(time.perf_counter() - start)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        report = result["long_document"]
+    return statistics.median(timings), report
+
+
+def main():
+    """Sweep inference slot counts for one long document"""
+    parser = argparse.ArgumentParser(description='Map-reduce scaling benchmark')
+    parser.add_argument('--slots', type=int, nargs='+', default=[1, 2, 4], help='Inference slot counts')
+    parser.add_argument('--doc-words', type=int, default=3000, help='Document length in words')
+    parser.add_argument('--batch-size', type=int, default=2, help='Chunks per generate call')
+    parser.add_argument('--repeats', type=int, default=3, help='Runs per slot count (median reported)')
+    parser.add_argument('--model-dir', type=str, help='Model directory (default: model/)')
+    parser.add_argument('--tiny', action='store_true', help='Use a tiny random T5')
+    args = parser.parse_args()
+
+    summarizer = load_summarizer(args.model_dir, tiny=args.tiny)
+    document = synthetic_document(args.doc_words, seed=11)
+    print(f"{len(available_cores())} cores, {args.doc_words}-word document, "
+          f"batch size {args.batch_size}\n")
+
+    print(f"{'slots':>6}{'threads':>9}{'chunks':>8}{'depth':>7}{'seconds':>10}{'speedup':>9}")
+    baseline = None
+    for slots in args.slots:
+        executor = summarizer.reset_executor(slots=slots)
+        summarizer.summarize_long(document[:2000], batch_size=args.batch_size)  # warm up
+        seconds, report = time_long_document(summarizer, document, args.batch_size, args.repeats)
+        baseline = baseline or seconds
+        print(f"{slots:>6}{executor.intra_op_threads:>9}{report['chunks']:>8}{report['depth']:>7}"
+              f"{seconds:>10.2f}{baseline / seconds:>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: int8 dynamic quantization against the float32 baseline
+
+Each mode runs in its own subprocess so resident memory is measured in
+isolation. Reports load time, RSS after load and generated tokens/sec.
+
+Usage:
+  python -m benchmarks.bench_quantization --tiny
+  python -m benchmarks.bench_quantization --docs 8
+"""
+
+import sys
+import json
+import time
+import argparse
+import subprocess
+import tempfile
+
+from benchmarks.common import (PROJECT_ROOT, synthetic_corpus, load_summarizer,
+                               build_tiny_model, rss_bytes)
+
+MODES = ("fp32", "int8")
+
+
+def run_mode(mode, model_dir, docs, cache_dir):
+    """Load the model in one mode and measure it (runs inside the subprocess)"""
+    config = {
+        "QUANTIZATION": "int8" if mode == "int8" else None,
+        "QUANTIZED_MODEL_CACHE_DIR": cache_dir,
+        "RESULT_CACHE_ENABLED": False,
+    }
+    baseline_rss = rss_bytes()
+    start = time.perf_counter()
+    summarizer = load_summarizer(model_dir, config=config)
+    load_seconds = time.perf_counter() - start
+    loaded_rss = rss_bytes()
+
+    texts = synthetic_corpus(docs, seed=11)
+    summarizer.summarize(texts[0], use_cache=False)  # warm up
+
+    generated = 0
+    start = time.perf_counter()
+    for text in texts:
+        summary = summarizer.summarize(text, use_cache=False)["summary"]
+        generated += len(summarizer.tokenizer(summary)["input_ids"])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "load_seconds": round(load_seconds, 2),
+        "model_rss_mb": round((loaded_rss - baseline_rss) / 2 ** 20, 1),
+        "total_rss_mb": round(rss_bytes() / 2 ** 20, 1),
+        "tokens_per_sec": round(generated / elapsed, 2),
+        "seconds": round(elapsed, 2),
+    }
+
+
+def main():
+    """Run every mode in a subprocess and print a comparison table"""
+    parser = argparse.ArgumentParser(description='int8 quantization benchmark')
+    parser.add_argument('--docs', type=int, default=8, help='Documents to summarize per mode')
+    parser.add_argument('--model-dir', type=str, help='Model directory (default: model/)')
+    parser.add_argument('--tiny', action='store_true', help='Use a tiny random T5')
+    parser.add_argument('--cache-dir', type=str, help='Quantized model cache directory')
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.model_dir, args.docs, args.cache_dir)))
+        return
+
+    model_dir = build_tiny_model() if args.tiny else args.model_dir
+    cache_dir = args.cache_dir or tempfile.mkdtemp(prefix='quantized-')
+
+    # The int8 mode runs twice: the first run quantizes and fills the cache,
+    # the second shows the cached start
+    rows = []
+    for mode in ("fp32", "int8", "int8"):
+        command = [sys.executable, '-m', 'benchmarks.bench_quantization',
+                   '--mode', mode, '--docs', str(args.docs), '--cache-dir', cache_dir]
+        if model_dir:
+            command += ['--model-dir', model_dir]
+        output = subprocess.run(command, cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+        rows.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    print(f"{'mode':<14}{'load s':>9}{'model MB':>10}{'RSS MB':>9}{'tokens/s':>10}")
+    for label, row in zip(("fp32", "int8 (cold)", "int8 (cached)"), rows):
+        print(f"{label:<14}{row['load_seconds']:>9}{row['model_rss_mb']:>10}"
+              f"{row['total_rss_mb']:>9}{row['tokens_per_sec']:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: chatbot passage retrieval
+
+Times PassageIndex.search() over random unit embeddings for growing passage
+counts and each storage dtype (no model is loaded). With --model-dir or
+--tiny, also times embedding a document and embedding plus searching per
+question.
+
+Usage:
+  python -m benchmarks.bench_retrieval
+  python -m benchmarks.bench_retrieval --passages 1000 10000 --dim 768
+  python -m benchmarks.bench_retrieval --tiny --doc-words 20000
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from benchmarks.common import synthetic_document, load_summarizer
+from app.retrieval import EMBEDDING_DTYPES, PassageIndex, embed_texts
+
+
+def random_unit_rows(rows, dim, rng):
+    """Random float32 matrix with L2-normalized rows"""
+    matrix = rng.standard_normal((rows, dim)).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def time_calls(fn, repeats):
+    """Call fn repeatedly and return latencies in ms"""
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return latencies
+
+
+def main():
+    """Time searches per passage count and dtype, then an end-to-end run"""
+    parser = argparse.ArgumentParser(description='Passage retrieval benchmark')
+    parser.add_argument('--passages', type=int, nargs='+', default=[100, 1000, 5000, 20000],
+                        help='Passage counts to test')
+    parser.add_argument('--dim', type=int, default=512, help='Embedding size (d_model)')
+    parser.add_argument('--repeats', type=int, default=50, help='Searches per setting')
+    parser.add_argument('--doc-words', type=int, default=20000, help='Document length for the model run')
+    parser.add_argument('--model-dir', type=str, help='Model directory for the end-to-end run')
+    parser.add_argument('--tiny', action='store_true', help='Run end-to-end with a tiny random T5')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'passages':>10}{'dtype':>9}{'MB':>8}{'p50 ms':>9}{'p90 ms':>9}")
+    for count in args.passages:
+        vectors = random_unit_rows(count, args.dim, rng)
+        query = random_unit_rows(1, args.dim, rng)
+        for dtype in EMBEDDING_DTYPES:
+            index = PassageIndex.from_vectors([""] * count, [80] * count, vectors, dtype)
+            latencies = sorted(time_calls(lambda: index.search(query), args.repeats))
+            print(f"{count:>10}{dtype:>9}{index.embeddings.nbytes / 1e6:>8.1f}"
+                  f"{statistics.median(latencies):>9.2f}{latencies[int(0.9 * (len(latencies) - 1))]:>9.2f}")
+
+    if not (args.model_dir or args.tiny):
+        return
+
+    summarizer = load_summarizer(args.model_dir, tiny=args.tiny)
+    document = synthetic_document(args.doc_words, seed=11)
+    start = time.perf_counter()
+    index = PassageIndex.build(summarizer, document)
+    build_ms = (time.perf_counter() - start) * 1000.0
+    print(f"\nEmbedded {len(index)} passages of a {args.doc_words}-word document in {build_ms:.0f} ms")
+
+    questions = ["What is the payment term?", "Which risks were reported?", "Who approved the budget?"]
+    latencies = time_calls(lambda: index.search(embed_texts(summarizer, questions[:1])), args.repeats)
+    print(f"Per question (embed + search): p50 {statistics.median(latencies):.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: preload-and-fork serving throughput and memory per worker count
+
+Starts the web app with 1, 2, 4 ... forked workers, sends concurrent
+summarize requests over HTTP and reports requests/sec next to the summed
+RSS and PSS of all serving processes. Shared model weights are counted once
+per process in RSS but only once in total in PSS.
+
+Usage:
+  python -m benchmarks.bench_serving --tiny
+  python -m benchmarks.bench_serving --workers 1 2 4 --requests 64
+"""
+
+import argparse
+import json
+import os
+import signal
+import time
+import multiprocessing
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import MODEL_DIR, build_tiny_model, synthetic_corpus
+
+
+def serve(model_dir, port, workers):
+    """Server process: load the app once and fork the workers"""
+    import ui.ewb_app as ewb_app
+    from app.summarizer import DocumentSummarizer
+
+    ewb_app.DocumentSummarizer = lambda model_path, tokenizer_path, device="cpu", config=None: \
+        DocumentSummarizer(os.path.join(model_dir, 'model.safetensors'), model_dir, device, config=config)
+    ewb_app.app.config['RESULT_CACHE_ENABLED'] = False
+    ewb_app.initialize_app(background=False)
+    ewb_app.serve_prefork('127.0.0.1', port, workers)
+
+
+def request(port, path, body=None):
+    """Send a GET (or JSON POST) request and decode the JSON response"""
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(f"http://127.0.0.1:{port}{path}", data=data,
+                                 headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=300) as response:
+        return json.load(response)
+
+
+def wait_ready(port, timeout=300):
+    """Poll /api/ready until the server answers"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if request(port, '/api/ready').get('ready'):
+                return True
+        except OSError:
+            pass
+        time.sleep(0.25)
+    return False
+
+
+def main():
+    """Measure throughput and memory for each worker count"""
+    parser = argparse.ArgumentParser(description='Multi-process serving benchmark')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='Worker counts')
+    parser.add_argument('--requests', type=int, default=32, help='Requests per worker count')
+    parser.add_argument('--port', type=int, default=8790, help='Port to serve on')
+    parser.add_argument('--model-dir', type=str, help='Model directory (default: model/)')
+    parser.add_argument('--tiny', action='store_true', help='Use a tiny random T5')
+    args = parser.parse_args()
+
+    model_dir = build_tiny_model() if args.tiny else (args.model_dir or MODEL_DIR)
+    documents = synthetic_corpus(args.requests, seed=5)
+    context = multiprocessing.get_context('fork')
+
+    print(f"{'workers':>8}{'req/s':>10}{'RSS MB':>10}{'PSS MB':>10}{'PSS/worker MB':>15}")
+    for workers in args.workers:
+        server = context.Process(target=serve, args=(model_dir, args.port, workers), daemon=True)
+        server.start()
+        try:
+            if not wait_ready(args.port):
+                print(f"{workers:>8}  server did not become ready")
+                continue
+            # Let every worker bind and warm up its first request
+            with ThreadPoolExecutor(max_workers=workers * 2) as pool:
+                list(pool.map(lambda d: request(args.port, '/api/summarize', {"text": d}),
+                              documents[:workers * 2]))
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers * 2) as pool:
+                list(pool.map(lambda d: request(args.port, '/api/summarize', {"text": d}), documents))
+            rate = len(documents) / (time.perf_counter() - start)
+
+            memory = request(args.port, '/api/server/stats')
+            total = memory["total"]
+            per_worker = [p["pss"] for name, p in memory["processes"].items() if name.startswith("worker")]
+            print(f"{workers:>8}{rate:>10.2f}{total['rss'] / 2**20:>10.0f}{total['pss'] / 2**20:>10.0f}"
+                  f"{sum(per_worker) / max(len(per_worker), 1) / 2**20:>15.0f}")
+        finally:
+            os.kill(server.pid, signal.SIGTERM)
+            server.join(60)
+
+
+if __name__ == '__main__':
+    main()
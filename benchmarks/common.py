@@ -0,0 +1,151 @@
+"""
+Shared helpers for benchmark scripts
+Synthetic corpora, tiny model construction and summarizer loading
+"""
+
+import os
+import sys
+import random
+import tempfile
+
+# Add parent directory to path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+MODEL_DIR = os.path.join(PROJECT_ROOT, 'model')
+
+VOCABULARY = (
+    "the contract party shall agree payment term deliver service notice period "
+    "clause liability report revenue quarter growth market customer product team "
+    "project deadline budget review approval risk compliance policy data system "
+    "analysis result increase decrease annual meeting board member decision"
+).split()
+
+
+def synthetic_document(num_words, seed=None, sentence_words=(8, 24), paragraph_sentences=6):
+    """
+    Build a pseudo-document of roughly num_words words
+    
+    Args:
+        num_words: Target word count
+        seed: Random seed for reproducible output
+        sentence_words: (min, max) words per sentence
+        paragraph_sentences: Sentences per paragraph
+    
+    Returns:
+        str: Generated text with sentence and paragraph boundaries
+    """
+    rng = random.Random(seed)
+    paragraphs, sentences, total = [], [], 0
+    while total < num_words:
+        length = rng.randint(*sentence_words)
+        words = [rng.choice(VOCABULARY) for _ in range(length)]
+        sentences.append(" ".join(words).capitalize() + ".")
+        total += length
+        if len(sentences) == paragraph_sentences:
+            paragraphs.append(" ".join(sentences))
+            sentences = []
+    if sentences:
+        paragraphs.append(" ".join(sentences))
+    return "\n\n".join(paragraphs)
+
+
+def synthetic_corpus(num_docs, min_words=50, max_words=350, seed=0):
+    """
+    Build a list of documents with varied lengths
+    
+    Returns:
+        list: Generated documents
+    """
+    rng = random.Random(seed)
+    return [synthetic_document(rng.randint(min_words, max_words), seed=seed + i)
+            for i in range(num_docs)]
+
+
+def rss_bytes():
+    """
+    Current resident set size of this process
+    
+    Returns:
+        int: RSS in bytes (0 when /proc is unavailable)
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+def peak_rss_bytes():
+    """
+    Peak resident set size of this process
+    
+    Returns:
+        int: Peak RSS in bytes
+    """
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def build_tiny_model(output_dir=None):
+    """
+    Save a tiny randomly initialized T5 next to the real tokenizer
+    
+    The tiny model has the real vocabulary, so tokenization cost is
+    realistic while generate() runs anywhere in seconds.
+    
+    Args:
+        output_dir: Directory to write to (a temp dir by default)
+    
+    Returns:
+        str: Directory containing model and tokenizer files
+    """
+    from transformers import AutoTokenizer, T5Config, T5ForConditionalGeneration
+
+    output_dir = output_dir or tempfile.mkdtemp(prefix='tiny-t5-')
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_DIR)
+    config = T5Config(
+        vocab_size=len(tokenizer),
+        d_model=64,
+        d_ff=128,
+        d_kv=16,
+        num_layers=2,
+        num_decoder_layers=2,
+        num_heads=4,
+        decoder_start_token_id=0,
+        eos_token_id=1,
+        pad_token_id=0,
+    )
+    model = T5ForConditionalGeneration(config)
+    model.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+    return output_dir
+
+
+def load_summarizer(model_dir=None, tiny=False, config=None):
+    """
+    Load a DocumentSummarizer for benchmarking
+    
+    Args:
+        model_dir: Directory with model and tokenizer files (default: model/)
+        tiny: Use a tiny random T5 instead of the real weights
+        config: Optional settings dict (the result and answer caches stay
+                off unless it sets RESULT_CACHE_ENABLED or
+                CHATBOT_ANSWER_CACHE_ENABLED)
+    
+    Returns:
+        DocumentSummarizer: Loaded summarizer
+    """
+    from app.summarizer import DocumentSummarizer
+
+    # Benchmarks time generation, not cache hits
+    config = dict({"RESULT_CACHE_ENABLED": False, "CHATBOT_ANSWER_CACHE_ENABLED": False}, **(config or {}))
+
+    if tiny:
+        model_dir = build_tiny_model()
+    model_dir = model_dir or MODEL_DIR
+    return DocumentSummarizer(os.path.join(model_dir, 'model.safetensors'), model_dir,
+                              config=config)
@@ -0,0 +1,349 @@
+"""
+Micro-benchmark suite for the hot paths, with regression tracking
+
+Times text processing, keyword extraction, history I/O, tokenization,
+summarization and chatbot answers on synthetic documents of several
+sizes, and writes latency percentiles, throughput and peak RSS as JSON.
+Model benchmarks run against a tiny random T5 (anywhere), the real
+weights, or both. `compare` diffs two result files and exits with status 1
+when a benchmark got slower (p50) or bigger (peak RSS) beyond a threshold.
+
+Usage:
+  python -m benchmarks.suite run -o results.json
+  python -m benchmarks.suite run --model both --sizes small,medium -o results.json
+  python -m benchmarks.suite run --filter "text\\." --min-time 0.5 -o text.json
+  python -m benchmarks.suite compare baseline.json results.json --threshold 0.15
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import itertools
+import platform
+import tempfile
+import subprocess
+
+from benchmarks.common import (PROJECT_ROOT, MODEL_DIR, synthetic_document, rss_bytes,
+                               peak_rss_bytes, load_summarizer)
+
+# Document sizes in words
+SIZES = {"small": 200, "medium": 2000, "large": 20000}
+
+# History file sizes in entries (HistoryManager keeps the last 100)
+HISTORY_SIZES = {"small": 10, "medium": 50, "large": 100}
+
+QUESTIONS = [
+    "What is the payment term?",
+    "Who are the parties?",
+    "When is the deadline?",
+    "What does the liability clause say?",
+]
+
+# Benchmarks run per model (named "<benchmark>[<size>,<model>]")
+MODEL_BENCHMARKS = ("tokenize.uncached", "tokenize.cached", "summarizer.summarize",
+                    "chatbot.answer_question")
+
+# Benchmarks slower than this many ms per call get fewer iterations
+SLOW_CALL_MS = 1000.0
+
+
+def measure(fn, items=1, min_iterations=5, min_time=1.0, max_iterations=10000, warmup=1):
+    """
+    Time repeated calls of fn
+
+    Runs at least min_iterations calls and keeps going until min_time
+    seconds have been spent (capped at max_iterations).
+
+    Args:
+        fn: Zero-argument callable
+        items: Units of work per call (words, entries, ...) for throughput
+        min_iterations: Minimum timed calls
+        min_time: Minimum seconds of timed calls
+        max_iterations: Maximum timed calls
+        warmup: Untimed calls first
+
+    Returns:
+        dict: iterations, mean/min/max and p50/p90/p99 latency (ms),
+              calls and items per second, RSS and peak RSS (bytes)
+    """
+    for _ in range(warmup):
+        fn()
+
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < max_iterations:
+        call_start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - call_start) * 1000.0)
+        if len(latencies) >= min_iterations and time.perf_counter() - started >= min_time:
+            break
+
+    total_seconds = sum(latencies) / 1000.0
+    ordered = sorted(latencies)
+    return {
+        "iterations": len(latencies),
+        "mean_ms": round(total_seconds * 1000.0 / len(latencies), 4),
+        "min_ms": round(ordered[0], 4),
+        "max_ms": round(ordered[-1], 4),
+        "p50_ms": round(percentile(ordered, 50), 4),
+        "p90_ms": round(percentile(ordered, 90), 4),
+        "p99_ms": round(percentile(ordered, 99), 4),
+        "calls_per_sec": round(len(latencies) / total_seconds, 3) if total_seconds else None,
+        "items_per_sec": round(len(latencies) * items / total_seconds, 3) if total_seconds else None,
+        "items_per_call": items,
+        "rss_bytes": rss_bytes(),
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def percentile(ordered, q):
+    """Linear-interpolated percentile of a sorted list"""
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * q / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def text_cases(sizes):
+    """Text processing and keyword extraction benchmarks (no model)"""
+    from app.utils import TextProcessor, ContextBinder
+
+    for size in sizes:
+        words = SIZES[size]
+        document = synthetic_document(words, seed=words)
+        messy = document.replace(". ", ".   ").replace(" the ", " the  ")
+        yield f"text.clean_text[{size}]", lambda d=messy: TextProcessor.clean_text(d), words
+        yield f"text.split_sentences[{size}]", lambda d=document: TextProcessor.split_sentences(d), words
+        yield (f"keywords.extract_keywords[{size}]",
+               lambda d=document: ContextBinder.extract_keywords(d, num_keywords=5), words)
+
+
+def history_cases(sizes, directory):
+    """HistoryManager benchmarks on pre-filled history files"""
+    from app.utils import HistoryManager
+
+    for size in sizes:
+        entries = HISTORY_SIZES[size]
+        manager = HistoryManager(os.path.join(directory, f"history-{size}.json"))
+        manager.clear_history()
+        for i in range(entries):
+            manager.add_entry(synthetic_document(300, seed=i), synthetic_document(60, seed=-i),
+                              keywords=["contract", "payment"])
+        text = synthetic_document(300, seed=entries)
+        yield (f"history.add_entry[{size}]",
+               lambda m=manager, t=text: m.add_entry(t, "summary of the report", keywords=["report"]), 1)
+        yield f"history.get_history[{size}]", lambda m=manager: m.get_history(), entries
+        yield f"history.search_history[{size}]", lambda m=manager: m.search_history("payment"), entries
+
+
+def model_cases(summarizer, label, sizes):
+    """Tokenization, summarization and chatbot benchmarks for one model"""
+    from app.chatbot import DocumentChatbot
+
+    for size in sizes:
+        words = SIZES[size]
+        document = synthetic_document(words, seed=words)
+        yield (f"tokenize.uncached[{size},{label}]",
+               lambda d=document: summarizer.tokenizer(d)["input_ids"], words)
+        summarizer.encode(document)
+        yield f"tokenize.cached[{size},{label}]", lambda d=document: summarizer.encode(d), words
+        yield (f"summarizer.summarize[{size},{label}]",
+               lambda d=document: summarizer.summarize(d, use_cache=False), words)
+
+        chatbot = DocumentChatbot(summarizer)
+        chatbot.load_document(document, use_cache=False)
+        questions = itertools.cycle(QUESTIONS)
+        yield (f"chatbot.answer_question[{size},{label}]",
+               lambda c=chatbot, q=questions: c.answer_question(next(q)), 1)
+
+
+def git_commit():
+    """Current commit hash, or None outside a git checkout"""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=PROJECT_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """Metadata identifying where results were produced"""
+    import numpy
+    meta = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+    }
+    try:
+        import torch
+        import transformers
+        meta.update(torch=torch.__version__, transformers=transformers.__version__,
+                    torch_threads=torch.get_num_threads())
+    except ImportError:
+        pass
+    return meta
+
+
+def run_suite(args):
+    """Run the selected benchmarks and write the results file"""
+    sizes = args.sizes.split(',')
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        sys.exit(f"Unknown sizes: {', '.join(unknown)} (choose from {', '.join(SIZES)})")
+    pattern = re.compile(args.filter) if args.filter else None
+    directory = tempfile.mkdtemp(prefix='bench-suite-')
+
+    def groups():
+        yield text_cases(sizes)
+        yield history_cases(sizes, directory)
+        models = {"tiny": ["tiny"], "real": ["real"], "both": ["tiny", "real"], "none": []}[args.model]
+        for label in models:
+            model_sizes = [size for size in sizes if size in args.model_sizes.split(',')]
+            names = [f"{benchmark}[{size},{label}]" for benchmark in MODEL_BENCHMARKS
+                     for size in model_sizes]
+            if pattern and not any(pattern.search(name) for name in names):
+                continue  # Do not load a model none of the selected benchmarks use
+            try:
+                # Local files only: a missing checkpoint must not fall back to downloading t5-base
+                summarizer = load_summarizer(args.model_dir if label == "real" else None,
+                                             tiny=label == "tiny",
+                                             config={"RESULT_CACHE_ENABLED": False,
+                                                     "MODEL_LOCAL_FILES_ONLY": True})
+            except Exception as e:
+                print(f"Skipping {label} model benchmarks: {e}", file=sys.stderr)
+                results["skipped"][label] = str(e)
+                continue
+            yield model_cases(summarizer, label, model_sizes)
+
+    results = {"meta": environment(), "benchmarks": {}, "skipped": {}}
+    results["meta"]["model_dir"] = args.model_dir or MODEL_DIR
+    print(f"{'benchmark':<44}{'iters':>7}{'p50 ms':>11}{'p90 ms':>11}{'p99 ms':>11}{'items/s':>13}")
+    try:
+        for cases in groups():
+            for name, fn, items in cases:
+                if pattern and not pattern.search(name):
+                    continue
+                # A single slow call sets the iteration budget (model calls on real weights)
+                start = time.perf_counter()
+                fn()
+                first_ms = (time.perf_counter() - start) * 1000.0
+                min_iterations = 3 if first_ms > SLOW_CALL_MS else args.min_iterations
+                stats = measure(fn, items, min_iterations=min_iterations, min_time=args.min_time,
+                                warmup=0)
+                results["benchmarks"][name] = stats
+                print(f"{name:<44}{stats['iterations']:>7}{stats['p50_ms']:>11.3f}"
+                      f"{stats['p90_ms']:>11.3f}{stats['p99_ms']:>11.3f}{stats['items_per_sec']:>13.1f}",
+                      flush=True)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    results["meta"]["peak_rss_bytes"] = peak_rss_bytes()
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {len(results['benchmarks'])} results to {args.output}")
+
+
+def compare_results(baseline, current, threshold=0.10, rss_threshold=0.10):
+    """
+    Compare two result files
+
+    Args:
+        baseline: Baseline results dict
+        current: New results dict
+        threshold: Allowed relative p50 latency increase
+        rss_threshold: Allowed relative peak RSS increase
+
+    Returns:
+        list: One dict per benchmark present in both (name, p50 and peak RSS
+              ratios, regressed flag)
+    """
+    rows = []
+    for name, new in current["benchmarks"].items():
+        old = baseline["benchmarks"].get(name)
+        if old is None:
+            continue
+        latency_ratio = new["p50_ms"] / old["p50_ms"] if old["p50_ms"] else 1.0
+        rss_ratio = new["peak_rss_bytes"] / old["peak_rss_bytes"] if old["peak_rss_bytes"] else 1.0
+        rows.append({
+            "name": name,
+            "baseline_p50_ms": old["p50_ms"],
+            "p50_ms": new["p50_ms"],
+            "latency_ratio": round(latency_ratio, 3),
+            "rss_ratio": round(rss_ratio, 3),
+            "regressed": latency_ratio > 1.0 + threshold or rss_ratio > 1.0 + rss_threshold,
+        })
+    return rows
+
+
+def compare(args):
+    """Print a comparison table; exit status 1 on regressions"""
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+
+    rows = compare_results(baseline, current, args.threshold, args.rss_threshold)
+    print(f"baseline: {baseline['meta'].get('commit')} ({baseline['meta'].get('created')})")
+    print(f"current:  {current['meta'].get('commit')} ({current['meta'].get('created')})\n")
+    print(f"{'benchmark':<44}{'base p50':>11}{'p50':>11}{'change':>9}{'rss':>8}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regressed"] else ""
+        print(f"{row['name']:<44}{row['baseline_p50_ms']:>11.3f}{row['p50_ms']:>11.3f}"
+              f"{row['latency_ratio'] - 1:>+9.1%}{row['rss_ratio'] - 1:>+8.1%}{flag}")
+
+    missing = sorted(set(baseline["benchmarks"]) - set(current["benchmarks"]))
+    added = sorted(set(current["benchmarks"]) - set(baseline["benchmarks"]))
+    if missing:
+        print(f"\nNot in current run: {', '.join(missing)}")
+    if added:
+        print(f"\nNew benchmarks: {', '.join(added)}")
+
+    regressions = [row["name"] for row in rows if row["regressed"]]
+    print(f"\n{len(regressions)} regression(s) beyond +{args.threshold:.0%} p50 "
+          f"/ +{args.rss_threshold:.0%} peak RSS")
+    if regressions:
+        sys.exit(1)
+
+
+def main():
+    """Run the suite or compare two result files"""
+    parser = argparse.ArgumentParser(description='Hot-path micro-benchmark suite')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='Run benchmarks and write results as JSON')
+    run.add_argument('-o', '--output', type=str, default='bench_results.json', help='Results file')
+    run.add_argument('--sizes', type=str, default='small,medium,large',
+                     help=f'Document sizes ({", ".join(f"{k}={v} words" for k, v in SIZES.items())})')
+    run.add_argument('--model-sizes', type=str, default='small,medium',
+                     help='Sizes also used for the model benchmarks')
+    run.add_argument('--model', choices=['tiny', 'real', 'both', 'none'], default='tiny',
+                     help='Models for tokenizer/summarizer/chatbot benchmarks')
+    run.add_argument('--model-dir', type=str, help='Real model directory (default: model/)')
+    run.add_argument('--filter', type=str, help='Only benchmarks whose name matches this regex')
+    run.add_argument('--min-time', type=float, default=1.0, help='Minimum seconds per benchmark')
+    run.add_argument('--min-iterations', type=int, default=10, help='Minimum calls per benchmark')
+
+    cmp = commands.add_parser('compare', help='Compare results against a baseline')
+    cmp.add_argument('baseline', type=str, help='Baseline results file')
+    cmp.add_argument('current', type=str, help='New results file')
+    cmp.add_argument('--threshold', type=float, default=0.10, help='Allowed p50 latency increase')
+    cmp.add_argument('--rss-threshold', type=float, default=0.10, help='Allowed peak RSS increase')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run_suite(args)
+    else:
+        compare(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,7 @@ import torch
 from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 import logging
 from app.summarizer import DocumentSummarizer
+from app.tokenization import load_tokenizer
 
 logger = logging.getLogger(__name__)
 
@@ -24,17 +25,15 @@ class FixedDocumentSummarizer(DocumentSummarizer):
         self.config = config
         self.model = None
         self.tokenizer = None
+        self._init_runtime()
         
         try:
             logger.info(f"Loading tokenizer from {tokenizer_path}...")
-            self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_path)
+            self.tokenizer = load_tokenizer(tokenizer_path)
             
             logger.info(f"Loading model from {model_path}...")
             # This is the key fix: loading the model from the directory containing the .safetensors file
-            self.model = AutoModelForSeq2SeqLM.from_pretrained(os.path.dirname(model_path))
-            
-            self.model.to(self.device)
-            self.model.eval()
+            self.model = self._load_model(os.path.dirname(model_path))
             logger.info("Model loaded successfully!")
         except Exception as e:
             logger.warning(f"Could not load custom model: {e}. Loading T5-base...")
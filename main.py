@@ -18,19 +18,29 @@ def main():
     """Main entry point"""
     try:
         # Import and initialize the Flask app
-        from ui.ewb_app import initialize_app
+        from app.config import Config
+        from ui.ewb_app import initialize_app, serve_prefork
         
         logger.info("=" * 60)
         logger.info("Starting Document Summarizer & Contextual Binding")
         logger.info("=" * 60)
         
-        # Initialize the application
-        app = initialize_app()
-        
         # Get configuration
         debug = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
         host = os.getenv('FLASK_HOST', '0.0.0.0')
         port = int(os.getenv('FLASK_PORT', 8080))
+        workers = int(os.getenv('SERVER_WORKERS', Config.SERVER_WORKERS))
+        
+        # Multi-process mode: load the model once, then fork workers sharing it
+        if workers > 1:
+            initialize_app(background=False, start_jobs=False)
+            logger.info(f"Starting {workers} workers on http://{host}:{port} "
+                        f"(SIGHUP restarts workers, /api/server/stats shows memory)")
+            serve_prefork(host, port, workers)
+            return
+        
+        # Initialize the application
+        app = initialize_app()
         
         logger.info(f"Flask app initialized successfully!")
         logger.info(f"Debug mode: {debug}")
@@ -104,6 +104,17 @@ for file in "${TOKENIZER_FILES[@]}"; do
     fi
 done
 
+# Build fast tokenizer artifact
+echo ""
+echo "⚡ Building fast tokenizer artifact..."
+if [ -f "model/spiece.model" ]; then
+    if python3 -m app.tokenization model > /dev/null 2>&1; then
+        echo -e "${GREEN}✓ model/tokenizer.json built${NC}"
+    else
+        echo -e "${YELLOW}⚠ Could not build model/tokenizer.json (startup converts spiece.model each time; retry: python3 -m app.tokenization model)${NC}"
+    fi
+fi
+
 # Create data directory
 echo ""
 echo "📁 Setting up data directories..."
@@ -0,0 +1,45 @@
+"""
+Shared fixtures: a tiny random T5 with the real tokenizer
+
+The tiny model keeps model-backed tests to seconds. Its summaries are
+noise, so tests check structure and behaviour, not wording.
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add the project root to the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+
+@pytest.fixture(scope="session")
+def tiny_model_dir(tmp_path_factory):
+    """Directory with a tiny random T5 and the real tokenizer"""
+    import torch
+    from benchmarks.common import build_tiny_model
+
+    torch.manual_seed(0)
+    return build_tiny_model(str(tmp_path_factory.mktemp("tiny-t5")))
+
+
+@pytest.fixture(scope="session")
+def summarizer(tiny_model_dir):
+    """DocumentSummarizer over the tiny model (result cache off)"""
+    from app.summarizer import DocumentSummarizer
+
+    return DocumentSummarizer(os.path.join(tiny_model_dir, 'model.safetensors'), tiny_model_dir,
+                              config={"RESULT_CACHE_ENABLED": False, "WARMUP_ENABLED": False})
+
+
+@pytest.fixture
+def document():
+    """A multi-paragraph document of a few hundred tokens"""
+    paragraphs = []
+    for p in range(6):
+        sentences = [f"Paragraph {p} sentence {s} says the invoice deadline is March {s + 1} "
+                     f"and payment goes to account {p * 10 + s}." for s in range(5)]
+        paragraphs.append(" ".join(sentences))
+    return "\n\n".join(paragraphs)
@@ -0,0 +1,163 @@
+"""
+Tests for the Flask API routes, run with the test client over the tiny model
+"""
+
+import json
+import time
+
+import pytest
+
+from app.chatbot import DocumentChatbot
+from app.jobs import FINISHED_STATES, JobRunner, JobStore
+from app.sessions import ChatSessionStore
+from ui import ewb_app
+
+
+@pytest.fixture
+def client(monkeypatch, summarizer):
+    """Test client with the tiny model, in-memory chat sessions and no history"""
+    monkeypatch.setattr(ewb_app, "summarizer", summarizer)
+    monkeypatch.setattr(ewb_app, "chat_sessions", ChatSessionStore(lambda: DocumentChatbot(summarizer)))
+    monkeypatch.setattr(ewb_app, "history_manager", None)
+    monkeypatch.setattr(ewb_app, "scheduler", None)
+    monkeypatch.setitem(ewb_app.app.config, "CHATBOT_LOAD_BACKGROUND", False)
+    return ewb_app.app.test_client()
+
+
+def read_events(response):
+    """Parse a text/event-stream body into (event name, data) pairs"""
+    assert response.mimetype == "text/event-stream"
+    events = []
+    for block in response.get_data(as_text=True).split("\n\n"):
+        if not block:
+            continue
+        name, data = block.split("\n")
+        assert name.startswith("event: ") and data.startswith("data: ")
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_summary_stream_ends_with_done(client):
+    response = client.post('/api/summarize/stream', json={"text": "The invoice is due in March. Pay it."})
+    events = read_events(response)
+
+    assert response.status_code == 200 and response.headers["Cache-Control"] == "no-cache"
+    assert [name for name, _ in events[:-1]] == ["token"] * (len(events) - 1)
+    name, done = events[-1]
+    assert name == "done"
+    assert done["summary"] == "".join(data["text"] for _, data in events[:-1]).strip()
+    assert "keywords" in done
+
+
+def test_summary_stream_rejects_bad_requests(client):
+    assert client.post('/api/summarize/stream', json={"text": " "}).status_code == 400
+    response = client.post('/api/summarize/stream', json={"text": "Some text.", "decoder": "beam"})
+    assert response.status_code == 400 and "decoder" in response.get_json()["error"]
+
+
+def test_answer_stream_without_a_document_sends_an_error_event(client):
+    events = read_events(client.post('/api/chatbot/ask/stream', json={"question": "Who?", "session_id": "s1"}))
+
+    assert [name for name, _ in events] == ["error"]
+    assert events[0][1]["session_id"] == "s1"
+
+
+def test_answer_stream_ends_with_done(client, document):
+    assert client.post('/api/chatbot/load', json={"text": document, "session_id": "s1"}).status_code == 200
+    events = read_events(client.post('/api/chatbot/ask/stream',
+                                     json={"question": "When is the deadline?", "session_id": "s1"}))
+
+    assert events[-1][0] == "done" and events[-1][1]["success"]
+    assert {name for name, _ in events[:-1]} <= {"token"}
+
+
+@pytest.fixture
+def jobs(monkeypatch, tmp_path):
+    """Job store of the app (no runner: jobs stay queued until one is started)"""
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(ewb_app, "job_store", store)
+    monkeypatch.setattr(ewb_app, "job_runner", None)
+    return store
+
+
+def test_job_submit_poll_and_cancel(client, jobs):
+    response = client.post('/api/jobs', json={"text": "The invoice is due in March.", "max_length": 20})
+    job = response.get_json()
+
+    assert response.status_code == 202 and response.headers["Location"] == f"/api/jobs/{job['id']}"
+    assert client.get(f"/api/jobs/{job['id']}").get_json()["status"] == "queued"
+    assert client.get(f"/api/jobs/{job['id']}/result").status_code == 409
+
+    cancelled = client.post(f"/api/jobs/{job['id']}/cancel")
+    assert cancelled.status_code == 200 and cancelled.get_json()["status"] == "cancelled"
+    assert client.get(f"/api/jobs/{job['id']}/result").status_code == 200
+    assert client.get('/api/jobs?status=cancelled').get_json()["counts"]["cancelled"] == 1
+
+
+def test_job_routes_reject_bad_requests(client, jobs):
+    assert client.post('/api/jobs', json={"text": ""}).status_code == 400
+    assert client.post('/api/jobs', json={"text": "Text.", "max_length": 0}).status_code == 400
+    assert client.get('/api/jobs?status=lost').status_code == 400
+    for response in (client.get('/api/jobs/missing'), client.get('/api/jobs/missing/result'),
+                     client.post('/api/jobs/missing/cancel')):
+        assert response.status_code == 404
+
+
+def test_job_runs_to_a_result(client, jobs, monkeypatch):
+    runner = JobRunner(jobs, {"summarize": ewb_app._run_summarize_job}, poll_interval=0.05)
+    monkeypatch.setattr(ewb_app, "job_runner", runner)
+    runner.start()
+    try:
+        job = client.post('/api/jobs', json={"text": "The invoice is due in March. Pay it."}).get_json()
+        deadline = time.monotonic() + 30
+        while client.get(f"/api/jobs/{job['id']}").get_json()["status"] not in FINISHED_STATES:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+    finally:
+        runner.stop()
+
+    done = client.get(f"/api/jobs/{job['id']}/result").get_json()
+    assert done["status"] == "succeeded" and "keywords" in done["result"]
+
+
+def test_ask_batch_validates_questions(client, monkeypatch):
+    monkeypatch.setitem(ewb_app.app.config, "CHATBOT_MAX_BATCH_QUESTIONS", 3)
+
+    for body in ({}, {"questions": []}, {"questions": "Who?"}, {"questions": ["Who?", " "]},
+                 {"questions": ["Who?", 3]}, {"questions": ["a?", "b?", "c?", "d?"]},
+                 {"questions": ["Who?"], "batch_size": 0}, {"questions": ["Who?"], "session_id": "../x"}):
+        response = client.post('/api/chatbot/ask-batch', json=body)
+        assert response.status_code == 400, body
+    assert "At most 3" in client.post('/api/chatbot/ask-batch',
+                                      json={"questions": ["a?", "b?", "c?", "d?"]}).get_json()["error"]
+
+
+def test_ask_batch_answers_in_order(client, document):
+    questions = ["Who gets paid?", "When is the deadline?", "Which account?"]
+    empty = client.post('/api/chatbot/ask-batch', json={"questions": questions, "session_id": "s2"})
+    assert empty.status_code == 200 and not empty.get_json()["success"]
+
+    client.post('/api/chatbot/load', json={"text": document, "session_id": "s2"})
+    result = client.post('/api/chatbot/ask-batch',
+                         json={"questions": questions, "session_id": "s2", "batch_size": 2}).get_json()
+    assert result["success"] and result["session_id"] == "s2"
+    assert [answer["question"] for answer in result["answers"]] == questions
+
+
+def test_chatbot_sessions_are_shared_between_workers(client, summarizer, document, monkeypatch, tmp_path):
+    workers = [ChatSessionStore(lambda: DocumentChatbot(summarizer), spill_dir=str(tmp_path)) for _ in range(2)]
+    for store in workers:
+        store.share()
+
+    def on_worker(index):
+        monkeypatch.setattr(ewb_app, "chat_sessions", workers[index])
+        return client
+
+    loaded = on_worker(0).post('/api/chatbot/load', json={"text": document, "session_id": "w"}).get_json()
+    assert loaded["status"] == "ready"  # shared sessions load in the request
+    assert on_worker(1).get('/api/chatbot/status?session_id=w').get_json()["state"] == "ready"
+    answer = on_worker(1).post('/api/chatbot/ask', json={"question": "Who gets paid?", "session_id": "w"})
+    assert answer.status_code == 200 and answer.get_json()["success"]
+
+    on_worker(0).post('/api/chatbot/clear', json={"session_id": "w"})
+    assert not on_worker(1).post('/api/chatbot/ask', json={"question": "Who?", "session_id": "w"}).get_json()["success"]
@@ -0,0 +1,91 @@
+"""
+Tests for the micro-batching scheduler
+"""
+
+import threading
+import time
+
+import pytest
+
+from app.batching import BatchScheduler
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def scheduler(calls):
+    def echo(items):
+        calls.append(list(items))
+        return [item * 10 for item in items]
+
+    def slow(items):
+        time.sleep(0.3)
+        return items
+
+    def broken(items):
+        raise RuntimeError("model failed")
+
+    scheduler = BatchScheduler({"echo": echo, "slow": slow, "broken": broken, "short": lambda items: []},
+                               window_ms=50, max_batch_size=4)
+    yield scheduler
+    scheduler.stop(timeout=2)
+
+
+def test_concurrent_requests_share_a_batch(scheduler, calls):
+    futures = [scheduler.submit("echo", i) for i in range(3)]
+
+    assert [future.result(timeout=2) for future in futures] == [0, 10, 20]
+    assert calls == [[0, 1, 2]]
+    assert scheduler.stats()["batches"] == 1
+
+
+def test_groups_are_batched_separately(scheduler, calls):
+    futures = [scheduler.submit("echo", i, group=i % 2) for i in range(4)]
+
+    assert [future.result(timeout=2) for future in futures] == [0, 10, 20, 30]
+    assert sorted(calls) == [[0, 2], [1, 3]]
+
+
+def test_batches_are_capped(scheduler, calls):
+    futures = [scheduler.submit("echo", i) for i in range(6)]
+    [future.result(timeout=2) for future in futures]
+
+    assert max(len(batch) for batch in calls) == 4
+
+
+def test_handler_errors_reach_every_caller(scheduler):
+    futures = [scheduler.submit("broken", i) for i in range(2)]
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model failed"):
+            future.result(timeout=2)
+    with pytest.raises(RuntimeError, match="returned 0 results"):
+        scheduler.run("short", 1, timeout=2)
+
+
+def test_unknown_kind_is_rejected(scheduler):
+    with pytest.raises(ValueError):
+        scheduler.submit("missing", 1)
+
+
+def test_wait_times_out_and_drops_the_queued_request(scheduler):
+    busy = threading.Thread(target=scheduler.run, args=("slow", 1), kwargs={"timeout": 5})
+    busy.start()
+    time.sleep(0.1)
+
+    with pytest.raises(TimeoutError):
+        scheduler.run("slow", 2, group="other", timeout=0.05)
+    busy.join()
+    time.sleep(0.1)
+    # The abandoned request never reached the handler
+    assert scheduler.stats()["requests"] == 1
+
+
+def test_stopped_scheduler_rejects_requests(scheduler):
+    scheduler.stop(timeout=2)
+
+    with pytest.raises(RuntimeError):
+        scheduler.submit("echo", 1)
@@ -0,0 +1,82 @@
+"""
+Tests for bulk summarization: inputs, checkpoints and resume
+"""
+
+import json
+
+import pytest
+
+from ui.bulk import list_documents, read_checkpoint, run_bulk
+
+
+def write_lines(path, lines):
+    path.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+
+
+def read_records(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_jsonl_source_keeps_bad_lines_as_errors(tmp_path):
+    source = tmp_path / "docs.jsonl"
+    write_lines(source, [json.dumps({"id": "a", "text": "A."}), "", "{not json",
+                         json.dumps({"text": "C.", "context": "ctx"})])
+    total, documents = list_documents(str(source))
+    documents = list(documents)
+
+    assert total == 3
+    assert documents[0] == {"id": "a", "text": "A.", "context": None}
+    assert documents[1]["id"] == "line-3" and "Invalid JSON" in documents[1]["error"]
+    assert documents[2] == {"id": "line-4", "text": "C.", "context": "ctx"}
+
+
+def test_directory_source_lists_text_files(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "b.txt").write_text("B.")
+    (tmp_path / "sub" / "a.md").write_text("A.")
+    (tmp_path / "skip.pdf").write_text("")
+
+    total, documents = list_documents(str(tmp_path))
+    assert total == 2 and [document["id"] for document in documents] == ["b.txt", "sub/a.md"]
+    with pytest.raises(ValueError):
+        list_documents(str(tmp_path / "*.csv"))
+
+
+def test_checkpoint_truncates_a_cut_off_record(tmp_path):
+    output = tmp_path / "out.jsonl"
+    output.write_text(json.dumps({"id": "a", "summary": "A"}) + '\n{"id": "b", "summ', encoding="utf-8")
+
+    assert read_checkpoint(str(output)) == {"a"}
+    assert read_records(output) == [{"id": "a", "summary": "A"}]
+
+
+def test_checkpoint_drops_failed_records(tmp_path):
+    output = tmp_path / "out.jsonl"
+    write_lines(output, [json.dumps({"id": "a", "summary": "A"}), json.dumps({"id": "b", "error": "boom"}),
+                         json.dumps({"id": "c", "summary": "C"})])
+    with open(output, "a") as f:
+        f.write('{"id": "d"')
+
+    assert read_checkpoint(str(output)) == {"a", "c"}
+    assert [record["id"] for record in read_records(output)] == ["a", "c"]
+
+
+def test_resume_retries_failures_without_duplicates(tmp_path, tiny_model_dir):
+    source = tmp_path / "docs.jsonl"
+    write_lines(source, [json.dumps({"id": name, "text": f"Document {name} is about invoices."})
+                         for name in ("a", "b", "c")])
+    output = tmp_path / "out.jsonl"
+    write_lines(output, [json.dumps({"id": "a", "summary": "A"}), json.dumps({"id": "b", "error": "timeout"})])
+
+    stats = run_bulk(str(source), str(output), batch_size=2, model_dir=tiny_model_dir,
+                     progress_interval=60)
+
+    assert (stats["skipped"], stats["processed"], stats["failed"]) == (1, 2, 0)
+    records = read_records(output)
+    assert sorted(record["id"] for record in records) == ["a", "b", "c"]
+    assert all("summary" in record and "error" not in record for record in records)
+
+    # A finished run resumes to nothing
+    again = run_bulk(str(source), str(output), model_dir=tiny_model_dir, progress_interval=60)
+    assert (again["skipped"], again["processed"]) == (3, 0)
+    assert len(read_records(output)) == 3
@@ -0,0 +1,155 @@
+"""
+Tests for the result cache and the chatbot answer cache
+"""
+
+import os
+import time
+
+import numpy as np
+
+from app.cache import AnswerCache, ResultCache, make_cache_key, normalize_question, question_terms
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_cache_key_is_stable_and_order_sensitive():
+    assert make_cache_key("summary", "text", {"b": 1, "a": 2}) == make_cache_key("summary", "text", {"a": 2, "b": 1})
+    assert make_cache_key("summary", "text") != make_cache_key("text", "summary")
+    assert make_cache_key("summary", "text", None) != make_cache_key("summary", "text", "")
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", {"summary": "A"})
+    cache.put("b", {"summary": "B"})
+    assert cache.get("a") == {"summary": "A"}
+    cache.put("c", {"summary": "C"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"summary": "A"} and cache.get("c") == {"summary": "C"}
+    stats = cache.stats()
+    assert (stats["memory_entries"], stats["evictions"], stats["misses"]) == (2, 1, 1)
+
+
+def test_values_are_copied():
+    cache = ResultCache(max_entries=4)
+    value = {"summary": "A", "keywords": ["x"]}
+    cache.put("a", value)
+    value["keywords"].append("y")
+    cache.get("a")["keywords"].append("z")
+
+    assert cache.get("a") == {"summary": "A", "keywords": ["x"]}
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    ResultCache(max_entries=4, disk_dir=str(tmp_path)).put("ab12", {"summary": "A"})
+    cache = ResultCache(max_entries=4, disk_dir=str(tmp_path))
+
+    assert cache.get("ab12") == {"summary": "A"}
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.get("ab12") == {"summary": "A"}
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_disk_tier_drops_expired_entries(tmp_path):
+    cache = ResultCache(max_entries=0, disk_dir=str(tmp_path), max_age=60)
+    cache.put("ab12", {"summary": "A"})
+    path = cache._disk_path("ab12")
+    os.utime(path, (time.time() - 120, time.time() - 120))
+
+    assert cache.get("ab12") is None
+    assert not os.path.exists(path)
+
+
+def test_disk_tier_is_trimmed_oldest_first(tmp_path):
+    cache = ResultCache(max_entries=0, disk_dir=str(tmp_path), max_disk_bytes=1)
+    for age, key in enumerate(("aa01", "bb02", "cc03")):
+        cache.put(key, {"summary": key})
+        os.utime(cache._disk_path(key), (time.time() - 100 + age, time.time() - 100 + age))
+    cache.max_disk_bytes = os.path.getsize(cache._disk_path("cc03")) * 2
+
+    assert cache.evict_disk() == 1
+    assert cache.get("aa01") is None
+    assert cache.get("cc03") == {"summary": "cc03"}
+
+
+def test_normalize_question():
+    assert normalize_question("What's the DEADLINE?") == "what is the deadline"
+    assert normalize_question("  isn’t it   due?! ") == "is not it due"
+    assert normalize_question("We can't pay.") == "we can not pay"
+
+
+def test_answer_cache_matches_normalized_questions_only_by_default():
+    cache = AnswerCache()
+    cache.put("doc", "quality", "What's the deadline?", {"answer": "March", "source": "passages"},
+              unit(1, 0, 0))
+
+    hit = cache.get("doc", "quality", "what is the deadline", unit(1, 0, 0))
+    assert hit == {"answer": "March", "source": "passages", "match": "exact",
+                   "matched_question": "what is the deadline"}
+    # Near-identical embeddings of a different question must not hit without a threshold
+    assert cache.get("doc", "quality", "what is the budget", unit(1, 0, 0)) is None
+    assert cache.get("doc", "fast", "what is the deadline") is None
+    assert cache.get("other", "quality", "what is the deadline") is None
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["similar_hits"], stats["misses"]) == (1, 0, 3)
+
+
+def test_question_terms_drop_filler_but_keep_key_words():
+    assert question_terms("Can you tell me what the payment deadlines are?") == ("what", "payment", "deadline")
+    assert question_terms("What's the payment deadline") == ("what", "payment", "deadline")
+    assert question_terms("Who was the CEO?") != question_terms("who is the ceo")
+    assert question_terms("Isn't it due?") != question_terms("Is it due?")
+
+
+def test_answer_cache_near_duplicates_with_a_threshold():
+    cache = AnswerCache(threshold=0.9)
+    cache.put("doc", "quality", "Who pays the rent?", {"answer": "A", "source": "passages"}, unit(1, 0, 0))
+    cache.put("doc", "quality", "When is it due?", {"answer": "B", "source": "passages"}, unit(0, 1, 0))
+
+    hit = cache.get("doc", "quality", "Can you tell me who pays the rent", unit(0.99, 0.1, 0))
+    assert (hit["answer"], hit["match"], hit["matched_question"]) == ("A", "similar", "who pays the rent")
+    assert cache.get("doc", "quality", "Could you tell me who pays the rent", unit(0.6, 0.6, 0.5)) is None
+    assert cache.get("doc", "fast", "Can you tell me who pays the rent", unit(1, 0, 0)) is None
+
+
+def test_questions_differing_in_a_key_word_never_match():
+    cache = AnswerCache(threshold=0.5)
+    cache.put("doc", "quality", "What is the payment deadline?", {"answer": "March", "source": "passages"},
+              unit(1, 0, 0))
+
+    # Identical embeddings: only the key terms tell these questions apart
+    for question in ("What is the payment budget?", "When is the payment deadline?",
+                     "What was the payment deadline?", "What is not the payment deadline?"):
+        assert cache.get("doc", "quality", question, unit(1, 0, 0)) is None
+    assert cache.get("doc", "quality", "what are the payment deadlines", unit(1, 0, 0))["answer"] == "March"
+
+
+def test_answer_cache_bounds_entries_and_documents():
+    cache = AnswerCache(max_documents=2, max_entries=2, threshold=0.9)
+    for question, vector in (("a", unit(1, 0, 0)), ("b", unit(0, 1, 0)), ("c", unit(0, 0, 1))):
+        cache.put("doc", "quality", question, {"answer": question.upper(), "source": "passages"}, vector)
+
+    # The oldest answer and its embedding slot are gone
+    assert cache.get("doc", "quality", "a", unit(1, 0, 0)) is None
+    assert cache.get("doc", "quality", "the c", unit(0, 0, 1))["answer"] == "C"
+
+    cache.put("doc2", "quality", "q", {"answer": "Q", "source": "summary"})
+    cache.put("doc3", "quality", "q", {"answer": "Q", "source": "summary"})
+    stats = cache.stats()
+    assert stats["documents"] == 2
+    assert stats["evictions"] == 1 + 2
+    assert cache.get("doc", "quality", "c") is None
+
+
+def test_answer_cache_clear():
+    cache = AnswerCache()
+    cache.put("doc", "quality", "q", {"answer": "A", "source": "summary"})
+    cache.put("doc2", "quality", "q", {"answer": "B", "source": "summary"})
+    cache.clear()
+
+    assert cache.get("doc", "quality", "q") is None
+    assert cache.stats()["documents"] == 0
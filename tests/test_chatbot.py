@@ -0,0 +1,154 @@
+"""
+Tests for DocumentChatbot: loading, answer caching and state round-trips
+"""
+
+import json
+import time
+
+import pytest
+import torch
+
+from app.cache import AnswerCache
+from app.chatbot import DocumentChatbot
+
+
+@pytest.fixture
+def chatbot(summarizer, document):
+    bot = DocumentChatbot(summarizer)
+    assert bot.load_document(document)["success"]
+    return bot
+
+
+def test_questions_need_a_document(summarizer):
+    bot = DocumentChatbot(summarizer)
+
+    assert not bot.answer_question("What is due?")["success"]
+    assert not bot.get_document_summary()["success"]
+
+
+def test_state_round_trip_skips_summarizing(chatbot, summarizer):
+    state = json.loads(json.dumps(chatbot.export_state()))
+    restored = DocumentChatbot(summarizer)
+    restored.restore_state(state)
+
+    assert (restored.summary, restored.keywords) == (chatbot.summary, chatbot.keywords)
+    assert restored.load_status()["index_ready"]
+    assert restored._index.passages == chatbot._index.passages
+
+
+def test_clear_context(chatbot):
+    chatbot.clear_context()
+
+    assert chatbot.export_state() is None
+    assert chatbot.load_status() == {"state": "empty"}
+    assert chatbot.memory_bytes() == 0
+
+
+def test_answer_questions_keeps_input_order(chatbot, summarizer):
+    questions = ["Who?", "When is the invoice deadline for paragraph two?", "Which account?"]
+    result = chatbot.answer_questions(questions, batch_size=2)
+
+    assert result["success"] and result["batches"] == 2
+    assert [answer["question"] for answer in result["answers"]] == questions
+    assert not DocumentChatbot(summarizer).answer_questions(questions)["success"]
+
+
+def test_split_context_joins_separate_encodings(summarizer, document):
+    bot = DocumentChatbot(summarizer, split_context=True, retrieval=False)
+    bot.load_document(document)
+    inputs = bot._split_context_inputs(["Who pays?"])
+
+    # Reusing the stored context states equals encoding question and context apart;
+    # it approximates the joint prompt, which bench_chatbot compares against
+    question = summarizer.pad_inputs([summarizer.encode("question: Who pays?")])
+    context = summarizer.pad_inputs([summarizer.truncate_ids(summarizer.encode(f"context: {bot.summary}"),
+                                                             512 - bot.question_tokens)])
+    expected = torch.cat([summarizer.run_encoder(question).last_hidden_state,
+                          summarizer.run_encoder(context).last_hidden_state], dim=1)
+    assert torch.allclose(inputs["encoder_outputs"].last_hidden_state, expected, atol=1e-5)
+    assert inputs["attention_mask"].shape == expected.shape[:2]
+    assert bot.answer_question("Who pays?")["context_source"] == "summary"
+
+
+def test_loading_builds_index_and_summary(chatbot):
+    status = chatbot.load_status()
+
+    assert (status["state"], status["summary_ready"], status["index_ready"]) == ("ready", True, True)
+    assert "invoice" in chatbot.keywords
+    assert chatbot.memory_bytes() > len(chatbot.document_context)
+
+
+def test_summary_errors_fail_the_load(summarizer, document, monkeypatch):
+    monkeypatch.setattr(summarizer, "summarize", lambda *args, **kwargs: {"summary": "", "error": "boom"})
+    bot = DocumentChatbot(summarizer)
+
+    assert bot.load_document(document) == {"success": False, "error": "boom"}
+    status = bot.load_status()
+    assert (status["state"], status["error"], status["summary_ready"]) == ("failed", "boom", False)
+
+
+def test_repeated_question_is_answered_from_cache(chatbot):
+    first = chatbot.answer_question("When is the invoice deadline?")
+    again = chatbot.answer_question("when is the invoice deadline")
+
+    assert first["success"] and first["context_source"] == "passages" and "cached" not in first
+    assert again["cached"] == "exact" and again["answer"] == first["answer"]
+
+
+def test_rephrased_questions_match_but_other_key_words_do_not(summarizer, document):
+    # Any embedding similarity passes, so the key terms alone decide
+    bot = DocumentChatbot(summarizer, answer_cache=AnswerCache(threshold=-1.0))
+    bot.load_document(document)
+    answer = bot.answer_question("What is the payment deadline?")["answer"]
+
+    hit = bot.answer_question("Can you tell me what the payment deadlines are?")
+    assert (hit["cached"], hit["answer"]) == ("similar", answer)
+    assert "cached" not in bot.answer_question("What is the payment account?")
+
+
+def test_sessions_on_the_same_document_share_answers(summarizer, document):
+    shared = AnswerCache()
+    first, second = (DocumentChatbot(summarizer, answer_cache=shared) for _ in range(2))
+    first.load_document(document)
+    second.load_document(document)
+
+    answer = first.answer_question("Who gets paid?")["answer"]
+    # Clearing one session must not wipe the answers the other still uses
+    first.clear_context()
+    hit = second.answer_question("Who gets paid?")
+    assert hit["cached"] == "exact" and hit["answer"] == answer
+
+
+def test_restored_session_reuses_answers(chatbot, summarizer):
+    answer = chatbot.answer_question("Which account?")["answer"]
+    restored = DocumentChatbot(summarizer, answer_cache=chatbot.answer_cache)
+    restored.restore_state(chatbot.export_state())
+
+    assert restored.answer_question("Which account?")["answer"] == answer
+
+
+def test_new_document_does_not_reuse_answers(chatbot, document):
+    chatbot.answer_question("Who gets paid?")
+    chatbot.load_document(document.replace("invoice", "contract"))
+
+    assert "cached" not in chatbot.answer_question("Who gets paid?")
+
+
+def test_answers_for_a_replaced_document_are_not_cached(chatbot, document, monkeypatch):
+    generate = chatbot._generate_answers
+    other = document.replace("invoice", "contract")
+
+    def generate_then_replace(*args, **kwargs):
+        answers = generate(*args, **kwargs)
+        # Another request loads a new document while this one is generating
+        chatbot.load_document(other, background=True)
+        return answers
+
+    monkeypatch.setattr(chatbot, "_generate_answers", generate_then_replace)
+    assert chatbot.answer_question("Who gets paid?")["success"]
+    monkeypatch.undo()
+
+    assert chatbot.answer_cache.stats()["entries"] == 0
+    while chatbot.loading:
+        time.sleep(0.05)
+    assert "cached" not in chatbot.answer_question("Who gets paid?")
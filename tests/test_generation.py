@@ -0,0 +1,76 @@
+"""
+Tests for request deadlines and the decode cost model
+"""
+
+import time
+
+import pytest
+
+from app.generation import Deadline, DecodeCostModel
+
+
+def fitted_cost_model(overhead=0.01, per_token=0.01, rows=(1, 2, 4)):
+    """Cost model observed at seconds = overhead + per_token * rows * tokens"""
+    model = DecodeCostModel()
+    for r in rows:
+        for tokens in (10, 20, 40):
+            model.observe(r, tokens, overhead + per_token * r * tokens)
+    return model
+
+
+def test_deadline_expires():
+    deadline = Deadline(30)
+
+    assert 0.0 < deadline.remaining() <= 0.03
+    time.sleep(0.04)
+    assert deadline.remaining() == 0.0
+    assert not deadline.truncated
+
+
+def test_cost_model_fits_observations():
+    model = fitted_cost_model()
+
+    assert model.estimate(2, 50) == pytest.approx(0.01 + 0.02 * 50)
+    # Unmeasured row counts scale from the nearest measured one
+    assert model.estimate(8, 10) > model.estimate(4, 10)
+    assert model.snapshot()["4"] == {"samples": 3, "overhead_ms": 10.0, "per_token_ms": 40.0}
+
+
+def test_plan_halves_beams_to_fit_the_budget():
+    model = fitted_cost_model()
+
+    # 50 tokens: 4 beams ~2.01s, 2 beams ~1.01s, greedy ~0.51s
+    assert model.plan(10.0, 1, 4, 50) == (4, 50)
+    assert model.plan(1.5, 1, 4, 50) == (2, 50)
+    assert model.plan(1.0, 1, 4, 50) == (1, 50)
+    # Greedy does not fit either: shorten the output instead
+    beams, tokens = model.plan(0.3, 1, 4, 50)
+    assert beams == 1 and tokens == int((0.3 * 0.9 - 0.01) / 0.01)
+    assert model.plan(0.0, 1, 4, 50) == (1, 1)
+
+
+def test_deadline_sets_max_time(summarizer, monkeypatch):
+    calls = []
+    generate = summarizer.model.generate
+
+    def record(**kwargs):
+        calls.append(kwargs)
+        return generate(**kwargs)
+
+    monkeypatch.setattr(summarizer.model, "generate", record)
+    inputs = summarizer.pad_inputs([summarizer.encode("summarize: The invoice is due in March.")])
+    deadline = Deadline(5000)
+    summarizer.generate(inputs, deadline=deadline, max_length=8, num_beams=2)
+    summarizer.generate(inputs, max_length=8)
+
+    assert 0.0 < calls[0]["max_time"] <= 5.0
+    assert "max_time" not in calls[1]
+    assert not deadline.truncated
+
+
+def test_expired_deadline_truncates(summarizer, document):
+    truncated = summarizer.summarize(document[:400], deadline_ms=1, profile="quality")
+    complete = summarizer.summarize(document[:400], deadline_ms=60000)
+
+    assert "error" not in truncated and "error" not in complete
+    assert truncated["truncated"] and not complete["truncated"]
@@ -0,0 +1,71 @@
+"""
+Tests for the inference executor: slot limits, queueing and inline re-entry
+"""
+
+import threading
+
+import pytest
+
+from app.inference import InferenceExecutor
+
+
+@pytest.fixture
+def executor():
+    executor = InferenceExecutor(slots=1, intra_op_threads=1)
+    yield executor
+    executor.shutdown()
+
+
+def test_calls_beyond_the_slots_wait_in_order(executor):
+    release = threading.Event()
+    started = threading.Event()
+    order = []
+
+    def blocking():
+        started.set()
+        release.wait(5)
+        order.append("first")
+
+    first = executor.submit(blocking)
+    started.wait(5)
+    rest = [executor.submit(order.append, name) for name in ("second", "third")]
+
+    stats = executor.stats()
+    assert (stats["running"], stats["queued"]) == (1, 2)
+    release.set()
+    for future in [first] + rest:
+        future.result(5)
+    assert order == ["first", "second", "third"]
+    stats = executor.stats()
+    assert (stats["running"], stats["queued"], stats["completed"]) == (0, 0, 3)
+    assert stats["queue_wait_ms"]["count"] == 3
+
+
+def test_nested_calls_run_inline(executor):
+    def outer():
+        # With one slot a queued inner call would wait for this one forever
+        return executor.run(lambda: (executor.in_slot(), threading.current_thread().name))
+
+    in_slot, thread = executor.run(outer)
+
+    assert in_slot and thread.startswith("inference")
+    assert not executor.in_slot()
+    assert executor.stats()["completed"] == 1
+
+
+def test_errors_reach_the_caller(executor):
+    def fail():
+        raise ValueError("bad input")
+
+    with pytest.raises(ValueError, match="bad input"):
+        executor.run(fail)
+    assert executor.stats()["running"] == 0
+
+
+def test_slots_get_disjoint_core_blocks():
+    executor = InferenceExecutor(slots=2, intra_op_threads=2, cores=[0, 1, 2, 3])
+    try:
+        assert executor.slot_cores(0) == [0, 1] and executor.slot_cores(1) == [2, 3]
+        assert executor.slot_cores(2) == [0, 1]
+    finally:
+        executor.shutdown()
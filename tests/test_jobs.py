@@ -0,0 +1,141 @@
+"""
+Tests for the durable job store: claiming, leases and recovery
+"""
+
+import socket
+import sqlite3
+import time
+
+import pytest
+
+from app.jobs import JobStore, JobRunner
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"), lease_seconds=60, max_attempts=2)
+
+
+def set_columns(store, job_id, **columns):
+    """Change job columns directly, as a crashed runner would have left them"""
+    conn = sqlite3.connect(store.path)
+    try:
+        assignments = ", ".join(f"{name} = ?" for name in columns)
+        conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*columns.values(), job_id))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_jobs_are_claimed_oldest_first_and_once(store):
+    first = store.submit("summarize", {"text": "a"})
+    store.submit("summarize", {"text": "b"})
+    store.submit("other", {"text": "c"})
+
+    job = store.claim(["summarize"])
+    assert job["id"] == first["id"]
+    assert (job["status"], job["attempts"], job["payload"]) == ("running", 1, {"text": "a"})
+    assert store.claim(["summarize"])["payload"] == {"text": "b"}
+    assert store.claim(["summarize"]) is None
+
+
+def test_finished_jobs_keep_their_result(store):
+    job = store.submit("summarize", {})
+    store.claim(["summarize"])
+    store.finish(job["id"], "succeeded", result={"summary": "s"})
+
+    stored = store.get(job["id"], include_result=True)
+    assert (stored["status"], stored["result"]) == ("succeeded", {"summary": "s"})
+    assert store.counts()["succeeded"] == 1
+
+
+def test_live_lease_is_not_recovered(store):
+    job = store.submit("summarize", {})
+    store.claim(["summarize"])
+
+    assert store.recover()["requeued"] == 0
+    assert store.get(job["id"])["status"] == "running"
+
+
+def test_expired_lease_is_requeued(store):
+    job = store.submit("summarize", {})
+    store.claim(["summarize"])
+    set_columns(store, job["id"], heartbeat_at=time.time() - 120)
+
+    assert store.recover()["requeued"] == 1
+    assert store.get(job["id"])["status"] == "queued"
+    assert store.claim(["summarize"])["attempts"] == 2
+
+
+def test_heartbeat_renews_the_lease(store):
+    job = store.submit("summarize", {})
+    store.claim(["summarize"])
+    set_columns(store, job["id"], heartbeat_at=time.time() - 120)
+    store.heartbeat([job["id"]])
+
+    assert store.recover()["requeued"] == 0
+
+
+def test_jobs_of_dead_processes_are_requeued_at_once(store):
+    job = store.submit("summarize", {})
+    store.claim(["summarize"])
+    # PIDs are capped far below this, so the owner cannot exist
+    set_columns(store, job["id"], owner=f"{socket.gethostname()}:999999999")
+
+    assert store.recover()["requeued"] == 1
+
+
+def test_jobs_over_max_attempts_fail(store):
+    job = store.submit("summarize", {})
+    store.claim(["summarize"])
+    set_columns(store, job["id"], heartbeat_at=0, attempts=2)
+
+    assert store.recover()["failed"] == 1
+    failed = store.get(job["id"])
+    assert failed["status"] == "failed" and "too many times" in failed["error"]
+
+
+def test_cancellation(store):
+    running = store.submit("summarize", {})
+    queued = store.submit("summarize", {})
+    store.claim(["summarize"])
+
+    assert store.cancel(queued["id"])["status"] == "cancelled"
+    flagged = store.cancel(running["id"])
+    assert flagged["status"] == "running" and flagged["cancel_requested"]
+    assert store.update_progress(running["id"], {"done": 1})
+
+    # An abandoned job with a pending cancellation ends cancelled, not requeued
+    set_columns(store, running["id"], heartbeat_at=0)
+    assert store.recover()["cancelled"] == 1
+
+
+def test_expired_jobs_are_purged(store):
+    job = store.submit("summarize", {})
+    store.claim(["summarize"])
+    store.finish(job["id"], "succeeded", result={})
+    set_columns(store, job["id"], expires_at=time.time() - 1)
+
+    assert store.get(job["id"]) is None
+    assert store.recover()["purged"] == 1
+
+
+def test_runner_executes_and_records_failures(store):
+    ok = store.submit("double", {"value": 2})
+    bad = store.submit("double", {"value": None})
+
+    def double(payload, progress):
+        progress({"done": 0})
+        return {"value": payload["value"] * 2}
+
+    runner = JobRunner(store, {"double": double}, workers=1, poll_interval=0.05)
+    runner.start()
+    try:
+        deadline = time.time() + 5
+        while time.time() < deadline and store.counts()["queued"] + store.counts()["running"]:
+            time.sleep(0.05)
+    finally:
+        runner.stop(timeout=2)
+
+    assert store.get(ok["id"], include_result=True)["result"] == {"value": 4}
+    assert store.get(bad["id"])["status"] == "failed"
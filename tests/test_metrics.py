@@ -0,0 +1,91 @@
+"""
+Tests for the metrics registry: exposition format and merging across workers
+"""
+
+import json
+import os
+
+import pytest
+
+from app.metrics import Registry, merge_families, prepare_shared_dir, render_families
+
+# No process has this ID (above the Linux pid_max limit)
+DEAD_PID = 2 ** 23
+
+
+def worker_registry(requests, in_flight, latencies):
+    registry = Registry(prefix="t_")
+    registry.counter("requests_total", "Requests", ("route",)).labels("/a").inc(requests)
+    registry.gauge("in_flight", "Requests in flight").set(in_flight)
+    histogram = registry.histogram("latency_seconds", "Latency", (0.1, 1.0))
+    for value in latencies:
+        histogram.observe(value)
+    return registry
+
+
+def samples(families, name):
+    family = next(f for f in families if f["name"] == name)
+    return {tuple(sorted(labels.items())): value for labels, value in family["samples"]}
+
+
+def test_render_uses_the_exposition_format():
+    registry = worker_registry(3, 1, [0.05, 5.0])
+    registry.register("broken", "Fails", "gauge", lambda: 1 / 0)
+
+    assert registry.render().splitlines() == [
+        "# HELP t_requests_total Requests",
+        "# TYPE t_requests_total counter",
+        't_requests_total{route="/a"} 3',
+        "# HELP t_in_flight Requests in flight",
+        "# TYPE t_in_flight gauge",
+        "t_in_flight 1",
+        "# HELP t_latency_seconds Latency",
+        "# TYPE t_latency_seconds histogram",
+        't_latency_seconds_bucket{le="0.1"} 1',
+        't_latency_seconds_bucket{le="1"} 1',
+        't_latency_seconds_bucket{le="+Inf"} 2',
+        "t_latency_seconds_sum 5.05",
+        "t_latency_seconds_count 2",
+        "# t_broken unavailable: division by zero",
+    ]
+
+
+def test_merge_sums_counters_and_labels_gauges_per_worker():
+    merged = merge_families([
+        ("0", True, worker_registry(3, 1, [0.05]).collect()),
+        ("1", True, worker_registry(4, 2, [0.5, 5.0]).collect()),
+        ("1", False, worker_registry(10, 7, [0.05]).collect()),  # exited worker 1 before a restart
+    ])
+
+    assert samples(merged, "t_requests_total") == {(("route", "/a"),): 17}
+    assert samples(merged, "t_in_flight") == {(("worker", "0"),): 1, (("worker", "1"),): 2}
+    latency = samples(merged, "t_latency_seconds")[()]
+    assert latency["buckets"] == [["0.1", 2], ["1", 3], ["+Inf", 4]]
+    assert (latency["count"], latency["sum"]) == (4, pytest.approx(5.6))
+    assert 't_in_flight{worker="1"} 2' in render_families(merged)
+
+
+def test_shared_registry_renders_every_worker(tmp_path):
+    directory = prepare_shared_dir(str(tmp_path))
+    other = {"pid": os.getppid(), "worker": "1", "families": worker_registry(4, 2, [0.5]).collect()}
+    (tmp_path / f"{os.getppid()}.json").write_text(json.dumps(other))
+    gone = {"pid": DEAD_PID, "worker": "1", "families": worker_registry(10, 7, []).collect()}
+    (tmp_path / f"{DEAD_PID}.json").write_text(json.dumps(gone))
+
+    registry = worker_registry(3, 1, [0.05])
+    registry.share(directory, 0, interval=3600)
+    text = registry.render()
+
+    assert 't_requests_total{route="/a"} 17' in text
+    assert 't_in_flight{worker="0"} 1' in text and 't_in_flight{worker="1"} 2' in text
+    assert "t_latency_seconds_count 2" in text
+    assert os.path.exists(tmp_path / f"{os.getpid()}.json")
+
+
+def test_prepare_shared_dir_drops_old_snapshots(tmp_path):
+    (tmp_path / "123.json").write_text("{}")
+    (tmp_path / "notes.txt").write_text("kept")
+
+    assert prepare_shared_dir(str(tmp_path)) == str(tmp_path)
+    assert os.listdir(tmp_path) == ["notes.txt"]
+    assert os.path.isdir(prepare_shared_dir())
@@ -0,0 +1,23 @@
+"""
+Tests for the ONNX Runtime backend: export and parity with PyTorch
+"""
+
+import pytest
+
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+from app.onnx_backend import check_parity, export_onnx
+
+
+def test_exported_model_matches_pytorch(tiny_model_dir, tmp_path, document):
+    onnx_dir = str(tmp_path / "onnx")
+    export_onnx(tiny_model_dir, onnx_dir)
+    texts = [document[:300], "The invoice is due in March.", document]
+
+    report = check_parity(tiny_model_dir, onnx_dir, texts, num_beams_options=(1, 4), max_new_tokens=24)
+
+    assert report["samples"] == 3
+    assert report["encoder_max_abs_diff"] < 1e-4
+    for beams in ("beams_1", "beams_4"):
+        assert report["generation"][beams]["exact_match_rate"] == 1.0, beams
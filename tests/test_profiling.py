@@ -0,0 +1,92 @@
+"""
+Tests for on-demand request profiling
+"""
+
+import os
+import re
+
+from app import profiling
+from app.profiling import RequestProfiler, safe_id
+
+
+def profile_ids(trace_dir):
+    return sorted({name.split('.', 1)[0] for name in os.listdir(trace_dir)})
+
+
+def test_token_gates_requested_profiles(tmp_path):
+    open_profiler = RequestProfiler(str(tmp_path))
+    guarded = RequestProfiler(str(tmp_path), token="s3cret")
+
+    assert open_profiler.wanted("1") == "requested"
+    assert open_profiler.wanted(None) is None
+    assert guarded.wanted("1") is None
+    assert guarded.wanted("s3cret") == "requested"
+
+
+def test_sampling_profiles_one_in_n(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), sample_every=3)
+
+    assert [profiler.wanted(None) for _ in range(6)] == [None, None, "sampled"] * 2
+
+
+def test_profile_files_are_named_after_the_request(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), torch_trace=False)
+    profile = profiler.begin("req-1")
+
+    assert profiling.active()
+    assert profiler.begin("req-2") is None  # one profile at a time
+    sum(range(1000))
+    paths = profiler.end(profile, {"path": "/api/summarize"})
+
+    assert not profiling.active()
+    assert re.fullmatch(r"\d{8}-\d{6}-req-1", profile.profile_id)
+    assert sorted(os.path.basename(p) for p in paths) == [f"{profile.profile_id}.pstats",
+                                                          f"{profile.profile_id}.txt"]
+    with open(paths[1], encoding='utf-8') as f:
+        assert "path: /api/summarize" in f.read()
+    again = profiler.begin("req-3")
+    assert again is not None
+    profiler.end(again)
+
+
+def test_torch_trace_is_written(tmp_path):
+    import torch
+
+    profiler = RequestProfiler(str(tmp_path))
+    profile = profiler.begin("req")
+    torch.ones(8, 8) @ torch.ones(8, 8)
+    paths = profiler.end(profile)
+
+    assert paths[-1].endswith(".trace.json") and os.path.getsize(paths[-1]) > 0
+
+
+def test_only_the_newest_traces_are_kept(tmp_path):
+    for old in ("20000101-000000-a", "20000101-000001-b"):
+        for suffix in (".pstats", ".txt", ".trace.json"):
+            (tmp_path / (old + suffix)).write_text("")
+    profiler = RequestProfiler(str(tmp_path), torch_trace=False, max_traces=2)
+    profile = profiler.begin("new")
+    profiler.end(profile)
+
+    assert profile_ids(tmp_path) == ["20000101-000001-b", profile.profile_id]
+
+
+def test_safe_id():
+    assert safe_id("../../etc/passwd") == "etc_passwd"
+    assert safe_id("a" * 100) == "a" * 64
+    assert safe_id("///") is None
+
+
+def test_flagged_api_request_is_profiled(tmp_path, monkeypatch):
+    from ui import ewb_app
+
+    monkeypatch.setattr(ewb_app, "profiler", RequestProfiler(str(tmp_path), token="t", torch_trace=False))
+    client = ewb_app.app.test_client()
+    body = {"text": "One sentence. Another one."}
+
+    plain = client.post('/api/text-info', json=body, headers={"X-Profile": "wrong"})
+    flagged = client.post('/api/text-info', json=body, headers={"X-Profile": "t", "X-Request-ID": "../abc"})
+
+    assert "X-Profile-Id" not in plain.headers
+    assert flagged.status_code == 200 and flagged.headers["X-Request-ID"] == "abc"
+    assert profile_ids(tmp_path) == [flagged.headers["X-Profile-Id"]]
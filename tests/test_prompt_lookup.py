@@ -0,0 +1,41 @@
+"""
+Tests for prompt-lookup decoding: drafts must never change greedy output
+"""
+
+import numpy as np
+import pytest
+import torch
+
+from app.prompt_lookup import PromptLookupDecoder, find_draft
+
+
+def test_find_draft_copies_after_longest_match():
+    source = np.array([5, 6, 7, 8, 6, 7, 9, 1])
+
+    assert find_draft(source, [6, 7], 2) == [8, 6]
+    assert find_draft(source, [4, 6, 7], 3, max_ngram=3) == [8, 6, 7]
+    assert find_draft(source, [42], 3) == []
+    assert find_draft(source, [6], 0) == []
+
+
+@pytest.mark.parametrize("repetition_penalty,no_repeat_ngram_size", [(1.0, 0), (1.3, 2), (1.3, 3)])
+def test_prompt_lookup_matches_greedy(summarizer, document, repetition_penalty, no_repeat_ngram_size):
+    model = summarizer.model
+    kwargs = {"max_length": 48, "min_length": 4, "repetition_penalty": repetition_penalty,
+              "no_repeat_ngram_size": no_repeat_ngram_size}
+    decoder = PromptLookupDecoder(model, num_draft_tokens=6)
+    prompts = [list(summarizer.encode("summarize: " + document))[:200]]
+    # The random model rarely copies the document, so also feed it its own greedy
+    # output: drafts then match and get accepted, not just proposed
+    first = model.generate(**summarizer.pad_inputs(prompts[:1]), num_beams=1, do_sample=False, **kwargs)
+    prompts.append(first[0, 1:].tolist() + prompts[0])
+
+    for ids in prompts:
+        inputs = summarizer.pad_inputs([ids])
+        with torch.no_grad():
+            greedy = model.generate(**inputs, num_beams=1, do_sample=False, **kwargs)
+        assert decoder.generate(**inputs, **kwargs).tolist() == greedy.tolist()
+
+    stats = decoder.stats()
+    assert stats["accepted"] > 0
+    assert stats["forward_passes"] < stats["new_tokens"]
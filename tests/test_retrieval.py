@@ -0,0 +1,75 @@
+"""
+Tests for the passage index: search, storage types and state round-trips
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from app.retrieval import PassageIndex, embed_texts
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(0)
+    matrix = rng.standard_normal((40, 16)).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def make_index(vectors, dtype="float32", lengths=None):
+    passages = [f"passage {i}" for i in range(len(vectors))]
+    return PassageIndex.from_vectors(passages, lengths or [10] * len(vectors), vectors, dtype)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_search_finds_the_matching_passage(vectors, dtype):
+    index = make_index(vectors, dtype)
+    picks = index.search(vectors[[3, 17]], top_k=1)
+
+    assert picks == [[3], [17]]
+
+
+def test_search_respects_top_k_and_token_budget(vectors):
+    index = make_index(vectors, lengths=[30] * len(vectors))
+
+    picks = index.search(vectors[:1], top_k=4, token_budget=100)[0]
+    assert len(picks) == 3 and 0 in picks and picks == sorted(picks)
+    # The best passage is kept even when it alone exceeds the budget
+    assert index.search(vectors[:1], top_k=4, token_budget=5) == [[0]]
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_state_round_trip(vectors, dtype):
+    index = make_index(vectors, dtype)
+    restored = PassageIndex.from_state(json.loads(json.dumps(index.to_state())))
+
+    assert restored.embeddings.dtype == index.embeddings.dtype
+    assert np.array_equal(restored.embeddings, index.embeddings)
+    assert restored.passages == index.passages
+    assert np.allclose(restored.scores(vectors), index.scores(vectors))
+    assert restored.search(vectors[:5]) == index.search(vectors[:5])
+
+
+def test_compact_storage_keeps_scores_close(vectors):
+    exact = make_index(vectors).scores(vectors)
+
+    assert make_index(vectors, "float16").memory_bytes() < make_index(vectors).memory_bytes()
+    assert np.abs(make_index(vectors, "float16").scores(vectors) - exact).max() < 1e-2
+    assert np.abs(make_index(vectors, "int8").scores(vectors) - exact).max() < 5e-2
+
+
+def test_unknown_dtype_is_rejected(vectors):
+    with pytest.raises(ValueError):
+        make_index(vectors, "int4")
+
+
+def test_build_embeds_every_passage(summarizer, document):
+    index = PassageIndex.build(summarizer, document, passage_tokens=48)
+
+    assert len(index) == len(summarizer.chunk_text(document, 48))
+    assert index.embeddings.shape == (len(index), summarizer.model.config.d_model)
+    assert np.allclose(np.linalg.norm(index.embeddings, axis=1), 1.0, atol=1e-5)
+    # A passage is its own nearest neighbour
+    queries = embed_texts(summarizer, index.passages[:3])
+    assert [picks[0] for picks in index.search(queries, top_k=1)] == [0, 1, 2]
@@ -0,0 +1,220 @@
+"""
+Tests for the chat session store: LRU eviction, spill and rehydrate
+"""
+
+import os
+import time
+
+import pytest
+
+from app.sessions import ChatSessionStore, check_session_id
+
+
+class FakeChatbot:
+    """The part of DocumentChatbot the store uses"""
+
+    def __init__(self):
+        self.document_context = None
+        self.loading = False
+        self.on_loaded = None
+        self.restored = False
+        self.revision = 0
+
+    def load(self, text):
+        self.document_context = text
+        self.revision += 1
+
+    def memory_bytes(self):
+        return len(self.document_context or "")
+
+    def export_state(self):
+        return {"document": self.document_context} if self.document_context else None
+
+    def restore_state(self, state):
+        self.document_context = state["document"]
+        self.restored = True
+        self.revision += 1
+
+    def clear_context(self):
+        self.document_context = None
+        self.revision += 1
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ChatSessionStore(FakeChatbot, max_bytes=250, spill_dir=str(tmp_path / "sessions"))
+
+
+def load(store, session_id, text):
+    with store.session(session_id, create=True) as bot:
+        bot.load(text)
+
+
+def test_session_ids_are_validated():
+    assert check_session_id("tab-1_A") == "tab-1_A"
+    for bad in ("", "../etc", "a" * 65, None):
+        with pytest.raises(ValueError):
+            check_session_id(bad)
+
+
+def test_missing_sessions_are_only_created_on_request(store):
+    with store.session("a") as bot:
+        assert bot is None
+    with store.session("a", create=True) as bot:
+        assert isinstance(bot, FakeChatbot)
+
+
+def test_least_recently_used_session_spills_and_rehydrates(store):
+    load(store, "a", "x" * 100)
+    load(store, "b", "y" * 100)
+    with store.session("a"):
+        pass
+    load(store, "c", "z" * 100)
+
+    stats = store.stats()
+    assert (stats["memory_sessions"], stats["disk_sessions"], stats["memory_bytes"]) == (2, 1, 200)
+
+    with store.session("b") as bot:
+        assert bot.restored and bot.document_context == "y" * 100
+    assert store.rehydrations == 1
+    # Rehydrating pushed the next least recently used session out
+    assert store.stats()["disk_sessions"] == 1
+
+
+def test_sessions_in_use_are_never_evicted(store):
+    load(store, "a", "x" * 200)
+    with store.session("a") as pinned:
+        load(store, "b", "y" * 200)
+        assert store.stats()["memory_sessions"] == 1
+        with store.session("a") as bot:
+            assert bot is pinned
+
+
+def test_loading_sessions_are_measured_when_the_load_finishes(store):
+    with store.session("a", create=True) as bot:
+        bot.loading = True
+    load(store, "b", "y" * 100)
+
+    # The background load finishes after the request released the session
+    bot.load("x" * 200)
+    bot.loading = False
+    bot.on_loaded()
+
+    stats = store.stats()
+    assert stats["memory_bytes"] <= store.max_bytes
+    assert stats["disk_sessions"] == 1
+
+
+def test_idle_sessions_are_evicted(tmp_path):
+    store = ChatSessionStore(FakeChatbot, spill_dir=str(tmp_path), idle_seconds=0.05)
+    store.IDLE_SCAN_INTERVAL = 0
+    load(store, "a", "x")
+    assert store.evict() == 0
+    time.sleep(0.1)
+
+    assert store.evict() == 1
+    assert store.stats()["disk_sessions"] == 1
+
+
+def test_empty_sessions_are_dropped_not_spilled(store):
+    with store.session("a", create=True):
+        pass
+    load(store, "b", "y" * 300)
+
+    assert not os.path.exists(store._spill_path("a"))
+    with store.session("a") as bot:
+        assert bot is None
+
+
+def test_remove_clears_memory_and_disk(store):
+    load(store, "a", "x" * 200)
+    load(store, "b", "y" * 200)
+    assert store.stats()["disk_sessions"] == 1
+
+    assert store.remove("a") and store.remove("b")
+    assert not store.remove("a")
+    stats = store.stats()
+    assert (stats["memory_sessions"], stats["disk_sessions"], stats["memory_bytes"]) == (0, 0, 0)
+
+
+def test_spilled_sessions_expire(tmp_path):
+    store = ChatSessionStore(FakeChatbot, max_bytes=0, spill_dir=str(tmp_path), max_age=60)
+    load(store, "a", "x")
+    path = os.path.join(str(tmp_path), "a.json.gz")
+    os.utime(path, (time.time() - 120, time.time() - 120))
+
+    with store.session("a") as bot:
+        assert bot is None
+    assert not os.path.exists(path)
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two stores sharing one directory, like forked server workers"""
+    stores = [ChatSessionStore(FakeChatbot, spill_dir=str(tmp_path)) for _ in range(2)]
+    for store in stores:
+        store.share()
+    return stores
+
+
+def document_of(store, session_id):
+    with store.session(session_id) as bot:
+        return bot.document_context if bot is not None else None
+
+
+def test_shared_sessions_are_seen_by_every_worker(workers):
+    first, second = workers
+    load(first, "a", "x" * 10)
+
+    assert document_of(second, "a") == "x" * 10
+    # Rehydrating keeps the file for the other workers
+    assert document_of(first, "a") == "x" * 10
+    assert first.stats()["disk_sessions"] == 1
+
+
+def test_shared_sessions_reload_when_another_worker_changes_them(workers):
+    first, second = workers
+    load(first, "a", "x")
+    assert document_of(second, "a") == "x"
+
+    load(second, "a", "y")
+    assert document_of(first, "a") == "y"
+    with first.session("a") as bot:
+        bot.clear_context()
+    assert document_of(second, "a") is None
+
+    load(first, "a", "z")
+    assert second.remove("a")
+    assert document_of(first, "a") is None
+
+
+def test_unchanged_shared_sessions_are_not_rewritten(workers):
+    first, second = workers
+    load(first, "a", "x")
+    version = first._file_version("a")
+    for _ in range(3):
+        document_of(first, "a")
+        document_of(second, "a")
+
+    assert first._file_version("a") == version
+    assert first.rehydrations == 0 and second.rehydrations == 1
+
+
+def test_evicting_a_shared_session_keeps_the_newest_file(workers, tmp_path):
+    first, second = workers
+    load(first, "a", "x")
+    document_of(second, "a")
+    load(first, "a", "y")
+
+    # The second worker's copy is stale; evicting it must not overwrite the file
+    second.max_bytes = 0
+    with second.session("b", create=True) as bot:
+        bot.load("z")
+    assert document_of(ChatSessionStore(FakeChatbot, spill_dir=str(tmp_path)), "a") == "y"
+
+
+def test_sharing_without_a_spill_dir_uses_a_temporary_one():
+    store = ChatSessionStore(FakeChatbot, spill_dir=None)
+    store.share()
+
+    assert store.shared and os.path.isdir(store.spill_dir)
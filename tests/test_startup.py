@@ -0,0 +1,106 @@
+"""
+Tests for background model loading and the routes that depend on it
+"""
+
+import threading
+
+import pytest
+
+from app.startup import ModelLoader
+from ui import ewb_app
+
+
+def gated_load(gate, fail=False):
+    """Load function that stops in "loading" until the gate opens"""
+    def load(loader):
+        loader.enter("importing")
+        loader.enter("loading")
+        assert gate.wait(5)
+        if fail:
+            raise RuntimeError("weights missing")
+        loader.enter("warming_up")
+    return load
+
+
+def test_phases_are_timed_in_order():
+    seen = []
+
+    def load(loader):
+        for phase in ("importing", "loading", "warming_up"):
+            loader.enter(phase)
+            seen.append(loader.status()["phase"])
+
+    loader = ModelLoader(load)
+
+    assert loader.status()["phase"] == "pending"
+    loader.start(background=False)
+
+    assert seen == ["importing", "loading", "warming_up"]
+    status = loader.status()
+    assert (status["phase"], status["ready"], status["error"]) == ("ready", True, None)
+    assert list(status["timings_ms"]) == ["importing", "loading", "warming_up", "total"]
+    assert "elapsed_ms" not in status
+
+
+def test_background_load_reports_progress():
+    gate = threading.Event()
+    loader = ModelLoader(gated_load(gate)).start()
+
+    status = loader.status()
+    while status["phase"] != "loading":
+        status = loader.status()
+    assert not status["ready"] and "elapsed_ms" in status
+    assert not loader.wait(0.01)
+
+    gate.set()
+    assert loader.wait(5)
+    assert "warming_up" in loader.status()["timings_ms"]
+
+
+def test_failed_load_keeps_the_error():
+    gate = threading.Event()
+    gate.set()
+    loader = ModelLoader(gated_load(gate, fail=True)).start()
+
+    assert not loader.wait(5)
+    assert loader.failed and loader.status()["error"] == "weights missing"
+
+
+@pytest.fixture
+def loading_app(monkeypatch):
+    """App whose model is still loading"""
+    gate = threading.Event()
+    loader = ModelLoader(gated_load(gate)).start()
+    for name in ("summarizer", "chat_sessions"):
+        monkeypatch.setattr(ewb_app, name, None)
+    monkeypatch.setattr(ewb_app, "model_loader", loader)
+    while loader.phase != "loading":
+        pass
+    yield ewb_app.app.test_client()
+    gate.set()
+    loader.wait(5)
+
+
+def test_model_routes_answer_503_while_loading(loading_app):
+    for path, body in (('/api/summarize', {"text": "Some text."}),
+                       ('/api/chatbot/ask', {"question": "Who?"})):
+        response = loading_app.post(path, json=body)
+        assert response.status_code == 503
+        assert response.get_json()["phase"] == "loading"
+
+    ready = loading_app.get('/api/ready')
+    assert ready.status_code == 503 and ready.get_json() == {"ready": False, "phase": "loading"}
+    assert loading_app.get('/api/health').get_json()["model_load"]["phase"] == "loading"
+    # Routes without the model keep working
+    assert loading_app.post('/api/text-info', json={"text": "One. Two."}).status_code == 200
+
+
+def test_model_routes_answer_500_after_a_failed_load(monkeypatch):
+    gate = threading.Event()
+    gate.set()
+    loader = ModelLoader(gated_load(gate, fail=True)).start(background=False)
+    monkeypatch.setattr(ewb_app, "summarizer", None)
+    monkeypatch.setattr(ewb_app, "model_loader", loader)
+
+    response = ewb_app.app.test_client().post('/api/summarize', json={"text": "Some text."})
+    assert response.status_code == 500
@@ -0,0 +1,127 @@
+"""
+Tests for DocumentSummarizer: chunking, map-reduce and batching
+"""
+
+import os
+
+import pytest
+
+from app.utils import TextProcessor
+
+
+@pytest.fixture(scope="module")
+def long_summarizer(tiny_model_dir):
+    """Summarizer with short partial summaries, so reduce levels shrink"""
+    from app.summarizer import DocumentSummarizer
+
+    return DocumentSummarizer(os.path.join(tiny_model_dir, 'model.safetensors'), tiny_model_dir,
+                              config={"RESULT_CACHE_ENABLED": False, "LONG_DOCUMENT_PARTIAL_TOKENS": 8})
+
+
+def sentences_of(text):
+    return [s for p in TextProcessor.split_paragraphs(text) for s in TextProcessor.split_sentences(p)]
+
+
+def test_chunks_stay_within_token_budget(summarizer, document):
+    chunks = summarizer.chunk_text(document, 64)
+
+    assert len(chunks) > 1
+    assert all(summarizer._count_tokens(chunk) <= 64 for chunk in chunks)
+
+
+def test_chunks_end_on_sentence_boundaries_and_keep_order(summarizer, document):
+    chunks = summarizer.chunk_text(document, 64, overlap_tokens=0)
+
+    # Without overlap every sentence appears exactly once, in document order
+    assert sentences_of(" ".join(chunks)) == sentences_of(document)
+    for chunk in chunks:
+        assert chunk.endswith(".")
+
+
+def test_overlap_repeats_trailing_sentences(summarizer, document):
+    chunks = summarizer.chunk_text(document, 64, overlap_tokens=32)
+
+    overlapping = 0
+    for previous, chunk in zip(chunks, chunks[1:]):
+        carried = sentences_of(chunk)[0]
+        # A carried sentence ends the previous chunk; chunks closed at a paragraph end carry nothing
+        if carried in previous:
+            assert previous.endswith(carried)
+            overlapping += 1
+    assert overlapping > 0
+    assert len(chunks) > len(summarizer.chunk_text(document, 64, overlap_tokens=0))
+
+
+def test_oversized_sentence_is_split_on_token_windows(summarizer):
+    chunks = summarizer.chunk_text("word " * 300, 64)
+
+    lengths = [summarizer._count_tokens(chunk) for chunk in chunks]
+    assert max(lengths) <= 64
+    assert sum(lengths) == summarizer._count_tokens("word " * 300)
+
+
+def test_summarize_long_reports_levels(long_summarizer, document):
+    result = long_summarizer.summarize_long(document, chunk_tokens=64, overlap_tokens=0, fan_in=2)
+
+    assert "error" not in result
+    assert {"summary", "summary_length", "original_length", "compression_ratio", "profile",
+            "truncated", "long_document"} <= set(result)
+    report = result["long_document"]
+    assert {"chunks", "depth", "levels", "chunk_tokens", "overlap_tokens", "fan_in",
+            "total_seconds"} <= set(report)
+    assert (report["chunk_tokens"], report["overlap_tokens"], report["fan_in"]) == (64, 0, 2)
+
+    levels = report["levels"]
+    assert report["depth"] == len(levels)
+    assert levels[0]["stage"] == "map" and levels[0]["inputs"] == report["chunks"]
+    assert levels[-1]["stage"] == "final" and levels[-1]["inputs"] == 1
+    reduces = [level["inputs"] for level in levels[1:-1]]
+    assert all(level["stage"] == "reduce" for level in levels[1:-1])
+    # Every reduce merges at most fan_in partials per input
+    previous = levels[0]["inputs"]
+    for inputs in reduces:
+        assert (previous + 1) // 2 <= inputs < previous
+        previous = inputs
+
+
+def test_summarize_long_respects_max_depth(tiny_model_dir, document):
+    from app.summarizer import DocumentSummarizer
+
+    capped = DocumentSummarizer(os.path.join(tiny_model_dir, 'model.safetensors'), tiny_model_dir,
+                                config={"RESULT_CACHE_ENABLED": False, "LONG_DOCUMENT_MAX_DEPTH": 1})
+    result = capped.summarize_long(document, chunk_tokens=64, overlap_tokens=0, fan_in=2)
+
+    assert [level["stage"] for level in result["long_document"]["levels"]] == ["map", "final"]
+
+
+def test_map_workers_follow_inference_slots(tiny_model_dir, document):
+    from app.summarizer import DocumentSummarizer
+
+    two_slots = DocumentSummarizer(os.path.join(tiny_model_dir, 'model.safetensors'), tiny_model_dir,
+                                   config={"RESULT_CACHE_ENABLED": False, "INFERENCE_SLOTS": 2,
+                                           "LONG_DOCUMENT_PARTIAL_TOKENS": 8})
+    default = two_slots.summarize_long(document, chunk_tokens=128, batch_size=2, max_length=8)
+    capped = two_slots.summarize_long(document, chunk_tokens=128, batch_size=2, max_length=8, num_workers=8)
+
+    assert default["long_document"]["workers"] == 2
+    # Workers beyond the slots would only wait for one
+    assert capped["long_document"]["workers"] == 2
+
+
+def test_summarize_long_rejects_empty_text(summarizer):
+    assert summarizer.summarize_long("   ") == {"summary": "", "error": "Empty input text"}
+
+
+def test_summarize_batch_keeps_input_order(summarizer):
+    texts = ["The invoice is due in March.", "", "Payment goes to account four. " * 5]
+    results = summarizer.summarize_batch(texts)
+
+    assert len(results) == 3
+    assert results[1]["error"] == "Empty input text"
+    assert results[0]["original_length"] == len(texts[0].split())
+    assert results[2]["original_length"] == len(texts[2].split())
+
+
+def test_fits_window(summarizer, document):
+    assert summarizer.fits_window("A short note about the invoice.")
+    assert not summarizer.fits_window(document * 2)
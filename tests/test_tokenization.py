@@ -0,0 +1,101 @@
+"""
+Tests for tokenizer loading and the token cache
+"""
+
+import os
+import shutil
+
+import pytest
+from transformers import AutoTokenizer
+
+from app.tokenization import FAST_TOKENIZER_FILE, TokenCache, build_fast_tokenizer, load_tokenizer
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model')
+
+TEXTS = [
+    "The invoice is due on March 3rd, 2024.",
+    "  Leading spaces,\ttabs and\nnew lines  ",
+    "Café naïve résumé — “quoted” text… 100% (approx.)",
+    "summarize: Payment goes to account DE89 3704 0044 0532 0130 00.",
+    "",
+]
+
+
+@pytest.fixture
+def tokenizer_dir(tmp_path):
+    """Copy of the model's tokenizer files without the fast artifact"""
+    for name in os.listdir(MODEL_DIR):
+        if name.endswith(('.json', '.model')) and name != FAST_TOKENIZER_FILE:
+            shutil.copy(os.path.join(MODEL_DIR, name), tmp_path / name)
+    return str(tmp_path)
+
+
+def test_loading_does_not_write_the_artifact(tokenizer_dir):
+    tokenizer = load_tokenizer(tokenizer_dir)
+
+    assert not os.path.exists(os.path.join(tokenizer_dir, FAST_TOKENIZER_FILE))
+    assert tokenizer("Hello world")["input_ids"][-1] == tokenizer.eos_token_id
+
+
+def test_artifact_is_built_on_request(tokenizer_dir):
+    load_tokenizer(tokenizer_dir, build_artifact=True)
+
+    assert os.path.exists(os.path.join(tokenizer_dir, FAST_TOKENIZER_FILE))
+
+
+def test_fast_artifact_matches_the_slow_tokenizer(tokenizer_dir):
+    build_fast_tokenizer(tokenizer_dir)
+    fast = load_tokenizer(tokenizer_dir)
+    slow = AutoTokenizer.from_pretrained(tokenizer_dir, use_fast=False)
+
+    assert fast.is_fast and not slow.is_fast
+    for text in TEXTS:
+        assert fast(text)["input_ids"] == slow(text)["input_ids"], text
+    assert fast.batch_decode([fast(text)["input_ids"] for text in TEXTS], skip_special_tokens=True) == \
+        slow.batch_decode([slow(text)["input_ids"] for text in TEXTS], skip_special_tokens=True)
+
+
+def test_token_cache_hits_and_misses():
+    cache = TokenCache(max_entries=4)
+    cache.put("a", [1, 2, 3])
+
+    assert cache.get("a") == (1, 2, 3)
+    assert cache.get("b") is None
+    assert cache.stats() == {"entries": 1, "tokens": 3, "hits": 1, "misses": 1}
+
+
+def test_token_cache_evicts_least_recently_used():
+    cache = TokenCache(max_entries=2)
+    cache.put("a", [1])
+    cache.put("b", [2])
+    cache.get("a")
+    cache.put("c", [3])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == (1,) and cache.get("c") == (3,)
+
+
+def test_token_cache_bounds_total_tokens():
+    cache = TokenCache(max_entries=10, max_tokens=5)
+    cache.put("a", [1, 2])
+    cache.put("b", [3, 4])
+    cache.put("c", [5, 6])
+
+    assert cache.get("a") is None
+    assert cache.stats()["tokens"] == 4
+    # Entries larger than the whole budget are not cached at all
+    cache.put("big", list(range(6)))
+    assert cache.get("big") is None and cache.get("c") == (5, 6)
+    cache.put("b", [3])
+    assert cache.stats()["tokens"] == 3
+
+
+def test_summarizer_tokenizes_repeated_text_once(summarizer):
+    text = "A text the summarizer has not seen before in this test run."
+    before = summarizer.token_cache.stats()
+    first = summarizer.encode(text)
+    assert summarizer.encode(text) == first
+    assert summarizer.encode_batch([text, text + " More."])[0] == first
+
+    after = summarizer.token_cache.stats()
+    assert (after["misses"] - before["misses"], after["hits"] - before["hits"]) == (2, 2)
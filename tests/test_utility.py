@@ -0,0 +1,65 @@
+"""
+Tests for the text utilities and the history file
+"""
+
+from app.utils import ContextBinder, HistoryManager, SentenceRanker, TextProcessor
+
+
+def test_clean_text():
+    assert TextProcessor.clean_text("  Hello,\n\tworld!  <b>ok</b> ") == "Hello, world! bokb"
+    assert TextProcessor.clean_text("") == ""
+
+
+def test_split_sentences_keeps_abbreviations_and_initials():
+    text = "Dr. Smith met J. Doe at 5 p.m. on Friday. They signed it! Did they pay? yes, later."
+
+    assert TextProcessor.split_sentences(text) == [
+        "Dr. Smith met J. Doe at 5 p.m. on Friday.",
+        "They signed it!",
+        "Did they pay? yes, later.",
+    ]
+
+
+def test_split_sentences_keeps_closing_quotes():
+    assert TextProcessor.split_sentences('He said "stop." Then he left.') == ['He said "stop."', "Then he left."]
+
+
+def test_split_paragraphs():
+    assert TextProcessor.split_paragraphs("One.\n\n  \n\nTwo\nlines.\n\n") == ["One.", "Two\nlines."]
+
+
+def test_word_count_and_reading_time():
+    text = "word " * 450
+
+    assert TextProcessor.get_word_count(text) == 450
+    assert TextProcessor.get_reading_time(text) == 2
+    assert TextProcessor.get_reading_time("short") == 1
+
+
+def test_extract_keywords_by_frequency():
+    text = "Invoice invoice invoice payment payment the and deadline 2024 ok"
+
+    assert ContextBinder.extract_keywords(text, num_keywords=2) == ["invoice", "payment"]
+    assert "2024" not in ContextBinder.extract_keywords(text, num_keywords=10)
+
+
+def test_key_sentences_are_central_and_in_order():
+    text = ("The invoice is due in March. The invoice total is paid by card. "
+            "Cats sleep all day. The March invoice is paid late.")
+    picked = SentenceRanker.key_sentences(text, num_sentences=2)
+
+    assert len(picked) == 2 and "Cats sleep all day." not in picked
+    sentences = TextProcessor.split_sentences(text)
+    assert [sentences.index(s) for s in picked] == sorted(sentences.index(s) for s in picked)
+
+
+def test_history_appends_and_searches(tmp_path):
+    history = HistoryManager(str(tmp_path / "history.json"))
+    history.add_entry("First document about invoices.", "Invoices.")
+    history.add_entry("Second document about contracts.", "Contracts.", keywords=["contract"])
+
+    assert [entry["summary"] for entry in history.get_history()] == ["Invoices.", "Contracts."]
+    assert [entry["summary"] for entry in history.get_history(limit=1)] == ["Contracts."]
+    assert [entry["summary"] for entry in history.search_history("invoice")] == ["Invoices."]
+    history.clear_history()
+    assert history.get_history() == []
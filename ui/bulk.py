@@ -0,0 +1,348 @@
+"""
+Bulk summarization for the CLI
+Summarizes a directory, glob or JSONL corpus across worker processes and
+appends results to a JSONL file that doubles as the resume checkpoint
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import logging
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from app.config import Config
+from app.utils import TextProcessor
+
+logger = logging.getLogger(__name__)
+
+# File types picked up when the input is a directory
+TEXT_EXTENSIONS = ('.txt', '.md')
+
+# Summarizer loaded once per worker process by _init_worker
+_worker_summarizer = None
+
+
+def list_documents(source, text_field='text', id_field='id', context_field='context'):
+    """
+    Enumerate the documents of a bulk input
+
+    Args:
+        source: Directory (text files, recursive), glob pattern, or .jsonl file
+                with one {"id": ..., "text": ..., "context": ...} object per line
+        text_field: JSONL key holding the text
+        id_field: JSONL key holding the document ID (default: line number)
+        context_field: JSONL key holding optional context
+
+    Returns:
+        tuple: (document count, iterator of document dicts with "id" and
+               either "path" or "text"/"context")
+
+    Raises:
+        ValueError: When the source matches nothing
+    """
+    if source.endswith('.jsonl') and os.path.isfile(source):
+        with open(source, 'r', encoding='utf-8') as f:
+            total = sum(1 for line in f if line.strip())
+
+        def records():
+            with open(source, 'r', encoding='utf-8') as f:
+                for number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        yield {"id": f"line-{number}", "error": f"Invalid JSON: {e}"}
+                        continue
+                    yield {
+                        "id": str(record.get(id_field) or f"line-{number}"),
+                        "text": record.get(text_field) or "",
+                        "context": record.get(context_field),
+                    }
+
+        return total, records()
+
+    if os.path.isdir(source):
+        paths = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(source)
+            for name in names if name.lower().endswith(TEXT_EXTENSIONS)
+        )
+        base = source
+    else:
+        paths = sorted(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+        base = os.path.dirname(source.split('*', 1)[0]) or '.'
+
+    if not paths:
+        raise ValueError(f"No documents found in '{source}'")
+    return len(paths), ({"id": os.path.relpath(path, base), "path": path} for path in paths)
+
+
+def read_checkpoint(output_path):
+    """
+    Collect the IDs already summarized in an output file
+
+    Only successful records count: documents that failed (e.g. a transient
+    error) are summarized again, and their error records are removed so
+    the new record replaces them. A trailing line cut off by a crash is
+    removed too, so appending resumes on a clean line boundary.
+
+    Args:
+        output_path: Output JSONL file
+
+    Returns:
+        set: Document IDs with a summary
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+
+    valid_bytes = 0
+    failed = 0
+    with open(output_path, 'rb') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if not line.endswith(b'\n'):
+                break
+            if record.get("error"):
+                failed += 1
+            else:
+                completed.add(str(record.get("id")))
+            valid_bytes += len(line)
+
+    if failed:
+        logger.info(f"Retrying {failed} failed documents from {output_path}")
+        _drop_failed_records(output_path, valid_bytes)
+    elif valid_bytes < os.path.getsize(output_path):
+        logger.warning(f"Dropping incomplete trailing record in {output_path}")
+        with open(output_path, 'r+b') as f:
+            f.truncate(valid_bytes)
+    return completed
+
+
+def _drop_failed_records(output_path, valid_bytes):
+    """Rewrite an output file without its error records and anything past valid_bytes"""
+    tmp_path = output_path + ".tmp"
+    with open(output_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        read = 0
+        for line in src:
+            read += len(line)
+            if read > valid_bytes:
+                break
+            if not json.loads(line).get("error"):
+                dst.write(line)
+        dst.flush()
+        os.fsync(dst.fileno())
+    os.replace(tmp_path, output_path)
+
+
+def _init_worker(model_dir, config):
+    """Worker initializer: load the summarizer once per process"""
+    global _worker_summarizer
+    from app.summarizer import DocumentSummarizer
+
+    logging.getLogger().setLevel(logging.WARNING)
+    _worker_summarizer = DocumentSummarizer(os.path.join(model_dir, 'model.safetensors'), model_dir,
+                                            config=config)
+
+
+def _summarize_documents(documents, profile=None):
+    """
+    Summarize one batch of documents in a worker
+
+    Args:
+        documents: Document dicts from list_documents()
+        profile: Generation profile name
+
+    Returns:
+        list: One output record per document ("id" plus the summarize() result)
+    """
+    records = [{"id": document["id"]} for document in documents]
+    texts, contexts, positions = [], [], []
+    for i, document in enumerate(documents):
+        try:
+            if document.get("error"):
+                raise ValueError(document["error"])
+            if "path" in document:
+                with open(document["path"], 'r', encoding='utf-8', errors='replace') as f:
+                    text = f.read()
+            else:
+                text = document["text"]
+            text = TextProcessor.clean_text(text)
+            if not text.strip():
+                raise ValueError("Empty input text")
+        except (OSError, ValueError) as e:
+            records[i]["error"] = str(e)
+            continue
+        texts.append(text)
+        contexts.append(document.get("context"))
+        positions.append(i)
+
+    if texts:
+        results = _worker_summarizer.summarize_batch(
+            texts,
+            contexts=contexts if any(contexts) else None,
+            use_cache=False,
+            profile=profile,
+        )
+        for i, result in zip(positions, results):
+            records[i].update(result)
+    return records
+
+
+def _batches(documents, batch_size):
+    """Group an iterator of documents into lists of batch_size"""
+    while True:
+        batch = list(islice(documents, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def format_duration(seconds):
+    """Format seconds as H:MM:SS"""
+    seconds = int(max(0, seconds))
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class BulkProgress:
+    """Counts finished documents and reports throughput and ETA"""
+
+    def __init__(self, total, interval=5.0, stream=None):
+        """
+        Initialize progress tracker
+
+        Args:
+            total: Documents to process in this run
+            interval: Seconds between progress lines
+            stream: Output stream (default: stderr)
+        """
+        self.total = total
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self.done = 0
+        self.failed = 0
+        self.words = 0
+        self.started = time.perf_counter()
+        self._last_report = self.started
+
+    def update(self, records):
+        """Count a finished batch and print a progress line when due"""
+        self.done += len(records)
+        self.failed += sum(1 for record in records if record.get("error"))
+        self.words += sum(record.get("original_length", 0) for record in records)
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report()
+
+    def report(self):
+        """Print done/total, documents and words per second and the ETA"""
+        elapsed = time.perf_counter() - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.done) / rate if rate > 0 else 0.0
+        print(f"{self.done}/{self.total} documents ({self.failed} failed) | "
+              f"{rate:.2f} docs/s | {self.words / elapsed if elapsed > 0 else 0:.0f} words/s | "
+              f"elapsed {format_duration(elapsed)} | ETA {format_duration(eta)}",
+              file=self.stream, flush=True)
+
+
+def run_bulk(source, output_path, workers=1, batch_size=16, profile=None, model_dir=None,
+             resume=True, text_field='text', id_field='id', context_field='context',
+             progress_interval=5.0):
+    """
+    Summarize a corpus into a JSONL file
+
+    Every worker process loads the model once and summarizes batches of
+    documents with summarize_batch(). Records are appended (one JSON object
+    per line) as batches finish, so output order follows completion, not
+    input order. With resume, IDs already summarized in the output are
+    skipped, so a crashed or interrupted run continues where it stopped;
+    failed documents are tried again.
+
+    Args:
+        source: Directory, glob pattern or .jsonl file (see list_documents())
+        output_path: Output JSONL file
+        workers: Worker processes (1 = summarize in this process)
+        batch_size: Documents per summarize_batch() call
+        profile: Generation profile name
+        model_dir: Directory with model and tokenizer files (default: MODEL_DIR)
+        resume: Skip documents already summarized in the output (False overwrites it)
+        text_field / id_field / context_field: JSONL keys
+        progress_interval: Seconds between progress lines
+
+    Returns:
+        dict: Processed, failed and skipped counts and elapsed seconds
+    """
+    global _worker_summarizer
+    total, documents = list_documents(source, text_field, id_field, context_field)
+    completed = read_checkpoint(output_path) if resume else set()
+    if not resume and os.path.exists(output_path):
+        open(output_path, 'w').close()
+    if completed:
+        print(f"Resuming: {len(completed)} documents already in {output_path}", file=sys.stderr)
+
+    pending = (document for document in documents if document["id"] not in completed)
+    remaining = max(0, total - len(completed))
+    batches = _batches(pending, batch_size)
+
+    # Split the cores between the workers instead of every worker using all of them
+    threads = max(1, (os.cpu_count() or 1) // max(1, workers))
+    config = {"RESULT_CACHE_ENABLED": False, "INFERENCE_INTRA_OP_THREADS": threads}
+    model_dir = model_dir or Config.MODEL_DIR
+    progress = BulkProgress(remaining, progress_interval)
+    print(f"Summarizing {remaining} of {total} documents with {workers} workers "
+          f"(batch size {batch_size})...", file=sys.stderr)
+
+    last_sync = time.monotonic()
+    with open(output_path, 'a', encoding='utf-8') as out:
+
+        def write(records):
+            nonlocal last_sync
+            out.write("".join(json.dumps(record) + "\n" for record in records))
+            out.flush()
+            if time.monotonic() - last_sync >= progress_interval:
+                os.fsync(out.fileno())
+                last_sync = time.monotonic()
+            progress.update(records)
+
+        try:
+            if workers <= 1:
+                _init_worker(model_dir, config)
+                for batch in batches:
+                    write(_summarize_documents(batch, profile))
+            else:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(model_dir, config)) as pool:
+                    # Keep a bounded number of batches in flight so large
+                    # corpora are never read into memory at once
+                    in_flight = set()
+                    for batch in batches:
+                        if len(in_flight) >= workers * 2:
+                            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                write(future.result())
+                        in_flight.add(pool.submit(_summarize_documents, batch, profile))
+                    for future in wait(in_flight).done:
+                        write(future.result())
+        except KeyboardInterrupt:
+            print("\nInterrupted; run the same command again to resume", file=sys.stderr)
+            raise
+        finally:
+            out.flush()
+            os.fsync(out.fileno())
+            _worker_summarizer = None
+            progress.report()
+
+    return {
+        "processed": progress.done,
+        "failed": progress.failed,
+        "skipped": len(completed),
+        "seconds": round(time.perf_counter() - progress.started, 3),
+    }
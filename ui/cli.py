@@ -6,11 +6,13 @@ Quick access to summarization features from terminal
 import argparse
 import sys
 import os
+import time
 from pathlib import Path
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from app.config import Config
 from app.summarizer import DocumentSummarizer
 from app.utils import TextProcessor, ContextBinder, HistoryManager
 
@@ -33,6 +35,16 @@ Examples:
   
   # Get text statistics
   python cli.py -f document.txt --stats
+  
+  # Fast (greedy) summary that must finish within 2 seconds
+  python cli.py -f document.txt --profile fast --deadline-ms 2000
+  
+  # Write a Python profile and torch operator trace of the summarization
+  python cli.py -f document.txt --trace /tmp/traces
+  
+  # Bulk: summarize a directory, glob or JSONL corpus into JSONL (resumable)
+  python cli.py --bulk corpus.jsonl -o summaries.jsonl --workers 4
+  python cli.py --bulk "docs/**/*.txt" -o summaries.jsonl --profile fast
         '''
     )
     
@@ -42,10 +54,30 @@ Examples:
     parser.add_argument('--keywords', type=int, nargs='?', const=5, help='Extract N keywords')
     parser.add_argument('--stats', action='store_true', help='Show text statistics')
     parser.add_argument('--length', type=int, help='Maximum summary length')
+    parser.add_argument('--profile', choices=sorted(Config.GENERATION_PROFILES),
+                        help=f'Generation profile (default: {Config.DEFAULT_GENERATION_PROFILE})')
+    parser.add_argument('--deadline-ms', type=float, help='Latency deadline for the summary in milliseconds')
     parser.add_argument('-o', '--output', type=str, help='Output file path')
+    parser.add_argument('--trace', type=str, nargs='?', const=Config.PROFILING_TRACE_DIR, metavar='DIR',
+                        help='Profile the summarization and write trace files to DIR '
+                             '(default: PROFILING_TRACE_DIR)')
+    
+    bulk = parser.add_argument_group('bulk mode')
+    bulk.add_argument('--bulk', type=str, metavar='INPUT',
+                      help='Directory, glob or .jsonl corpus to summarize into the -o JSONL file')
+    bulk.add_argument('--workers', type=int, default=1, help='Worker processes, each loading the model once')
+    bulk.add_argument('--batch-size', type=int, default=16, help='Documents per batched generate call')
+    bulk.add_argument('--no-resume', action='store_true', help='Overwrite the output instead of resuming')
+    bulk.add_argument('--model-dir', type=str, help='Model directory (default: MODEL_DIR)')
+    bulk.add_argument('--text-field', type=str, default='text', help='JSONL key with the text')
+    bulk.add_argument('--id-field', type=str, default='id', help='JSONL key with the document ID')
     
     args = parser.parse_args()
     
+    if args.bulk:
+        run_bulk_mode(parser, args)
+        return
+    
     # Validate arguments
     if not args.file and not args.text:
         parser.print_help()
@@ -75,7 +107,8 @@ Examples:
     tokenizer_path = project_root
     
     print("Loading model...")
-    summarizer = DocumentSummarizer(model_path, tokenizer_path)
+    # One-off runs never reuse a summary; caching would only write it to disk
+    summarizer = DocumentSummarizer(model_path, tokenizer_path, config={"RESULT_CACHE_ENABLED": False})
     
     # Show statistics if requested
     if args.stats:
@@ -105,7 +138,21 @@ Examples:
         print("="*60)
         print("Processing...")
         
-        result = summarizer.summarize_with_context(text, args.context, args.length)
+        trace = None
+        if args.trace:
+            from app.profiling import Profile
+            trace = Profile(f"{time.strftime('%Y%m%d-%H%M%S')}-cli-{os.getpid()}", args.trace,
+                            torch_trace=Config.PROFILING_TORCH_TRACE)
+            trace.start()
+        try:
+            result = summarizer.summarize_with_context(text, args.context, args.length,
+                                                       profile=args.profile,
+                                                       deadline_ms=args.deadline_ms)
+        finally:
+            if trace is not None:
+                trace.stop()
+                for path in trace.write({"command": " ".join(sys.argv)}):
+                    print(f"Trace written to: {path}")
         
         if result.get('error'):
             print(f"Error: {result['error']}")
@@ -114,7 +161,11 @@ Examples:
         summary = result.get('summary', '')
         print(f"\nOriginal Length: {result.get('original_length', 0)} words")
         print(f"Summary Length: {result.get('summary_length', 0)} words")
-        print(f"Compression Ratio: {result.get('compression_ratio', 0)}x\n")
+        print(f"Compression Ratio: {result.get('compression_ratio', 0)}x")
+        print(f"Profile: {result.get('profile')}")
+        if result.get('truncated'):
+            print("Note: the deadline was reached and the summary was cut short")
+        print()
         print("SUMMARY:")
         print("-" * 60)
         print(summary)
@@ -127,5 +178,36 @@ Examples:
             print(f"\nSummary saved to: {args.output}")
 
 
+def run_bulk_mode(parser, args):
+    """Run --bulk: summarize a whole corpus into a JSONL file"""
+    from ui.bulk import run_bulk
+    
+    if not args.output:
+        parser.error("--bulk requires -o/--output (a .jsonl file)")
+    if args.workers < 1 or args.batch_size < 1:
+        parser.error("--workers and --batch-size must be at least 1")
+    
+    try:
+        stats = run_bulk(
+            args.bulk, args.output,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            profile=args.profile,
+            model_dir=args.model_dir,
+            resume=not args.no_resume,
+            text_field=args.text_field,
+            id_field=args.id_field,
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    
+    print(f"\nProcessed {stats['processed']} documents ({stats['failed']} failed, "
+          f"{stats['skipped']} already done) in {stats['seconds']}s")
+    print(f"Results written to: {args.output}")
+
+
 if __name__ == '__main__':
     main()
@@ -4,51 +4,72 @@ Main Flask app with routes and API endpoints
 """
 
 import os
+import json
+import time
+import uuid
 import logging
-import torch
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import (Flask, Response, g, render_template, request, jsonify, send_from_directory,
+                   stream_with_context)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Import app components
+# Import app components (torch/transformers are imported by the model loader)
 from app import create_app
-from dev_fix import FixedDocumentSummarizer as DocumentSummarizer
-from app.chatbot import DocumentChatbot
 from app.utils import TextProcessor, ContextBinder, HistoryManager
+from app.batching import BatchScheduler
+from app.startup import ModelLoader
+from app.jobs import JobStore, JobRunner, FINISHED_STATES, JOB_STATES
+from app.metrics import REGISTRY, STAGE_BUCKETS_SECONDS, prepare_shared_dir, stage
+from app.sessions import ChatSessionStore, check_session_id
+from app.cache import AnswerCache
+from app import serving
+from app import profiling
 
-# Create Flask app instance so route decorators work at import time
-app = create_app()
-"""
-Flask web application for Document Summarizer
-Main Flask app with routes and API endpoints
-"""
-
-import os
-import logging
-import torch
-from flask import Flask, render_template, request, jsonify, send_from_directory
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-# Import app components
-from app import create_app
-from dev_fix import FixedDocumentSummarizer as DocumentSummarizer
-from app.chatbot import DocumentChatbot
-from app.utils import TextProcessor, ContextBinder, HistoryManager
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 # Create Flask app instance so route decorators work at import time
 app = create_app()
 summarizer = None
-chatbot = None
+chat_sessions = None
+answer_cache = None
 history_manager = None
+scheduler = None
+model_loader = None
+job_store = None
+job_runner = None
+profiler = None
+_jobs_autostart = True
+
+# Directory the prefork workers share metric snapshots through (set before forking)
+_metrics_dir = None
 
-def initialize_app():
-    """Initialize the Flask app and all components"""
-    global app, summarizer, chatbot, history_manager
+# Model classes, imported by the model loader unless already set (e.g. patched in tests)
+DocumentSummarizer = None
+DocumentChatbot = None
+
+# Chat session used by clients that send no session ID
+DEFAULT_SESSION_ID = "default"
+
+def initialize_app(background=None, start_jobs=True):
+    """
+    Initialize the Flask app and all components
+    
+    Lightweight components are ready on return. The model is loaded by a
+    ModelLoader: in the background when MODEL_LOAD_BACKGROUND is set (the
+    server can bind at once; model routes answer 503 until /api/ready
+    does), otherwise before this returns.
+    
+    Jobs submitted to /api/jobs are queued at once and run when the model
+    is ready.
+    
+    Args:
+        background: Override MODEL_LOAD_BACKGROUND
+        start_jobs: Start the job runner once the model is loaded (the
+                    prefork server starts one per worker instead)
+    """
+    global app, history_manager, model_loader, job_store, profiler, _jobs_autostart
     # Note: `app` is created at import time so route decorators are bound.
     
     # Set up logging
@@ -57,43 +78,539 @@ def initialize_app():
         file_handler.setLevel(logging.INFO)
         app.logger.addHandler(file_handler)
     
-    global summarizer, chatbot, history_manager
-    # Initialize summarizer
-    try:
-        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        model_path = os.path.join(project_root, 'model.safetensors')
-        tokenizer_path = project_root
-
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        logger.info(f"Using device: {device}")
-
-        summarizer = DocumentSummarizer(model_path, tokenizer_path, device, config=app.config)
-        logger.info("Summarizer initialized successfully!")
-
-    except Exception as e:
-        logger.error(f"Error initializing summarizer: {e}")
-        summarizer = None
-
-    # Initialize chatbot
-    if summarizer:
-        chatbot = DocumentChatbot(summarizer)
-        logger.info("Chatbot initialized successfully!")
-    else:
-        chatbot = None
-
     # Initialize history manager
     try:
-        history_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                                   'data', 'history.json')
+        history_file = os.path.join(PROJECT_ROOT, 'data', 'history.json')
         history_manager = HistoryManager(history_file)
         logger.info("History manager initialized successfully!")
     except Exception as e:
         logger.error(f"Error initializing history manager: {e}")
         history_manager = None
 
+    # Open the job queue; jobs left over from a previous run are picked up again
+    if app.config.get('JOBS_ENABLED'):
+        try:
+            job_store = JobStore(
+                app.config['JOBS_DB_PATH'],
+                result_ttl=app.config.get('JOB_RESULT_TTL', 24 * 3600),
+                lease_seconds=app.config.get('JOB_LEASE_SECONDS', 60),
+                max_attempts=app.config.get('JOB_MAX_ATTEMPTS', 3),
+            )
+            logger.info("Job store initialized successfully!")
+        except Exception as e:
+            logger.error(f"Error initializing job store: {e}")
+            job_store = None
+    _jobs_autostart = start_jobs
+
+    # Per-request profiling is opt-in; flags are ignored unless it is enabled
+    if app.config.get('PROFILING_ENABLED'):
+        profiler = profiling.RequestProfiler(
+            app.config['PROFILING_TRACE_DIR'],
+            token=app.config.get('PROFILING_TOKEN'),
+            sample_every=app.config.get('PROFILING_SAMPLE_EVERY', 0),
+            torch_trace=app.config.get('PROFILING_TORCH_TRACE', True),
+            max_traces=app.config.get('PROFILING_MAX_TRACES', 200),
+        )
+        logger.info(f"Request profiling enabled (traces in {profiler.trace_dir})")
+
+    # Load the model stack
+    if background is None:
+        background = app.config.get('MODEL_LOAD_BACKGROUND', False)
+    model_loader = ModelLoader(_load_model_components).start(background=background)
+
     return app
 
 
+def _load_model_components(loader):
+    """
+    Import the model stack, load the summarizer and chat sessions and warm them up
+    
+    Components are published to the module globals only once warmup has
+    finished, so requests never see a half-initialized model.
+    
+    Args:
+        loader: ModelLoader running this function
+    """
+    global summarizer, chat_sessions, answer_cache, scheduler, DocumentSummarizer, DocumentChatbot
+
+    loader.enter("importing")
+    import torch
+    if DocumentSummarizer is None:
+        from dev_fix import FixedDocumentSummarizer as DocumentSummarizer
+    if DocumentChatbot is None:
+        from app.chatbot import DocumentChatbot
+
+    # Initialize summarizer
+    loader.enter("loading")
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    logger.info(f"Using device: {device}")
+
+    model_dir = app.config.get('MODEL_DIR') or PROJECT_ROOT
+    model = DocumentSummarizer(os.path.join(model_dir, 'model.safetensors'), model_dir, device,
+                               config=app.config)
+    logger.info("Summarizer initialized successfully!")
+
+    # Run generate at typical shapes so first requests skip one-time costs
+    if app.config.get('WARMUP_ENABLED'):
+        loader.enter("warming_up")
+        try:
+            model.warmup()
+        except Exception as e:
+            logger.warning(f"Warmup failed: {e}")
+
+    # Chatbot answers, shared by all sessions (same document, same answers)
+    answers = None
+    if app.config.get('CHATBOT_ANSWER_CACHE_ENABLED'):
+        answers = AnswerCache(
+            max_documents=app.config.get('CHATBOT_ANSWER_CACHE_DOCUMENTS', 256),
+            max_entries=app.config.get('CHATBOT_ANSWER_CACHE_ENTRIES', 128),
+            threshold=app.config.get('CHATBOT_ANSWER_CACHE_SIMILARITY'),
+        )
+
+    # Initialize chat sessions (one chatbot per session, sharing the model)
+    sessions = ChatSessionStore(
+        lambda: DocumentChatbot(model, answer_cache=answers),
+        max_bytes=app.config.get('CHAT_SESSIONS_MAX_BYTES', 256 * 1024 * 1024),
+        spill_dir=app.config.get('CHAT_SESSIONS_DIR'),
+        idle_seconds=app.config.get('CHAT_SESSION_IDLE_SECONDS'),
+        max_age=app.config.get('CHAT_SESSION_MAX_AGE'),
+    )
+    logger.info("Chat sessions initialized successfully!")
+
+    # Initialize request batching in front of the model
+    if scheduler:
+        scheduler.stop()
+        scheduler = None
+    chat_sessions, answer_cache, summarizer = sessions, answers, model
+    if app.config.get('BATCHING_ENABLED'):
+        scheduler = _build_scheduler()
+        logger.info("Batch scheduler initialized successfully!")
+
+    if _jobs_autostart:
+        _start_job_runner()
+
+
+def serve_prefork(host, port, workers):
+    """
+    Serve the initialized app from forked worker processes
+    
+    Call after initialize_app(background=False): the model is loaded once
+    here and the workers share its weights copy-on-write.
+    
+    Args:
+        host: Bind address
+        port: Bind port
+        workers: Number of worker processes
+    
+    The workers share one socket, so a session's next request can land on
+    any worker: chat sessions are shared through their files in
+    CHAT_SESSIONS_DIR (see ChatSessionStore.share), and /api/metrics
+    merges the metrics of all workers (see Registry.share).
+    """
+    global _metrics_dir
+    if workers > 1:
+        _metrics_dir = prepare_shared_dir(app.config.get('METRICS_MULTIPROCESS_DIR'))
+    if workers > 1 and chat_sessions is not None:
+        chat_sessions.share()
+        logger.info(f"Chat sessions shared by {workers} workers through {chat_sessions.spill_dir}")
+    serving.PreforkServer(
+        app, host, port, workers,
+        pre_fork=_before_fork,
+        post_fork=lambda index: _after_fork(index, workers),
+        graceful_timeout=app.config.get('SERVER_GRACEFUL_TIMEOUT', 30),
+    ).run()
+
+
+def _before_fork():
+    """Stop threads in the master; they do not survive fork"""
+    global scheduler, job_runner
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    if scheduler:
+        scheduler.stop()
+        scheduler = None
+    if job_runner:
+        job_runner.stop()
+        job_runner = None
+
+
+def _after_fork(index, workers):
+    """Per-worker setup: shared metrics, an inference executor on this worker's share of cores, a fresh batch scheduler and job runner"""
+    global scheduler
+    if _metrics_dir:
+        REGISTRY.share(_metrics_dir, index, interval=app.config.get('METRICS_SNAPSHOT_INTERVAL', 5.0))
+    if summarizer is None:
+        return
+    from app.inference import available_cores
+    cores = available_cores()
+    share = max(1, len(cores) // workers)
+    worker_cores = cores[index * share:(index + 1) * share] or cores
+    executor = summarizer.reset_executor(cores=worker_cores)
+    if app.config.get('BATCHING_ENABLED'):
+        scheduler = _build_scheduler()
+    _start_job_runner()
+    logger.info(f"Worker {index} (pid {os.getpid()}) ready with {executor.slots} inference slots "
+                f"x {executor.intra_op_threads} torch threads")
+
+
+def _model_unavailable(component="Summarizer"):
+    """
+    Error response for model routes called before the model is available
+    
+    Returns:
+        tuple: (response, 503) while loading, (response, 500) when loading failed
+    """
+    if model_loader is not None and not model_loader.failed:
+        status = model_loader.status()
+        return jsonify({"error": "Model is loading, try again shortly",
+                        "phase": status["phase"]}), 503
+    return jsonify({"error": f"{component} not initialized"}), 500
+
+
+def _build_scheduler():
+    """Create the micro-batching scheduler for the model-backed routes"""
+    # Requests are grouped by cache flag and profile, so each batch shares one
+    handlers = {
+        "summarize": lambda items: summarizer.summarize_batch(
+            [text for text, _, _ in items], use_cache=items[0][1], profile=items[0][2]
+        ),
+        "summarize_context": lambda items: summarizer.summarize_batch(
+            [text for text, _, _, _ in items],
+            contexts=[context for _, context, _, _ in items],
+            use_cache=items[0][2],
+            profile=items[0][3]
+        ),
+    }
+    # Chatbot requests are grouped by session and profile; the payload carries the session's chatbot
+    handlers["chatbot_ask"] = lambda items: items[0][0].answer_batch(
+        [question for _, question, _ in items], profile=items[0][2]
+    )
+
+    return BatchScheduler(
+        handlers,
+        window_ms=app.config.get('BATCH_WINDOW_MS', 10),
+        max_batch_size=app.config.get('BATCH_MAX_SIZE', 8),
+    )
+
+
+def _start_job_runner():
+    """Start draining the job queue with the loaded summarizer"""
+    global job_runner
+    if job_store is None or job_runner is not None:
+        return
+    job_runner = JobRunner(
+        job_store,
+        {"summarize": _run_summarize_job},
+        workers=app.config.get('JOB_WORKERS', 1),
+        poll_interval=app.config.get('JOB_POLL_INTERVAL', 1.0),
+    )
+    job_runner.start()
+
+
+def _run_summarize_job(payload, progress):
+    """
+    Job handler for /api/jobs: summarize like /api/summarize(-context)
+    
+    Args:
+        payload: Cleaned text, optional context / max_length / profile / bypass_cache
+        progress: Job progress callback, passed on to the summarizer
+    
+    Returns:
+        dict: Summary result with keywords
+    """
+    text = payload["text"]
+    context = payload.get("context")
+    options = {
+        "max_length": payload.get("max_length"),
+        "use_cache": not payload.get("bypass_cache", False),
+        "profile": payload.get("profile"),
+        "progress": progress,
+    }
+    if context:
+        result = summarizer.summarize_with_context(text, context, **options)
+    else:
+        result = summarizer.summarize(text, **options)
+    if result.get("error"):
+        return result
+
+    with stage("keywords"):
+        keywords = ContextBinder.extract_keywords(text, num_keywords=5)
+    result["keywords"] = keywords
+    if history_manager:
+        history_manager.add_entry(text, result.get('summary', ''), context, keywords)
+    return result
+
+
+def _run_model_request(kind, payload, direct, group=None, batchable=True):
+    """
+    Run a model request through the batch scheduler when it is enabled
+    
+    Args:
+        kind: Scheduler handler name
+        payload: Handler payload for this request
+        direct: Zero-argument callable used when batching is disabled
+        group: Optional key; only requests with equal keys share a batch
+        batchable: False runs the request directly (e.g. it has a deadline,
+                   or is long enough for map-reduce, which would hold the
+                   scheduler thread and stall every queued request)
+    
+    Profiled requests always run directly so the model call lands in
+    their profile rather than on a scheduler thread.
+    
+    Returns:
+        The result for this request
+    
+    Raises:
+        TimeoutError: When a batched request waited BATCH_TIMEOUT_SECONDS
+    """
+    if scheduler and batchable and not profiling.active():
+        return scheduler.run(kind, payload, group=group, timeout=app.config.get('BATCH_TIMEOUT_SECONDS'))
+    return direct()
+
+
+def _generation_options(data):
+    """
+    Read the generation profile and latency deadline from a request body
+    
+    Args:
+        data: Request JSON (optional "profile" and "deadline_ms")
+    
+    Returns:
+        dict: profile / deadline_ms keyword arguments for the model calls
+    
+    Raises:
+        ValueError: For an unknown profile or a non-positive deadline
+    """
+    profile = data.get('profile') or None
+    if profile is not None and summarizer:
+        summarizer.generation_profile(profile)
+
+    deadline_ms = data.get('deadline_ms')
+    if deadline_ms is not None:
+        deadline_ms = float(deadline_ms)
+        if deadline_ms <= 0:
+            raise ValueError("deadline_ms must be positive")
+    return {"profile": profile, "deadline_ms": deadline_ms}
+
+
+def _decoding_options(data):
+    """
+    Read the streaming decoder options from a request body
+    
+    Args:
+        data: Request JSON ("decoder": "greedy" or "sample", plus optional
+              "temperature", "top_k" and "top_p" for sampling)
+    
+    Returns:
+        dict: Keyword arguments for summarize_stream / answer_question_stream
+    
+    Raises:
+        ValueError: For an unknown decoder or out-of-range sampling values
+    """
+    decoder = data.get('decoder', 'greedy')
+    if decoder not in ('greedy', 'sample'):
+        raise ValueError(f"Unknown decoder '{decoder}' (use 'greedy' or 'sample')")
+
+    options = {
+        "do_sample": decoder == 'sample',
+        "temperature": float(data.get('temperature', 1.0)),
+        "top_k": int(data.get('top_k', 50)),
+        "top_p": float(data.get('top_p', 1.0)),
+    }
+    if options["temperature"] <= 0 or not 0 < options["top_p"] <= 1 or options["top_k"] < 0:
+        raise ValueError("temperature must be > 0, top_p in (0, 1] and top_k >= 0")
+    return options
+
+
+def _sse_response(events, on_done=None):
+    """
+    Send event dicts as server-sent events
+    
+    Args:
+        events: Iterable of {"event": name, ...} dicts
+        on_done: Optional callable that completes the final "done" payload
+    
+    Returns:
+        Response: text/event-stream response
+    """
+    def stream():
+        for event in events:
+            name = event.pop("event")
+            if name == "done" and on_done:
+                event = on_done(event)
+            yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# HTTP metrics, recorded for every request
+HTTP_REQUESTS = REGISTRY.counter("http_requests_total", "HTTP requests by route, method and status",
+                                 ("endpoint", "method", "status"))
+HTTP_SECONDS = REGISTRY.histogram("http_request_duration_seconds",
+                                  "Time to produce the response (streamed bodies excluded)",
+                                  STAGE_BUCKETS_SECONDS, ("endpoint",))
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "Requests being handled")
+
+
+def _register_metrics():
+    """Export model, cache, queue and memory statistics, read at scrape time"""
+    def cache_stats():
+        if not summarizer:
+            return {}
+        stats = {"tokens": summarizer.token_cache.stats()}
+        if summarizer.result_cache:
+            stats["results"] = summarizer.result_cache.stats()
+        if answer_cache:
+            stats["answers"] = answer_cache.stats()
+        return stats
+
+    def hits():
+        samples = []
+        for cache, stats in cache_stats().items():
+            if cache == "results":
+                samples.append(({"cache": cache, "tier": "memory"}, stats["memory_hits"]))
+                samples.append(({"cache": cache, "tier": "disk"}, stats["disk_hits"]))
+            elif cache == "answers":
+                samples.append(({"cache": cache, "tier": "exact"}, stats["exact_hits"]))
+                samples.append(({"cache": cache, "tier": "similar"}, stats["similar_hits"]))
+            else:
+                samples.append(({"cache": cache, "tier": "memory"}, stats["hits"]))
+        return samples
+
+    def hit_ratio():
+        samples = []
+        for cache, stats in cache_stats().items():
+            hit_count = stats.get("hits", stats.get("memory_hits", 0) + stats.get("disk_hits", 0))
+            lookups = hit_count + stats["misses"]
+            samples.append(({"cache": cache}, hit_count / lookups if lookups else 0.0))
+        return samples
+
+    def memory():
+        samples = []
+        process = serving.process_memory()
+        if process:
+            samples += [({"kind": "rss"}, process["rss"]), ({"kind": "pss"}, process["pss"])]
+        if summarizer and summarizer.model_memory_bytes() is not None:
+            samples.append(({"kind": "model_parameters"}, summarizer.model_memory_bytes()))
+        return samples
+
+    def executor_load():
+        if not summarizer:
+            return []
+        stats = summarizer.executor.stats()
+        return [({"state": "queued"}, stats["queued"]), ({"state": "running"}, stats["running"])]
+
+    REGISTRY.register("model_ready", "1 once the model is loaded and warmed up", "gauge",
+                      lambda: [({}, 1 if summarizer is not None else 0)])
+    REGISTRY.register("memory_bytes", "Process RSS/PSS and model parameter memory", "gauge", memory)
+    REGISTRY.register("cache_hits_total", "Cache hits by cache and tier", "counter", hits)
+    REGISTRY.register("cache_misses_total", "Cache misses", "counter",
+                      lambda: [({"cache": cache}, stats["misses"]) for cache, stats in cache_stats().items()])
+    REGISTRY.register("cache_hit_ratio", "Hits / lookups since start", "gauge", hit_ratio)
+    REGISTRY.register("inference_calls", "Model calls waiting for or running on an inference slot",
+                      "gauge", executor_load)
+    REGISTRY.register("inference_queue_wait_seconds", "Wait for a free inference slot", "histogram",
+                      lambda: [({}, summarizer.executor.queue_wait_ms)] if summarizer else [], scale=0.001)
+    REGISTRY.register("batching_queue_wait_seconds", "Wait in the micro-batching queue", "histogram",
+                      lambda: [({}, scheduler.queue_wait_ms)] if scheduler else [], scale=0.001)
+    REGISTRY.register("batching_batch_size", "Requests per micro-batch", "histogram",
+                      lambda: [({}, scheduler.batch_size)] if scheduler else [])
+    REGISTRY.register("streaming_ttft_seconds", "Time to first streamed token", "histogram",
+                      lambda: [({}, summarizer.ttft_ms)] if summarizer else [], scale=0.001)
+    def session_tiers(field):
+        if not chat_sessions:
+            return []
+        stats = chat_sessions.stats()
+        return [({"tier": tier}, stats[f"{tier}_{field}"]) for tier in ("memory", "disk")]
+
+    REGISTRY.register("chat_sessions", "Chat sessions in memory and spilled to disk", "gauge",
+                      lambda: session_tiers("sessions"))
+    REGISTRY.register("chat_session_bytes", "Bytes held by chat sessions per tier", "gauge",
+                      lambda: session_tiers("bytes"))
+    REGISTRY.register("jobs", "Asynchronous jobs by state", "gauge",
+                      lambda: [({"status": status}, count) for status, count in job_store.counts().items()]
+                      if job_store else [])
+
+
+_register_metrics()
+
+
+@app.before_request
+def _start_request_metrics():
+    """Count the request as in flight and start its timer"""
+    g.metrics_started = time.perf_counter()
+    HTTP_IN_FLIGHT.inc()
+
+
+@app.after_request
+def _record_request_metrics(response):
+    """Count the response by route, method and status and observe its latency"""
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    HTTP_REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+    if "metrics_started" in g:
+        HTTP_SECONDS.labels(endpoint).observe(time.perf_counter() - g.metrics_started)
+    return response
+
+
+@app.teardown_request
+def _finish_request_metrics(error=None):
+    """Release the in-flight slot (runs even when the view raised)"""
+    if g.pop("metrics_started", None) is not None:
+        HTTP_IN_FLIGHT.dec()
+
+
+# Routes never profiled: scrapes and probes would crowd out real requests
+_UNPROFILED_PATHS = ('/api/metrics', '/api/health', '/api/ready')
+
+
+@app.before_request
+def _start_request_profile():
+    """Profile this /api/* request when it is flagged or sampled"""
+    if profiler is None or not request.path.startswith('/api/') or request.path in _UNPROFILED_PATHS:
+        return
+    flag = request.headers.get('X-Profile') or request.args.get('_profile')
+    reason = profiler.wanted(flag)
+    if reason is None:
+        return
+    request_id = profiling.safe_id(request.headers.get('X-Request-ID', '')) or uuid.uuid4().hex[:16]
+    g.profile_request_id = request_id
+    g.profile = profiler.begin(request_id)
+    g.profile_reason = reason
+
+
+@app.after_request
+def _tag_profiled_response(response):
+    """Tell the client which profile its request went to"""
+    if "profile_request_id" in g:
+        response.headers['X-Request-ID'] = g.profile_request_id
+        if g.get("profile") is not None:
+            response.headers['X-Profile-Id'] = g.profile.profile_id
+        else:
+            response.headers['X-Profile'] = 'busy'
+        g.profile_status = response.status_code
+    return response
+
+
+@app.teardown_request
+def _finish_request_profile(error=None):
+    """Stop the profile and write its trace files (after streamed bodies finish)"""
+    profile = g.pop("profile", None)
+    if profile is None:
+        return
+    meta = {
+        "method": request.method,
+        "path": request.path,
+        "status": g.get("profile_status", 500),
+        "reason": g.get("profile_reason"),
+    }
+    if error is not None:
+        meta["error"] = repr(error)
+    try:
+        profiler.end(profile, meta)
+    except Exception as e:
+        logger.error(f"Error writing profile {profile.profile_id}: {e}")
+
+
 def get_app():
     """Get or create the Flask app"""
     global app
@@ -120,19 +637,30 @@ def summarize():
             return jsonify({"error": "No text provided"}), 400
         
         if not summarizer:
-            return jsonify({"error": "Summarizer not initialized"}), 500
+            return _model_unavailable()
+        
+        use_cache = not data.get('bypass_cache', False)
+        options = _generation_options(data)
         
         # Clean text
-        text = TextProcessor.clean_text(text)
+        with stage("clean"):
+            text = TextProcessor.clean_text(text)
         
         # Summarize
-        result = summarizer.summarize(text)
+        result = _run_model_request(
+            "summarize",
+            (text, use_cache, options["profile"]),
+            lambda: summarizer.summarize(text, use_cache=use_cache, **options),
+            group=(use_cache, options["profile"]),
+            batchable=options["deadline_ms"] is None and summarizer.fits_window(text)
+        )
         
         if result.get("error"):
             return jsonify(result), 400
         
         # Extract keywords
-        keywords = ContextBinder.extract_keywords(text, num_keywords=5)
+        with stage("keywords"):
+            keywords = ContextBinder.extract_keywords(text, num_keywords=5)
         result["keywords"] = keywords
         
         # Save to history
@@ -145,11 +673,51 @@ def summarize():
         
         return jsonify(result), 200
     
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except TimeoutError as e:
+        logger.warning(f"Timed out in summarize endpoint: {e}")
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         logger.error(f"Error in summarize endpoint: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/summarize/stream', methods=['POST'])
+def summarize_stream():
+    """API endpoint streaming the summary as server-sent events"""
+    try:
+        data = request.get_json()
+        text = data.get('text', '').strip()
+        
+        if not text:
+            return jsonify({"error": "No text provided"}), 400
+        
+        if not summarizer:
+            return _model_unavailable()
+        
+        options = dict(_decoding_options(data), **_generation_options(data))
+        with stage("clean"):
+            text = TextProcessor.clean_text(text)
+        
+        def finish(result):
+            # Same metadata and history entry as /api/summarize
+            with stage("keywords"):
+                keywords = ContextBinder.extract_keywords(text, num_keywords=5)
+            result["keywords"] = keywords
+            if history_manager:
+                history_manager.add_entry(text, result.get('summary', ''), keywords=keywords)
+            return result
+        
+        return _sse_response(summarizer.summarize_stream(text, **options), on_done=finish)
+    
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in summarize-stream endpoint: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/api/summarize-context', methods=['POST'])
 def summarize_with_context():
     """API endpoint for contextual summarization"""
@@ -162,17 +730,27 @@ def summarize_with_context():
             return jsonify({"error": "No text provided"}), 400
         
         if not summarizer:
-            return jsonify({"error": "Summarizer not initialized"}), 500
+            return _model_unavailable()
         
-        text = TextProcessor.clean_text(text)
-        context = TextProcessor.clean_text(context) if context else None
+        use_cache = not data.get('bypass_cache', False)
+        options = _generation_options(data)
+        with stage("clean"):
+            text = TextProcessor.clean_text(text)
+            context = TextProcessor.clean_text(context) if context else None
         
-        result = summarizer.summarize_with_context(text, context)
+        result = _run_model_request(
+            "summarize_context",
+            (text, context, use_cache, options["profile"]),
+            lambda: summarizer.summarize_with_context(text, context, use_cache=use_cache, **options),
+            group=(use_cache, options["profile"]),
+            batchable=options["deadline_ms"] is None and summarizer.fits_window(text, context)
+        )
         
         if result.get("error"):
             return jsonify(result), 400
         
-        keywords = ContextBinder.extract_keywords(text, num_keywords=5)
+        with stage("keywords"):
+            keywords = ContextBinder.extract_keywords(text, num_keywords=5)
         result["keywords"] = keywords
         
         if history_manager:
@@ -180,11 +758,128 @@ def summarize_with_context():
         
         return jsonify(result), 200
     
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except TimeoutError as e:
+        logger.warning(f"Timed out in summarize-context endpoint: {e}")
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         logger.error(f"Error in summarize-context endpoint: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """API endpoint queueing a summarization job (returns 202 with the job)"""
+    try:
+        if job_store is None:
+            return jsonify({"error": "Job queue not initialized"}), 500
+
+        data = request.get_json()
+        text = data.get('text', '').strip()
+        context = data.get('context', '').strip()
+        
+        if not text:
+            return jsonify({"error": "No text provided"}), 400
+        
+        max_length = data.get('max_length')
+        if max_length is not None:
+            max_length = int(max_length)
+            if max_length <= 0:
+                raise ValueError("max_length must be positive")
+        
+        payload = {
+            "text": TextProcessor.clean_text(text),
+            "context": TextProcessor.clean_text(context) if context else None,
+            "max_length": max_length,
+            "profile": _generation_options(data)["profile"],
+            "bypass_cache": bool(data.get('bypass_cache', False)),
+        }
+        job = job_store.submit("summarize", payload)
+        if job_runner:
+            job_runner.notify()
+        
+        return jsonify(job), 202, {"Location": f"/api/jobs/{job['id']}"}
+    
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in submit-job endpoint: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """API endpoint listing recent jobs (optional ?status= and ?limit=)"""
+    try:
+        if job_store is None:
+            return jsonify({"error": "Job queue not initialized"}), 500
+
+        status = request.args.get('status')
+        if status and status not in JOB_STATES:
+            return jsonify({"error": f"Unknown status '{status}'"}), 400
+        limit = request.args.get('limit', 50, type=int)
+        
+        return jsonify({
+            "jobs": job_store.list(status, limit),
+            "counts": job_store.counts(),
+            "running_here": job_runner.running() if job_runner else [],
+        }), 200
+    
+    except Exception as e:
+        logger.error(f"Error listing jobs: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """API endpoint for a job's status and progress"""
+    try:
+        job = job_store.get(job_id) if job_store else None
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        
+        return jsonify(job), 200
+    
+    except Exception as e:
+        logger.error(f"Error getting job: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """API endpoint for a finished job's result (409 while it is queued or running)"""
+    try:
+        job = job_store.get(job_id, include_result=True) if job_store else None
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        
+        if job["status"] not in FINISHED_STATES:
+            return jsonify({"error": f"Job is {job['status']}", "status": job["status"],
+                            "progress": job["progress"]}), 409
+        
+        return jsonify(job), 200
+    
+    except Exception as e:
+        logger.error(f"Error getting job result: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """API endpoint cancelling a job (running jobs stop at their next progress report)"""
+    try:
+        job = job_store.cancel(job_id) if job_store else None
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        
+        return jsonify(job), 200
+    
+    except Exception as e:
+        logger.error(f"Error cancelling job: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/api/extract-keywords', methods=['POST'])
 def extract_keywords():
     """API endpoint for keyword extraction"""
@@ -232,12 +927,42 @@ def text_info():
         return jsonify({"error": str(e)}), 500
 
 
+def _session_id(data=None):
+    """
+    Chat session ID of the request
+    
+    Taken from the JSON body's "session_id", the X-Session-ID header or the
+    session_id query parameter, in that order; DEFAULT_SESSION_ID otherwise.
+    
+    Raises:
+        ValueError: When the ID is malformed
+    """
+    session_id = ((data or {}).get('session_id') or request.headers.get('X-Session-ID')
+                  or request.args.get('session_id') or DEFAULT_SESSION_ID)
+    return check_session_id(session_id)
+
+
+def _no_document(session_id):
+    """Response body for a question to a session without a document"""
+    return {"success": False, "error": "No document loaded. Please load a document first.",
+            "session_id": session_id}
+
+
+def _session_answer_stream(session_id, question, options):
+    """Stream an answer while keeping the session pinned in memory"""
+    with chat_sessions.session(session_id) as bot:
+        if bot is None:
+            yield dict(_no_document(session_id), event="error")
+            return
+        yield from bot.answer_question_stream(question, **options)
+
+
 @app.route('/api/chatbot/load', methods=['POST'])
 def chatbot_load():
     """API endpoint to load document for chatbot"""
     try:
-        if not chatbot:
-            return jsonify({"error": "Chatbot not initialized"}), 500
+        if not chat_sessions:
+            return _model_unavailable("Chatbot")
         
         data = request.get_json()
         text = data.get('text', '').strip()
@@ -245,11 +970,22 @@ def chatbot_load():
         if not text:
             return jsonify({"error": "No text provided"}), 400
         
+        session_id = _session_id(data)
+        # Summarizing and indexing continue in the background unless the client waits;
+        # sessions shared by worker processes load in the request, so they are
+        # written for the other workers when it returns
+        background = (app.config.get('CHATBOT_LOAD_BACKGROUND', True) and not data.get('wait', False)
+                      and not chat_sessions.shared)
         text = TextProcessor.clean_text(text)
-        result = chatbot.load_document(text)
+        with chat_sessions.session(session_id, create=True) as bot:
+            result = bot.load_document(text, use_cache=not data.get('bypass_cache', False),
+                                       background=background, **_generation_options(data))
+        result["session_id"] = session_id
         
         return jsonify(result), 200
     
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error in chatbot-load endpoint: {e}")
         return jsonify({"error": str(e)}), 500
@@ -259,8 +995,8 @@ def chatbot_load():
 def chatbot_ask():
     """API endpoint for chatbot question answering"""
     try:
-        if not chatbot:
-            return jsonify({"error": "Chatbot not initialized"}), 500
+        if not chat_sessions:
+            return _model_unavailable("Chatbot")
         
         data = request.get_json()
         question = data.get('question', '').strip()
@@ -268,26 +1004,136 @@ def chatbot_ask():
         if not question:
             return jsonify({"error": "No question provided"}), 400
         
-        result = chatbot.answer_question(question)
+        session_id = _session_id(data)
+        options = _generation_options(data)
+        with chat_sessions.session(session_id) as bot:
+            if bot is None:
+                return jsonify(_no_document(session_id)), 200
+            result = _run_model_request(
+                "chatbot_ask",
+                (bot, question, options["profile"]),
+                lambda: bot.answer_question(question, **options),
+                group=(session_id, options["profile"]),
+                batchable=options["deadline_ms"] is None
+            )
+        result["session_id"] = session_id
         
         return jsonify(result), 200
     
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except TimeoutError as e:
+        logger.warning(f"Timed out in chatbot-ask endpoint: {e}")
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         logger.error(f"Error in chatbot-ask endpoint: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/chatbot/ask-batch', methods=['POST'])
+def chatbot_ask_batch():
+    """API endpoint answering a list of questions in batched generate calls"""
+    try:
+        if not chat_sessions:
+            return _model_unavailable("Chatbot")
+        
+        data = request.get_json()
+        questions = data.get('questions')
+        
+        if not isinstance(questions, list) or not questions:
+            return jsonify({"error": "No questions provided"}), 400
+        if not all(isinstance(question, str) and question.strip() for question in questions):
+            return jsonify({"error": "questions must be non-empty strings"}), 400
+        max_questions = app.config.get('CHATBOT_MAX_BATCH_QUESTIONS', 100)
+        if len(questions) > max_questions:
+            return jsonify({"error": f"At most {max_questions} questions per request"}), 400
+        
+        batch_size = data.get('batch_size')
+        if batch_size is not None and (not isinstance(batch_size, int) or batch_size < 1):
+            return jsonify({"error": "batch_size must be a positive integer"}), 400
+        
+        session_id = _session_id(data)
+        options = _generation_options(data)
+        with chat_sessions.session(session_id) as bot:
+            if bot is None:
+                return jsonify(_no_document(session_id)), 200
+            result = bot.answer_questions([question.strip() for question in questions],
+                                          batch_size=batch_size, **options)
+        result["session_id"] = session_id
+        
+        return jsonify(result), 200
+    
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in chatbot-ask-batch endpoint: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/chatbot/ask/stream', methods=['POST'])
+def chatbot_ask_stream():
+    """API endpoint streaming a chatbot answer as server-sent events"""
+    try:
+        if not chat_sessions:
+            return _model_unavailable("Chatbot")
+        
+        data = request.get_json()
+        question = data.get('question', '').strip()
+        
+        if not question:
+            return jsonify({"error": "No question provided"}), 400
+        
+        session_id = _session_id(data)
+        options = dict(_decoding_options(data), **_generation_options(data))
+        return _sse_response(_session_answer_stream(session_id, question, options))
+    
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in chatbot-ask-stream endpoint: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/chatbot/status', methods=['GET'])
+def chatbot_status():
+    """API endpoint reporting the progress of a session's document load"""
+    try:
+        if not chat_sessions:
+            return _model_unavailable("Chatbot")
+        
+        session_id = _session_id()
+        with chat_sessions.session(session_id) as bot:
+            status = bot.load_status() if bot is not None else {"state": "empty"}
+        status["session_id"] = session_id
+        
+        return jsonify(status), 200
+    
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in chatbot-status endpoint: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/api/chatbot/summary', methods=['GET'])
 def chatbot_summary():
     """API endpoint to get current chatbot summary"""
     try:
-        if not chatbot:
-            return jsonify({"error": "Chatbot not initialized"}), 500
+        if not chat_sessions:
+            return _model_unavailable("Chatbot")
         
-        result = chatbot.get_document_summary()
+        session_id = _session_id()
+        with chat_sessions.session(session_id) as bot:
+            if bot is None:
+                return jsonify({"success": False, "error": "No document loaded",
+                                "session_id": session_id}), 200
+            result = bot.get_document_summary()
+        result["session_id"] = session_id
         
         return jsonify(result), 200
     
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error in chatbot-summary endpoint: {e}")
         return jsonify({"error": str(e)}), 500
@@ -297,18 +1143,29 @@ def chatbot_summary():
 def chatbot_clear():
     """API endpoint to clear chatbot context"""
     try:
-        if not chatbot:
-            return jsonify({"error": "Chatbot not initialized"}), 500
+        if not chat_sessions:
+            return _model_unavailable("Chatbot")
         
-        result = chatbot.clear_context()
+        session_id = _session_id(request.get_json(silent=True))
+        chat_sessions.remove(session_id)
         
-        return jsonify(result), 200
+        return jsonify({"success": True, "message": "Context cleared", "session_id": session_id}), 200
     
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error in chatbot-clear endpoint: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/chatbot/sessions', methods=['GET'])
+def chatbot_sessions():
+    """API endpoint for chat session store statistics"""
+    if not chat_sessions:
+        return _model_unavailable("Chatbot")
+    return jsonify(chat_sessions.stats()), 200
+
+
 @app.route('/api/history', methods=['GET'])
 def get_history():
     """API endpoint to get summarization history"""
@@ -364,18 +1221,112 @@ def clear_history():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """API endpoint for result, token and chatbot answer cache statistics"""
+    if not summarizer:
+        return _model_unavailable()
+
+    stats = {
+        "results": summarizer.result_cache.stats() if summarizer.result_cache else None,
+        "tokens": summarizer.token_cache.stats(),
+        "answers": answer_cache.stats() if answer_cache else None,
+    }
+    return jsonify(stats), 200
+
+
+@app.route('/api/cache/clear', methods=['POST'])
+def cache_clear():
+    """API endpoint to clear the summary result and chatbot answer caches"""
+    if not summarizer:
+        return _model_unavailable()
+
+    if summarizer.result_cache:
+        summarizer.result_cache.clear()
+    if answer_cache:
+        answer_cache.clear()
+    summarizer.token_cache.clear()
+    return jsonify({"success": True, "message": "Cache cleared"}), 200
+
+
+@app.route('/api/batching/stats', methods=['GET'])
+def batching_stats():
+    """API endpoint for micro-batching queue-wait and batch-size histograms"""
+    if not scheduler:
+        return jsonify({"enabled": False}), 200
+
+    return jsonify({"enabled": True, **scheduler.stats()}), 200
+
+
+@app.route('/api/generation/profiles', methods=['GET'])
+def generation_profiles():
+    """API endpoint listing generation profiles and the fitted decode cost model"""
+    if not summarizer:
+        return _model_unavailable()
+
+    profiles = {}
+    for name in app.config.get('GENERATION_PROFILES', {}):
+        profiles[name] = summarizer.generation_profile(name)[1]
+    return jsonify({
+        "default": summarizer.generation_profile()[0],
+        "profiles": profiles,
+        "cost_model": summarizer.cost_model.snapshot(),
+        "prompt_lookup": summarizer.prompt_lookup_stats(),
+    }), 200
+
+
+@app.route('/api/streaming/stats', methods=['GET'])
+def streaming_stats():
+    """API endpoint for the time-to-first-token histogram of streamed responses"""
+    if not summarizer:
+        return _model_unavailable()
+
+    return jsonify({"ttft_ms": summarizer.ttft_ms.snapshot()}), 200
+
+
+@app.route('/api/inference/stats', methods=['GET'])
+def inference_stats():
+    """API endpoint for inference slots, thread settings and queue wait"""
+    if not summarizer:
+        return _model_unavailable()
+
+    return jsonify(summarizer.executor.stats()), 200
+
+
+@app.route('/api/server/stats', methods=['GET'])
+def server_stats():
+    """API endpoint for memory (RSS/PSS) of the master and worker processes"""
+    return jsonify(serving.memory_report()), 200
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics: stage timings, tokens, cache hit rates, queues, in-flight requests and memory"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
 @app.route('/api/health', methods=['GET'])
 def health():
-    """Health check endpoint"""
+    """Health check endpoint (liveness, with model load phase and timings)"""
     status = {
         "status": "ok",
         "summarizer": summarizer is not None,
-        "chatbot": chatbot is not None,
-        "history_manager": history_manager is not None
+        "chatbot": chat_sessions is not None,
+        "history_manager": history_manager is not None,
+        "job_runner": job_runner is not None,
+        "model_load": model_loader.status() if model_loader else None
     }
     return jsonify(status), 200
 
 
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """Readiness endpoint: 200 once the model is loaded and warmed up, 503 before"""
+    is_ready = summarizer is not None and chat_sessions is not None
+    status = model_loader.status() if model_loader else {"phase": "ready" if is_ready else "pending"}
+    return jsonify({"ready": is_ready, "phase": status["phase"]}), 200 if is_ready else 503
+
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
@@ -5,6 +5,9 @@
 // API Base URL
 const API_BASE = '/api';
 
+// Chat session of this page, so each tab gets its own chatbot document
+const CHAT_SESSION_ID = Date.now().toString(36) + Math.random().toString(36).slice(2, 10);
+
 // Helper to safely get elements
 function el(id) {
     return document.getElementById(id);
@@ -193,6 +196,10 @@ Generated by Document Summarizer & Contextual Binding
 // CHATBOT FUNCTIONS
 // ==========================================
 
+// Delay between load status polls, and a counter that stops polling a replaced load
+const LOAD_POLL_INTERVAL_MS = 500;
+let chatbotLoadId = 0;
+
 async function loadChatbotDocument() {
     const text = document.getElementById('chatbotText').value.trim();
     
@@ -207,23 +214,23 @@ async function loadChatbotDocument() {
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({ text })
+            body: JSON.stringify({ text, session_id: CHAT_SESSION_ID })
         });
         
         const data = await response.json();
         
         if (response.ok && data.success) {
+            const loadId = ++chatbotLoadId;
             document.getElementById('chatInterface').style.display = 'block';
             document.getElementById('chatHistory').innerHTML = '';
+            const details = `${data.word_count} words, ${data.reading_time} min read`;
             
-            const statusDiv = document.getElementById('chatbotStatus');
-            statusDiv.className = 'status-message success';
-            statusDiv.innerHTML = `✓ Document loaded successfully! (${data.word_count} words, ${data.reading_time} min read)`;
-            statusDiv.style.display = 'block';
-            
-            addChatMessage('assistant', 'Document loaded! I can now answer questions about it. What would you like to know?');
-            
-            showNotification('Document loaded successfully!', 'success');
+            if (data.status === 'loading') {
+                setChatbotStatus('loading', `⏳ Analyzing document (${details})...`);
+                await pollChatbotStatus(loadId, details);
+            } else {
+                chatbotReady(details);
+            }
         } else {
             showNotification(data.error || 'Error loading document', 'error');
         }
@@ -233,6 +240,49 @@ async function loadChatbotDocument() {
     }
 }
 
+async function pollChatbotStatus(loadId, details) {
+    // Summary and index are built in the background; wait for them before inviting questions
+    while (loadId === chatbotLoadId) {
+        await new Promise(resolve => setTimeout(resolve, LOAD_POLL_INTERVAL_MS));
+        if (loadId !== chatbotLoadId) {
+            return;
+        }
+        
+        const response = await fetch(`${API_BASE}/chatbot/status?session_id=${encodeURIComponent(CHAT_SESSION_ID)}`);
+        const status = await response.json();
+        if (loadId !== chatbotLoadId) {
+            return;
+        }
+        
+        if (!response.ok || status.state === 'failed' || status.state === 'empty') {
+            const error = status.error || 'The document could not be analyzed';
+            setChatbotStatus('error', `✗ Loading failed: ${error}`);
+            addChatMessage('assistant', 'Sorry, I could not analyze this document. Please try loading it again.');
+            showNotification('Error loading document', 'error');
+            return;
+        }
+        if (status.state === 'ready') {
+            chatbotReady(details);
+            return;
+        }
+        const step = status.index_ready ? 'passages indexed, summarizing' : 'indexing passages';
+        setChatbotStatus('loading', `⏳ Analyzing document (${details}): ${step}...`);
+    }
+}
+
+function chatbotReady(details) {
+    setChatbotStatus('success', `✓ Document loaded successfully! (${details})`);
+    addChatMessage('assistant', 'Document loaded! I can now answer questions about it. What would you like to know?');
+    showNotification('Document loaded successfully!', 'success');
+}
+
+function setChatbotStatus(state, message) {
+    const statusDiv = document.getElementById('chatbotStatus');
+    statusDiv.className = `status-message ${state}`;
+    statusDiv.textContent = message;
+    statusDiv.style.display = 'block';
+}
+
 async function askQuestion() {
     const question = document.getElementById('chatQuestion').value.trim();
     
@@ -251,7 +301,7 @@ async function askQuestion() {
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({ question })
+            body: JSON.stringify({ question, session_id: CHAT_SESSION_ID })
         });
         
         const data = await response.json();
@@ -296,6 +346,14 @@ function handleChatKeypress(event) {
 }
 
 function unloadChatbot() {
+    chatbotLoadId++;
+    fetch(`${API_BASE}/chatbot/clear`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({ session_id: CHAT_SESSION_ID })
+    }).catch(error => console.error('Error:', error));
     document.getElementById('chatInterface').style.display = 'none';
     document.getElementById('chatbotText').value = '';
     document.getElementById('chatHistory').innerHTML = '';